@@ -0,0 +1,83 @@
+"""Async micro-batching: gather single requests into one call per key.
+
+``MicroBatcher.submit(key, item)`` parks the item in the bucket for ``key``.
+A bucket is handed to ``flush(key, items)`` as soon as it holds
+``batch_size`` items, or ``max_wait_s`` after its first item arrived,
+whichever comes first. ``flush`` returns one result per item, in order, and
+each submitter gets its own entry back. If ``flush`` raises, every item of
+that bucket gets the exception.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+FlushFn = Callable[[Hashable, List[Any]], Awaitable[List[Any]]]
+
+
+class _Bucket:
+    __slots__ = ("entries", "timer")
+
+    def __init__(self) -> None:
+        self.entries: List[Tuple[Any, "asyncio.Future[Any]"]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    def __init__(self, flush: FlushFn, *, batch_size: int, max_wait_s: float) -> None:
+        self._flush = flush
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_s))
+        self._buckets: Dict[Hashable, _Bucket] = {}
+        self._running: Set["asyncio.Task[None]"] = set()
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Any]" = loop.create_future()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+            bucket.timer = loop.call_later(self.max_wait_s, self._flush_bucket, key)
+        bucket.entries.append((item, future))
+        if len(bucket.entries) >= self.batch_size:
+            self._flush_bucket(key)
+        return await future
+
+    def _flush_bucket(self, key: Hashable) -> None:
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            return
+        if bucket.timer is not None:
+            bucket.timer.cancel()
+        task = asyncio.ensure_future(self._run(key, bucket.entries))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, entries: List[Tuple[Any, "asyncio.Future[Any]"]]) -> None:
+        try:
+            results = await self._flush(key, [item for item, _future in entries])
+            if len(results) != len(entries):
+                raise RuntimeError(f"flush returned {len(results)} results for {len(entries)} items")
+        except BaseException as exc:
+            for _item, future in entries:
+                if not future.done():
+                    future.set_exception(exc)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return
+        for (_item, future), result in zip(entries, results):
+            if not future.done():
+                future.set_result(result)
+
+    def close(self) -> None:
+        """Drop queued items and stop waiting on flushes still running."""
+        for key in list(self._buckets):
+            bucket = self._buckets.pop(key)
+            if bucket.timer is not None:
+                bucket.timer.cancel()
+            for _item, future in bucket.entries:
+                future.cancel()
+        for task in list(self._running):
+            task.cancel()
@@ -109,8 +109,68 @@ class Settings:
     product_data_fallback_timeout_seconds: float = _env_float_min(
         "PRODUCT_DATA_FALLBACK_TIMEOUT_SECONDS", 10.0, 0.1
     )
+    # product_data executor: worker threads and how many tasks may wait for one
+    # before /analyze answers 503 (0 = unbounded queue).
+    product_data_workers: int = _env_int_min("PRODUCT_DATA_WORKERS", 4, 1)
+    product_data_max_queue: int = _env_int_min("PRODUCT_DATA_MAX_QUEUE", 32, 0)
+    # LLM scheduler: concurrent OpenRouter calls per process, per-class caps
+    # (0 = only the global limit), WFQ weights, and the interactive queue wait
+    # above which background/batch calls are throttled.
+    llm_max_concurrency: int = _env_int_min("LLM_MAX_CONCURRENCY", 16, 1)
+    llm_background_max_concurrency: int = _env_int_min("LLM_BACKGROUND_MAX_CONCURRENCY", 2, 0)
+    llm_batch_max_concurrency: int = _env_int_min("LLM_BATCH_MAX_CONCURRENCY", 1, 0)
+    llm_interactive_weight: float = _env_float_min("LLM_INTERACTIVE_WEIGHT", 8.0, 0.1)
+    llm_background_weight: float = _env_float_min("LLM_BACKGROUND_WEIGHT", 2.0, 0.1)
+    llm_batch_weight: float = _env_float_min("LLM_BATCH_WEIGHT", 1.0, 0.1)
+    llm_interactive_wait_target_ms: float = _env_float_min("LLM_INTERACTIVE_WAIT_TARGET_MS", 500.0, 0.0)
+    # /analyze-all stage deadlines, measured from the start of the request: the
+    # single-call stages (fast classification, price, size) and the rest.
+    analyze_all_fast_deadline_seconds: float = _env_float_min("ANALYZE_ALL_FAST_DEADLINE_SECONDS", 30.0, 1.0)
+    analyze_all_deadline_seconds: float = _env_float_min("ANALYZE_ALL_DEADLINE_SECONDS", 120.0, 1.0)
+    # /analyze/batch: most items per request and how many are analyzed at once
+    # (the per-request ``concurrency`` field may only lower it).
+    analyze_batch_max_items: int = _env_int_min("ANALYZE_BATCH_MAX_ITEMS", 500, 1)
+    analyze_batch_concurrency: int = _env_int_min("ANALYZE_BATCH_CONCURRENCY", 4, 1)
+    # /title/analyze/batch: titles per batched prompt, how long a partial batch
+    # waits for more titles, and the most items per request.
+    title_batch_size: int = _env_int_min("TITLE_BATCH_SIZE", 20, 1)
+    title_batch_max_wait_ms: int = _env_int_min("TITLE_BATCH_MAX_WAIT_MS", 200, 0)
+    title_batch_max_items: int = _env_int_min("TITLE_BATCH_MAX_ITEMS", 10000, 1)
+    # Local title -> top-level category model (scripts/train_title_classifier.py);
+    # used instead of the first /title/analyze LLM call when its confidence
+    # reaches the minimum. A missing file turns it off.
+    title_classifier_path: str = os.getenv("TITLE_CLASSIFIER_PATH", "data/title_classifier.json")
+    title_classifier_min_confidence: float = _env_float_min("TITLE_CLASSIFIER_MIN_CONFIDENCE", 0.9, 0.0)
+    # Near-duplicate title answer cache (scripts/title_cache.py rebuild|update);
+    # a past answer is reused when its title's shingle Jaccard similarity
+    # reaches the minimum. A missing file turns it off.
+    title_cache_path: str = os.getenv("TITLE_CACHE_PATH", "logs/title_cache.db")
+    title_cache_min_similarity: float = _env_float_min("TITLE_CACHE_MIN_SIMILARITY", 0.9, 0.0)
+    # Groups with more candidate category paths than this are narrowed in two
+    # steps: the model first picks second-level nodes, then a path under them
+    # (0 = always send the full list).
+    category_hierarchical_threshold: int = _env_int_min("CATEGORY_HIERARCHICAL_THRESHOLD", 600, 0)
+    # A category path the model returns that is not exactly a candidate is
+    # replaced by the closest candidate at or above this similarity (0-1).
+    category_match_min_similarity: float = _env_float_min("CATEGORY_MATCH_MIN_SIMILARITY", 0.8, 0.0)
+    # Mark the per-group candidate list of category prompts as a prompt-cache
+    # breakpoint (``cache_control``), for providers that only cache on request.
+    prompt_cache_control: bool = _env_bool("PROMPT_CACHE_CONTROL", True)
+    # Upper bound for the ``wait`` long-poll parameter of the job poll endpoint.
+    job_poll_max_wait_seconds: int = _env_int_min("JOB_POLL_MAX_WAIT_SECONDS", 30, 0)
+    # Where analysis jobs live: memory (one worker), sqlite or redis (shared by workers).
+    job_store_backend: str = os.getenv("JOB_STORE_BACKEND", "memory").strip().lower()
+    job_store_path: str = os.getenv("JOB_STORE_PATH", "logs/jobs.db")
+    job_store_url: str = os.getenv("JOB_STORE_URL", "")
+    # Estimated memory cap for in-process jobs; least recently polled are evicted first (0 = no cap).
+    job_store_max_bytes: int = _env_int_min("JOB_STORE_MAX_BYTES", 256 * 1024 ** 2, 0)
     brand_csv_path: str = os.getenv("BRAND_CSV_PATH", "data/mercari_brand.csv")
     category_csv_path: str = os.getenv("CATEGORY_CSV_PATH", "data/category_rakuten.csv")
+    # Binary snapshots loaded instead of the CSVs; rebuilt when missing or older than the CSV ("" = off).
+    brand_snapshot_path: str = os.getenv("BRAND_SNAPSHOT_PATH", "data/mercari_brand.snapshot")
+    category_snapshot_path: str = os.getenv("CATEGORY_SNAPSHOT_PATH", "data/category_rakuten.snapshot")
+    # How often each worker checks the brand/category CSVs for changes and reloads them (0 = never).
+    reference_data_reload_seconds: int = _env_int_min("REFERENCE_DATA_RELOAD_SECONDS", 30, 0)
     openrouter_base_url: str = os.getenv(
         "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1/chat/completions"
     )
@@ -125,7 +185,12 @@ class Settings:
     log_retention_days: int = field(default_factory=lambda: _env_int_min("LOG_RETENTION_DAYS", 7, 1))
     log_max_total_bytes: int = field(default_factory=lambda: _env_int_min("LOG_MAX_TOTAL_BYTES", 5 * 1024 ** 3, 1024 ** 2))
     log_prune_interval_minutes: int = field(default_factory=lambda: _env_int_min("LOG_PRUNE_INTERVAL_MINUTES", 60, 1))
+    log_prune_batch_size: int = field(default_factory=lambda: _env_int_min("LOG_PRUNE_BATCH_SIZE", 500, 1))
     log_response_max_bytes: int = field(default_factory=lambda: _env_int_min("LOG_RESPONSE_MAX_BYTES", 2 * 1024 * 1024, 0))
+    metrics_enabled: bool = _env_bool("METRICS_ENABLED", True)
+    metrics_token: str = field(default_factory=lambda: os.getenv("METRICS_TOKEN", ""))
+    metrics_multiproc_dir: str = field(default_factory=lambda: os.getenv("METRICS_MULTIPROC_DIR", ""))
+    metrics_flush_seconds: int = field(default_factory=lambda: _env_int_min("METRICS_FLUSH_SECONDS", 5, 1))
     logs_password: str = field(default_factory=lambda: os.getenv("LOGS_PASSWORD", ""))
     logs_user: str = field(default_factory=lambda: os.getenv("LOGS_USER", "admin"))
 
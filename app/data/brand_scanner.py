@@ -0,0 +1,247 @@
+"""Find brand names mentioned anywhere in product text.
+
+``BrandScanner`` is an Aho-Corasick automaton over the normalised brand
+names of a ``BrandStore``: one pass over a text reports every indexed name
+it contains, however many names there are. The automaton is kept in flat
+columns so it costs a few bytes per trie node and can be written into the
+brand snapshot as is:
+
+- nodes are numbered breadth-first, so the children of a node are
+  consecutive ids ``first[n] .. first[n] + count[n]`` and ``labels[i]`` is
+  the character on the edge into node ``i``;
+- ``fail[n]`` is the longest proper suffix of node ``n`` that is also a
+  node, ``output[n]`` the name ending at ``n`` (or -1) and ``link[n]`` the
+  nearest node on the fail chain that ends a name.
+
+Positions are offsets into ``normalize_text(text)``, the form names are
+indexed in.
+"""
+from array import array
+from collections import defaultdict
+from typing import AbstractSet, Any, Dict, List, NamedTuple, Sequence, Tuple
+
+from ..utils import normalize_text
+
+
+# Where a mention was found; earlier fields are stronger evidence.
+FIELD_WEIGHTS = {"title": 3.0, "keywords": 2.0, "description": 1.0}
+# Shorter names are mostly noise inside other words ("ママ", "uk").
+MIN_NAME_CHARS = 3
+# Everyday words that are also brand names (WHITE, pearl, ...). Category
+# path words cover item types; these are the colours, materials and sizes.
+GENERIC_WORDS = frozenset(normalize_text(word) for word in (
+    "ホワイト", "ブラック", "レッド", "ブルー", "グリーン", "イエロー", "ピンク", "パープル",
+    "ブラウン", "ベージュ", "グレー", "グレイ", "ネイビー", "シルバー", "ゴールド", "オレンジ",
+    "カーキ", "アイボリー", "クリア", "レザー", "コットン", "ウール", "シルク", "デニム", "リネン",
+    "ナイロン", "ステンレス", "サイズ", "フリー", "セット", "ミニ", "ロング", "ショート", "ビッグ",
+    "レディース", "メンズ", "キッズ", "ベビー", "ヴィンテージ", "アンティーク", "ハンドメイド",
+    "オリジナル", "プレゼント", "ギフト", "ノーブランド",
+))
+# Flat columns of the automaton, in snapshot order.
+_ARRAYS = (("first", "I"), ("count", "I"), ("output", "i"), ("fail", "I"), ("link", "i"))
+
+
+def _script(char: str) -> str:
+    """Coarse script class; a mention may not continue a run of its own script."""
+    if char.isascii():
+        return "latin" if char.isalnum() else ""
+    code = ord(char)
+    if 0x30A0 <= code <= 0x30FF or 0x31F0 <= code <= 0x31FF:
+        return "katakana"
+    if 0x3040 <= code <= 0x309F:
+        return "hiragana"
+    if 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+        return "kanji"
+    if char.isalnum():
+        return "latin"
+    return ""
+
+
+def indexable(name: str) -> bool:
+    return len(name) >= MIN_NAME_CHARS and not name.isdigit()
+
+
+def distinctive(name: str, generic_words: AbstractSet[str] = frozenset()) -> bool:
+    """Whether a mention of indexed ``name`` is evidence of the brand on its own.
+
+    Latin-script and multi-word names are; a single kana or kanji word is
+    only when it is not an everyday word (``GENERIC_WORDS`` or
+    ``generic_words``, e.g. the words of the category paths).
+    """
+    if " " in name or any(_script(char) == "latin" for char in name):
+        return True
+    return name not in GENERIC_WORDS and name not in generic_words
+
+
+class BrandMention(NamedTuple):
+    name: str
+    field: str
+    start: int
+    end: int
+
+
+class BrandHit(NamedTuple):
+    """One brand found in the text, with every place it was mentioned."""
+
+    record: Any
+    score: float
+    mentions: Tuple[BrandMention, ...]
+
+
+class BrandScanner:
+    def __init__(self, names: Sequence[str], records: Sequence[Any]) -> None:
+        """``names[i]`` is a normalised name of ``records[i]``; unusable names are skipped."""
+        self._keep(names, records)
+        self._build()
+
+    def _keep(self, names: Sequence[str], records: Sequence[Any]) -> None:
+        self.names: List[str] = []
+        self.records: List[Any] = []
+        for name, record in zip(names, records):
+            if indexable(name):
+                self.names.append(name)
+                self.records.append(record)
+
+    def state(self) -> Dict[str, Any]:
+        """The automaton as plain values for a snapshot; see ``from_state``."""
+        state: Dict[str, Any] = {"labels": self._labels}
+        for name, _typecode in _ARRAYS:
+            state[name] = getattr(self, f"_{name}").tobytes()
+        return state
+
+    @classmethod
+    def from_state(cls, names: Sequence[str], records: Sequence[Any], state: Dict[str, Any]) -> "BrandScanner":
+        """Rebuild from ``state()`` and the same ``names`` and ``records`` it was built over."""
+        scanner = cls.__new__(cls)
+        scanner._keep(names, records)
+        scanner._labels = state["labels"]
+        for name, typecode in _ARRAYS:
+            column = array(typecode)
+            column.frombytes(state[name])
+            setattr(scanner, f"_{name}", column)
+        return scanner
+
+    def _build(self) -> None:
+        # Sorted prefixes of one length are already grouped by parent, in
+        # the order of the parents: that is the breadth-first numbering.
+        first, count = array("I", [1]), array("I", [0])
+        output, labels = array("i", [-1]), ["\0"]
+        ends = {name: position for position, name in reversed(list(enumerate(self.names)))}
+        names = sorted(ends)
+        parents, parent_base = [""], 0
+        depth = 1
+        while names:
+            level: List[str] = []
+            for name in names:
+                prefix = name[:depth]
+                if not level or level[-1] != prefix:
+                    level.append(prefix)
+            base = len(labels)
+            cursor = 0
+            for node, prefix in enumerate(level, base):
+                parent = prefix[:-1]
+                while parents[cursor] != parent:
+                    cursor += 1
+                if not count[parent_base + cursor]:
+                    first[parent_base + cursor] = node
+                count[parent_base + cursor] += 1
+                labels.append(prefix[-1])
+                output.append(ends.get(prefix, -1))
+            zeros = array("I", bytes(4 * len(level)))
+            first.extend(zeros)
+            count.extend(zeros)
+            parents, parent_base = level, base
+            depth += 1
+            names = [name for name in names if len(name) >= depth]
+        self._labels = "".join(labels)
+        self._first, self._count, self._output = first, count, output
+        self._link_failures()
+
+    def _link_failures(self) -> None:
+        labels, first, count, output = self._labels, self._first, self._count, self._output
+        size = len(labels)
+        fail, link = array("I", bytes(4 * size)), array("i", [-1]) * size
+        # Breadth-first numbering: parents are done before their children.
+        for node in range(size):
+            start = first[node]
+            for child in range(start, start + count[node]):
+                char = labels[child]
+                target = 0
+                if node:
+                    state = fail[node]
+                    while True:
+                        lo = first[state]
+                        found = labels.find(char, lo, lo + count[state])
+                        if found >= 0:
+                            target = found
+                            break
+                        if not state:
+                            break
+                        state = fail[state]
+                fail[child] = target
+                link[child] = target if output[target] >= 0 else link[target]
+        self._fail, self._link = fail, link
+
+    def find(self, text: str) -> List[Tuple[int, int, int]]:
+        """``(start, end, name position)`` of each name in normalised ``text``.
+
+        Matches must start and end at a script boundary; overlapping matches
+        keep the leftmost, then the longest.
+        """
+        labels, first, count = self._labels, self._first, self._count
+        fail, output, link = self._fail, self._output, self._link
+        names = self.names
+        found: List[Tuple[int, int, int]] = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            while True:
+                lo = first[state]
+                target = labels.find(char, lo, lo + count[state])
+                if target >= 0:
+                    state = target
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            node = state if output[state] >= 0 else link[state]
+            while node >= 0:
+                position = output[node]
+                found.append((end - len(names[position]), end, position))
+                node = link[node]
+        return self._select(text, found)
+
+    @staticmethod
+    def _select(text: str, found: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+        selected: List[Tuple[int, int, int]] = []
+        last_end = 0
+        for start, end, position in sorted(found, key=lambda hit: (hit[0], -hit[1])):
+            if start < last_end:
+                continue
+            if start and _script(text[start - 1]) == _script(text[start]) != "":
+                continue
+            if end < len(text) and _script(text[end]) == _script(text[end - 1]) != "":
+                continue
+            selected.append((start, end, position))
+            last_end = end
+        return selected
+
+    def scan(self, fields: Dict[str, str]) -> List[BrandHit]:
+        """Brands mentioned in ``fields`` (``title`` / ``keywords`` / ``description``), best first.
+
+        A brand scores the field weight times the name length of each
+        mention, so a long name in the title outranks a short one repeated
+        in the description.
+        """
+        records: Dict[int, Any] = {}
+        mentions: Dict[int, List[BrandMention]] = defaultdict(list)
+        scores: Dict[int, float] = defaultdict(float)
+        for field, raw in fields.items():
+            text = normalize_text(raw) if raw else ""
+            for start, end, position in self.find(text):
+                record = self.records[position]
+                records[id(record)] = record
+                mentions[id(record)].append(BrandMention(self.names[position], field, start, end))
+                scores[id(record)] += FIELD_WEIGHTS.get(field, 1.0) * (end - start)
+        hits = [BrandHit(records[key], score, tuple(mentions[key])) for key, score in scores.items()]
+        hits.sort(key=lambda hit: (-hit.score, hit.mentions[0].start))
+        return hits
@@ -1,8 +1,15 @@
 import csv
 import difflib
-from typing import Any, Dict, List, Optional
+import logging
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from ..utils import normalize_text
+from .brand_scanner import BrandHit, BrandScanner
+from .records import Interner, SlotRecord
+from .snapshot import read_current_snapshot, source_fingerprint, write_snapshot
+
+_logger = logging.getLogger(__name__)
 
 BRAND_ID_FIELD_MAP = {
     "rakuten_brand_id": "rakuten_id",
@@ -25,49 +32,114 @@ def _clean_brand_id(value: str) -> str:
     return "" if cleaned == "0" else cleaned
 
 
-def _pick_brand_name(record: Dict[str, str]) -> str:
-    for field in ("name", "name_en", "name_jp"):
-        value = record.get(field, "").strip()
-        if value:
-            return value
-    return ""
+# Columns kept per brand, in snapshot order; the platform ids follow them.
+BRAND_COLUMNS = ("id", "name", "name_jp", "name_en", "name_cn")
+_NO_BRAND_IDS = ("",) * len(BRAND_ID_FIELD_MAP)
+
+
+class BrandRecord(SlotRecord):
+    """One brand row; ``record["brand_id_obj"]`` builds a fresh id dict on access."""
+
+    __slots__ = BRAND_COLUMNS + ("brand_name", "brand_ids")
+    KEYS = BRAND_COLUMNS + ("brand_name", "brand_id_obj")
+
+    def __init__(self, values: Tuple[str, ...], brand_ids: Tuple[str, ...]) -> None:
+        self.id, self.name, self.name_jp, self.name_en, self.name_cn = values
+        # First non-empty of the names; the values are already stripped.
+        self.brand_name = self.name or self.name_en or self.name_jp
+        # Most rows carry no platform ids; they all share one tuple.
+        self.brand_ids = brand_ids if any(brand_ids) else _NO_BRAND_IDS
+
+    @property
+    def brand_id_obj(self) -> Dict[str, str]:
+        return dict(zip(BRAND_ID_FIELD_MAP, self.brand_ids))
 
 
 class BrandStore:
-    def __init__(self, path: str):
+    def __init__(self, path: str, snapshot_path: str = ""):
         self.path = path
-        self.records: List[Dict[str, Any]] = []
-        self._index: Dict[str, Dict[str, Any]] = {}
-        self._keys: List[str] = []
+        self.snapshot_path = snapshot_path
+        self._source: Optional[Dict[str, Any]] = None
+        self.records: List[BrandRecord] = []
+        # Normalised name -> record; also the candidate list for fuzzy matching.
+        self._index: Dict[str, BrandRecord] = {}
+        # Finds the indexed names inside free text; built with the index.
+        self.scanner: Optional[BrandScanner] = None
         self._load()
 
     def _load(self) -> None:
+        snapshot = None
+        if self.snapshot_path:
+            snapshot = read_current_snapshot(self.snapshot_path, "brands", self.path)
+        if snapshot is not None:
+            self._source = snapshot.get("source")
+            self._restore(snapshot)
+            return
+        self._source = source_fingerprint(self.path)
+        self._load_csv()
+        if self.snapshot_path:
+            try:
+                self.write_snapshot(self.snapshot_path)
+            except OSError as exc:
+                _logger.warning("Could not write brand snapshot %s: %s", self.snapshot_path, exc)
+
+    def _load_csv(self) -> None:
+        intern = Interner()
+        width = len(BRAND_COLUMNS)
+        for row in self._csv_rows():
+            row = intern.row(row)
+            record = BrandRecord(row[:width], row[width:])
+            self.records.append(record)
+            for value in row[1:width]:
+                normalized = normalize_text(value) if value else ""
+                if normalized and normalized not in self._index:
+                    self._index[normalized] = record
+        self.scanner = BrandScanner(list(self._index), list(self._index.values()))
+
+    def _restore(self, snapshot: Dict[str, Any]) -> None:
+        columns = snapshot["columns"]
+        self.records = [BrandRecord(values, _NO_BRAND_IDS) for values in zip(*(columns[f] for f in BRAND_COLUMNS))]
+        for position, brand_ids in snapshot["brand_ids"].items():
+            self.records[position].brand_ids = brand_ids
+        rows = array("I")
+        rows.frombytes(snapshot["index_rows"])
+        self._index = dict(zip(snapshot["index_keys"], map(self.records.__getitem__, rows)))
+        self.scanner = BrandScanner.from_state(list(self._index), list(self._index.values()), snapshot["scanner"])
+
+    def _csv_rows(self) -> Iterator[Tuple[str, ...]]:
         with open(self.path, newline="", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
+            reader = csv.reader(f)
+            header = next(reader, [])
+            # Missing columns read the empty string appended to every row.
+            positions = [header.index(field) if field in header else -1 for field in BRAND_COLUMNS]
+            id_positions = [header.index(field) if field in header else -1 for field in BRAND_ID_FIELD_MAP.values()]
             for row in reader:
-                record = {
-                    "id": row.get("id", "").strip(),
-                    "name": row.get("name", "").strip(),
-                    "name_jp": row.get("name_jp", "").strip(),
-                    "name_en": row.get("name_en", "").strip(),
-                    "name_cn": row.get("name_cn", "").strip(),
-                }
-                record["brand_name"] = _pick_brand_name(record)
-                record["brand_id_obj"] = {
-                    output_field: _clean_brand_id(row.get(source_field, ""))
-                    for output_field, source_field in BRAND_ID_FIELD_MAP.items()
-                }
-                self.records.append(record)
-                for field in ("name", "name_jp", "name_en", "name_cn"):
-                    value = record.get(field, "")
-                    normalized = normalize_text(value) if value else ""
-                    if not normalized:
-                        continue
-                    if normalized not in self._index:
-                        self._index[normalized] = record
-                        self._keys.append(normalized)
-
-    def match(self, raw_name: str) -> Optional[Dict[str, Any]]:
+                if len(row) < len(header):
+                    row.extend([""] * (len(header) - len(row)))
+                row.append("")
+                yield tuple([row[i].strip() for i in positions] + [_clean_brand_id(row[i]) for i in id_positions])
+
+    def write_snapshot(self, path: str) -> None:
+        positions = {id(record): position for position, record in enumerate(self.records)}
+        write_snapshot(path, "brands", {
+            "columns": {field: tuple(getattr(r, field) for r in self.records) for field in BRAND_COLUMNS},
+            # Only the few rows that have platform ids, in BRAND_ID_FIELD_MAP order.
+            "brand_ids": {i: r.brand_ids for i, r in enumerate(self.records) if r.brand_ids is not _NO_BRAND_IDS},
+            "index_keys": tuple(self._index),
+            "index_rows": array("I", (positions[id(r)] for r in self._index.values())).tobytes(),
+            "scanner": self.scanner.state(),
+        }, source=self._source)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def scan_mentions(self, title: str = "", keywords: str = "", description: str = "") -> List[BrandHit]:
+        """Brands named anywhere in a listing's text, best first; see ``BrandScanner.scan``."""
+        if self.scanner is None:
+            return []
+        return self.scanner.scan({"title": title, "keywords": keywords, "description": description})
+
+    def match(self, raw_name: str) -> Optional[BrandRecord]:
         if not raw_name:
             return None
         normalized = normalize_text(raw_name)
@@ -76,7 +148,7 @@ class BrandStore:
         if normalized in self._index:
             return self._index[normalized]
 
-        close = difflib.get_close_matches(normalized, self._keys, n=1, cutoff=0.9)
+        close = difflib.get_close_matches(normalized, self._index, n=1, cutoff=0.9)
         if close:
             return self._index.get(close[0])
         return None
@@ -1,45 +1,336 @@
 import csv
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+import heapq
+import logging
+import re
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple
 
-from ..utils import compress_whitespace, normalize_category_label
+from ..utils import compress_whitespace, normalize_category_label, normalize_text
+from .records import Interner, SlotRecord
+from .snapshot import read_current_snapshot, source_fingerprint, write_snapshot
+
+_logger = logging.getLogger(__name__)
+
+
+PATH_SEPARATOR = " > "
+# Columns kept per category, in snapshot order.
+CATEGORY_COLUMNS = (
+    "id", "name", "group_name",
+    "meru_id", "rakuma_id", "zenplus_id", "meru_path", "rakuma_path", "zenplus_path",
+)
+_MAX_CANDIDATE_PREFIXES = 256
+# Runs of one Japanese script in a path: katakana (with ー, without ・), hiragana, kanji.
+_PATH_WORD_RE = re.compile(r"[\u30a0-\u30fa\u30fc-\u30ff]+|[\u3040-\u309f]+|[\u4e00-\u9fff]+")
+# Separators models put between path segments besides " > " (＞ is folded to > by NFKC).
+_SEGMENT_SPLIT_RE = re.compile(r"[>›»→|]")
+
+
+class CategoryEntry(SlotRecord):
+    """One category row (``entry["id"]``, ``entry["name"]``, ``entry.get("meru_path")``)."""
+
+    __slots__ = CATEGORY_COLUMNS
+    KEYS = CATEGORY_COLUMNS
+
+    def __init__(self, values: Sequence[str]) -> None:
+        (self.id, self.name, self.group_name, self.meru_id, self.rakuma_id, self.zenplus_id,
+         self.meru_path, self.rakuma_path, self.zenplus_path) = values
+
+
+class CategoryNode:
+    """One prefix of the category paths of a group, e.g. ``ファッション > メンズ``.
+
+    ``entries`` holds every category at or below the node; ``own`` only the
+    category whose path is the node itself, if there is one.
+    """
+
+    __slots__ = ("path", "entries", "own", "children")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.entries: List[CategoryEntry] = []
+        self.own: List[CategoryEntry] = []
+        self.children: Dict[str, "CategoryNode"] = {}
+
+
+def build_category_trie(group_name: str, entries: List[CategoryEntry]) -> CategoryNode:
+    root = CategoryNode(group_name)
+    for entry in entries:
+        segments = entry["name"].split(PATH_SEPARATOR)
+        if segments[0] == group_name:
+            segments = segments[1:]
+        node = root
+        node.entries.append(entry)
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = CategoryNode(f"{node.path}{PATH_SEPARATOR}{segment}")
+            node = child
+            node.entries.append(entry)
+        node.own.append(entry)
+    return root
+
+
+def path_segments(path: str) -> List[str]:
+    """Normalised segments of a category path, whatever separator and width it uses."""
+    normalized = normalize_category_label(path)
+    return ["".join(segment.split()) for segment in _SEGMENT_SPLIT_RE.split(normalized) if segment.strip()]
+
+
+def _segment_features(segments: Sequence[str]) -> FrozenSet[str]:
+    features = set()
+    for segment in segments:
+        features.add(f"#{segment}")
+        if len(segment) < 2:
+            features.add(segment)
+        features.update(segment[i:i + 2] for i in range(len(segment) - 1))
+    return frozenset(features)
+
+
+class CategoryPathIndex:
+    """Fuzzy lookup of the category paths of one group.
+
+    Paths are indexed by their segments below the group (so a missing or
+    differently written group prefix does not matter), as whole segment tokens
+    plus character bigrams in an inverted index. A query scores the mean of
+    the share of its features a path has and the Dice coefficient of both
+    feature sets: a path with a dropped segment still covers the query fully,
+    while a typo only costs a few bigrams.
+    """
+
+    def __init__(self, group_name: str, entries: List[CategoryEntry]) -> None:
+        self._group = path_segments(group_name)
+        self._entries = entries
+        # Keyed by the segments below the group, joined with a character no segment has.
+        self._exact: Dict[str, CategoryEntry] = {}
+        self._sizes = array("H")
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for position, entry in enumerate(entries):
+            segments = self._below_group(path_segments(entry["name"]))
+            self._exact.setdefault("\x1f".join(segments), entry)
+            features = _segment_features(segments)
+            self._sizes.append(len(features))
+            for feature in features:
+                postings[feature].append(position)
+        # Position lists as machine-word arrays: a fraction of a list of ints.
+        self._postings: Dict[str, array] = {feature: array("I", positions) for feature, positions in postings.items()}
+
+    def state(self) -> Dict[str, Any]:
+        """The built index as plain values for a snapshot; see ``from_state``."""
+        positions = {id(entry): position for position, entry in enumerate(self._entries)}
+        return {
+            "exact_keys": tuple(self._exact),
+            "exact_rows": array("I", (positions[id(e)] for e in self._exact.values())).tobytes(),
+            "sizes": self._sizes.tobytes(),
+            "features": tuple(self._postings),
+            "postings": tuple(postings.tobytes() for postings in self._postings.values()),
+        }
+
+    @classmethod
+    def from_state(cls, group_name: str, entries: List[CategoryEntry], state: Dict[str, Any]) -> "CategoryPathIndex":
+        index = cls.__new__(cls)
+        index._group = path_segments(group_name)
+        index._entries = entries
+        exact_rows = array("I")
+        exact_rows.frombytes(state["exact_rows"])
+        index._exact = dict(zip(state["exact_keys"], map(entries.__getitem__, exact_rows)))
+        index._sizes = array("H")
+        index._sizes.frombytes(state["sizes"])
+        index._postings = {}
+        for feature, data in zip(state["features"], state["postings"]):
+            postings = index._postings[feature] = array("I")
+            postings.frombytes(data)
+        return index
+
+    def _below_group(self, segments: List[str]) -> List[str]:
+        if segments[:len(self._group)] == self._group:
+            return segments[len(self._group):]
+        return segments
+
+    def closest(self, path: str, min_similarity: float) -> Optional[Tuple[CategoryEntry, float]]:
+        """The indexed path most similar to ``path`` and its similarity, if unambiguous and close enough."""
+        segments = self._below_group(path_segments(path))
+        if not segments:
+            return None
+        exact = self._exact.get("\x1f".join(segments))
+        if exact is not None:
+            return exact, 1.0
+        features = _segment_features(segments)
+        shared = Counter(chain.from_iterable(self._postings[f] for f in features if f in self._postings))
+        size = len(features)
+        scored = heapq.nlargest(2, (
+            ((count / size + 2 * count / (size + self._sizes[position])) / 2, position)
+            for position, count in shared.items()
+        ))
+        if not scored or scored[0][0] < min_similarity:
+            return None
+        if len(scored) > 1 and scored[1][0] == scored[0][0]:
+            # Two paths fit equally well (e.g. "その他" under a dropped segment).
+            return None
+        similarity, position = scored[0]
+        return self._entries[position], round(similarity, 4)
 
 
 class CategoryStore:
-    def __init__(self, path: str):
+    def __init__(self, path: str, snapshot_path: str = ""):
         self.path = path
-        self.by_group: Dict[str, List[Dict[str, str]]] = defaultdict(list)
-        self._lookup: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.snapshot_path = snapshot_path
+        self._source: Optional[Dict[str, Any]] = None
+        self.by_group: Dict[str, List[CategoryEntry]] = defaultdict(list)
+        self._lookup: Dict[Tuple[str, str], CategoryEntry] = {}
+        self._tries: Dict[str, CategoryNode] = {}
+        self._path_indexes: Dict[str, CategoryPathIndex] = {}
+        # Every path of a group, one per line, as the category prompt lists them.
+        self._candidate_blocks: Dict[str, str] = {}
+        # Prompt prefixes (template head + candidate block) by (head, group).
+        self._candidate_prefixes: Dict[Tuple[str, str], str] = {}
         self._load()
+        for group, entries in self.by_group.items():
+            self._candidate_blocks[group] = "\n".join(entry["name"] for entry in entries)
+        self._by_id: Dict[str, CategoryEntry] = {entry.id: entry for entry in self._entries()}
+        self._path_words: Optional[FrozenSet[str]] = None
 
     def _load(self) -> None:
+        snapshot = None
+        if self.snapshot_path:
+            snapshot = read_current_snapshot(self.snapshot_path, "categories", self.path)
+        if snapshot is not None:
+            self._source = snapshot.get("source")
+            self._restore(snapshot)
+            return
+        self._source = source_fingerprint(self.path)
+        self._load_csv()
+        if self.snapshot_path:
+            try:
+                self.write_snapshot(self.snapshot_path)
+            except OSError as exc:
+                _logger.warning("Could not write category snapshot %s: %s", self.snapshot_path, exc)
+
+    def _load_csv(self) -> None:
+        intern = Interner()
+        for row in self._csv_rows():
+            entry = CategoryEntry(intern.row(row))
+            self.by_group[entry.group_name].append(entry)
+            key = (intern(normalize_category_label(entry.group_name)), normalize_category_label(entry.name))
+            self._lookup[key] = entry
+        for group, entries in self.by_group.items():
+            self._path_indexes[group] = CategoryPathIndex(group, entries)
+
+    def _entries(self) -> List[CategoryEntry]:
+        return [entry for entries in self.by_group.values() for entry in entries]
+
+    def _restore(self, snapshot: Dict[str, Any]) -> None:
+        columns = snapshot["columns"]
+        entries = list(map(CategoryEntry, zip(*(columns[field] for field in CATEGORY_COLUMNS))))
+        for entry in entries:
+            self.by_group[entry.group_name].append(entry)
+        lookup_rows = array("I")
+        lookup_rows.frombytes(snapshot["lookup_rows"])
+        self._lookup = dict(zip(snapshot["lookup_keys"], map(entries.__getitem__, lookup_rows)))
+        for group, state in snapshot["path_indexes"].items():
+            self._path_indexes[group] = CategoryPathIndex.from_state(group, self.by_group[group], state)
+
+    def _csv_rows(self) -> Iterator[Tuple[str, ...]]:
         with open(self.path, newline="", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
+            for row in csv.DictReader(f):
                 category_id = compress_whitespace(row.get("category_id", ""))
-                name = row.get("category_name") or row.get("path") or ""
-                name = compress_whitespace(name)
+                name = compress_whitespace(row.get("category_name") or row.get("path") or "")
                 group = compress_whitespace(row.get("group_name", ""))
                 if not category_id or not name or not group:
                     continue
-                entry = {
-                    "id": category_id,
-                    "name": name,
-                    "group_name": group,
-                    "meru_id": compress_whitespace(row.get("meru_id", "")),
-                    "rakuma_id": compress_whitespace(row.get("rakuma_id", "")),
-                    "zenplus_id": compress_whitespace(row.get("zenplus_id", "")),
-                    "meru_path": compress_whitespace(row.get("meru_path", "")),
-                    "rakuma_path": compress_whitespace(row.get("rakuma_path", "")),
-                    "zenplus_path": compress_whitespace(row.get("zenplus_path", "")),
-                }
-                self.by_group[group].append(entry)
-                key = (normalize_category_label(group), normalize_category_label(name))
-                self._lookup[key] = entry
-
-    def get_categories_by_group(self, group_name: str) -> List[Dict[str, str]]:
+                yield (category_id, name, group) + tuple(
+                    compress_whitespace(row.get(field, "")) for field in CATEGORY_COLUMNS[3:]
+                )
+
+    def write_snapshot(self, path: str) -> None:
+        entries = self._entries()
+        positions = {id(entry): position for position, entry in enumerate(entries)}
+        write_snapshot(path, "categories", {
+            "columns": {field: tuple(getattr(e, field) for e in entries) for field in CATEGORY_COLUMNS},
+            "lookup_keys": tuple(self._lookup),
+            "lookup_rows": array("I", (positions[id(e)] for e in self._lookup.values())).tobytes(),
+            "path_indexes": {group: index.state() for group, index in self._path_indexes.items()},
+        }, source=self._source)
+
+    def __len__(self) -> int:
+        return sum(map(len, self.by_group.values()))
+
+    def get_categories_by_group(self, group_name: str) -> List[CategoryEntry]:
         return self.by_group.get(group_name, [])
 
-    def find_category(self, group_name: str, category_name: str) -> Optional[Dict[str, str]]:
+    def candidate_block(self, group_name: str) -> str:
+        return self._candidate_blocks.get(group_name, "")
+
+    def candidate_prefix(self, head: str, group_name: str) -> str:
+        """``head`` formatted with the group name, followed by the group's candidate block.
+
+        Cached per (head, group): a handful of templates times the groups. A
+        reload builds a new store, so a stale block is never served.
+        """
+        key = (head, group_name)
+        prefix = self._candidate_prefixes.get(key)
+        if prefix is None:
+            if len(self._candidate_prefixes) >= _MAX_CANDIDATE_PREFIXES:
+                # Only reachable when prompt templates keep being edited.
+                self._candidate_prefixes.clear()
+            prefix = head.format(group_name=group_name) + self.candidate_block(group_name)
+            self._candidate_prefixes[key] = prefix
+        return prefix
+
+    def path_words(self) -> FrozenSet[str]:
+        """Every kana or kanji word of the category paths (ワンピース, ラック, ...), normalised."""
+        if self._path_words is None:
+            self._path_words = frozenset(
+                word
+                for entry in self._entries()
+                for word in _PATH_WORD_RE.findall(normalize_text(entry.name))
+            )
+        return self._path_words
+
+    def get_category(self, category_id: str) -> Optional[CategoryEntry]:
+        return self._by_id.get(category_id)
+
+    def find_category(self, group_name: str, category_name: str) -> Optional[CategoryEntry]:
         key = (normalize_category_label(group_name), normalize_category_label(category_name))
         return self._lookup.get(key)
+
+    def closest_category(
+        self, group_name: str, category_name: str, min_similarity: float
+    ) -> Optional[Tuple[CategoryEntry, float]]:
+        """Reconcile a near-miss path (other separator or width, dropped segment, typo) to a real one."""
+        index = self._path_indexes.get(group_name)
+        if index is None:
+            return None
+        return index.closest(category_name, min_similarity)
+
+    def category_nodes(self, group_name: str, max_leaves: int) -> List[CategoryNode]:
+        """The second-level nodes of a group, for narrowing its candidates in two steps.
+
+        A node with more than ``max_leaves`` categories under it is replaced by
+        its children (recursively), so every returned node is small enough to
+        list in full; together the nodes cover every category of the group.
+        """
+        entries = self.get_categories_by_group(group_name)
+        if not entries:
+            return []
+        trie = self._tries.get(group_name)
+        if trie is None:
+            trie = self._tries[group_name] = build_category_trie(group_name, entries)
+
+        nodes: List[CategoryNode] = []
+
+        def expand(node: CategoryNode, split: bool) -> None:
+            if not split:
+                nodes.append(node)
+                return
+            if node.own:
+                # The category named by the node itself stays selectable.
+                leaf = CategoryNode(node.path)
+                leaf.entries = leaf.own = node.own
+                nodes.append(leaf)
+            for child in node.children.values():
+                expand(child, len(child.entries) > max_leaves and bool(child.children))
+
+        expand(trie, True)
+        return nodes
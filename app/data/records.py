@@ -0,0 +1,67 @@
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+
+class SlotRecord:
+    """Read-only row with ``__slots__`` fields that reads like the dict it replaced.
+
+    Reference tables hold tens of thousands of rows per worker; a slotted
+    object costs a fraction of a dict and callers keep using ``row["id"]``
+    and ``row.get("meru_id", "")``.
+    """
+
+    __slots__ = ()
+    # Keys answered by ``row[key]``; subclasses may add computed ones.
+    KEYS: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.KEYS else default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.KEYS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.KEYS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self.KEYS}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, SlotRecord):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Interner:
+    """Load-time string table: equal values across rows share one object.
+
+    Unlike ``sys.intern`` the table is dropped with the loader, so only the
+    strings still referenced by records stay alive.
+    """
+
+    def __init__(self) -> None:
+        self._strings: Dict[str, str] = {}
+
+    def __call__(self, value: str) -> str:
+        return self._strings.setdefault(value, value)
+
+    def row(self, values: Iterable[str]) -> Tuple[str, ...]:
+        values = tuple(values)
+        return tuple(map(self._strings.setdefault, values, values))
@@ -0,0 +1,102 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+from ..observability.metrics import REFERENCE_DATA_RELOADS
+
+_logger = logging.getLogger(__name__)
+
+StoreT = TypeVar("StoreT")
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ReloadableStore(Generic[StoreT]):
+    """A brand or category store that can be rebuilt from its CSV while serving.
+
+    Attribute access is forwarded to the current store, so callers use it
+    exactly like the store itself. A reload builds a complete new store off
+    to the side and then replaces the reference in one assignment: every
+    call sees either the old table or the new one, never a half-loaded one,
+    and a failed build keeps the old store serving.
+    """
+
+    def __init__(self, name: str, source_path: str, factory: Callable[[], StoreT]) -> None:
+        self._name = name
+        self._source_path = source_path
+        self._factory = factory
+        self._reload_lock = threading.Lock()
+        self._last_error = ""
+        self._store, self._signature, self._load_ms, self._loaded_at = self._build()
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only reached for names not set on the wrapper itself.
+        store = self.__dict__.get("_store")
+        if store is None:
+            raise AttributeError(attr)
+        return getattr(store, attr)
+
+    @property
+    def store(self) -> StoreT:
+        return self._store
+
+    def _build(self) -> Tuple[StoreT, Optional[Tuple[int, int]], float, str]:
+        # Signature first: a file replaced during the build is picked up by the next check.
+        signature = _file_signature(self._source_path)
+        started = time.perf_counter()
+        store = self._factory()
+        load_ms = round((time.perf_counter() - started) * 1000, 1)
+        loaded_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        return store, signature, load_ms, loaded_at
+
+    def changed(self) -> bool:
+        """Whether the source file differs (mtime or size) from the one last loaded."""
+        signature = _file_signature(self._source_path)
+        return signature is not None and signature != self._signature
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """Rebuild the store if its source changed (or always with ``force``) and swap it in.
+
+        Returns ``status()`` plus ``reloaded``; a reload already in progress
+        is not started twice.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return {**self.status(), "reloaded": False}
+        try:
+            if not force and not self.changed():
+                return {**self.status(), "reloaded": False}
+            try:
+                store, signature, load_ms, loaded_at = self._build()
+            except Exception as exc:
+                self._last_error = f"{type(exc).__name__}: {exc}"
+                REFERENCE_DATA_RELOADS.inc(table=self._name, outcome="failed")
+                _logger.exception("Reloading %s from %s failed; keeping the loaded data", self._name, self._source_path)
+                return {**self.status(), "reloaded": False}
+            self._store = store
+            self._signature, self._load_ms, self._loaded_at, self._last_error = signature, load_ms, loaded_at, ""
+            REFERENCE_DATA_RELOADS.inc(table=self._name, outcome="reloaded")
+            _logger.info("Reloaded %s: %d rows in %.1f ms", self._name, len(store), load_ms)
+            return {**self.status(), "reloaded": True}
+        finally:
+            self._reload_lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self._name,
+            "source_path": self._source_path,
+            "rows": len(self._store),
+            "load_ms": self._load_ms,
+            "loaded_at": self._loaded_at,
+            "stale": self.changed(),
+            "reloading": self._reload_lock.locked(),
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,112 @@
+"""Read-only binary snapshots of the reference tables.
+
+A snapshot holds everything a store builds from its CSV -- the cleaned
+columns plus the normalised keys, index positions and brand name
+automaton -- as ``marshal`` data behind a short header carrying the format
+version and a CRC-32 of the payload. Loading maps the file and decodes it in one call instead of
+parsing, cleaning and normalising every CSV field, and the result can be
+loaded once before a fork and shared copy-on-write by the workers.
+
+The payload also records the size, mtime and SHA-256 of the CSV it was
+built from, so a store can tell when its snapshot is stale and rebuild it.
+"""
+import hashlib
+import logging
+import marshal
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional
+
+_logger = logging.getLogger(__name__)
+
+MAGIC = b"MRSNAP\x02\n"
+# Bump when the payload layout of any store changes; older snapshots are rebuilt.
+SNAPSHOT_VERSION = 3
+_HEADER = struct.Struct("<II")
+
+
+class SnapshotError(ValueError):
+    """The file is not a usable snapshot of the expected kind."""
+
+
+def source_fingerprint(source_path: str) -> Optional[Dict[str, Any]]:
+    """Size, mtime and SHA-256 of a CSV, or None when it does not exist."""
+    try:
+        stat = os.stat(source_path)
+        with open(source_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+
+def _same_source(recorded: Dict[str, Any], source_path: str) -> bool:
+    try:
+        stat = os.stat(source_path)
+    except FileNotFoundError:
+        # Nothing to rebuild from; the snapshot is all there is.
+        return True
+    if stat.st_size != recorded.get("size"):
+        return False
+    if stat.st_mtime_ns == recorded.get("mtime_ns"):
+        return True
+    # Touched or checked out again: only the content decides.
+    current = source_fingerprint(source_path)
+    return current is not None and current["sha256"] == recorded.get("sha256")
+
+
+def write_snapshot(path: str, kind: str, payload: Dict[str, Any], source: Optional[Dict[str, Any]] = None) -> None:
+    """Write a store's ``payload`` atomically to ``path``.
+
+    ``source`` is the ``source_fingerprint`` of the CSV taken before it was read.
+    """
+    data = marshal.dumps({"kind": kind, "source": source, **payload})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(SNAPSHOT_VERSION, zlib.crc32(data)))
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, kind: str) -> Dict[str, Any]:
+    header_size = len(MAGIC) + _HEADER.size
+    with open(path, "rb") as f:
+        header = f.read(header_size)
+        if len(header) < header_size or header[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"{path} is not a reference data snapshot")
+        version, checksum = _HEADER.unpack(header[len(MAGIC):])
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"{path} has format version {version}, expected {SNAPSHOT_VERSION}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                memoryview(mapped)[header_size:] as payload:
+            if zlib.crc32(payload) != checksum:
+                raise SnapshotError(f"{path} fails its checksum")
+            try:
+                data = marshal.loads(payload)
+            except (EOFError, ValueError, TypeError) as exc:
+                raise SnapshotError(f"{path} is truncated or corrupt") from exc
+    if not isinstance(data, dict) or data.get("kind") != kind:
+        raise SnapshotError(f"{path} is not a {kind} snapshot")
+    return data
+
+
+def read_current_snapshot(path: str, kind: str, source_path: str) -> Optional[Dict[str, Any]]:
+    """The snapshot at ``path`` if it is usable and built from ``source_path`` as it is now.
+
+    Returns None (after logging why) when the store should rebuild from the CSV.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        data = read_snapshot(path, kind)
+    except (OSError, SnapshotError) as exc:
+        _logger.warning("Ignoring %s snapshot: %s", kind, exc)
+        return None
+    if data.get("source") and not _same_source(data["source"], source_path):
+        _logger.info("%s snapshot %s is older than %s; rebuilding", kind, path, source_path)
+        return None
+    return data
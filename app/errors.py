@@ -14,6 +14,10 @@ class LLMRequestError(Exception):
     pass
 
 
+class LLMCancelledError(LLMRequestError):
+    """Raised when an in-flight LLM request is aborted through its CancellationToken."""
+
+
 class LLMParseError(Exception):
     """Raised by parse_llm_json when LLM output cannot be coerced into JSON."""
 
@@ -25,3 +29,20 @@ class LLMAllAttemptsFailedError(Exception):
         self.stage = stage
         self.attempts = list(attempts)
         super().__init__(f"{stage}: {len(self.attempts)} attempts failed.")
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when a bounded executor's queue is full; the caller should shed load."""
+
+    def __init__(self, retry_after: int) -> None:
+        self.retry_after = retry_after
+        super().__init__(f"Executor queue is full; retry after {retry_after}s.")
+
+
+class StageDeadlineError(Exception):
+    """Raised for a pipeline stage that did not finish before its deadline."""
+
+    def __init__(self, stage: str, deadline_seconds: float) -> None:
+        self.stage = stage
+        self.deadline_seconds = deadline_seconds
+        super().__init__(f"{stage}: not finished within {deadline_seconds:g}s.")
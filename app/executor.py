@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+from .errors import ExecutorSaturatedError
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TaskTiming:
+    """Monotonic timestamps of one task, attached to its future as ``timing``."""
+
+    submitted_at: float
+    started_at: Optional[float] = None
+    _callbacks: List[Callable[["TaskTiming"], Any]] = field(default_factory=list, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def queue_wait_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return self.started_at - self.submitted_at
+
+    def add_start_callback(self, fn: Callable[["TaskTiming"], Any]) -> None:
+        """Call ``fn(timing)`` once a worker picks the task up (now if it has)."""
+        with self._lock:
+            if self.started_at is None:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def mark_started(self) -> None:
+        with self._lock:
+            self.started_at = time.monotonic()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception:
+                _logger.exception("executor: task start callback failed")
+
+
+class BoundedExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor with a cap on tasks waiting for a worker.
+
+    ``submit`` raises ExecutorSaturatedError instead of queueing once
+    ``max_queue`` tasks are already waiting (0 disables the cap). Queued and
+    running counts are kept for metrics, and the average run time feeds the
+    Retry-After estimate handed to rejected callers.
+    """
+
+    RETRY_AFTER_MAX_SECONDS = 60
+
+    def __init__(self, max_workers: int, max_queue: int = 0, thread_name_prefix: str = "") -> None:
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._counts_lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._avg_run_seconds: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def retry_after_seconds(self) -> int:
+        with self._counts_lock:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self) -> int:
+        # Time for the backlog ahead of a new task to drain through the workers.
+        per_task = self._avg_run_seconds or 1.0
+        backlog = (self._queued + self._active) / max(1, self.max_workers)
+        return int(min(self.RETRY_AFTER_MAX_SECONDS, max(1, math.ceil(backlog * per_task))))
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        with self._counts_lock:
+            if self.max_queue and self._queued >= self.max_queue:
+                raise ExecutorSaturatedError(self._retry_after_locked())
+            self._queued += 1
+        timing = TaskTiming(submitted_at=time.monotonic())
+
+        def _run() -> Any:
+            timing.mark_started()
+            with self._counts_lock:
+                self._queued -= 1
+                self._active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.monotonic() - timing.started_at
+                with self._counts_lock:
+                    self._active -= 1
+                    avg = self._avg_run_seconds
+                    self._avg_run_seconds = elapsed if avg is None else 0.8 * avg + 0.2 * elapsed
+
+        try:
+            future = super().submit(_run)
+        except BaseException:
+            with self._counts_lock:
+                self._queued -= 1
+            raise
+        future.timing = timing  # type: ignore[attr-defined]
+        future.add_done_callback(self._release_if_cancelled)
+        return future
+
+    def _release_if_cancelled(self, future: Future) -> None:
+        # A task cancelled while still queued never reaches _run.
+        if future.cancelled():
+            with self._counts_lock:
+                self._queued -= 1
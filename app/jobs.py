@@ -1,16 +1,261 @@
 from __future__ import annotations
 
+import asyncio
+import heapq
+import json
+import logging
+import sqlite3
 import time
-from concurrent.futures import Future
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from contextlib import contextmanager
+from pathlib import Path
 from threading import Lock
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple, Union
+
+from .errors import BadRequestError, LLMAllAttemptsFailedError
+from .llm.resilient import AttemptRecord
+from .observability import metrics as obs_metrics
+
+
+_logger = logging.getLogger(__name__)
+
+# How often a worker that does not own a job's futures re-reads its state.
+REMOTE_REFRESH_SECONDS = 0.5
+
+
+class JobBackend(Protocol):
+    """The slice of the redis-py client API the job store needs.
+
+    A ``redis.Redis`` instance satisfies it as-is; ``SQLiteJobBackend`` is the
+    dependency-free stand-in for workers sharing one host.
+    """
+
+    def get(self, name: str) -> Optional[Union[bytes, str]]: ...
+
+    def set(self, name: str, value: str, ex: Optional[int] = None) -> Any: ...
+
+    def delete(self, *names: str) -> Any: ...
+
+
+class SQLiteJobBackend:
+    """Expiring key/value table in a SQLite file shared by all workers."""
+
+    _PURGE_EVERY = 100
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._sets = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_kv ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_kv_expires ON job_kv(expires_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, name: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM job_kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (name, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, name: str, value: str, ex: Optional[int] = None) -> bool:
+        expires_at = time.time() + ex if ex else None
+        self._sets += 1
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (name, value, expires_at),
+            )
+            if self._sets % self._PURGE_EVERY == 0:
+                conn.execute("DELETE FROM job_kv WHERE expires_at <= ?", (time.time(),))
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._connect() as conn:
+            cur = conn.executemany("DELETE FROM job_kv WHERE key = ?", [(n,) for n in names])
+        return cur.rowcount
+
+
+def create_job_backend(kind: str, *, path: Union[str, Path], url: str = "") -> Optional[JobBackend]:
+    """Backend for JOB_STORE_BACKEND: ``memory`` (None), ``sqlite`` or ``redis``."""
+    kind = (kind or "memory").strip().lower()
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        return SQLiteJobBackend(path)
+    if kind == "redis":
+        try:
+            import redis  # optional; only needed for this backend
+        except ImportError as exc:
+            raise RuntimeError("JOB_STORE_BACKEND=redis requires the 'redis' package.") from exc
+        return redis.Redis.from_url(url or "redis://localhost:6379/0")
+    raise ValueError(f"Unknown JOB_STORE_BACKEND: {kind!r}")
+
+
+def _encode_error(exc: BaseException) -> Dict[str, Any]:
+    if isinstance(exc, LLMAllAttemptsFailedError):
+        return {
+            "kind": "all_attempts_failed",
+            "stage": exc.stage,
+            "attempts": [dict(a.__dict__) for a in exc.attempts],
+        }
+    if isinstance(exc, BadRequestError):
+        return {"kind": "bad_request", "message": str(exc)}
+    if isinstance(exc, CancelledError):
+        return {"kind": "cancelled"}
+    return {"kind": "error", "message": repr(exc)}
+
+
+def _decode_error(data: Dict[str, Any]) -> BaseException:
+    if data.get("kind") == "all_attempts_failed":
+        attempts = [AttemptRecord(**a) for a in data.get("attempts") or []]
+        return LLMAllAttemptsFailedError(stage=data.get("stage") or "", attempts=attempts)
+    if data.get("kind") == "bad_request":
+        return BadRequestError(data.get("message") or "")
+    if data.get("kind") == "cancelled":
+        return CancelledError()
+    return RuntimeError(data.get("message") or "product data failed")
+
+
+def _outcome_future(raw: Optional[Union[bytes, str]]) -> Future:
+    """A settled Future rebuilt from a published outcome, or a pending one."""
+    future: Future = Future()
+    if raw is None:
+        return future
+    outcome = json.loads(raw)
+    if "error" in outcome:
+        future.set_exception(_decode_error(outcome["error"]))
+    else:
+        future.set_result(outcome.get("result"))
+    return future
+
+
+def _estimate_bytes(value: Any) -> int:
+    """Rough resident size of a JSON-like value: its serialised UTF-8 length."""
+    if value is None:
+        return 0
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _strip_tracebacks(exc: BaseException) -> None:
+    # Traceback frames hold the worker's locals, i.e. the uploaded images.
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        exc.__traceback__ = None
+        exc = exc.__cause__ or exc.__context__
+
+
+def _settled_copy(future: Future) -> Future:
+    """A fresh done Future carrying only ``future``'s result or exception."""
+    if future.cancelled():
+        return future
+    settled: Future = Future()
+    error = future.exception()
+    if error is not None:
+        _strip_tracebacks(error)
+        settled.set_exception(error)
+    else:
+        settled.set_result(future.result())
+    return settled
+
+
+def _to_wall(monotonic_at: Optional[float]) -> Optional[float]:
+    if monotonic_at is None:
+        return None
+    return time.time() - (time.monotonic() - float(monotonic_at))
+
+
+def _from_wall(wall_at: Optional[float]) -> Optional[float]:
+    if wall_at is None:
+        return None
+    return time.monotonic() - (time.time() - float(wall_at))
+
+
+def primary_started_at(job: Dict[str, Any]) -> Optional[float]:
+    """Monotonic time a worker picked the primary call up, or None while queued.
+
+    The fallback threshold is measured from this point, so time spent waiting
+    for an executor worker does not count against the primary. Live executor
+    futures carry it on ``future.timing``; the job store copies it into the job
+    (``primary_started_at``) and the published record. Jobs whose future has no
+    executor timing fall back to the submit time ``started_at``.
+    """
+    started = job.get("primary_started_at")
+    if started is not None:
+        return float(started)
+    timing = getattr(job.get("future"), "timing", None)
+    if timing is not None:
+        return timing.started_at
+    if "primary_started_at" in job:
+        return None  # published by the owning worker: still queued there
+    return job.get("started_at")
+
+
+def _is_settled(job: Dict[str, Any]) -> bool:
+    return all(f.done() for f in (job["future"], job.get("fallback_future")) if f is not None)
+
+
+class _JobEntry:
+    __slots__ = ("job", "expires_at", "nbytes", "payload_bytes")
+
+    def __init__(self, job: Dict[str, Any], expires_at: float, payload_bytes: int) -> None:
+        self.job = job
+        self.expires_at = expires_at
+        self.payload_bytes = payload_bytes
+        self.nbytes = 0
 
 
 class AnalysisJobStore:
-    def __init__(self, ttl_seconds: int = 1800) -> None:
+    """Analysis jobs keyed by job_id.
+
+    Jobs are kept in LRU order, with a heap of expiry times beside them, so
+    each call only pops what has actually expired. Once a product-data future
+    settles it is swapped for a bare result (exception tracebacks stripped),
+    so finished jobs no longer pin the uploaded images. ``max_bytes`` caps the
+    estimated resident size -- classification, results and, while work is
+    pending, the image payload -- by evicting least recently used settled
+    jobs; pending jobs are never evicted.
+
+    Futures always stay in the memory of the worker that created them. With a
+    shared ``backend`` the job is also published there -- classification at
+    put() time, each product-data outcome from a future done-callback -- so a
+    poll that lands on another worker can rebuild the job from plain data.
+    Monotonic start times -- submit and primary pickup, the latter republished
+    when a worker picks the primary up -- are published as wall-clock time and
+    converted back on read.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 1800,
+        backend: Optional[JobBackend] = None,
+        max_bytes: int = 0,
+    ) -> None:
         self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.max_bytes = max_bytes
         self._lock = Lock()
-        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._jobs: "OrderedDict[str, _JobEntry]" = OrderedDict()
+        self._expiry: List[Tuple[float, str]] = []
+        self._bytes = 0
 
     def put(
         self,
@@ -21,32 +266,234 @@ class AnalysisJobStore:
         fallback_future: Optional[Future] = None,
         started_at: Optional[float] = None,
         fallback_timeout: Optional[float] = None,
+        payload_bytes: int = 0,
     ) -> None:
+        created_at = time.time()
+        timing = getattr(future, "timing", None)
+        job = {
+            "created_at": created_at,
+            "classification": dict(classification),
+            "future": future,
+            "fallback_future": fallback_future,
+            "started_at": started_at,
+            "primary_started_at": started_at if timing is None else timing.started_at,
+            "fallback_timeout": fallback_timeout,
+        }
+        entry = _JobEntry(job, created_at + self.ttl_seconds, int(payload_bytes))
         with self._lock:
             self._purge_expired_locked()
-            self._jobs[job_id] = {
-                "created_at": time.time(),
-                "classification": dict(classification),
-                "future": future,
-                "fallback_future": fallback_future,
-                "started_at": started_at,
-                "fallback_timeout": fallback_timeout,
-            }
+            self._remove_locked(job_id, None)
+            self._jobs[job_id] = entry
+            heapq.heappush(self._expiry, (entry.expires_at, job_id))
+            self._resize_locked(entry)
+            self._enforce_budget_locked()
+        for pending in (future, fallback_future):
+            if pending is not None:
+                pending.add_done_callback(lambda _f, e=entry: self._settle(job_id, e))
+        published = self.backend is not None and self._publish_job(job_id, job)
+        if timing is not None:
+            # Registered after the first publish so the pickup is never
+            # overwritten by it; fires at once when the primary already runs.
+            timing.add_start_callback(
+                lambda t, e=entry: self._record_pickup(job_id, e, t.started_at, published)
+            )
+        if not published:
+            return
+        future.add_done_callback(lambda f: self._publish_outcome(job_id, "primary", f))
+        if fallback_future is not None:
+            fallback_future.add_done_callback(lambda f: self._publish_outcome(job_id, "fallback", f))
 
     def get(self, job_id: str) -> Optional[Dict[str, Any]]:
         with self._lock:
             self._purge_expired_locked()
-            job = self._jobs.get(job_id)
-            if not job:
-                return None
-            return dict(job)
+            entry = self._jobs.get(job_id)
+            if entry is not None:
+                self._jobs.move_to_end(job_id)
+                return dict(entry.job)
+        if self.backend is None:
+            return None
+        return self._load_remote(job_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    @property
+    def resident_bytes(self) -> int:
+        """Estimated memory held by the jobs in this process."""
+        with self._lock:
+            return self._bytes
+
+    def _publish_job(self, job_id: str, job: Dict[str, Any]) -> bool:
+        record = {
+            "created_at": job["created_at"],
+            "classification": job["classification"],
+            "has_fallback": job.get("fallback_future") is not None,
+            "started_wall": _to_wall(job.get("started_at")),
+            "primary_started_wall": _to_wall(job.get("primary_started_at")),
+            "fallback_timeout": job.get("fallback_timeout"),
+        }
+        ttl = max(1, int(job["created_at"] + self.ttl_seconds - time.time()))
+        try:
+            self.backend.set(self._key(job_id), json.dumps(record, default=str), ex=ttl)
+        except Exception:
+            _logger.exception("job store: failed to publish job %s", job_id)
+            return False
+        return True
+
+    def _record_pickup(self, job_id: str, entry: _JobEntry, started: float, publish: bool) -> None:
+        with self._lock:
+            if entry.job.get("primary_started_at") == started:
+                return
+            entry.job["primary_started_at"] = started
+            job = dict(entry.job)
+        if publish:
+            self._publish_job(job_id, job)
+
+    def _settle(self, job_id: str, entry: _JobEntry) -> None:
+        with self._lock:
+            if self._jobs.get(job_id) is not entry:
+                return
+            for key in ("future", "fallback_future"):
+                current = entry.job.get(key)
+                if current is not None and current.done():
+                    entry.job[key] = _settled_copy(current)
+            self._resize_locked(entry)
+            self._enforce_budget_locked()
+
+    def _resize_locked(self, entry: _JobEntry) -> None:
+        job = entry.job
+        futures = [f for f in (job["future"], job.get("fallback_future")) if f is not None]
+        size = _estimate_bytes(job["classification"])
+        for future in futures:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                size += _estimate_bytes(future.result())
+        if not all(f.done() for f in futures):
+            size += entry.payload_bytes
+        self._bytes += size - entry.nbytes
+        entry.nbytes = size
+
+    def _remove_locked(self, job_id: str, reason: Optional[str]) -> None:
+        entry = self._jobs.pop(job_id, None)
+        if entry is None:
+            return
+        self._bytes -= entry.nbytes
+        if reason:
+            obs_metrics.ANALYSIS_JOB_EVICTIONS.inc(reason=reason)
+
+    def _enforce_budget_locked(self) -> None:
+        # Only settled jobs are evicted: a pending one is still being polled and
+        # its images stay pinned by the executor anyway, so the store may run
+        # over budget until it settles (_settle() enforces again). The newest
+        # job always stays, even if it alone is over budget.
+        if not self.max_bytes or self._bytes <= self.max_bytes:
+            return
+        victims = []
+        over = self._bytes - self.max_bytes
+        for job_id, entry in list(self._jobs.items())[:-1]:
+            if over <= 0:
+                break
+            if _is_settled(entry.job):
+                victims.append(job_id)
+                over -= entry.nbytes
+        for job_id in victims:
+            self._remove_locked(job_id, "budget")
+
+    @staticmethod
+    def _key(job_id: str, slot: str = "") -> str:
+        return f"analysis_job:{job_id}" + (f":{slot}" if slot else "")
+
+    def _publish_outcome(self, job_id: str, slot: str, future: Future) -> None:
+        try:
+            error = CancelledError() if future.cancelled() else future.exception()
+            outcome = {"error": _encode_error(error)} if error is not None else {"result": future.result()}
+            self.backend.set(self._key(job_id, slot), json.dumps(outcome, default=str), ex=self.ttl_seconds)
+        except Exception:
+            _logger.exception("job store: failed to publish %s outcome of job %s", slot, job_id)
+
+    def _load_remote(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.backend.get(self._key(job_id))
+        if raw is None:
+            return None
+        record = json.loads(raw)
+        fallback_future = None
+        if record.get("has_fallback"):
+            fallback_future = _outcome_future(self.backend.get(self._key(job_id, "fallback")))
+        job = {
+            "created_at": record.get("created_at"),
+            "classification": record.get("classification") or {},
+            "future": _outcome_future(self.backend.get(self._key(job_id, "primary"))),
+            "fallback_future": fallback_future,
+            "started_at": _from_wall(record.get("started_wall")),
+            "fallback_timeout": record.get("fallback_timeout"),
+            # Futures above are snapshots; re-get() the job to observe progress.
+            "remote": True,
+        }
+        if "primary_started_wall" in record:
+            job["primary_started_at"] = _from_wall(record["primary_started_wall"])
+        return job
 
     def _purge_expired_locked(self) -> None:
-        cutoff = time.time() - self.ttl_seconds
-        expired = [
-            job_id
-            for job_id, job in self._jobs.items()
-            if float(job.get("created_at", 0)) < cutoff
-        ]
-        for job_id in expired:
-            self._jobs.pop(job_id, None)
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, job_id = heapq.heappop(self._expiry)
+            entry = self._jobs.get(job_id)
+            # Entries left behind by a re-put or an eviction are skipped.
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove_locked(job_id, "expired")
+
+
+async def wait_for_job_update(job: Dict[str, Any], timeout: float) -> bool:
+    """Wait until the job's product-data source may have become decidable.
+
+    Wakes when the primary or fallback future finishes (via done-callbacks, no
+    polling or worker thread), when a queued primary is picked up by a worker
+    or when it crosses the fallback threshold -- measured from that pickup, see
+    ``primary_started_at`` -- whichever comes first; otherwise returns after
+    ``timeout`` seconds. Returns False on a plain timeout.
+
+    A job rebuilt from a shared backend has snapshot futures that never
+    complete, so for those this just sleeps ``REMOTE_REFRESH_SECONDS`` and the
+    caller re-reads the job.
+    """
+    if job.get("remote"):
+        await asyncio.sleep(min(max(0.0, float(timeout)), REMOTE_REFRESH_SECONDS))
+        return True
+    futures = [f for f in (job.get("future"), job.get("fallback_future")) if f is not None]
+    pending = [f for f in futures if not f.done()]
+    if not pending:
+        return True
+
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+
+    def _wake(_future: Future) -> None:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # loop already closed; nobody is waiting any more
+
+    for future in pending:
+        future.add_done_callback(_wake)
+
+    wait_s = max(0.0, float(timeout))
+    threshold_wake = False
+    primary = job.get("future")
+    fallback_timeout = job.get("fallback_timeout")
+    if primary in pending and fallback_timeout is not None:
+        started_at = primary_started_at(job)
+        timing = getattr(primary, "timing", None)
+        if started_at is not None:
+            until_threshold = started_at + float(fallback_timeout) - time.monotonic()
+            if 0 < until_threshold < wait_s:
+                wait_s = until_threshold
+                threshold_wake = True
+        elif timing is not None:
+            # Still queued: the threshold clock starts at pickup, so wake then
+            # and let the caller wait again with the real threshold.
+            timing.add_start_callback(lambda _t: _wake(primary))
+    try:
+        await asyncio.wait_for(event.wait(), wait_s)
+    except asyncio.TimeoutError:
+        return threshold_wake
+    return True
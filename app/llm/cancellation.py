@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, List
+
+
+_logger = logging.getLogger(__name__)
+
+
+class CancellationToken:
+    """Cooperative cancellation flag shared by a caller and a running task.
+
+    The task polls ``cancelled`` (or sleeps with ``wait``) between steps;
+    blocking I/O registers an ``on_cancel`` callback that aborts it, e.g. by
+    shutting down the socket of an in-flight HTTP request.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                _logger.debug("cancellation callback failed", exc_info=True)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run ``callback`` on cancel (now, if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def _unregister() -> None:
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return _unregister
+        callback()
+        return lambda: None
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to ``timeout`` seconds; True if cancelled meanwhile."""
+        return self._event.wait(timeout)
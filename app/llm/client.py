@@ -1,9 +1,15 @@
 import json
-from typing import Any, Dict, List, Optional, Tuple
+import socket
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
-from ..errors import LLMRequestError
+from ..errors import LLMCancelledError, LLMRequestError
+from .cancellation import CancellationToken
 
 
 # Sentinel: when passed as `reasoning`, fall back to the client's configured
@@ -12,6 +18,70 @@ from ..errors import LLMRequestError
 USE_CLIENT_REASONING = object()
 
 
+class _CancelScope:
+    """Connections used by one cancellable chat() call, aborted on cancel."""
+
+    def __init__(self, token: CancellationToken) -> None:
+        self.token = token
+        self._unregister: List[Callable[[], None]] = []
+
+    def track(self, conn: "_AbortableConnectionMixin") -> None:
+        self._unregister.append(self.token.on_cancel(conn.abort))
+
+    def close(self) -> None:
+        for unregister in self._unregister:
+            unregister()
+
+
+_cancel_scope: ContextVar[Optional[_CancelScope]] = ContextVar("openrouter_cancel_scope", default=None)
+
+
+class _AbortableConnectionMixin:
+    """urllib3 connection that a CancellationToken can cut mid-request."""
+
+    def request(self, *args: Any, **kwargs: Any) -> None:
+        scope = _cancel_scope.get()
+        if scope is not None:
+            scope.track(self)
+        super().request(*args, **kwargs)  # type: ignore[misc]
+
+    def abort(self) -> None:
+        sock = getattr(self, "sock", None)
+        if sock is None:
+            return
+        try:
+            # socket.socket.shutdown (not SSLSocket's) so a read blocked in
+            # another thread wakes up with EOF instead of racing the TLS object.
+            socket.socket.shutdown(sock, socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _AbortableHTTPConnection(_AbortableConnectionMixin, HTTPConnection):
+    pass
+
+
+class _AbortableHTTPSConnection(_AbortableConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _AbortableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _AbortableHTTPConnection
+
+
+class _AbortableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _AbortableHTTPSConnection
+
+
+class _AbortableAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _AbortableHTTPConnectionPool,
+            "https": _AbortableHTTPSConnectionPool,
+        }
+
+
 class OpenRouterClient:
     def __init__(
         self,
@@ -29,6 +99,9 @@ class OpenRouterClient:
         self.app_name = app_name
         self.reasoning = dict(reasoning) if reasoning else None
         self.session = requests.Session()
+        adapter = _AbortableAdapter()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     def chat(
         self,
@@ -38,7 +111,16 @@ class OpenRouterClient:
         max_tokens: int = 1024,
         timeout: Optional[float] = None,
         reasoning: Any = USE_CLIENT_REASONING,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Tuple[str, Dict[str, Any]]:
+        """Send one chat completion request.
+
+        With ``cancel_token``, cancelling it shuts the request's socket down, so
+        the call fails fast with LLMCancelledError instead of waiting for the
+        model to finish.
+        """
+        if cancel_token is not None and cancel_token.cancelled:
+            raise LLMCancelledError("OpenRouter request cancelled.")
         if not self.api_key:
             raise LLMRequestError("OPENROUTER_API_KEY is not configured.")
         if not model:
@@ -66,6 +148,8 @@ class OpenRouterClient:
             payload["reasoning"] = dict(effective_reasoning)
 
         effective_timeout = timeout if timeout is not None else self.timeout
+        scope = _CancelScope(cancel_token) if cancel_token is not None else None
+        scope_token = _cancel_scope.set(scope)
         try:
             response = self.session.post(
                 self.base_url,
@@ -74,7 +158,13 @@ class OpenRouterClient:
                 timeout=effective_timeout,
             )
         except requests.RequestException as exc:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise LLMCancelledError("OpenRouter request cancelled.") from exc
             raise LLMRequestError(f"OpenRouter request failed: {exc}") from exc
+        finally:
+            _cancel_scope.reset(scope_token)
+            if scope is not None:
+                scope.close()
 
         if response.status_code >= 400:
             raise LLMRequestError(
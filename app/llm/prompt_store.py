@@ -31,12 +31,16 @@ class PromptDef:
 PROMPT_REGISTRY: Tuple[PromptDef, ...] = (
     PromptDef("FAST_CLASSIFICATION_SYSTEM_PROMPT", "快速分类 · System", "fast_classification", "system", _p.FAST_CLASSIFICATION_SYSTEM_PROMPT, (CATEGORY_OPTIONS_TOKEN,)),
     PromptDef("FAST_CLASSIFICATION_USER_PROMPT", "快速分类 · User", "fast_classification", "user", _p.FAST_CLASSIFICATION_USER_PROMPT, ("{language_label}",)),
+    PromptDef("TITLE_CATEGORY_BATCH_SYSTEM_PROMPT", "批量标题选类目 · System", "title_category_batch", "system", _p.TITLE_CATEGORY_BATCH_SYSTEM_PROMPT, (CATEGORY_OPTIONS_TOKEN,)),
+    PromptDef("TITLE_CATEGORY_BATCH_USER_PROMPT", "批量标题选类目 · User", "title_category_batch", "user", _p.TITLE_CATEGORY_BATCH_USER_PROMPT, ("{titles}", "{language_label}")),
     PromptDef("TITLE_IMAGE_FALLBACK_SYSTEM_PROMPT", "标题图片兜底 · System", "title_image_fallback", "system", _p.TITLE_IMAGE_FALLBACK_SYSTEM_PROMPT, (CATEGORY_OPTIONS_TOKEN,)),
     PromptDef("TITLE_IMAGE_FALLBACK_USER_PROMPT", "标题图片兜底 · User", "title_image_fallback", "user", _p.TITLE_IMAGE_FALLBACK_USER_PROMPT, ("{language_label}",)),
     PromptDef("PRICE_ONLY_SYSTEM_PROMPT", "价格提取 · System", "price_only", "system", _p.PRICE_ONLY_SYSTEM_PROMPT, ()),
     PromptDef("PRICE_ONLY_USER_PROMPT", "价格提取 · User", "price_only", "user", _p.PRICE_ONLY_USER_PROMPT, ()),
     PromptDef("SIZE_ONLY_SYSTEM_PROMPT", "尺寸提取 · System", "size_only", "system", _p.SIZE_ONLY_SYSTEM_PROMPT, ()),
     PromptDef("SIZE_ONLY_USER_PROMPT", "尺寸提取 · User", "size_only", "user", _p.SIZE_ONLY_USER_PROMPT, ()),
+    PromptDef("PRICE_SIZE_SYSTEM_PROMPT", "价格+尺寸提取 · System", "price_size", "system", _p.PRICE_SIZE_SYSTEM_PROMPT, ()),
+    PromptDef("PRICE_SIZE_USER_PROMPT", "价格+尺寸提取 · User", "price_size", "user", _p.PRICE_SIZE_USER_PROMPT, ()),
     PromptDef("PRODUCT_DATA_SYSTEM_PROMPT", "商品数据 · System", "product_data", "system", _p.PRODUCT_DATA_SYSTEM_PROMPT, ()),
     PromptDef("PRODUCT_DATA_USER_PROMPT", "商品数据 · User", "product_data", "user", _p.PRODUCT_DATA_USER_PROMPT, ("{language_label}",)),
     PromptDef("PRODUCT_DATA_REGENERATION_SYSTEM_PROMPT", "商品数据再生成 · System", "product_data_regeneration", "system", _p.PRODUCT_DATA_REGENERATION_SYSTEM_PROMPT, ()),
@@ -47,6 +51,10 @@ PROMPT_REGISTRY: Tuple[PromptDef, ...] = (
     PromptDef("PRODUCT_TITLE_CATEGORY_USER_PROMPT", "标题选类目 · User", "title_category", "user", _p.PRODUCT_TITLE_CATEGORY_USER_PROMPT, ("{title}", "{language_label}")),
     PromptDef("CATEGORY_SYSTEM_PROMPT", "类目匹配 · System", "category", "system", _p.CATEGORY_SYSTEM_PROMPT, ()),
     PromptDef("CATEGORY_USER_PROMPT_TEMPLATE", "类目匹配 · User", "category", "user", _p.CATEGORY_USER_PROMPT_TEMPLATE, ("{title}", "{description}", "{brand}", "{group_name}", "{candidate_paths}")),
+    PromptDef("CATEGORY_NODE_SYSTEM_PROMPT", "类目节点预选 · System", "category_node", "system", _p.CATEGORY_NODE_SYSTEM_PROMPT, ()),
+    PromptDef("CATEGORY_NODE_USER_PROMPT_TEMPLATE", "类目节点预选 · User", "category_node", "user", _p.CATEGORY_NODE_USER_PROMPT_TEMPLATE, ("{title}", "{description}", "{brand}", "{group_name}", "{candidate_nodes}")),
+    PromptDef("CATEGORY_BATCH_SYSTEM_PROMPT", "批量类目匹配 · System", "category_batch", "system", _p.CATEGORY_BATCH_SYSTEM_PROMPT, ()),
+    PromptDef("CATEGORY_BATCH_USER_PROMPT_TEMPLATE", "批量类目匹配 · User", "category_batch", "user", _p.CATEGORY_BATCH_USER_PROMPT_TEMPLATE, ("{group_name}", "{products}", "{candidate_paths}")),
     PromptDef("SHOWCASE_PROMPT", "图片合成 · 指令", "showcase", "system", _p.SHOWCASE_PROMPT, ()),
 )
 
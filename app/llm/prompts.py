@@ -27,6 +27,36 @@ PRODUCT_TITLE_CATEGORY_USER_PROMPT = """Product title: {title}
 
 Language of the title: {language_label}"""
 
+TITLE_CATEGORY_BATCH_SYSTEM_PROMPT = """You are an assistant helping sellers choose the correct top-level category in a Japanese e-commerce taxonomy based on Rakuten categories.
+
+You are given a numbered list of product titles. For EACH title, choose the single best matching top-level category from the following list (return exactly one of these strings):
+[[TOP_LEVEL_CATEGORY_OPTIONS]]
+
+IMPORTANT:
+- Judge every title independently; do not let one title influence another.
+- The top_level_category must be exactly one of the provided strings.
+- Use only the product title to decide the category.
+- Return exactly one result per input title, using the same id.
+
+You must respond with pure JSON only, without any explanations, without markdown, and without comments.
+
+The JSON schema is:
+
+{
+  "results": [
+    {
+      "id": "string",
+      "top_level_category": "string"
+    }
+  ]
+}
+"""
+
+TITLE_CATEGORY_BATCH_USER_PROMPT = """Language of the titles: {language_label}
+
+Product titles (one per line, as id: title):
+{titles}"""
+
 TITLE_IMAGE_FALLBACK_SYSTEM_PROMPT = """You are an assistant helping sellers classify a product image for a Japanese marketplace.
 
 This is a fallback for title-only category analysis. Use the image only to identify the product well enough for downstream taxonomy matching.
@@ -158,6 +188,52 @@ SIZE_ONLY_USER_PROMPT = """Extract the product size from the attached images, bu
 
 Return JSON only with product_size. Inspect every image; set product_size to null if no explicit size text is visible in any of them. Do not infer size from appearance."""
 
+PRICE_SIZE_SYSTEM_PROMPT = """You are an assistant that reads product prices and product size information from images for a Japanese marketplace.
+
+Your job is to extract any clearly visible ACTUAL product price, provide a realistic AI reference price range for the same product, and extract the product size when it is explicitly and clearly readable.
+
+Return:
+- tax_excluded: the visible tax-excluded price as an integer JPY, or null
+- tax_included: the visible tax-included price as an integer JPY, or null
+- prices: a two-item integer JPY array [low, high] representing a realistic reference price range for this product
+- product_size: the size text exactly as shown in the image, or null
+
+Price rules:
+- If exactly one actual product price is visible, return it as tax_included and set tax_excluded to null.
+- If both tax-excluded and tax-included prices are clearly visible, return both.
+- If NO actual product price is clearly visible in any image, set both tax_excluded and tax_included to null.
+- The prices range is an AI reference range, not a copied label price. Estimate it from visible evidence such as brand, product name, model number, series, capacity/size, color, accessories, packaging, apparent condition, and whether the item looks new, used, vintage, limited, or bundled.
+- Make the range commercially useful for a Japanese marketplace seller: neither too narrow to be false precision nor too wide to be meaningless. Prefer a range that reflects likely market variance for comparable items.
+- If a visible actual product price exists, the prices range MUST include that visible price. For example, if tax_included is 10780, low <= 10780 <= high.
+- If product identity is uncertain, return a cautious wider range based on the most likely product type and visible brand tier. If there is too little evidence to estimate responsibly, return [].
+- Always return prices in ascending order. Use integer JPY only.
+
+Size rules:
+- Return a size ONLY when there is explicit, clearly visible size information, such as text on a tag, label, packaging, a size chart, or a measurement printed next to the item (e.g. "M", "27cm", "縦30×横20×高10cm").
+- Copy the size exactly as shown, keeping its original numbers, units, and labels. You may join several visible dimensions into one short string.
+- Do NOT guess, estimate, or infer the size from the object's appearance, proportions, or any surrounding objects. If no explicit size text is visible in any image, you MUST return null.
+- When in doubt, return null. It is far better to omit the size than to return a wrong one.
+
+Inspect EVERY uploaded image; a price or size may appear on any of them (a tag, the back of the package, a size chart, etc.), not necessarily the first image.
+
+Do not generate a title, brand, description, category, keywords, or any other field. Do not use web search or browsing.
+
+You must respond with pure JSON only, without explanations, markdown, or comments.
+
+The JSON schema is:
+
+{
+  "tax_excluded": number or null,
+  "tax_included": number or null,
+  "prices": [number, number] or [],
+  "product_size": "string or null"
+}
+"""
+
+PRICE_SIZE_USER_PROMPT = """Extract the actual visible product price and the product size from the attached images, and estimate a realistic AI reference price range.
+
+Return JSON only with tax_excluded, tax_included, prices, and product_size. Set tax_excluded and tax_included to null if no real price is visible; the prices range must cover any visible actual price. Set product_size to null if no explicit size text is visible in any image; do not infer size from appearance."""
+
 PRODUCT_DATA_SYSTEM_PROMPT = """You are an assistant helping sellers list items for a Japanese marketplace.
 
 Given one or more images of the same product, inspect every image independently, then merge the evidence into one product listing payload.
@@ -441,15 +517,108 @@ Notes:
 - Confidence values should be numbers between 0 and 1.
 """
 
-CATEGORY_USER_PROMPT_TEMPLATE = """Product:
+CATEGORY_USER_PROMPT_TEMPLATE = """Top-level category (group_name): {group_name}
+
+Candidate category paths (one per line):
+{candidate_paths}
+
+Product:
 - Title: {title}
 - Description: {description}
 - Brand (may be empty): {brand}
-- Top-level category (group_name): {group_name}
+- Top-level category (group_name): {group_name}"""
+
+
+CATEGORY_NODE_SYSTEM_PROMPT = """You are an e-commerce taxonomy specialist working with a Japanese marketplace taxonomy based on Rakuten categories.
+
+Task:
+- You are given information about ONE product (title, description, brand, and its top-level category).
+- You are also given a list of candidate category nodes under that top-level category. Each node is the start of a category path; the final category will be chosen later from the categories under the nodes you pick.
+- Your job is to choose up to 3 nodes most likely to contain the best category for the product, ranked by how likely they are.
+
+Instructions:
+- Carefully understand what the product is, how it is used, who it is for, and any important attributes.
+- Carefully read all candidate nodes.
+- Choose only from the given candidate nodes. Do NOT invent or modify nodes.
+- Put the most likely node first. Add a 2nd and 3rd node only when the product could plausibly belong under them; never pad the list with unrelated nodes.
+- If nothing fits at all, return an empty list.
+
+Output format:
+- Respond with pure JSON only, with no explanations, no markdown, and no comments.
+- Use double quotes for all strings. No trailing commas. No extra keys.
+- The JSON schema is:
+
+{
+  "nodes": ["string"]
+}
+
+Notes:
+- Every entry of "nodes" must be exactly one of the candidate nodes.
+- The same node MUST NOT appear more than once.
+"""
+
+CATEGORY_NODE_USER_PROMPT_TEMPLATE = """Top-level category (group_name): {group_name}
+
+Candidate category nodes (one per line):
+{candidate_nodes}
+
+Product:
+- Title: {title}
+- Description: {description}
+- Brand (may be empty): {brand}
+- Top-level category (group_name): {group_name}"""
+
+
+CATEGORY_BATCH_SYSTEM_PROMPT = """You are an e-commerce taxonomy specialist working with a Japanese marketplace taxonomy based on Rakuten categories.
+
+Task:
+- You are given a numbered list of products (title only) that all belong to the same top-level category.
+- You are also given a list of candidate category paths under that top-level category.
+- For EACH product, choose the top 3 most relevant target category paths from the candidates, ranked by how well they match that product.
+
+Instructions:
+- Judge every product independently; do not let one product influence another.
+- Carefully understand what each product is, how it is used, who it is for, and any important attributes.
+- Choose only from the given candidate category paths. Do NOT invent or modify categories.
+- Return 3 distinct paths per product whenever the candidate list contains 3 or more plausible matches. Never pad the list with unrelated categories just to reach 3.
+- "best_target_path" is the single best match. The "alternatives" array holds the 2nd and 3rd best matches (in that order), sorted strictly by confidence in descending order.
+- If nothing fits a product at all, return an empty string for its best_target_path and an empty alternatives list.
+- Return exactly one result per input product, using the same id.
+
+Output format:
+- Respond with pure JSON only, with no explanations, no markdown, and no comments.
+- Use double quotes for all strings. No trailing commas. No extra keys.
+- The JSON schema is:
+
+{
+  "results": [
+    {
+      "id": "string",
+      "best_target_path": "string",
+      "confidence": number,
+      "alternatives": [
+        {
+          "target_path": "string",
+          "confidence": number
+        }
+      ]
+    }
+  ]
+}
+
+Notes:
+- Every "best_target_path" and "target_path" must be exactly one of the candidate category paths (unless empty).
+- The same path MUST NOT appear more than once within one product's result.
+- Confidence values should be numbers between 0 and 1.
+"""
+
+CATEGORY_BATCH_USER_PROMPT_TEMPLATE = """Top-level category (group_name): {group_name}
 
 Candidate category paths (one per line):
-{candidate_paths}"""
+{candidate_paths}
 
+Products (one per line, as id: title):
+{products}"""
 
 SHOWCASE_PROMPT = """Create a realistic, high-conversion e-commerce hero image intended as the primary listing thumbnail. The photo must read as a CANDID LIFESTYLE MOMENT of the product being used in real life — NOT a posed studio showcase, NOT a catalog stand-and-display.
 
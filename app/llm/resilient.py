@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import re
 import time
+from contextlib import nullcontext
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from ..errors import LLMAllAttemptsFailedError, LLMParseError, LLMRequestError
+from ..errors import LLMAllAttemptsFailedError, LLMCancelledError, LLMParseError, LLMRequestError
+from ..observability import tracing
+from .cancellation import CancellationToken
 from .client import OpenRouterClient, USE_CLIENT_REASONING
+from .scheduler import get_scheduler
 from .json_parser import parse_llm_json
 
 
@@ -59,6 +63,31 @@ class ResilientCaller:
         temperature: float,
         max_tokens: int,
         reasoning: Any = USE_CLIENT_REASONING,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], List[AttemptRecord]]:
+        with tracing.span("llm.stage", stage=stage, primary_model=primary_model):
+            return self._call_and_parse(
+                stage=stage,
+                primary_model=primary_model,
+                fallback_models=fallback_models,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                reasoning=reasoning,
+                cancel_token=cancel_token,
+            )
+
+    def _call_and_parse(
+        self,
+        *,
+        stage: str,
+        primary_model: str,
+        fallback_models: Sequence[str],
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        reasoning: Any,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Tuple[Dict[str, Any], Dict[str, Any], List[AttemptRecord]]:
         attempts: List[AttemptRecord] = []
         if not primary_model:
@@ -75,6 +104,19 @@ class ResilientCaller:
         for model, n_attempts in schedule:
             for attempt in range(1, n_attempts + 1):
                 global_idx += 1
+                if cancel_token is not None and cancel_token.cancelled:
+                    attempts.append(
+                        AttemptRecord(
+                            model=model,
+                            attempt=attempt,
+                            attempt_global=global_idx,
+                            error_kind="cancelled",
+                            message="Cancelled before attempt.",
+                            latency_ms=0.0,
+                            status_code=None,
+                        )
+                    )
+                    raise LLMAllAttemptsFailedError(stage=stage, attempts=attempts)
                 remaining = deadline - time.monotonic()
                 if remaining <= _MIN_USEFUL_BUDGET_S:
                     attempts.append(
@@ -90,17 +132,46 @@ class ResilientCaller:
                     )
                     raise LLMAllAttemptsFailedError(stage=stage, attempts=attempts)
 
-                effective_timeout = min(self.per_attempt_timeout_s, remaining)
                 t0 = time.monotonic()
                 try:
-                    content, raw_response = self.client.chat(
-                        model=model,
-                        messages=messages,
-                        temperature=temperature,
-                        max_tokens=max_tokens,
-                        timeout=effective_timeout,
-                        reasoning=reasoning,
+                    chat_kwargs: Dict[str, Any] = {}
+                    if cancel_token is not None:
+                        chat_kwargs["cancel_token"] = cancel_token
+                    scheduler = get_scheduler()
+                    # Waiting for a slot spends the stage budget: give up once
+                    # too little is left for a useful attempt.
+                    slot = (
+                        scheduler.slot(cancel_token=cancel_token, deadline=deadline - _MIN_USEFUL_BUDGET_S)
+                        if scheduler is not None
+                        else nullcontext()
+                    )
+                    with tracing.span("llm.attempt", stage=stage, model=model, attempt=global_idx), slot:
+                        # Time spent queued for a slot is not model latency.
+                        t0 = time.monotonic()
+                        effective_timeout = min(self.per_attempt_timeout_s, deadline - t0)
+                        content, raw_response = self.client.chat(
+                            model=model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            timeout=effective_timeout,
+                            reasoning=reasoning,
+                            **chat_kwargs,
+                        )
+                except LLMCancelledError as exc:
+                    # Someone else already has the answer: stop, no retries.
+                    attempts.append(
+                        AttemptRecord(
+                            model=model,
+                            attempt=attempt,
+                            attempt_global=global_idx,
+                            error_kind="cancelled",
+                            message=str(exc),
+                            latency_ms=(time.monotonic() - t0) * 1000.0,
+                            status_code=None,
+                        )
                     )
+                    raise LLMAllAttemptsFailedError(stage=stage, attempts=attempts) from exc
                 except LLMRequestError as exc:
                     attempts.append(
                         AttemptRecord(
@@ -114,7 +185,7 @@ class ResilientCaller:
                         )
                     )
                     if attempt < n_attempts:
-                        self._sleep_capped(attempt - 1, deadline)
+                        self._sleep_capped(attempt - 1, deadline, cancel_token)
                     continue
 
                 try:
@@ -134,7 +205,7 @@ class ResilientCaller:
                         )
                     )
                     if attempt < n_attempts:
-                        self._sleep_capped(attempt - 1, deadline)
+                        self._sleep_capped(attempt - 1, deadline, cancel_token)
                     continue
 
                 attempts.append(
@@ -153,10 +224,13 @@ class ResilientCaller:
         raise LLMAllAttemptsFailedError(stage=stage, attempts=attempts)
 
     @staticmethod
-    def _sleep_capped(idx: int, deadline: float) -> None:
+    def _sleep_capped(idx: int, deadline: float, cancel_token: Optional[CancellationToken] = None) -> None:
         base = _BACKOFF_S[min(idx, len(_BACKOFF_S) - 1)]
         delay = min(base, _BACKOFF_CAP_S)
         budget_room = max(0.0, deadline - time.monotonic() - _BACKOFF_HEADROOM_S)
         delay = min(delay, budget_room)
         if delay > 0:
-            time.sleep(delay)
+            if cancel_token is not None:
+                cancel_token.wait(delay)
+            else:
+                time.sleep(delay)
@@ -0,0 +1,245 @@
+"""Priority-aware admission for outgoing LLM calls.
+
+Every OpenRouter attempt made through ResilientCaller takes a slot from the
+process-wide ``LLMScheduler`` first. Calls carry a priority class from a
+ContextVar -- ``interactive`` (the default: live API traffic), ``background``
+(evaluation runs) or ``batch`` (offline scripts, or requests sent with
+``X-Priority: batch``) -- and while slots are short, waiting classes are
+served by weighted fair queuing: each waiter gets a virtual finish tag of
+``max(now_v, last_tag[class]) + 1 / weight`` and the smallest tag whose class
+is under its concurrency cap goes next.
+
+When the interactive queue head, or the p90 of recent interactive waits, is
+over ``interactive_wait_target_ms``, background and batch calls are throttled: they
+are only started while no interactive call is queued, and at most one of them
+runs at a time.
+
+A waiter may pass a monotonic ``deadline``; if no slot is granted by then it
+leaves the queue with LLMRequestError, so queueing spends the call's budget
+instead of extending it.
+"""
+
+from __future__ import annotations
+
+import collections
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Deque, Dict, Iterator, Mapping, Optional, Tuple
+
+from ..errors import LLMCancelledError, LLMRequestError
+from ..observability import metrics as obs_metrics
+from ..observability import tracing
+from .cancellation import CancellationToken
+
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BATCH = "batch"
+PRIORITY_CLASSES: Tuple[str, ...] = (INTERACTIVE, BACKGROUND, BATCH)
+
+DEFAULT_WEIGHTS: Dict[str, float] = {INTERACTIVE: 8.0, BACKGROUND: 2.0, BATCH: 1.0}
+
+# Interactive queue waits from the last _WAIT_WINDOW_S seconds (at most
+# _WAIT_SAMPLES of them) decide throttling through their p90.
+_WAIT_WINDOW_S = 10.0
+_WAIT_SAMPLES = 256
+# Poll interval for cancellation while waiting for a slot.
+_CANCEL_POLL_S = 0.25
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+def normalize_priority(value: Optional[str]) -> str:
+    value = (value or "").strip().lower()
+    return value if value in PRIORITY_CLASSES else INTERACTIVE
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def set_priority(value: str) -> Token:
+    return _priority.set(normalize_priority(value))
+
+
+def reset_priority(token: Token) -> None:
+    _priority.reset(token)
+
+
+@contextmanager
+def llm_priority(value: str) -> Iterator[None]:
+    """Run LLM calls made inside the block under priority class ``value``."""
+    token = set_priority(value)
+    try:
+        yield
+    finally:
+        reset_priority(token)
+
+
+class _Waiter:
+    __slots__ = ("priority", "tag", "seq", "enqueued_at", "granted")
+
+    def __init__(self, priority: str, tag: float, seq: int) -> None:
+        self.priority = priority
+        self.tag = tag
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.granted = threading.Event()
+
+
+class LLMScheduler:
+    """Weighted fair queue with per-class caps in front of the LLM endpoints."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        *,
+        weights: Optional[Mapping[str, float]] = None,
+        caps: Optional[Mapping[str, int]] = None,
+        interactive_wait_target_ms: float = 500.0,
+    ) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.weights = {cls: float((weights or DEFAULT_WEIGHTS).get(cls, DEFAULT_WEIGHTS[cls]))
+                        for cls in PRIORITY_CLASSES}
+        # 0 / missing means "no cap beyond max_concurrency".
+        self.caps = {cls: int((caps or {}).get(cls) or 0) for cls in PRIORITY_CLASSES}
+        self.interactive_wait_target_ms = float(interactive_wait_target_ms)
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Waiter]] = {cls: collections.deque() for cls in PRIORITY_CLASSES}
+        self._running: Dict[str, int] = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._last_tag: Dict[str, float] = {cls: 0.0 for cls in PRIORITY_CLASSES}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._interactive_waits: Deque[Tuple[float, float]] = collections.deque(maxlen=_WAIT_SAMPLES)
+
+    # ---- public -----------------------------------------------------------
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None,
+             cancel_token: Optional[CancellationToken] = None,
+             deadline: Optional[float] = None) -> Iterator[None]:
+        """Hold one LLM concurrency slot for the enclosed call."""
+        cls = normalize_priority(priority or current_priority())
+        self._acquire(cls, cancel_token, deadline)
+        try:
+            yield
+        finally:
+            self._release(cls)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                cls: {"running": self._running[cls], "queued": len(self._queues[cls])}
+                for cls in PRIORITY_CLASSES
+            }
+
+    @property
+    def throttled(self) -> bool:
+        with self._lock:
+            return self._throttled_locked(time.monotonic())
+
+    # ---- internals ----------------------------------------------------------
+
+    def _acquire(
+        self,
+        cls: str,
+        cancel_token: Optional[CancellationToken],
+        deadline: Optional[float],
+    ) -> None:
+        with self._lock:
+            tag = max(self._virtual_time, self._last_tag[cls]) + 1.0 / self.weights[cls]
+            self._last_tag[cls] = tag
+            waiter = _Waiter(cls, tag, next(self._seq))
+            self._queues[cls].append(waiter)
+            self._dispatch_locked()
+        while True:
+            timeout = _CANCEL_POLL_S if cancel_token is not None else None
+            if deadline is not None:
+                left = max(0.0, deadline - time.monotonic())
+                timeout = left if timeout is None else min(timeout, left)
+            if waiter.granted.wait(timeout):
+                break
+            cancelled = cancel_token is not None and cancel_token.cancelled
+            expired = deadline is not None and time.monotonic() >= deadline
+            if not (cancelled or expired):
+                continue
+            with self._lock:
+                if not waiter.granted.is_set():
+                    self._queues[cls].remove(waiter)
+                    self._dispatch_locked()
+                    if cancelled:
+                        raise LLMCancelledError("Cancelled while waiting for an LLM slot.")
+                    raise LLMRequestError(
+                        f"Timed out after {time.monotonic() - waiter.enqueued_at:.2f}s "
+                        "waiting for an LLM slot."
+                    )
+            break
+        waited = time.monotonic() - waiter.enqueued_at
+        obs_metrics.LLM_SCHEDULER_WAIT_SECONDS.observe(waited, priority=cls)
+        if waited > 0.001:
+            end_ms = tracing.now_ms()
+            tracing.record_span("llm.queue_wait", end_ms - waited * 1000.0, end_ms, priority=cls)
+
+    def _release(self, cls: str) -> None:
+        with self._lock:
+            self._running[cls] -= 1
+            self._dispatch_locked()
+
+    def _throttled_locked(self, now: float) -> bool:
+        head = self._queues[INTERACTIVE][0] if self._queues[INTERACTIVE] else None
+        if head is not None and (now - head.enqueued_at) * 1000.0 > self.interactive_wait_target_ms:
+            return True
+        waits = self._interactive_waits
+        while waits and now - waits[0][0] > _WAIT_WINDOW_S:
+            waits.popleft()
+        if not waits:
+            return False
+        ranked = sorted(w for _t, w in waits)
+        p90 = ranked[min(len(ranked) - 1, int(math.ceil(0.9 * len(ranked))) - 1)]
+        return p90 > self.interactive_wait_target_ms
+
+    def _eligible_locked(self, cls: str, throttled: bool) -> bool:
+        if not self._queues[cls]:
+            return False
+        cap = self.caps[cls]
+        if cap and self._running[cls] >= cap:
+            return False
+        if cls != INTERACTIVE and throttled:
+            if self._queues[INTERACTIVE]:
+                return False
+            if self._running[BACKGROUND] + self._running[BATCH] >= 1:
+                return False
+        return True
+
+    def _dispatch_locked(self) -> None:
+        now = time.monotonic()
+        while sum(self._running.values()) < self.max_concurrency:
+            throttled = self._throttled_locked(now)
+            candidates = [
+                self._queues[cls][0] for cls in PRIORITY_CLASSES if self._eligible_locked(cls, throttled)
+            ]
+            if not candidates:
+                return
+            waiter = min(candidates, key=lambda w: (w.tag, w.seq))
+            self._queues[waiter.priority].popleft()
+            self._running[waiter.priority] += 1
+            self._virtual_time = max(self._virtual_time, waiter.tag)
+            if waiter.priority == INTERACTIVE:
+                self._interactive_waits.append((now, (now - waiter.enqueued_at) * 1000.0))
+            waiter.granted.set()
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def set_scheduler(scheduler: Optional[LLMScheduler]) -> None:
+    global _scheduler
+    _scheduler = scheduler
+
+
+def get_scheduler() -> Optional[LLMScheduler]:
+    return _scheduler
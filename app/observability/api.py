@@ -10,6 +10,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
 
 from .paths import resolve_artifact
+from .stats import PERIOD_LENGTHS, latency_stats, request_stats
 from .store import Store
 
 
@@ -144,6 +145,7 @@ def build_router(*, store: Store, store_root: Path, auth_dep) -> APIRouter:
             "request": dict(req),
             "llm_calls": [dict(c) for c in calls],
             "job_siblings": [dict(s) for s in siblings],
+            "spans": store.list_spans(request_id),
         }
 
     @router.get("/requests/{request_id}/files/{filename}")
@@ -169,34 +171,20 @@ def build_router(*, store: Store, store_root: Path, auth_dep) -> APIRouter:
         from_: Optional[str] = Query(default=None, alias="from"),
         to: Optional[str] = Query(default=None),
     ):
-        where = []
-        params: list = []
-        if from_:
-            where.append("timestamp_utc >= ?")
-            params.append(from_)
-        if to:
-            where.append("timestamp_utc <= ?")
-            params.append(to)
-        clause = (" WHERE " + " AND ".join(where)) if where else ""
-        with store.connect() as conn:
-            total = conn.execute(f"SELECT COUNT(*) AS n FROM requests{clause}", params).fetchone()["n"]
-            by_status = {r["status_code"]: r["n"] for r in conn.execute(
-                f"SELECT status_code, COUNT(*) AS n FROM requests{clause} GROUP BY status_code", params)}
-            by_endpoint = {r["endpoint"]: r["n"] for r in conn.execute(
-                f"SELECT endpoint, COUNT(*) AS n FROM requests{clause} GROUP BY endpoint", params)}
-            by_error_kind = {r["error_kind"]: r["n"] for r in conn.execute(
-                f"SELECT error_kind, COUNT(*) AS n FROM requests{clause} GROUP BY error_kind", params)}
-            sums = conn.execute(
-                f"SELECT COALESCE(SUM(total_tokens),0) AS t, COALESCE(SUM(total_cost_usd),0) AS c FROM requests{clause}",
-                params).fetchone()
-        return {
-            "total": total,
-            "by_status": by_status,
-            "by_endpoint": by_endpoint,
-            "by_error_kind": by_error_kind,
-            "sum_tokens": sums["t"],
-            "sum_cost_usd": sums["c"],
-        }
+        return request_stats(store, from_, to)
+
+    @router.get("/latency")
+    def latency(
+        from_: Optional[str] = Query(default=None, alias="from"),
+        to: Optional[str] = Query(default=None),
+        bucket: str = "hour",
+        stage: Optional[str] = None,
+        model: Optional[str] = None,
+        status: Optional[str] = None,
+    ):
+        if bucket not in PERIOD_LENGTHS:
+            raise HTTPException(400, f"bucket must be one of {', '.join(PERIOD_LENGTHS)}")
+        return latency_stats(store, from_, to, bucket=bucket, stage=stage, model=model, status=status)
 
     @router.post("/prune")
     def manual_prune():
@@ -204,7 +192,11 @@ def build_router(*, store: Store, store_root: Path, auth_dep) -> APIRouter:
         from app.config import load_settings
         s = load_settings()
         stats = _prune(store, store_root, s.log_retention_days, s.log_max_total_bytes)
-        return {"rows_deleted": stats.rows_deleted, "bytes_freed": stats.bytes_freed}
+        return {
+            "rows_deleted": stats.rows_deleted,
+            "bytes_freed": stats.bytes_freed,
+            "elapsed_ms": stats.elapsed_ms,
+        }
 
     @router.post("/clear")
     def manual_clear():
@@ -0,0 +1,448 @@
+"""Dependency-free Prometheus metrics for the live /metrics endpoint.
+
+Counters and histograms are sharded per thread: each thread updates its own
+dict without taking a lock, and a scrape merges the shards. With several
+uvicorn workers, every process also writes its merged snapshot to
+``METRICS_MULTIPROC_DIR`` and a scrape (served by whichever worker gets it)
+sums the snapshots of all workers.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+LabelKey = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelKey, Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _shard(self) -> Dict[LabelKey, Any]:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            # Only the first update from each thread takes the lock.
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.values = shard
+        return shard
+
+    def _shard_copies(self) -> List[Dict[LabelKey, Any]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict() copies under the GIL, so a concurrent update is either in or out.
+        return [dict(shard) for shard in shards]
+
+    def collect(self) -> Dict[LabelKey, Any]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def collect(self) -> Dict[LabelKey, float]:
+        merged: Dict[LabelKey, float] = {}
+        for shard in self._shard_copies():
+            for key, value in shard.items():
+                merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            # Per-bucket (non-cumulative) counts, the +Inf bucket, then the sum.
+            entry = [0] * (len(self.buckets) + 1) + [0.0]
+            shard[key] = entry
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def collect(self) -> Dict[LabelKey, List[float]]:
+        merged: Dict[LabelKey, List[float]] = {}
+        for shard in self._shard_copies():
+            for key, entry in shard.items():
+                entry = list(entry)
+                target = merged.get(key)
+                if target is None:
+                    merged[key] = entry
+                else:
+                    for idx, value in enumerate(entry):
+                        target[idx] += value
+        return merged
+
+
+class Gauge(_Metric):
+    """Point-in-time value read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._fn: Optional[Callable[[], Any]] = None
+
+    def set_function(self, fn: Callable[[], Any]) -> None:
+        """``fn`` returns a number, or a {label-tuple: number} dict for labelled gauges."""
+        self._fn = fn
+
+    def collect(self) -> Dict[LabelKey, float]:
+        if self._fn is None:
+            return {}
+        try:
+            value = self._fn()
+        except Exception:
+            _logger.exception("metrics gauge %s callback failed", self.name)
+            return {}
+        if isinstance(value, dict):
+            return {tuple(str(v) for v in key): float(v) for key, v in value.items()}
+        return {(): float(value)}
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable view of every metric in this process."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        out: Dict[str, Any] = {}
+        for metric in metrics:
+            out[metric.name] = {
+                "kind": metric.kind,
+                "help": metric.help,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "values": [[list(key), value] for key, value in metric.collect().items()],
+            }
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+
+# ---- multiprocess aggregation -----------------------------------------------
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_snapshot(registry: Registry, directory: Path) -> None:
+    """Atomically publish this process's snapshot as ``<pid>.json``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    pid = os.getpid()
+    tmp = directory / f".{pid}.json.tmp"
+    tmp.write_text(json.dumps(registry.snapshot()), encoding="utf-8")
+    os.replace(tmp, directory / f"{pid}.json")
+
+
+def read_snapshots(directory: Path) -> List[Tuple[int, bool, Dict[str, Any]]]:
+    """(pid, alive, snapshot) for every worker that has published one."""
+    out: List[Tuple[int, bool, Dict[str, Any]]] = []
+    for path in sorted(directory.glob("*.json")):
+        try:
+            pid = int(path.stem)
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (ValueError, OSError):
+            continue
+        out.append((pid, _pid_alive(pid), snapshot))
+    return out
+
+
+def merge_snapshots(snapshots: Sequence[Tuple[bool, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Sum counters and histograms across processes.
+
+    Gauges describe live state, so only processes that are still running
+    contribute; counters from exited workers are kept so totals stay monotonic.
+    """
+    merged: Dict[str, Any] = {}
+    for alive, snapshot in snapshots:
+        for name, metric in snapshot.items():
+            if metric["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "values": {}})
+            values = target["values"]
+            for key, value in metric["values"]:
+                key = tuple(key)
+                if isinstance(value, list):
+                    current = values.get(key)
+                    values[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    values[key] = values.get(key, 0.0) + value
+    for metric in merged.values():
+        metric["values"] = list(metric["values"].items())
+    return merged
+
+
+# ---- exposition -------------------------------------------------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(snapshot: Dict[str, Any]) -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        names = metric["labelnames"]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for key, value in sorted(metric["values"], key=lambda item: list(item[0])):
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {_fmt(value)}")
+                continue
+            cumulative = 0
+            bounds = [*metric["buckets"], math.inf]
+            for bound, count in zip(bounds, value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, key, ('le', _fmt(bound)))} {_fmt(cumulative)}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_fmt(value[-1])}")
+            lines.append(f"{name}_count{_labels(names, key)} {_fmt(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def exposition(registry: Registry, multiproc_dir: Optional[Path] = None) -> str:
+    if multiproc_dir is None:
+        return render(registry.snapshot())
+    write_snapshot(registry, multiproc_dir)
+    snapshots = read_snapshots(multiproc_dir)
+    return render(merge_snapshots([(alive, snap) for _pid, alive, snap in snapshots]))
+
+
+# ---- application metrics ----------------------------------------------------
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "mercari_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "endpoint", "status"),
+)
+LLM_ATTEMPT_SECONDS = REGISTRY.histogram(
+    "mercari_llm_attempt_duration_seconds",
+    "Latency of individual LLM attempts.",
+    ("stage", "model"),
+)
+LLM_ATTEMPTS = REGISTRY.counter(
+    "mercari_llm_attempts_total",
+    "LLM attempts by stage, model and outcome (ok / request_failed / parse_failed / ...).",
+    ("stage", "model", "outcome"),
+)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "mercari_llm_prompt_tokens_total",
+    "Prompt tokens of successful LLM calls by stage, split into provider-cached and uncached.",
+    ("stage", "cache"),
+)
+LLM_SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "mercari_llm_scheduler_wait_seconds",
+    "Time LLM calls waited for a scheduler slot, by priority class.",
+    ("priority",),
+)
+LLM_SCHEDULER_CALLS = REGISTRY.gauge(
+    "mercari_llm_scheduler_calls",
+    "LLM calls per priority class that are running or queued for a slot.",
+    ("priority", "state"),
+)
+LLM_SCHEDULER_THROTTLED = REGISTRY.gauge(
+    "mercari_llm_scheduler_throttled",
+    "1 while background and batch LLM calls are throttled for interactive traffic.",
+)
+PRODUCT_DATA_QUEUE_DEPTH = REGISTRY.gauge(
+    "mercari_product_data_queue_depth",
+    "Tasks waiting in the product_data executor queue.",
+)
+PRODUCT_DATA_ACTIVE_WORKERS = REGISTRY.gauge(
+    "mercari_product_data_active_workers",
+    "product_data executor tasks currently running.",
+)
+PRODUCT_DATA_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "mercari_product_data_queue_wait_seconds",
+    "Time product_data tasks waited for an executor worker.",
+)
+PRODUCT_DATA_REJECTED = REGISTRY.counter(
+    "mercari_product_data_rejected_total",
+    "product_data tasks refused because the executor queue was full (primary / fallback).",
+    ("task",),
+)
+ANALYZE_ALL_STAGE_SECONDS = REGISTRY.histogram(
+    "mercari_analyze_all_stage_seconds",
+    "Time from the start of an /analyze-all request until each stage settled.",
+    ("stage", "status"),
+)
+ANALYZE_BATCH_ITEMS = REGISTRY.counter(
+    "mercari_analyze_batch_items_total",
+    "Items handled by /analyze/batch by outcome (completed / failed / cancelled).",
+    ("status",),
+)
+TITLE_CLASSIFIER_ANSWERS = REGISTRY.counter(
+    "mercari_title_classifier_answers_total",
+    "Title -> top-level category lookups answered by the local classifier or passed to the LLM.",
+    ("outcome",),
+)
+TITLE_CACHE_LOOKUPS = REGISTRY.counter(
+    "mercari_title_cache_lookups_total",
+    "Near-duplicate title cache lookups by outcome (hit / miss).",
+    ("outcome",),
+)
+CATEGORY_NARROWING = REGISTRY.counter(
+    "mercari_category_narrowing_total",
+    "Two-step category selections by outcome (narrowed / full list after a failed or empty node pick).",
+    ("outcome",),
+)
+CATEGORY_PATH_MATCHES = REGISTRY.counter(
+    "mercari_category_path_matches_total",
+    "Category paths named by the model, by how they matched a candidate (exact / fuzzy / unmatched).",
+    ("outcome",),
+)
+REFERENCE_DATA_ROWS = REGISTRY.gauge(
+    "mercari_reference_data_rows",
+    "Rows loaded in each reference table (brands / categories).",
+    ("table",),
+)
+REFERENCE_DATA_LOAD_SECONDS = REGISTRY.gauge(
+    "mercari_reference_data_load_seconds",
+    "Time the last load of each reference table took.",
+    ("table",),
+)
+REFERENCE_DATA_RELOADS = REGISTRY.counter(
+    "mercari_reference_data_reloads_total",
+    "Reference table reloads by outcome (reloaded / failed).",
+    ("table", "outcome"),
+)
+ANALYSIS_JOBS = REGISTRY.gauge(
+    "mercari_analysis_jobs",
+    "Jobs held in the AnalysisJobStore.",
+)
+ANALYSIS_JOB_BYTES = REGISTRY.gauge(
+    "mercari_analysis_job_resident_bytes",
+    "Estimated memory held by AnalysisJobStore jobs (results, plus images while pending).",
+)
+ANALYSIS_JOB_EVICTIONS = REGISTRY.counter(
+    "mercari_analysis_job_evictions_total",
+    "Jobs dropped from the AnalysisJobStore by reason (expired / budget).",
+    ("reason",),
+)
+IMAGE_PREPROCESS_SECONDS = REGISTRY.histogram(
+    "mercari_image_preprocess_duration_seconds",
+    "Time spent validating and compressing one uploaded image.",
+    ("compressed",),
+)
+RECORDER_WRITE_SECONDS = REGISTRY.histogram(
+    "mercari_recorder_write_duration_seconds",
+    "Time the observability recorder spends persisting one event.",
+    ("op",),
+)
+LOG_PRUNE_ROWS_DELETED = REGISTRY.counter(
+    "mercari_log_prune_rows_deleted_total",
+    "Requests deleted from the observability store by the retention prune loop.",
+)
+LOG_PRUNE_BYTES_FREED = REGISTRY.counter(
+    "mercari_log_prune_bytes_freed_total",
+    "Artifact bytes freed by the retention prune loop.",
+)
+LOG_PRUNE_SECONDS = REGISTRY.histogram(
+    "mercari_log_prune_duration_seconds",
+    "Worker-thread time of one retention prune pass, summed over its chunks.",
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "mercari_cache_requests_total",
+    "Cache lookups by cache name and result (hit / miss).",
+    ("cache", "result"),
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
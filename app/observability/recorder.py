@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import json
 import logging
 import time
@@ -7,6 +8,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional
 
+from .metrics import RECORDER_WRITE_SECONDS
 from .paths import artifact_dir
 from .store import Store
 
@@ -23,6 +25,19 @@ def _date_str_from_iso(iso_ts: str) -> str:
     return iso_ts[:10]
 
 
+def cached_prompt_tokens(usage: Dict[str, Any]) -> Optional[int]:
+    """Prompt tokens the provider served from its prompt cache, if it says.
+
+    OpenRouter normalises this to ``usage.prompt_tokens_details.cached_tokens``;
+    some providers pass ``usage.cache_read_input_tokens`` through instead.
+    """
+    details = usage.get("prompt_tokens_details")
+    cached = details.get("cached_tokens") if isinstance(details, dict) else None
+    if cached is None:
+        cached = usage.get("cache_read_input_tokens")
+    return int(cached) if isinstance(cached, (int, float)) else None
+
+
 def _classify_error_kind(status_code: Optional[int], error: str) -> str:
     if error:
         return "exception"
@@ -51,6 +66,13 @@ def _summarize_body(content_type: str, body_bytes: bytes, uploaded_images: List[
     return "; ".join(parts)
 
 
+def _write_artifact(path: Path, data: bytes | str) -> int:
+    """Write one artifact file and return its size so callers can tally bytes."""
+    payload = data.encode("utf-8") if isinstance(data, str) else data
+    path.write_bytes(payload)
+    return len(payload)
+
+
 def _try_parse_json(body_bytes: bytes) -> Any:
     if not body_bytes:
         return None
@@ -60,6 +82,20 @@ def _try_parse_json(body_bytes: bytes) -> Any:
         return None
 
 
+def _timed_write(op: str):
+    """Observe how long a recorder write blocks its caller."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                RECORDER_WRITE_SECONDS.observe(time.monotonic() - started, op=op)
+        return wrapper
+    return decorator
+
+
 class Recorder:
     def __init__(self, *, store: Store, store_root: Path) -> None:
         self.store = store
@@ -68,6 +104,7 @@ class Recorder:
 
     # ---- HTTP request lifecycle -------------------------------------------
 
+    @_timed_write("start_request")
     def start_request(
         self,
         *,
@@ -113,13 +150,14 @@ class Recorder:
                 request_payload["body"] = {"json": parsed}
             elif body_bytes:
                 request_payload["body"] = {"size_bytes": len(body_bytes)}
+            written = 0
             saved_images: List[Dict[str, Any]] = []
             for idx, img in enumerate(uploaded_images):
                 data = img.get("bytes")
                 if data:
                     suffix = img.get("suffix", ".bin")
                     saved_as = f"image_{idx}{suffix}"
-                    (d / saved_as).write_bytes(data)
+                    written += _write_artifact(d / saved_as, data)
                     saved_images.append({
                         "filename": img.get("filename", ""),
                         "content_type": img.get("content_type", ""),
@@ -128,11 +166,15 @@ class Recorder:
                     })
             if saved_images:
                 request_payload["images"] = saved_images
-            (d / "request.json").write_text(json.dumps(request_payload, ensure_ascii=False, indent=2))
+            written += _write_artifact(
+                d / "request.json", json.dumps(request_payload, ensure_ascii=False, indent=2)
+            )
+            self.store.add_artifact_bytes(request_id, written)
         except Exception as exc:
             _logger.exception("observability.start_request failed: %s", exc)
             self._dead_letter("start_request", {"request_id": request_id, "error": repr(exc)})
 
+    @_timed_write("finalize_request")
     def finalize_request(
         self,
         *,
@@ -162,6 +204,7 @@ class Recorder:
                 job_id=job_id or "",
             )
             self.store.aggregate_request_totals(request_id)
+            self.store.rollup_request(request_id)
             # locate the day-dir for this request
             d = self._find_request_dir(request_id)
             if d is not None:
@@ -175,7 +218,10 @@ class Recorder:
                     response_payload["body"] = {"json": parsed}
                 elif response_body:
                     response_payload["body"] = {"size_bytes": len(response_body)}
-                (d / "response.json").write_text(json.dumps(response_payload, ensure_ascii=False, indent=2))
+                written = _write_artifact(
+                    d / "response.json", json.dumps(response_payload, ensure_ascii=False, indent=2)
+                )
+                self.store.add_artifact_bytes(request_id, written)
         except Exception as exc:
             _logger.exception("observability.finalize_request failed: %s", exc)
             self._dead_letter("finalize_request", {"request_id": request_id, "error": repr(exc)})
@@ -204,6 +250,7 @@ class Recorder:
         except Exception:
             pass
 
+    @_timed_write("record_llm_stage")
     def record_llm_stage(
         self,
         *,
@@ -254,29 +301,38 @@ class Recorder:
             def _rel(name: Optional[str]) -> Optional[str]:
                 return f"{date_str}/{request_id}/{name}" if name else None
 
+            written = 0
             for idx, attempt in enumerate(attempts):
                 attempt_idx = int(attempt.get("attempt") or (idx + 1))
                 error_kind = attempt.get("error_kind") or "ok"
-                status = "ok" if error_kind == "ok" else "failed"
+                status = error_kind if error_kind in ("ok", "cancelled") else "failed"
 
                 # prompt file: write per attempt (cheap, simplifies UI)
                 prompt_rel = f"llm_{stage}_{attempt_idx}_prompt.json"
-                (d / prompt_rel).write_text(json.dumps({"messages": messages}, ensure_ascii=False, indent=2))
+                written += _write_artifact(
+                    d / prompt_rel, json.dumps({"messages": messages}, ensure_ascii=False, indent=2)
+                )
 
                 response_rel = None
                 parsed_rel = None
                 attempt_prompt_tokens = None
+                attempt_cached_prompt_tokens = None
                 attempt_completion_tokens = None
                 attempt_total_tokens = None
                 attempt_cost = None
                 if status == "ok":
                     if raw_response is not None:
                         response_rel = f"llm_{stage}_{attempt_idx}_response.json"
-                        (d / response_rel).write_text(json.dumps(raw_response, ensure_ascii=False, indent=2))
+                        written += _write_artifact(
+                            d / response_rel, json.dumps(raw_response, ensure_ascii=False, indent=2)
+                        )
                     if parsed is not None:
                         parsed_rel = f"llm_{stage}_{attempt_idx}_parsed.json"
-                        (d / parsed_rel).write_text(json.dumps(parsed, ensure_ascii=False, indent=2))
+                        written += _write_artifact(
+                            d / parsed_rel, json.dumps(parsed, ensure_ascii=False, indent=2)
+                        )
                     attempt_prompt_tokens = usage.get("prompt_tokens")
+                    attempt_cached_prompt_tokens = cached_prompt_tokens(usage)
                     attempt_completion_tokens = usage.get("completion_tokens")
                     attempt_total_tokens = usage.get("total_tokens")
                     attempt_cost = cost
@@ -299,7 +355,9 @@ class Recorder:
                     prompt_file=_rel(prompt_rel),
                     response_file=_rel(response_rel),
                     parsed_file=_rel(parsed_rel),
+                    cached_prompt_tokens=attempt_cached_prompt_tokens,
                 )
+                self.store.rollup_llm_call(llm_call_id)
 
                 prompt_text = json.dumps(messages, ensure_ascii=False)
                 response_text = json.dumps(raw_response, ensure_ascii=False) if (raw_response and status == "ok") else ""
@@ -312,6 +370,7 @@ class Recorder:
                     prompt_text=prompt_text,
                     response_text=response_text,
                 )
+            self.store.add_artifact_bytes(request_id, written)
         except Exception as exc:
             _logger.exception("observability.record_llm_stage failed: %s", exc)
             self._dead_letter("record_llm_stage", {"request_id": request_id, "stage": stage, "error": repr(exc)})
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import shutil
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
@@ -16,6 +17,10 @@ _logger = logging.getLogger(__name__)
 class PruneStats:
     rows_deleted: int
     bytes_freed: int
+    elapsed_ms: float = 0.0
+    # True when a bounded prune (max_rows > 0) stopped before the store was
+    # back under both limits; the caller should schedule another chunk.
+    has_more: bool = False
 
 
 def _dir_size(path: Path) -> int:
@@ -31,25 +36,50 @@ def _dir_size(path: Path) -> int:
     return total
 
 
-def _total_store_bytes(store_root: Path) -> int:
-    if not store_root.exists():
-        return 0
-    return _dir_size(store_root)
+def _backfill_artifact_bytes(store: Store, store_root: Path, limit: int) -> int:
+    """Measure rows recorded before artifact_bytes existed.
+
+    Only the per-request directory of each legacy row is walked, and at most
+    ``limit`` rows per call (0 = all), so an upgraded store converges over a few
+    prune ticks instead of one long scan.
+    """
+    sql = "SELECT request_id, timestamp_utc FROM requests WHERE artifact_bytes IS NULL"
+    params: tuple = ()
+    if limit > 0:
+        sql += " LIMIT ?"
+        params = (limit,)
+    with store.connect() as conn:
+        rows = list(conn.execute(sql, params))
+    for row in rows:
+        size = _dir_size(store_root / row["timestamp_utc"][:10] / row["request_id"])
+        with store.connect() as conn:
+            conn.execute(
+                "UPDATE requests SET artifact_bytes = ? WHERE request_id = ?",
+                (size, row["request_id"]),
+            )
+    return len(rows)
+
+
+def _tracked_store_bytes(store: Store) -> int:
+    with store.connect() as conn:
+        row = conn.execute("SELECT COALESCE(SUM(artifact_bytes), 0) AS n FROM requests").fetchone()
+    return int(row["n"])
 
 
 def _delete_one(store: Store, store_root: Path, request_id: str) -> int:
-    freed = 0
     with store.connect() as conn:
-        row = conn.execute("SELECT timestamp_utc FROM requests WHERE request_id=?", (request_id,)).fetchone()
+        row = conn.execute(
+            "SELECT timestamp_utc, artifact_bytes FROM requests WHERE request_id=?", (request_id,)
+        ).fetchone()
         if row is None:
             return 0
         date_str = row["timestamp_utc"][:10]
+        freed = int(row["artifact_bytes"] or 0)
         conn.execute("DELETE FROM requests_fts WHERE request_id=?", (request_id,))
         conn.execute("DELETE FROM llm_fts WHERE request_id=?", (request_id,))
         conn.execute("DELETE FROM requests WHERE request_id=?", (request_id,))  # cascades llm_calls
     d = store_root / date_str / request_id
     if d.exists():
-        freed = _dir_size(d)
         shutil.rmtree(d, ignore_errors=True)
         parent = d.parent
         try:
@@ -60,25 +90,55 @@ def _delete_one(store: Store, store_root: Path, request_id: str) -> int:
     return freed
 
 
-def prune(store: Store, store_root: Path, retention_days: int, max_total_bytes: int) -> PruneStats:
+def prune(
+    store: Store,
+    store_root: Path,
+    retention_days: int,
+    max_total_bytes: int,
+    *,
+    max_rows: int = 0,
+) -> PruneStats:
+    """Delete expired requests, then the oldest ones until under the byte cap.
+
+    Capacity is judged from the ``artifact_bytes`` tallied by the recorder at
+    write time, so no step walks the whole store. ``max_rows`` bounds the work
+    done per call (0 = unbounded); ``PruneStats.has_more`` reports whether a
+    bounded call left work behind.
+    """
+    started = time.monotonic()
     rows_deleted = 0
     bytes_freed = 0
+    has_more = False
+
+    backfilled = _backfill_artifact_bytes(store, store_root, max_rows)
+    if max_rows > 0 and backfilled >= max_rows:
+        has_more = True
 
     # 1) age-based
     if retention_days > 0:
         cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        sql = "SELECT request_id FROM requests WHERE timestamp_utc < ? ORDER BY timestamp_utc"
+        params: tuple = (cutoff,)
+        if max_rows > 0:
+            # Fetch one extra row to learn whether anything is left after this chunk.
+            sql += " LIMIT ?"
+            params = (cutoff, max_rows + 1)
         with store.connect() as conn:
-            old = [r["request_id"] for r in conn.execute(
-                "SELECT request_id FROM requests WHERE timestamp_utc < ? ORDER BY timestamp_utc", (cutoff,))]
+            old = [r["request_id"] for r in conn.execute(sql, params)]
+        if max_rows > 0 and len(old) > max_rows:
+            old = old[:max_rows]
+            has_more = True
         for rid in old:
             bytes_freed += _delete_one(store, store_root, rid)
             rows_deleted += 1
 
-    # 2) capacity-based: snapshot total once then subtract per-delete to avoid
-    # walking the filesystem on every iteration (O(N*K) → O(N+K)).
-    if max_total_bytes > 0:
-        current_bytes = _total_store_bytes(store_root)
+    # 2) capacity-based, from the tracked byte totals.
+    if max_total_bytes > 0 and not has_more:
+        current_bytes = _tracked_store_bytes(store)
         while current_bytes > max_total_bytes:
+            if max_rows > 0 and rows_deleted >= max_rows:
+                has_more = True
+                break
             with store.connect() as conn:
                 row = conn.execute("SELECT request_id FROM requests ORDER BY timestamp_utc ASC LIMIT 1").fetchone()
             if row is None:
@@ -88,15 +148,24 @@ def prune(store: Store, store_root: Path, retention_days: int, max_total_bytes:
             current_bytes -= freed
             rows_deleted += 1
 
-    _logger.info("observability.prune deleted=%d freed_bytes=%d", rows_deleted, bytes_freed)
-    return PruneStats(rows_deleted=rows_deleted, bytes_freed=bytes_freed)
+    elapsed_ms = round((time.monotonic() - started) * 1000, 2)
+    _logger.info(
+        "observability.prune deleted=%d freed_bytes=%d elapsed_ms=%.2f has_more=%s",
+        rows_deleted, bytes_freed, elapsed_ms, has_more,
+    )
+    return PruneStats(
+        rows_deleted=rows_deleted,
+        bytes_freed=bytes_freed,
+        elapsed_ms=elapsed_ms,
+        has_more=has_more,
+    )
 
 
 def clear_all(store: Store, store_root: Path) -> PruneStats:
     """Wipe every recorded request and its artifacts.
 
-    Drops all rows from requests / llm_calls / requests_fts / llm_fts, then
-    removes every per-date directory under store_root. Leaves _dead_letter/
+    Drops all rows from requests / llm_calls / requests_fts / llm_fts and the
+    hourly rollups, then removes every per-date directory under store_root. Leaves _dead_letter/
     intact so diagnostic info from logging failures survives a manual wipe.
     """
     with store.connect() as conn:
@@ -104,6 +173,7 @@ def clear_all(store: Store, store_root: Path) -> PruneStats:
         conn.execute("DELETE FROM requests_fts")
         conn.execute("DELETE FROM llm_fts")
         conn.execute("DELETE FROM requests")  # cascades llm_calls
+    store.clear_rollups()
 
     bytes_freed = 0
     if store_root.exists():
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# Log-bucketed (HDR / DDSketch style) latency histogram. A value v > 1 ms lands
+# in bucket ceil(log_gamma(v)), so every bucket spans a fixed relative width and
+# any quantile read back from it is within RELATIVE_ACCURACY of the true sample.
+# Buckets are plain integers, which lets SQLite merge sketches with SUM(n).
+RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def latency_bucket(latency_ms: Optional[float]) -> int:
+    """Sketch bucket for one latency sample; <= 1 ms (or unknown) maps to 0."""
+    if latency_ms is None or latency_ms <= 1.0:
+        return 0
+    return int(math.ceil(math.log(latency_ms) / _LOG_GAMMA))
+
+
+def bucket_value(bucket: int) -> float:
+    """Representative latency (ms) of a bucket, minimising the relative error."""
+    if bucket <= 0:
+        return 1.0 if bucket == 0 else 0.0
+    return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+
+class LatencySketch:
+    """Mergeable bucket -> count map with quantile queries."""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    def add(self, latency_ms: Optional[float], n: int = 1) -> None:
+        self.add_bucket(latency_bucket(latency_ms), n)
+
+    def add_bucket(self, bucket: int, n: int) -> None:
+        if n <= 0:
+            return
+        self.counts[bucket] = self.counts.get(bucket, 0) + n
+        self.total += n
+
+    def merge(self, other: "LatencySketch") -> None:
+        for bucket, n in other.counts.items():
+            self.add_bucket(bucket, n)
+
+    @classmethod
+    def from_buckets(cls, rows: Iterable[Tuple[int, int]]) -> "LatencySketch":
+        sketch = cls()
+        for bucket, n in rows:
+            sketch.add_bucket(int(bucket), int(n))
+        return sketch
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.total == 0:
+            return None
+        # Nearest-rank: the smallest bucket whose cumulative count reaches q*N.
+        rank = max(1, int(math.ceil(q * self.total)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return bucket_value(bucket)
+        return bucket_value(max(self.counts))
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        out: Dict[str, Optional[float]] = {}
+        for q in QUANTILES:
+            value = self.quantile(q)
+            out[f"p{int(q * 100)}"] = None if value is None else round(value, 1)
+        return out
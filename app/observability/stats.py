@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sketch import RELATIVE_ACCURACY, LatencySketch
+from .store import LATENCY_BUCKET_BOUNDS_MS, LATENCY_BUCKET_COLUMNS, Store
+
+
+_HOUR_FMT = "%Y-%m-%dT%H"
+
+# Time-bucket granularity for /latency -> length of the "YYYY-MM-DDTHH" prefix.
+PERIOD_LENGTHS = {"hour": 13, "day": 10, "total": 0}
+
+
+@dataclass
+class RangePlan:
+    """How to answer a [from, to] query from hourly rollups plus raw edges.
+
+    Whole hours in ``[hour_from, hour_to)`` come from the rollup tables; the
+    partial hours at either end are aggregated from the raw rows, which the
+    timestamp indexes keep to at most two hours of scanning.
+    """
+
+    hour_from: Optional[str]
+    hour_to: Optional[str]
+    # (where, params) fragments over timestamp_utc for the raw edge windows.
+    raw_windows: List[Tuple[str, List[Any]]] = field(default_factory=list)
+    use_rollup: bool = True
+
+
+def _hour_start(hour: str) -> str:
+    return f"{hour}:00:00.000000Z"
+
+
+def _parse_hour(ts: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(ts[:13], _HOUR_FMT)
+    except ValueError:
+        return None
+
+
+def _raw_only(from_: Optional[str], to: Optional[str]) -> RangePlan:
+    where = []
+    params: List[Any] = []
+    if from_:
+        where.append("timestamp_utc >= ?")
+        params.append(from_)
+    if to:
+        where.append("timestamp_utc <= ?")
+        params.append(to)
+    return RangePlan(
+        hour_from=None,
+        hour_to=None,
+        raw_windows=[(" AND ".join(where) or "1", params)],
+        use_rollup=False,
+    )
+
+
+def plan_range(from_: Optional[str], to: Optional[str]) -> RangePlan:
+    hour_from: Optional[str] = None
+    hour_to: Optional[str] = None
+    windows: List[Tuple[str, List[Any]]] = []
+    if from_:
+        parsed = _parse_hour(from_)
+        if parsed is None:
+            return _raw_only(from_, to)
+        hour_from = parsed.strftime(_HOUR_FMT)
+        if from_ > _hour_start(hour_from):
+            hour_from = (parsed + timedelta(hours=1)).strftime(_HOUR_FMT)
+            windows.append(("timestamp_utc >= ? AND timestamp_utc < ?", [from_, _hour_start(hour_from)]))
+    if to:
+        parsed = _parse_hour(to)
+        if parsed is None:
+            return _raw_only(from_, to)
+        hour_to = parsed.strftime(_HOUR_FMT)
+        windows.append(("timestamp_utc >= ? AND timestamp_utc <= ?", [_hour_start(hour_to), to]))
+    if hour_from is not None and hour_to is not None and hour_from >= hour_to:
+        return _raw_only(from_, to)
+    return RangePlan(hour_from=hour_from, hour_to=hour_to, raw_windows=windows)
+
+
+def _collect(store: Store, table: str, plan: RangePlan, raw_fn) -> List[Any]:
+    rows: List[Any] = []
+    if plan.use_rollup:
+        rows.extend(store.rollup_rows(table, plan.hour_from, plan.hour_to))
+    for where, params in plan.raw_windows:
+        rows.extend(raw_fn(where, params))
+    return rows
+
+
+def _empty_histogram() -> Dict[str, Any]:
+    return {"bounds_ms": list(LATENCY_BUCKET_BOUNDS_MS), "counts": [0] * len(LATENCY_BUCKET_COLUMNS)}
+
+
+def _add_histogram(hist: Dict[str, Any], row: Any) -> None:
+    for idx, col in enumerate(LATENCY_BUCKET_COLUMNS):
+        hist["counts"][idx] += int(row[col] or 0)
+
+
+def request_stats(store: Store, from_: Optional[str], to: Optional[str]) -> Dict[str, Any]:
+    plan = plan_range(from_, to)
+    total = 0
+    sum_tokens = 0
+    sum_cost = 0.0
+    by_status: Dict[int, int] = {}
+    by_endpoint: Dict[str, int] = {}
+    by_error_kind: Dict[str, int] = {}
+    histogram = _empty_histogram()
+    for row in _collect(store, "rollup_requests_hourly", plan, store.raw_request_aggregates):
+        n = int(row["request_count"])
+        total += n
+        sum_tokens += int(row["total_tokens_sum"] or 0)
+        sum_cost += float(row["cost_usd_sum"] or 0.0)
+        by_status[row["status_code"]] = by_status.get(row["status_code"], 0) + n
+        by_endpoint[row["endpoint"]] = by_endpoint.get(row["endpoint"], 0) + n
+        by_error_kind[row["error_kind"]] = by_error_kind.get(row["error_kind"], 0) + n
+        _add_histogram(histogram, row)
+
+    by_stage: Dict[str, Dict[str, Any]] = {}
+    by_model: Dict[str, Dict[str, Any]] = {}
+    for row in _collect(store, "rollup_llm_hourly", plan, store.raw_llm_aggregates):
+        for bucket, key in ((by_stage, row["stage"]), (by_model, row["model"])):
+            entry = bucket.setdefault(
+                key, {"calls": 0, "failed": 0, "cancelled": 0, "tokens": 0, "cost_usd": 0.0}
+            )
+            entry["calls"] += int(row["call_count"])
+            if row["status"] == "cancelled":
+                entry["cancelled"] += int(row["call_count"])
+            elif row["status"] != "ok":
+                entry["failed"] += int(row["call_count"])
+            entry["tokens"] += int(row["total_tokens_sum"] or 0)
+            entry["cost_usd"] += float(row["cost_usd_sum"] or 0.0)
+
+    return {
+        "total": total,
+        "by_status": by_status,
+        "by_endpoint": by_endpoint,
+        "by_error_kind": by_error_kind,
+        "sum_tokens": sum_tokens,
+        "sum_cost_usd": sum_cost,
+        "by_stage": by_stage,
+        "by_model": by_model,
+        "latency_histogram": histogram,
+    }
+
+
+def latency_stats(
+    store: Store,
+    from_: Optional[str],
+    to: Optional[str],
+    *,
+    bucket: str = "hour",
+    stage: Optional[str] = None,
+    model: Optional[str] = None,
+    status: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Latency percentiles, error rate and throughput per period x stage x model.
+
+    Percentiles come from the log-bucket sketches in rollup_llm_latency_hourly
+    (within ``RELATIVE_ACCURACY`` of the exact value); counts and token sums
+    from rollup_llm_hourly. Only the partial edge hours touch llm_calls.
+    """
+    if bucket not in PERIOD_LENGTHS:
+        raise ValueError(f"bucket must be one of {sorted(PERIOD_LENGTHS)}")
+    period_len = PERIOD_LENGTHS[bucket]
+    plan = plan_range(from_, to)
+
+    filters: List[str] = []
+    filter_params: List[Any] = []
+    for column, value in (("stage", stage), ("model", model), ("status", status)):
+        if value:
+            filters.append(f"{column} = ?")
+            filter_params.append(value)
+    filter_sql = " AND ".join(filters) or "1"
+
+    groups: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    def _group(period: str, stage_: str, model_: str) -> Dict[str, Any]:
+        return groups.setdefault((period, stage_, model_), {
+            "sketch": LatencySketch(), "calls": 0, "errors": 0,
+            "ok_latency_ms": 0.0, "completion_tokens": 0,
+        })
+
+    sketch_rows: List[Any] = []
+    if plan.use_rollup:
+        sketch_rows.extend(store.latency_sketch_rows(
+            plan.hour_from, plan.hour_to, period_len, filter_sql, filter_params
+        ))
+    for where, params in plan.raw_windows:
+        sketch_rows.extend(store.raw_latency_sketch_rows(
+            period_len, f"({where}) AND ({filter_sql})", [*params, *filter_params]
+        ))
+    for row in sketch_rows:
+        _group(row["period"], row["stage"], row["model"])["sketch"].add_bucket(int(row["bucket"]), int(row["n"]))
+
+    for row in _collect(store, "rollup_llm_hourly", plan, store.raw_llm_aggregates):
+        if (stage and row["stage"] != stage) or (model and row["model"] != model) \
+                or (status and row["status"] != status):
+            continue
+        entry = _group(row["hour"][:period_len], row["stage"], row["model"])
+        n = int(row["call_count"])
+        entry["calls"] += n
+        if row["status"] == "ok":
+            entry["ok_latency_ms"] += float(row["latency_ms_sum"] or 0.0)
+            entry["completion_tokens"] += int(row["completion_tokens_sum"] or 0)
+        elif row["status"] != "cancelled":
+            # Attempts aborted because the other product-data call won are not errors.
+            entry["errors"] += n
+
+    items = []
+    for (period, stage_, model_), entry in sorted(groups.items()):
+        seconds = entry["ok_latency_ms"] / 1000.0
+        items.append({
+            "period": period or None,
+            "stage": stage_,
+            "model": model_,
+            "calls": entry["calls"],
+            "errors": entry["errors"],
+            "error_rate": round(entry["errors"] / entry["calls"], 4) if entry["calls"] else 0.0,
+            **entry["sketch"].percentiles(),
+            "tokens_per_sec": round(entry["completion_tokens"] / seconds, 2) if seconds > 0 else None,
+        })
+    return {"bucket": bucket, "relative_accuracy": RELATIVE_ACCURACY, "items": items}
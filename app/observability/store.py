@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import json
 import sqlite3
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .sketch import latency_bucket
 
 
 _SCHEMA = """
@@ -24,7 +27,8 @@ CREATE TABLE IF NOT EXISTS requests (
   total_tokens      INTEGER,
   total_cost_usd    REAL,
   llm_call_count    INTEGER DEFAULT 0,
-  has_image         INTEGER DEFAULT 0
+  has_image         INTEGER DEFAULT 0,
+  artifact_bytes    INTEGER DEFAULT 0
 );
 
 CREATE INDEX IF NOT EXISTS idx_requests_ts          ON requests(timestamp_utc DESC);
@@ -51,7 +55,8 @@ CREATE TABLE IF NOT EXISTS llm_calls (
   cost_usd          REAL,
   prompt_file       TEXT,
   response_file     TEXT,
-  parsed_file       TEXT
+  parsed_file       TEXT,
+  cached_prompt_tokens INTEGER
 );
 
 CREATE INDEX IF NOT EXISTS idx_llm_request ON llm_calls(request_id);
@@ -59,6 +64,21 @@ CREATE INDEX IF NOT EXISTS idx_llm_ts      ON llm_calls(timestamp_utc DESC);
 CREATE INDEX IF NOT EXISTS idx_llm_stage   ON llm_calls(stage, status);
 CREATE INDEX IF NOT EXISTS idx_llm_failed  ON llm_calls(status) WHERE status != 'ok';
 
+-- Trace spans (see tracing.py); trace_id is the request_id. start_ms/end_ms
+-- are process-monotonic milliseconds, only meaningful relative to each other.
+CREATE TABLE IF NOT EXISTS spans (
+  span_id    TEXT PRIMARY KEY,
+  request_id TEXT NOT NULL REFERENCES requests(request_id) ON DELETE CASCADE,
+  parent_id  TEXT,
+  name       TEXT NOT NULL,
+  start_ms   REAL NOT NULL,
+  end_ms     REAL NOT NULL,
+  status     TEXT NOT NULL,
+  thread     TEXT,
+  attributes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_spans_request ON spans(request_id, start_ms);
+
 CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts USING fts5(
   request_id UNINDEXED,
   endpoint,
@@ -77,6 +97,162 @@ CREATE VIRTUAL TABLE IF NOT EXISTS llm_fts USING fts5(
 );
 """
 
+# Upper bounds (inclusive, ms) of the latency histogram kept in the hourly
+# rollups; the last bucket is open-ended. Changing them needs a rollup rebuild.
+LATENCY_BUCKET_BOUNDS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+LATENCY_BUCKET_COLUMNS = tuple(f"latency_b{i}" for i in range(len(LATENCY_BUCKET_BOUNDS_MS) + 1))
+
+_BUCKET_DDL = ",\n".join(f"  {col} INTEGER NOT NULL DEFAULT 0" for col in LATENCY_BUCKET_COLUMNS)
+
+# Hourly rollups maintained by the recorder's write path so /stats never scans
+# the raw tables. Request-level and LLM-call-level facts live at different
+# grains, so they get one table each; hour is the UTC "YYYY-MM-DDTHH" prefix.
+_ROLLUP_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS rollup_requests_hourly (
+  hour               TEXT NOT NULL,
+  endpoint           TEXT NOT NULL,
+  status_code        INTEGER NOT NULL,
+  error_kind         TEXT NOT NULL,
+  request_count      INTEGER NOT NULL DEFAULT 0,
+  duration_ms_sum    REAL NOT NULL DEFAULT 0,
+  total_tokens_sum   INTEGER NOT NULL DEFAULT 0,
+  cost_usd_sum       REAL NOT NULL DEFAULT 0,
+  llm_call_count_sum INTEGER NOT NULL DEFAULT 0,
+{_BUCKET_DDL},
+  PRIMARY KEY (hour, endpoint, status_code, error_kind)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_llm_hourly (
+  hour                  TEXT NOT NULL,
+  stage                 TEXT NOT NULL,
+  model                 TEXT NOT NULL,
+  status                TEXT NOT NULL,
+  error_kind            TEXT NOT NULL,
+  call_count            INTEGER NOT NULL DEFAULT 0,
+  latency_ms_sum        REAL NOT NULL DEFAULT 0,
+  prompt_tokens_sum     INTEGER NOT NULL DEFAULT 0,
+  completion_tokens_sum INTEGER NOT NULL DEFAULT 0,
+  total_tokens_sum      INTEGER NOT NULL DEFAULT 0,
+  cost_usd_sum          REAL NOT NULL DEFAULT 0,
+{_BUCKET_DDL},
+  PRIMARY KEY (hour, stage, model, status, error_kind)
+);
+
+-- Sparse latency sketch per (hour, stage, model, status): one row per
+-- non-empty log bucket (see sketch.py), so merging ranges is SUM(n).
+CREATE TABLE IF NOT EXISTS rollup_llm_latency_hourly (
+  hour   TEXT NOT NULL,
+  stage  TEXT NOT NULL,
+  model  TEXT NOT NULL,
+  status TEXT NOT NULL,
+  bucket INTEGER NOT NULL,
+  n      INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (hour, stage, model, status, bucket)
+) WITHOUT ROWID;
+"""
+
+_ROLLUP_TABLES = ("rollup_requests_hourly", "rollup_llm_hourly", "rollup_llm_latency_hourly")
+
+
+def _bucket_sum_exprs(column: str) -> str:
+    exprs = []
+    lower = None
+    for col, bound in zip(LATENCY_BUCKET_COLUMNS, LATENCY_BUCKET_BOUNDS_MS):
+        cond = f"COALESCE({column}, 0) <= {bound}"
+        if lower is not None:
+            cond = f"COALESCE({column}, 0) > {lower} AND {cond}"
+        exprs.append(f"SUM(CASE WHEN {cond} THEN 1 ELSE 0 END) AS {col}")
+        lower = bound
+    exprs.append(f"SUM(CASE WHEN COALESCE({column}, 0) > {lower} THEN 1 ELSE 0 END) AS {LATENCY_BUCKET_COLUMNS[-1]}")
+    return ",\n       ".join(exprs)
+
+
+_BUCKET_COLS = ", ".join(LATENCY_BUCKET_COLUMNS)
+_BUCKET_UPSERT = ",\n    ".join(f"{col} = {col} + excluded.{col}" for col in LATENCY_BUCKET_COLUMNS)
+
+# Raw-table aggregates in rollup shape. They feed the upserts below and also
+# answer the partial hours at the edges of a /stats range.
+_REQUEST_AGG_SELECT = f"""
+SELECT substr(timestamp_utc, 1, 13) AS hour, endpoint,
+       COALESCE(status_code, 0) AS status_code, COALESCE(error_kind, '') AS error_kind,
+       COUNT(*) AS request_count, COALESCE(SUM(duration_ms), 0) AS duration_ms_sum,
+       COALESCE(SUM(total_tokens), 0) AS total_tokens_sum,
+       COALESCE(SUM(total_cost_usd), 0) AS cost_usd_sum,
+       COALESCE(SUM(llm_call_count), 0) AS llm_call_count_sum,
+       {_bucket_sum_exprs("duration_ms")}
+  FROM requests
+ WHERE {{where}}
+ GROUP BY 1, 2, 3, 4
+"""
+
+_LLM_AGG_SELECT = f"""
+SELECT substr(timestamp_utc, 1, 13) AS hour, stage, model, status,
+       COALESCE(error_kind, '') AS error_kind, COUNT(*) AS call_count,
+       COALESCE(SUM(latency_ms), 0) AS latency_ms_sum,
+       COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens_sum,
+       COALESCE(SUM(completion_tokens), 0) AS completion_tokens_sum,
+       COALESCE(SUM(total_tokens), 0) AS total_tokens_sum,
+       COALESCE(SUM(cost_usd), 0) AS cost_usd_sum,
+       {_bucket_sum_exprs("latency_ms")}
+  FROM llm_calls
+ WHERE {{where}}
+ GROUP BY 1, 2, 3, 4, 5
+"""
+
+_REQUEST_ROLLUP_SQL = f"""
+INSERT INTO rollup_requests_hourly (
+    hour, endpoint, status_code, error_kind, request_count, duration_ms_sum,
+    total_tokens_sum, cost_usd_sum, llm_call_count_sum, {_BUCKET_COLS})
+{_REQUEST_AGG_SELECT}
+ON CONFLICT (hour, endpoint, status_code, error_kind) DO UPDATE SET
+    request_count = request_count + excluded.request_count,
+    duration_ms_sum = duration_ms_sum + excluded.duration_ms_sum,
+    total_tokens_sum = total_tokens_sum + excluded.total_tokens_sum,
+    cost_usd_sum = cost_usd_sum + excluded.cost_usd_sum,
+    llm_call_count_sum = llm_call_count_sum + excluded.llm_call_count_sum,
+    {_BUCKET_UPSERT}
+"""
+
+_LLM_ROLLUP_SQL = f"""
+INSERT INTO rollup_llm_hourly (
+    hour, stage, model, status, error_kind, call_count, latency_ms_sum,
+    prompt_tokens_sum, completion_tokens_sum, total_tokens_sum, cost_usd_sum, {_BUCKET_COLS})
+{_LLM_AGG_SELECT}
+ON CONFLICT (hour, stage, model, status, error_kind) DO UPDATE SET
+    call_count = call_count + excluded.call_count,
+    latency_ms_sum = latency_ms_sum + excluded.latency_ms_sum,
+    prompt_tokens_sum = prompt_tokens_sum + excluded.prompt_tokens_sum,
+    completion_tokens_sum = completion_tokens_sum + excluded.completion_tokens_sum,
+    total_tokens_sum = total_tokens_sum + excluded.total_tokens_sum,
+    cost_usd_sum = cost_usd_sum + excluded.cost_usd_sum,
+    {_BUCKET_UPSERT}
+"""
+
+_LATENCY_AGG_SELECT = """
+SELECT substr(timestamp_utc, 1, 13) AS hour, stage, model, status,
+       latency_bucket(latency_ms) AS bucket, COUNT(*) AS n
+  FROM llm_calls
+ WHERE {where}
+ GROUP BY 1, 2, 3, 4, 5
+"""
+
+_LATENCY_ROLLUP_SQL = f"""
+INSERT INTO rollup_llm_latency_hourly (hour, stage, model, status, bucket, n)
+{_LATENCY_AGG_SELECT}
+ON CONFLICT (hour, stage, model, status, bucket) DO UPDATE SET n = n + excluded.n
+"""
+
+# Columns added after the first release. init_schema() ALTERs them onto older
+# databases; CREATE TABLE IF NOT EXISTS alone would leave them missing. Rows
+# that predate a column keep NULL so callers can tell "unknown" from zero.
+_ADDED_COLUMNS = (
+    ("requests", "artifact_bytes", "INTEGER DEFAULT 0"),
+    ("llm_calls", "cached_prompt_tokens", "INTEGER"),
+)
+# Columns whose rows from before the migration are left NULL for a later
+# backfill; rows inserted afterwards start from the column default.
+_BACKFILLED_COLUMNS = {("requests", "artifact_bytes")}
+
 
 class Store:
     def __init__(self, db_path: Path) -> None:
@@ -85,7 +261,118 @@ class Store:
     def init_schema(self) -> None:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         with self.connect() as conn:
+            tables = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
             conn.executescript(_SCHEMA)
+            conn.executescript(_ROLLUP_SCHEMA)
+            for table, column, decl in _ADDED_COLUMNS:
+                conn.execute("BEGIN IMMEDIATE")
+                columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+                    if (table, column) in _BACKFILLED_COLUMNS:
+                        conn.execute(f"UPDATE {table} SET {column} = NULL")
+                conn.execute("COMMIT")
+        if "requests" in tables and not set(_ROLLUP_TABLES) <= tables:
+            # Upgrading a database that predates the rollups: seed them once
+            # from the raw rows so historical stats stay visible.
+            self.rebuild_rollups()
+
+    def rebuild_rollups(self) -> None:
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in _ROLLUP_TABLES:
+                    conn.execute(f"DELETE FROM {table}")
+                conn.execute(_REQUEST_ROLLUP_SQL.format(where="error_kind != 'pending'"))
+                conn.execute(_LLM_ROLLUP_SQL.format(where="1"))
+                conn.execute(_LATENCY_ROLLUP_SQL.format(where="1"))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def rollup_request(self, request_id: str) -> None:
+        """Fold one finalized request into the hourly rollup (call exactly once)."""
+        with self.connect() as conn:
+            conn.execute(_REQUEST_ROLLUP_SQL.format(where="request_id = ?"), (request_id,))
+
+    def rollup_llm_call(self, llm_call_id: int) -> None:
+        with self.connect() as conn:
+            conn.execute(_LLM_ROLLUP_SQL.format(where="id = ?"), (llm_call_id,))
+            conn.execute(_LATENCY_ROLLUP_SQL.format(where="id = ?"), (llm_call_id,))
+
+    def rollup_rows(self, table: str, hour_from: Optional[str], hour_to: Optional[str]) -> List[sqlite3.Row]:
+        """Rollup rows with ``hour_from <= hour < hour_to`` (either bound may be None)."""
+        if table not in _ROLLUP_TABLES:
+            raise ValueError(f"Unknown rollup table: {table!r}")
+        where = []
+        params: list = []
+        if hour_from is not None:
+            where.append("hour >= ?")
+            params.append(hour_from)
+        if hour_to is not None:
+            where.append("hour < ?")
+            params.append(hour_to)
+        sql = f"SELECT * FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self.connect() as conn:
+            return list(conn.execute(sql, params))
+
+    def raw_request_aggregates(self, where: str, params: Sequence[Any]) -> List[sqlite3.Row]:
+        """Finalized requests matching ``where``, aggregated like rollup_requests_hourly."""
+        with self.connect() as conn:
+            return list(conn.execute(
+                _REQUEST_AGG_SELECT.format(where=f"error_kind != 'pending' AND ({where})"), params
+            ))
+
+    def raw_llm_aggregates(self, where: str, params: Sequence[Any]) -> List[sqlite3.Row]:
+        with self.connect() as conn:
+            return list(conn.execute(_LLM_AGG_SELECT.format(where=where), params))
+
+    def latency_sketch_rows(
+        self,
+        hour_from: Optional[str],
+        hour_to: Optional[str],
+        period_len: int,
+        where: str = "1",
+        params: Sequence[Any] = (),
+    ) -> List[sqlite3.Row]:
+        """Sketch buckets for whole hours in ``[hour_from, hour_to)``.
+
+        Rows are merged per (period, stage, model, bucket), where period is
+        the first ``period_len`` characters of the hour ("" for the whole range).
+        """
+        clauses = [f"({where})"]
+        args: list = [period_len, *params]
+        if hour_from is not None:
+            clauses.append("hour >= ?")
+            args.append(hour_from)
+        if hour_to is not None:
+            clauses.append("hour < ?")
+            args.append(hour_to)
+        sql = (
+            "SELECT substr(hour, 1, ?) AS period, stage, model, bucket, SUM(n) AS n"
+            " FROM rollup_llm_latency_hourly WHERE " + " AND ".join(clauses)
+            + " GROUP BY 1, 2, 3, 4"
+        )
+        with self.connect() as conn:
+            return list(conn.execute(sql, args))
+
+    def raw_latency_sketch_rows(self, period_len: int, where: str, params: Sequence[Any]) -> List[sqlite3.Row]:
+        """Same shape as latency_sketch_rows, computed from llm_calls."""
+        sql = (
+            "SELECT substr(timestamp_utc, 1, ?) AS period, stage, model,"
+            " latency_bucket(latency_ms) AS bucket, COUNT(*) AS n"
+            f" FROM llm_calls WHERE {where} GROUP BY 1, 2, 3, 4"
+        )
+        with self.connect() as conn:
+            return list(conn.execute(sql, [period_len, *params]))
+
+    def clear_rollups(self) -> None:
+        with self.connect() as conn:
+            for table in _ROLLUP_TABLES:
+                conn.execute(f"DELETE FROM {table}")
 
     @contextmanager
     def connect(self) -> Iterator[sqlite3.Connection]:
@@ -95,6 +382,7 @@ class Store:
             conn.execute("PRAGMA synchronous = NORMAL")
             conn.execute("PRAGMA foreign_keys = ON")
             conn.row_factory = sqlite3.Row
+            conn.create_function("latency_bucket", 1, latency_bucket, deterministic=True)
             yield conn
         finally:
             conn.close()
@@ -142,6 +430,15 @@ class Store:
                 (status_code, duration_ms, error, error_kind, job_id, request_id),
             )
 
+    def add_artifact_bytes(self, request_id: str, size_bytes: int) -> None:
+        if size_bytes <= 0:
+            return
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE requests SET artifact_bytes = COALESCE(artifact_bytes, 0) + ? WHERE request_id = ?",
+                (int(size_bytes), request_id),
+            )
+
     def insert_llm_call(
         self,
         request_id: str,
@@ -161,6 +458,7 @@ class Store:
         prompt_file,
         response_file,
         parsed_file,
+        cached_prompt_tokens=None,
     ) -> int:
         with self.connect() as conn:
             cur = conn.execute(
@@ -169,13 +467,13 @@ class Store:
                     request_id, timestamp_utc, stage, attempt, model, status,
                     error_kind, error_message, latency_ms, http_status_code,
                     prompt_tokens, completion_tokens, total_tokens, cost_usd,
-                    prompt_file, response_file, parsed_file
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    prompt_file, response_file, parsed_file, cached_prompt_tokens
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (request_id, timestamp_utc, stage, attempt, model, status,
                  error_kind, error_message, latency_ms, http_status_code,
                  prompt_tokens, completion_tokens, total_tokens, cost_usd,
-                 prompt_file, response_file, parsed_file),
+                 prompt_file, response_file, parsed_file, cached_prompt_tokens),
             )
             return int(cur.lastrowid)
 
@@ -218,3 +516,40 @@ class Store:
                 """,
                 (request_id, llm_call_id, stage, model, error_message, prompt_text, response_text),
             )
+
+    def insert_spans(self, spans: Sequence[Any]) -> None:
+        """Persist finished spans; ones whose request row is gone are skipped."""
+        rows = [
+            (span.span_id, span.trace_id, span.parent_id, span.name, span.start_ms,
+             span.end_ms, span.status, span.thread,
+             json.dumps(span.attributes, ensure_ascii=False, default=str))
+            for span in spans
+        ]
+        with self.connect() as conn:
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO spans (span_id, request_id, parent_id, name, start_ms,
+                    end_ms, status, thread, attributes)
+                SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?
+                 WHERE EXISTS (SELECT 1 FROM requests WHERE request_id = ?2)
+                """,
+                rows,
+            )
+
+    def list_spans(self, request_id: str) -> List[Dict[str, Any]]:
+        """Spans of one request, with ``offset_ms`` from the earliest start."""
+        with self.connect() as conn:
+            rows = list(conn.execute(
+                "SELECT * FROM spans WHERE request_id = ? ORDER BY start_ms", (request_id,)
+            ))
+        if not rows:
+            return []
+        origin = rows[0]["start_ms"]
+        out = []
+        for row in rows:
+            item = dict(row)
+            item["attributes"] = json.loads(row["attributes"] or "{}")
+            item["offset_ms"] = round(row["start_ms"] - origin, 3)
+            item["duration_ms"] = round(row["end_ms"] - row["start_ms"], 3)
+            out.append(item)
+        return out
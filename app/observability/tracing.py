@@ -0,0 +1,202 @@
+"""Lightweight in-process span tracing.
+
+A span is one timed step of a request (HTTP handling, executor queue wait, an
+LLM stage or attempt, ...). Spans nest through a ContextVar, so children pick
+up their parent automatically in the same task, in ``run_in_threadpool``
+(which copies the context) and, via ``use_span``, in executor threads. The
+trace id is the observability request_id. Finished spans go to the sink that
+main.py installs: a ``SpanWriter`` that batches them into the ``spans`` table.
+
+Timestamps are ``time.monotonic()`` in milliseconds: comparable within one
+process, which is where every span of a request is produced.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import context as obs_ctx
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    span_id: str
+    trace_id: str
+    parent_id: Optional[str]
+    name: str
+    start_ms: float
+    end_ms: Optional[float] = None
+    status: str = "ok"
+    thread: str = ""
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("observability_span", default=None)
+_sink: Optional[Callable[[Span], None]] = None
+
+
+def set_sink(sink: Optional[Callable[[Span], None]]) -> None:
+    global _sink
+    _sink = sink
+
+
+def now_ms() -> float:
+    return time.monotonic() * 1000.0
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _new_span(name: str, parent: Optional[Span], trace_id: Optional[str], start_ms: float,
+              attributes: Dict[str, Any]) -> Optional[Span]:
+    trace = trace_id or (parent.trace_id if parent else obs_ctx.get_request_id())
+    if not trace:
+        return None
+    return Span(
+        span_id=os.urandom(8).hex(),
+        trace_id=trace,
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        start_ms=start_ms,
+        thread=threading.current_thread().name,
+        attributes=attributes,
+    )
+
+
+def _emit(span: Span) -> None:
+    if _sink is None:
+        return
+    try:
+        _sink(span)
+    except Exception:
+        _logger.debug("dropping span %s of trace %s", span.name, span.trace_id, exc_info=True)
+
+
+@contextmanager
+def span(name: str, *, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a child of the current span.
+
+    Yields None (and records nothing) outside a traced request.
+    """
+    parent = _current_span.get()
+    current = _new_span(name, parent, trace_id, now_ms(), attributes)
+    if current is None:
+        yield None
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException:
+        current.status = "error"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ms = now_ms()
+        _emit(current)
+
+
+def open_span(name: str, *, trace_id: Optional[str] = None,
+              **attributes: Any) -> Tuple[Optional[Span], Token]:
+    """Start a span and make it current without tying its end to a block.
+
+    For spans that outlive the task that opened them, e.g. a request whose
+    streamed body is sent after the middleware returns: reset the context
+    with ``detach_span`` where it was opened and ``close_span`` it later.
+    """
+    parent = _current_span.get()
+    current = _new_span(name, parent, trace_id, now_ms(), attributes)
+    return current, _current_span.set(current if current is not None else parent)
+
+
+def detach_span(token: Token) -> None:
+    _current_span.reset(token)
+
+
+def close_span(span: Optional[Span]) -> None:
+    if span is None:
+        return
+    span.end_ms = now_ms()
+    _emit(span)
+
+
+def record_span(name: str, start_ms: float, end_ms: float, *, parent: Optional[Span] = None,
+                **attributes: Any) -> None:
+    """Record an interval that has already elapsed, e.g. time spent queued."""
+    done = _new_span(name, parent or _current_span.get(), None, start_ms, attributes)
+    if done is None:
+        return
+    done.end_ms = end_ms
+    _emit(done)
+
+
+@contextmanager
+def use_span(parent: Optional[Span]) -> Iterator[None]:
+    """Make ``parent`` current in a thread that did not inherit the context."""
+    token = _current_span.set(parent)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+
+
+class SpanWriter:
+    """Sink that persists spans in batches from a background thread.
+
+    Span ends only enqueue, so the request path and the event loop never wait
+    on SQLite. When the queue is over ``max_queue`` new spans are dropped.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Span]], None], *, max_batch: int = 200,
+                 max_queue: int = 10000) -> None:
+        self._write_batch = write_batch
+        self._max_batch = max_batch
+        self._max_queue = max_queue
+        self._queue: "queue.SimpleQueue[Span]" = queue.SimpleQueue()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def __call__(self, span: Span) -> None:
+        with self._cond:
+            if self._pending >= self._max_queue:
+                self.dropped += 1
+                return
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-writer", daemon=True)
+                self._thread.start()
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception:
+                _logger.debug("dropping %d spans", len(batch), exc_info=True)
+            with self._cond:
+                self._pending -= len(batch)
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until every queued span has been written (or ``timeout``)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
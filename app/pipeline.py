@@ -0,0 +1,198 @@
+"""Stage DAG runner for requests that make several model calls over one image set.
+
+The stages of a request are declared once as ``Stage`` objects: a name, the
+stages whose results it consumes and a deadline measured from the start of
+the run. ``StagePipeline.run`` starts every stage as soon as its dependencies
+have completed and yields one ``StageEvent`` per stage in completion order, so
+a caller can stream each result while slower stages are still running.
+
+A stage that raises or misses its deadline is reported as ``failed``; stages
+depending on it are reported as ``skipped`` and never start. A stage past its
+deadline has its CancellationToken fired, which aborts the in-flight LLM call
+instead of leaving it to finish for nobody.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from .errors import StageDeadlineError
+from .llm.cancellation import CancellationToken
+
+
+StageFn = Callable[[Mapping[str, Any], CancellationToken], Any]
+# Runs a blocking stage function off the event loop: runner(name, fn, *args).
+StageRunner = Callable[..., Awaitable[Any]]
+
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One node of the DAG.
+
+    ``fn(inputs, cancel_token)`` runs on a worker thread; ``inputs`` maps each
+    name in ``depends_on`` to that stage's result.
+    """
+
+    name: str
+    fn: StageFn
+    depends_on: Tuple[str, ...] = ()
+    deadline_seconds: Optional[float] = None
+
+
+@dataclass
+class StageEvent:
+    stage: str
+    status: str
+    elapsed_ms: float
+    result: Any = None
+    error: Optional[BaseException] = None
+    # For skipped stages: the failed dependency that ruled them out.
+    blocked_by: Optional[str] = None
+
+
+async def _to_thread(_name: str, fn: Callable[..., Any], /, *args: Any) -> Any:
+    return await asyncio.to_thread(fn, *args)
+
+
+def _consume_result(task: "asyncio.Future[Any]") -> None:
+    # Abandoned stages still finish on their thread; retrieve the outcome so
+    # asyncio does not log "exception was never retrieved".
+    if not task.cancelled():
+        task.exception()
+
+
+class StagePipeline:
+    def __init__(self, stages: Sequence[Stage]) -> None:
+        by_name: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in by_name:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            by_name[stage.name] = stage
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in by_name:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+        self.stages: Dict[str, Stage] = by_name
+        self.order: List[str] = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError("Stage dependency cycle: " + " -> ".join(path + (name,)))
+            state[name] = 1
+            for dep in self.stages[name].depends_on:
+                visit(dep, path + (name,))
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, ())
+        return order
+
+    def dependents(self, name: str) -> List[str]:
+        """Every stage that needs ``name``, directly or transitively, in run order."""
+        blocked: Set[str] = {name}
+        for candidate in self.order:
+            if any(dep in blocked for dep in self.stages[candidate].depends_on):
+                blocked.add(candidate)
+        blocked.discard(name)
+        return [candidate for candidate in self.order if candidate in blocked]
+
+    async def run(self, runner: StageRunner = _to_thread) -> AsyncIterator[StageEvent]:
+        """Run the DAG, yielding each stage's event as soon as it is known.
+
+        Closing the iterator early (e.g. the client disconnected) cancels every
+        stage still running.
+        """
+        started = time.monotonic()
+        results: Dict[str, Any] = {}
+        settled: Set[str] = set()
+        running: Dict["asyncio.Future[Any]", Tuple[Stage, CancellationToken]] = {}
+
+        def elapsed_ms() -> float:
+            return round((time.monotonic() - started) * 1000, 2)
+
+        def skip_dependents(name: str) -> List[StageEvent]:
+            events = []
+            for dependent in self.dependents(name):
+                if dependent not in settled:
+                    settled.add(dependent)
+                    events.append(StageEvent(dependent, SKIPPED, elapsed_ms(), blocked_by=name))
+            return events
+
+        def failed(stage: Stage, error: BaseException) -> List[StageEvent]:
+            settled.add(stage.name)
+            return [StageEvent(stage.name, FAILED, elapsed_ms(), error=error)] + skip_dependents(stage.name)
+
+        def past_deadline(stage: Stage) -> bool:
+            return (
+                stage.deadline_seconds is not None
+                and time.monotonic() - started >= stage.deadline_seconds
+            )
+
+        def start_ready() -> List[StageEvent]:
+            events: List[StageEvent] = []
+            active = {stage.name for stage, _token in running.values()}
+            for name in self.order:
+                stage = self.stages[name]
+                if name in settled or name in active:
+                    continue
+                if not all(dep in results for dep in stage.depends_on):
+                    continue
+                if past_deadline(stage):
+                    events.extend(failed(stage, StageDeadlineError(name, stage.deadline_seconds)))
+                    continue
+                token = CancellationToken()
+                inputs = {dep: results[dep] for dep in stage.depends_on}
+                task = asyncio.ensure_future(runner(name, stage.fn, inputs, token))
+                running[task] = (stage, token)
+            return events
+
+        try:
+            for event in start_ready():
+                yield event
+            while running:
+                deadlines = [
+                    started + stage.deadline_seconds - time.monotonic()
+                    for stage, _token in running.values()
+                    if stage.deadline_seconds is not None
+                ]
+                timeout = max(0.0, min(deadlines)) if deadlines else None
+                done, _pending = await asyncio.wait(
+                    list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                events: List[StageEvent] = []
+                for task in done:
+                    stage, _token = running.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        events.extend(failed(stage, error))
+                        continue
+                    results[stage.name] = task.result()
+                    settled.add(stage.name)
+                    events.append(StageEvent(stage.name, COMPLETED, elapsed_ms(), result=task.result()))
+                for task, (stage, token) in list(running.items()):
+                    if past_deadline(stage):
+                        del running[task]
+                        token.cancel()
+                        task.add_done_callback(_consume_result)
+                        events.extend(failed(stage, StageDeadlineError(stage.name, stage.deadline_seconds)))
+                events.extend(start_ready())
+                for event in events:
+                    yield event
+        finally:
+            for task, (_stage, token) in running.items():
+                token.cancel()
+                task.add_done_callback(_consume_result)
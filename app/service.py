@@ -1,21 +1,37 @@
 import difflib
 import json
+import logging
 import re
+import sqlite3
+import string
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import AbstractSet, Any, Dict, Iterable, List, Optional, Tuple
 
 from .config import Settings
 from .constants import DEFAULT_LANGUAGE, PRICE_MAX, PRICE_MIN, SUPPORTED_LANGUAGES, TOP_LEVEL_CATEGORIES
 from .observability import context as obs_ctx
-from .observability.recorder import Recorder
-from .data.brands import BrandStore, empty_brand_id_obj
+from .observability.metrics import (
+    CATEGORY_NARROWING,
+    CATEGORY_PATH_MATCHES,
+    LLM_ATTEMPT_SECONDS,
+    LLM_ATTEMPTS,
+    LLM_PROMPT_TOKENS,
+    TITLE_CACHE_LOOKUPS,
+    TITLE_CLASSIFIER_ANSWERS,
+)
+from .observability.recorder import Recorder, cached_prompt_tokens
+from .data.brand_scanner import distinctive
+from .data.brands import BrandRecord, BrandStore, empty_brand_id_obj
 from .data.categories import CategoryStore
 from .errors import BadRequestError, LLMAllAttemptsFailedError
+from .llm.cancellation import CancellationToken
 from .llm.client import OpenRouterClient, USE_CLIENT_REASONING
 from .llm.resilient import AttemptRecord, ResilientCaller
 from .llm import prompt_store
+from .title_cache import TitleAnswerCache
+from .title_classifier import TitleGroupClassifier
 from .utils import (
     compress_whitespace,
     fetch_image_from_url,
@@ -25,6 +41,8 @@ from .utils import (
 )
 
 
+_logger = logging.getLogger(__name__)
+
 recorder: Optional[Recorder] = None  # set by main.py at startup
 
 
@@ -46,6 +64,8 @@ DESCRIPTION_DETAIL_LEGACY_MAP = {
     "model_number": ("型番",),
     "color": ("カラー",),
 }
+# Second-level nodes the model may pick when a large group is narrowed first.
+CATEGORY_NODE_PICKS = 3
 TITLE_EXCLUDED_DETAIL_FIELDS = {
     "target": ("対象",),
     "size": ("サイズ",),
@@ -119,6 +139,56 @@ def _map_top_level_category(raw: str) -> Optional[str]:
     return None
 
 
+def _cacheable_user_content(
+    template: str,
+    block_field: str,
+    block: str,
+    cache_control: bool,
+    *,
+    prefix_store: Optional[CategoryStore] = None,
+    **fields: str,
+) -> Any:
+    """A category-style user prompt whose candidate list is a cacheable prefix.
+
+    When everything before ``{<block_field>}`` in the template depends only on
+    the group, that part plus the list becomes its own content part (marked for
+    providers that need an explicit cache breakpoint) and the product fields
+    follow in a second part, so every call for the group shares the prefix.
+    Templates that put product fields first are sent as one plain string.
+
+    Pass ``prefix_store`` when ``block`` is that store's precomputed candidate
+    block for the group: the rendered prefix is then reused from the store.
+    Ad-hoc blocks (e.g. a narrowed candidate list) are rendered per call.
+    """
+    head, marker, tail = template.partition("{" + block_field + "}")
+    head_fields = {name for _, name, _, _ in string.Formatter().parse(head) if name is not None}
+    if not marker or not head_fields <= {"group_name"}:
+        return template.format(**{block_field: block}, **fields)
+    group_name = fields.get("group_name", "")
+    if prefix_store is not None:
+        text = prefix_store.candidate_prefix(head, group_name)
+    else:
+        text = head.format(group_name=group_name) + block
+    prefix: Dict[str, Any] = {"type": "text", "text": text}
+    if cache_control:
+        prefix["cache_control"] = {"type": "ephemeral"}
+    rest = tail.format(**fields)
+    return [prefix, {"type": "text", "text": rest}] if rest else [prefix]
+
+
+def _path_match_summary(path_matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Debug view of how the model's category paths matched the candidates."""
+    counts = {outcome: 0 for outcome in ("exact", "fuzzy", "unmatched")}
+    for match in path_matches:
+        counts[match["outcome"]] += 1
+    total = len(path_matches)
+    return {
+        **counts,
+        "reconciled_rate": round(counts["fuzzy"] / total, 4) if total else None,
+        "paths": path_matches,
+    }
+
+
 def _clean_string(value: Any) -> str:
     if value is None:
         return ""
@@ -247,6 +317,10 @@ def _normalize_price_fields(ai_raw: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def _normalize_product_size(ai_raw: Dict[str, Any]) -> Optional[str]:
+    return _clean_string(ai_raw.get("product_size", "")) or None
+
+
 def _normalize_confidence(value: Any) -> float:
     if value is None or isinstance(value, bool):
         return 0.0
@@ -602,13 +676,16 @@ def _resolve_brand(
     brand_store: BrandStore,
     ai_raw: Dict[str, Any],
     description: Dict[str, Any],
+    generic_words: AbstractSet[str] = frozenset(),
 ) -> Tuple[str, Dict[str, Any], str]:
     """Resolve brand from the LLM payload via ordered candidates + cross-field fallback.
 
     Candidates are tried most-specific to most-general; the first one that matches
     the brand table wins. Returns (brand_name, brand_id_obj, brand_raw), where
     brand_raw is the original printed brand kept for title extension (behavior
-    unchanged vs. matching only the printed name).
+    unchanged vs. matching only the printed name). ``generic_words`` are
+    everyday words (the category path words) that a brand scanned from the
+    title may not be recognised by alone.
     """
     brand_raw = _clean_string(ai_raw.get("brand_name", ""))
 
@@ -621,8 +698,9 @@ def _resolve_brand(
     if isinstance(details, dict):
         raw_candidates.append(_clean_string(details.get("brand", "")))
 
-    # Title first token is the weakest signal: consulted only after everything
-    # more specific has failed (it dedupes away when it equals an earlier value).
+    # Title first token is the weakest explicit signal: consulted only after
+    # everything more specific has failed (it dedupes away when it equals an
+    # earlier value). Brands named further into the text are scanned for last.
     raw_candidates.append(_first_title_token(ai_raw.get("title", "")))
 
     for candidate in _dedupe_brand_candidates(raw_candidates):
@@ -630,9 +708,43 @@ def _resolve_brand(
         if match:
             return match["brand_name"], dict(match["brand_id_obj"]), brand_raw
 
+    match = _scan_brand_mention(brand_store, ai_raw, description, generic_words)
+    if match:
+        return match["brand_name"], dict(match["brand_id_obj"]), brand_raw
+
     return "", empty_brand_id_obj(), brand_raw
 
 
+def _scan_brand_mention(
+    brand_store: BrandStore,
+    ai_raw: Dict[str, Any],
+    description: Dict[str, Any],
+    generic_words: AbstractSet[str] = frozenset(),
+) -> Optional[BrandRecord]:
+    """Best brand the title or keywords name distinctively.
+
+    Titles are full of ordinary words that happen to be brand names too
+    (ホワイト -> WHITE, ワンピース -> ONE PIECE, ラック -> LACCU), so a hit the
+    model did not also produce only counts when the matched name is
+    Latin-script, several words, or not an everyday word; see
+    ``brand_scanner.distinctive``. Description text is not scanned.
+    """
+    scan = getattr(brand_store, "scan_mentions", None)
+    if scan is None:
+        return None
+    if not isinstance(description, dict):
+        description = {}
+    keywords = description.get("search_keywords")
+    hits = scan(
+        title=_clean_string(ai_raw.get("title", "")),
+        keywords=" ".join(str(k) for k in keywords) if isinstance(keywords, list) else "",
+    )
+    for hit in hits:
+        if any(distinctive(mention.name, generic_words) for mention in hit.mentions):
+            return hit.record
+    return None
+
+
 def _extend_title_to_minimum(
     title: str,
     *,
@@ -733,6 +845,24 @@ def _paths_from_categories(
     return payload
 
 
+def _batch_answers(parsed: Dict[str, Any], count: int) -> List[Optional[Dict[str, Any]]]:
+    """Per-item answers of a batched prompt, by the 1-based ``id`` each item was sent with."""
+    answers: List[Optional[Dict[str, Any]]] = [None] * count
+    results = parsed.get("results")
+    if not isinstance(results, list):
+        return answers
+    for answer in results:
+        if not isinstance(answer, dict):
+            continue
+        try:
+            index = int(str(answer.get("id", "")).strip()) - 1
+        except ValueError:
+            continue
+        if 0 <= index < count and answers[index] is None:
+            answers[index] = answer
+    return answers
+
+
 class MercariAnalyzer:
     def __init__(
         self,
@@ -741,12 +871,18 @@ class MercariAnalyzer:
         category_store: CategoryStore,
         vision_client: OpenRouterClient,
         category_client: OpenRouterClient,
+        title_classifier: Optional[TitleGroupClassifier] = None,
+        title_cache: Optional[TitleAnswerCache] = None,
     ):
         self.settings = settings
         self.brand_store = brand_store
         self.category_store = category_store
         self.vision_client = vision_client
         self.category_client = category_client
+        # Answers the title -> top-level category hop locally when confident.
+        self.title_classifier = title_classifier
+        # Answers near-duplicates of past titles without any LLM call.
+        self.title_cache = title_cache
         self.vision_caller = ResilientCaller(
             client=vision_client,
             max_retries=settings.model_call_max_retries,
@@ -776,6 +912,18 @@ class MercariAnalyzer:
         raw_response: Optional[Dict[str, Any]] = None,
         parsed: Optional[Dict[str, Any]] = None,
     ) -> None:
+        for attempt in attempts:
+            model = attempt.get("model") or ""
+            LLM_ATTEMPTS.inc(stage=stage, model=model, outcome=attempt.get("error_kind") or "")
+            latency_ms = attempt.get("latency_ms")
+            if latency_ms:
+                LLM_ATTEMPT_SECONDS.observe(float(latency_ms) / 1000.0, stage=stage, model=model)
+        usage = (raw_response or {}).get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        if isinstance(prompt_tokens, int):
+            cached = min(cached_prompt_tokens(usage) or 0, prompt_tokens)
+            LLM_PROMPT_TOKENS.inc(cached, stage=stage, cache="cached")
+            LLM_PROMPT_TOKENS.inc(prompt_tokens - cached, stage=stage, cache="uncached")
         if recorder is None:
             return
         recorder.record_llm_stage(
@@ -796,42 +944,19 @@ class MercariAnalyzer:
         category_model_override: Optional[str] = None,
         image_processing: Optional[List[Dict[str, Any]]] = None,
     ) -> Dict[str, Any]:
-        if language not in SUPPORTED_LANGUAGES:
-            raise BadRequestError("Unsupported language.")
-        if not images:
-            raise BadRequestError("Image list is required.")
         total_started = time.monotonic()
-        attempts_by_stage: Dict[str, List[AttemptRecord]] = {}
-
-        # Category is decided from the first image only (the prompt already treats
-        # it as the primary evidence). Sending just the first image keeps the
-        # vision call lean and fast; prices are handled by the dedicated price
-        # link, so the extra images are no longer needed here.
-        first_image_bytes, first_mime = images[0]
-        data_urls = [image_bytes_to_data_url(first_image_bytes, first_mime)]
-        ai_raw, vision_attempts = self._call_fast_classification_llm(
-            data_urls,
+        fast = self.fast_classify(
+            images,
             language,
+            debug=debug,
             model_override=vision_model_override,
         )
-        attempts_by_stage["fast_vision"] = vision_attempts
-
-        title = _clean_string(ai_raw.get("title", ""))
-        simple_description = _clean_string(ai_raw.get("simple_description", ""))
-        top_level_category = _clean_string(ai_raw.get("top_level_category", ""))
-        group_name = _map_top_level_category(top_level_category)
-
-        categories: List[Dict[str, Any]] = []
-        llm_category_raw: Optional[Dict[str, Any]] = None
-        if group_name:
-            categories, llm_category_raw, category_attempts = self._choose_categories(
-                title=title,
-                description=simple_description,
-                brand_for_prompt="",
-                group_name=group_name,
-                model_override=category_model_override,
-            )
-            attempts_by_stage["category"] = category_attempts
+        selected = self.select_categories(
+            fast,
+            debug=debug,
+            model_override=category_model_override,
+        )
+        categories = selected["categories"]
 
         classification_ms = round((time.monotonic() - total_started) * 1000, 2)
         result: Dict[str, Any] = {
@@ -852,11 +977,102 @@ class MercariAnalyzer:
         path_info = _paths_from_categories(categories, include_alternatives=False)
         if path_info:
             result.update(path_info)
+        if debug:
+            result["_debug"] = {
+                "fast_ai_raw": fast["_debug"]["fast_ai_raw"],
+                "group_name": fast["group_name"],
+                "llm_category_raw": selected["_debug"]["llm_category_raw"],
+                "category_path_matches": selected["_debug"]["category_path_matches"],
+                "attempts": {
+                    **fast["_debug"]["attempts"],
+                    **selected["_debug"]["attempts"],
+                },
+            }
+        return result
+
+    def fast_classify(
+        self,
+        images: List[Tuple[bytes, str]],
+        language: str,
+        debug: bool = False,
+        model_override: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Dict[str, Any]:
+        """First classification stage: title, short description and top-level group.
+
+        Category is decided from the first image only (the prompt already treats
+        it as the primary evidence). Sending just the first image keeps the
+        vision call lean and fast; prices are handled by the dedicated price
+        link, so the extra images are not needed here.
+        """
+        if language not in SUPPORTED_LANGUAGES:
+            raise BadRequestError("Unsupported language.")
+        if not images:
+            raise BadRequestError("Image list is required.")
+        started = time.monotonic()
+        first_image_bytes, first_mime = images[0]
+        data_urls = [image_bytes_to_data_url(first_image_bytes, first_mime)]
+        ai_raw, attempts = self._call_fast_classification_llm(
+            data_urls,
+            language,
+            model_override=model_override,
+            cancel_token=cancel_token,
+        )
+        top_level_category = _clean_string(ai_raw.get("top_level_category", ""))
+        result: Dict[str, Any] = {
+            "title": _clean_string(ai_raw.get("title", "")),
+            "simple_description": _clean_string(ai_raw.get("simple_description", "")),
+            "top_level_category": top_level_category,
+            "group_name": _map_top_level_category(top_level_category),
+            "timings": {
+                "fast_classification_ms": round((time.monotonic() - started) * 1000, 2),
+            },
+        }
         if debug:
             result["_debug"] = {
                 "fast_ai_raw": ai_raw,
-                "group_name": group_name,
+                "attempts": {"fast_vision": [a.__dict__ for a in attempts]},
+            }
+        return result
+
+    def select_categories(
+        self,
+        fast: Dict[str, Any],
+        debug: bool = False,
+        model_override: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Dict[str, Any]:
+        """Second classification stage: pick up to 3 category paths in the group
+        found by ``fast_classify``. No model call is made when no group matched.
+        """
+        started = time.monotonic()
+        categories: List[Dict[str, Any]] = []
+        llm_category_raw: Optional[Dict[str, Any]] = None
+        attempts_by_stage: Dict[str, List[AttemptRecord]] = {}
+        path_matches: List[Dict[str, Any]] = []
+        group_name = fast.get("group_name")
+        if group_name:
+            categories, llm_category_raw, category_attempts = self._choose_categories(
+                title=fast.get("title", ""),
+                description=fast.get("simple_description", ""),
+                brand_for_prompt="",
+                group_name=group_name,
+                model_override=model_override,
+                cancel_token=cancel_token,
+                path_matches=path_matches,
+            )
+            attempts_by_stage["category"] = category_attempts
+        result: Dict[str, Any] = {
+            "categories": categories,
+            **(_paths_from_categories(categories, include_alternatives=False) or {}),
+            "timings": {
+                "category_ms": round((time.monotonic() - started) * 1000, 2),
+            },
+        }
+        if debug:
+            result["_debug"] = {
                 "llm_category_raw": llm_category_raw,
+                "category_path_matches": _path_match_summary(path_matches),
                 "attempts": {
                     stage: [a.__dict__ for a in attempts]
                     for stage, attempts in attempts_by_stage.items()
@@ -870,6 +1086,7 @@ class MercariAnalyzer:
         debug: bool = False,
         model_override: Optional[str] = None,
         started_at: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Dict[str, Any]:
         """Standalone fast price link: a single vision call reading visible prices.
 
@@ -887,6 +1104,7 @@ class MercariAnalyzer:
         ai_raw, attempts = self._call_price_only_llm(
             data_urls,
             model_override=model_override,
+            cancel_token=cancel_token,
         )
         result: Dict[str, Any] = {
             **_normalize_price_fields(ai_raw),
@@ -907,6 +1125,7 @@ class MercariAnalyzer:
         debug: bool = False,
         model_override: Optional[str] = None,
         started_at: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Dict[str, Any]:
         """Standalone fast size link: a single vision call reading visible size text.
 
@@ -926,9 +1145,10 @@ class MercariAnalyzer:
         ai_raw, attempts = self._call_size_only_llm(
             data_urls,
             model_override=model_override,
+            cancel_token=cancel_token,
         )
         result: Dict[str, Any] = {
-            "product_size": _clean_string(ai_raw.get("product_size", "")) or None,
+            "product_size": _normalize_product_size(ai_raw),
             "timings": {
                 "size_ms": round((time.monotonic() - started) * 1000, 2),
             },
@@ -940,6 +1160,46 @@ class MercariAnalyzer:
             }
         return result
 
+    def extract_price_and_size(
+        self,
+        images: List[Tuple[bytes, str]],
+        debug: bool = False,
+        model_override: Optional[str] = None,
+        started_at: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Dict[str, Any]:
+        """Combined price and size link: one vision call instead of two.
+
+        Returns the price fields of ``extract_prices`` plus the ``product_size``
+        of ``extract_size``, normalized the same way, while sending the image
+        set to the model only once.
+        """
+        if not images:
+            raise BadRequestError("Image list is required.")
+        started = float(started_at) if started_at is not None else time.monotonic()
+        data_urls = [
+            image_bytes_to_data_url(image_bytes, mime_type)
+            for image_bytes, mime_type in images
+        ]
+        ai_raw, attempts = self._call_price_size_llm(
+            data_urls,
+            model_override=model_override,
+            cancel_token=cancel_token,
+        )
+        result: Dict[str, Any] = {
+            **_normalize_price_fields(ai_raw),
+            "product_size": _normalize_product_size(ai_raw),
+            "timings": {
+                "price_size_ms": round((time.monotonic() - started) * 1000, 2),
+            },
+        }
+        if debug:
+            result["_debug"] = {
+                "price_size_ai_raw": ai_raw,
+                "attempts": {"price_size": [a.__dict__ for a in attempts]},
+            }
+        return result
+
     def generate_product_data(
         self,
         images: List[Tuple[bytes, str]],
@@ -948,6 +1208,7 @@ class MercariAnalyzer:
         model_override: Optional[str] = None,
         use_fallback_prompt: bool = False,
         started_at: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Dict[str, Any]:
         if language not in SUPPORTED_LANGUAGES:
             raise BadRequestError("Unsupported language.")
@@ -966,12 +1227,13 @@ class MercariAnalyzer:
             language,
             model_override=model_override,
             use_fallback_prompt=use_fallback_prompt,
+            cancel_token=cancel_token,
         )
 
         description_raw = ai_raw.get("description")
         description_struct = _normalize_description(description_raw)
         brand_name, brand_id_obj, brand_raw = _resolve_brand(
-            self.brand_store, ai_raw, description_struct
+            self.brand_store, ai_raw, description_struct, self.category_store.path_words()
         )
         title = _extend_title_to_minimum(
             ai_raw.get("title", ""),
@@ -1034,7 +1296,7 @@ class MercariAnalyzer:
         description_raw = ai_raw.get("description")
         description_struct = _normalize_description(description_raw)
         brand_name, brand_id_obj, brand_raw = _resolve_brand(
-            self.brand_store, ai_raw, description_struct
+            self.brand_store, ai_raw, description_struct, self.category_store.path_words()
         )
         title = _extend_title_to_minimum(
             ai_raw.get("title", ""),
@@ -1079,32 +1341,133 @@ class MercariAnalyzer:
         if not title_clean:
             raise BadRequestError("Title is required.")
 
-        categories: List[Dict[str, str]] = []
+        # A pinned model must answer itself; cached answers came from whichever
+        # model was configured when they were recorded.
+        if not (category_model_override or vision_model_override):
+            cached = self.cached_title_result(title_clean)
+            if cached is not None:
+                return cached
+
+        paths_result: Optional[Dict[str, Any]] = None
         title_error: Optional[Exception] = None
 
         try:
-            title_payload, _title_attempts = self._call_title_category_llm(
-                title=title_clean,
-                language=language,
+            group_name = self.classify_title_group(
+                title_clean,
+                language,
                 model_override=category_model_override,
             )
-            top_level_category = _clean_string(title_payload.get("top_level_category", ""))
-            group_name = _map_top_level_category(top_level_category)
             if group_name:
-                categories, _, _category_attempts = self._choose_categories(
-                    title=title_clean,
-                    description="",
-                    brand_for_prompt="",
-                    group_name=group_name,
+                paths_result = self.title_category_paths(
+                    title_clean,
+                    group_name,
                     model_override=category_model_override,
                 )
         except (BadRequestError, LLMAllAttemptsFailedError) as exc:
             title_error = exc
 
-        paths_result = _paths_from_categories(categories)
         if paths_result:
             return paths_result
+        return self.title_image_fallback(
+            image_url,
+            language,
+            title_error=title_error,
+            vision_model_override=vision_model_override,
+            category_model_override=category_model_override,
+        )
+
+    def cached_title_result(self, title: str) -> Optional[Dict[str, Any]]:
+        """The past answer of a near-duplicate title, if the title cache has one.
+
+        The answer is rebuilt from the live category table, which may have
+        been reloaded since it was recorded: a best category that no longer
+        exists under the same path is a miss, vanished alternatives are dropped.
+        """
+        cache = self.title_cache
+        if cache is None:
+            return None
+        try:
+            hit = cache.lookup(title)
+        except sqlite3.Error as exc:
+            _logger.warning("Title cache lookup failed: %s", exc)
+            hit = None
+        answer = self._refresh_cached_answer(hit[0]) if hit else None
+        TITLE_CACHE_LOOKUPS.inc(outcome="hit" if answer else "miss")
+        return answer
+
+    def _refresh_cached_answer(self, answer: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.category_store is None:
+            return answer
+        best = self.category_store.get_category(str(answer.get("best_category_id") or ""))
+        if best is None or best["name"] != compress_whitespace(answer.get("best_target_path") or ""):
+            return None
+        entries = [best]
+        for alternative in answer.get("alternatives") or []:
+            if not isinstance(alternative, dict):
+                continue
+            entry = self.category_store.get_category(str(alternative.get("category_id") or ""))
+            if entry is not None:
+                entries.append(entry)
+        return _paths_from_categories(entries)
+
+    def classify_title_group(
+        self,
+        title: str,
+        language: str,
+        model_override: Optional[str] = None,
+    ) -> Optional[str]:
+        """Top-level category group for one title, or None when it maps to none."""
+        local = self._local_title_group(title)
+        if local:
+            return local
+        title_payload, _title_attempts = self._call_title_category_llm(
+            title=title,
+            language=language,
+            model_override=model_override,
+        )
+        top_level_category = _clean_string(title_payload.get("top_level_category", ""))
+        return _map_top_level_category(top_level_category)
+
+    def _local_title_group(self, title: str) -> Optional[str]:
+        """The local classifier's top-level category when it clears the confidence bar."""
+        classifier = self.title_classifier
+        if classifier is None:
+            return None
+        label, confidence = classifier.predict(title)
+        min_confidence = self.settings.title_classifier_min_confidence
+        group_name = _map_top_level_category(label or "") if confidence >= min_confidence else None
+        TITLE_CLASSIFIER_ANSWERS.inc(outcome="local" if group_name else "llm")
+        return group_name
 
+    def title_category_paths(
+        self,
+        title: str,
+        group_name: str,
+        model_override: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Category paths for one title inside ``group_name``; None when nothing fits."""
+        categories, _, _category_attempts = self._choose_categories(
+            title=title,
+            description="",
+            brand_for_prompt="",
+            group_name=group_name,
+            model_override=model_override,
+        )
+        return _paths_from_categories(categories)
+
+    def title_image_fallback(
+        self,
+        image_url: Optional[str],
+        language: str,
+        title_error: Optional[Exception] = None,
+        vision_model_override: Optional[str] = None,
+        category_model_override: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Category paths from the product image when the title alone gave none.
+
+        Without an image URL the title failure is re-raised (LLM failures as
+        they are, anything else as a BadRequestError).
+        """
         if not image_url:
             if isinstance(title_error, LLMAllAttemptsFailedError):
                 raise title_error
@@ -1136,6 +1499,129 @@ class MercariAnalyzer:
 
         raise BadRequestError("Image recognition failed to return a category path.")
 
+    def classify_title_groups(
+        self,
+        titles: List[str],
+        language: str,
+        model_override: Optional[str] = None,
+    ) -> List[Optional[str]]:
+        """``classify_title_group`` for many titles in a single model call.
+
+        An entry is ``""`` when the model answered with no known top-level
+        category, and None when the answer for that title is missing; callers
+        retry the None entries one at a time. Titles the local classifier is
+        confident about are answered without the model.
+        """
+        answers: List[Optional[str]] = [self._local_title_group(title) for title in titles]
+        pending = [index for index, answer in enumerate(answers) if not answer]
+        if not pending:
+            return answers
+        listing = "\n".join(
+            f"{number}: {_clean_string(titles[index])}" for number, index in enumerate(pending, start=1)
+        )
+        user_prompt = prompt_store.get("TITLE_CATEGORY_BATCH_USER_PROMPT").format(
+            titles=listing,
+            language_label=_language_label(language),
+        )
+        messages = [
+            {"role": "system", "content": prompt_store.render_system("TITLE_CATEGORY_BATCH_SYSTEM_PROMPT")},
+            {"role": "user", "content": user_prompt},
+        ]
+        parsed = self._call_batched_stage(
+            stage="title_category_batch",
+            primary_model=model_override or self.settings.category_model,
+            messages=messages,
+            temperature=0.3,
+        )
+        for index, answer in zip(pending, _batch_answers(parsed, len(pending))):
+            answers[index] = (
+                (_map_top_level_category(_clean_string(answer.get("top_level_category", ""))) or "")
+                if answer is not None else None
+            )
+        return answers
+
+    def choose_title_categories_batch(
+        self,
+        titles: List[str],
+        group_name: str,
+        model_override: Optional[str] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """``title_category_paths`` for many titles of one group in a single call.
+
+        The candidate paths are sent once for the whole batch. Each entry is the
+        paths payload, ``{}`` when nothing fits, or None when the answer for
+        that title is missing or names a path outside the candidates.
+        """
+        candidates = self.category_store.get_categories_by_group(group_name)
+        if not candidates:
+            return [{} for _ in titles]
+        listing = "\n".join(f"{index}: {_clean_string(title)}" for index, title in enumerate(titles, start=1))
+        user_prompt = _cacheable_user_content(
+            prompt_store.get("CATEGORY_BATCH_USER_PROMPT_TEMPLATE"),
+            "candidate_paths",
+            self.category_store.candidate_block(group_name),
+            self.settings.prompt_cache_control,
+            prefix_store=self.category_store,
+            group_name=group_name,
+            products=listing,
+        )
+        messages = [
+            {"role": "system", "content": prompt_store.render_system("CATEGORY_BATCH_SYSTEM_PROMPT")},
+            {"role": "user", "content": user_prompt},
+        ]
+        parsed = self._call_batched_stage(
+            stage="category_batch",
+            primary_model=model_override or self.settings.category_model,
+            messages=messages,
+            temperature=0.1,
+        )
+        results: List[Optional[Dict[str, Any]]] = []
+        for answer in _batch_answers(parsed, len(titles)):
+            if answer is None:
+                results.append(None)
+                continue
+            categories = self._categories_from_answer(answer, group_name)
+            best = answer.get("best_target_path")
+            if not categories and isinstance(best, str) and best.strip():
+                results.append(None)
+                continue
+            results.append(_paths_from_categories(categories) or {})
+        return results
+
+    def _call_batched_stage(
+        self,
+        *,
+        stage: str,
+        primary_model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+    ) -> Dict[str, Any]:
+        try:
+            parsed, raw_response, attempts = self.category_caller.call_and_parse(
+                stage=stage,
+                primary_model=primary_model,
+                fallback_models=self.settings.category_fallback_models,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=16000,
+                reasoning=self._classification_reasoning(),
+            )
+        except LLMAllAttemptsFailedError as exc:
+            self._record_stage(
+                stage=stage,
+                attempts=[a.__dict__ for a in exc.attempts],
+                messages=messages,
+            )
+            raise
+        self._record_stage(
+            stage=stage,
+            attempts=[a.__dict__ for a in attempts],
+            messages=messages,
+            raw_response=raw_response,
+            parsed=parsed,
+        )
+        return parsed
+
     def _call_title_image_fallback_llm(
         self,
         image_data_urls: List[str],
@@ -1200,6 +1686,7 @@ class MercariAnalyzer:
         image_data_urls: List[str],
         language: str,
         model_override: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Tuple[Dict[str, Any], List[AttemptRecord]]:
         if not image_data_urls:
             raise BadRequestError("Image list is empty.")
@@ -1234,6 +1721,7 @@ class MercariAnalyzer:
                 temperature=0.1,
                 max_tokens=2000,
                 reasoning=self._classification_reasoning(),
+                cancel_token=cancel_token,
             )
         except LLMAllAttemptsFailedError as exc:
             self._record_stage(
@@ -1255,67 +1743,86 @@ class MercariAnalyzer:
         self,
         image_data_urls: List[str],
         model_override: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Tuple[Dict[str, Any], List[AttemptRecord]]:
-        if not image_data_urls:
-            raise BadRequestError("Image list is empty.")
-        image_payloads: List[Dict[str, Any]] = []
-        image_count = len(image_data_urls)
-        for index, url in enumerate(image_data_urls, start=1):
-            image_payloads.append(
-                {
-                    "type": "text",
-                    "text": (
-                        f"Image {index} of {image_count}: inspect this image for any "
-                        "clearly visible actual product price and product evidence for "
-                        "a realistic AI reference price range."
-                    ),
-                }
-            )
-            image_payloads.append({"type": "image_url", "image_url": {"url": url}})
-        messages = [
-            {"role": "system", "content": prompt_store.render_system("PRICE_ONLY_SYSTEM_PROMPT")},
-            {
-                "role": "user",
-                "content": [{"type": "text", "text": prompt_store.get("PRICE_ONLY_USER_PROMPT")}] + image_payloads,
-            },
-        ]
-        primary = (
-            model_override
-            or getattr(self.settings, "price_model", "")
-            or self.settings.vision_model
-        )
-        fallbacks = self.settings.vision_fallback_models
-
-        try:
-            parsed, raw_response, attempts = self.vision_caller.call_and_parse(
-                stage="price_only",
-                primary_model=primary,
-                fallback_models=fallbacks,
-                messages=messages,
-                temperature=0.1,
-                max_tokens=300,
-            )
-        except LLMAllAttemptsFailedError as exc:
-            self._record_stage(
-                stage="price_only",
-                attempts=[a.__dict__ for a in exc.attempts],
-                messages=messages,
-            )
-            raise
-        self._record_stage(
+        return self._call_image_extraction_llm(
+            image_data_urls,
             stage="price_only",
-            attempts=[a.__dict__ for a in attempts],
-            messages=messages,
-            raw_response=raw_response,
-            parsed=parsed,
+            system_prompt_key="PRICE_ONLY_SYSTEM_PROMPT",
+            user_prompt_key="PRICE_ONLY_USER_PROMPT",
+            image_hint=(
+                "clearly visible actual product price and product evidence for "
+                "a realistic AI reference price range."
+            ),
+            primary_model=(
+                model_override
+                or getattr(self.settings, "price_model", "")
+                or self.settings.vision_model
+            ),
+            max_tokens=300,
+            cancel_token=cancel_token,
         )
-        return parsed, attempts
 
     def _call_size_only_llm(
         self,
         image_data_urls: List[str],
         model_override: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Tuple[Dict[str, Any], List[AttemptRecord]]:
+        return self._call_image_extraction_llm(
+            image_data_urls,
+            stage="size_only",
+            system_prompt_key="SIZE_ONLY_SYSTEM_PROMPT",
+            user_prompt_key="SIZE_ONLY_USER_PROMPT",
+            image_hint=(
+                "clearly visible product size text (tags, labels, packaging, "
+                "size charts, printed measurements)."
+            ),
+            primary_model=model_override or self.settings.vision_model,
+            max_tokens=200,
+            cancel_token=cancel_token,
+        )
+
+    def _call_price_size_llm(
+        self,
+        image_data_urls: List[str],
+        model_override: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Tuple[Dict[str, Any], List[AttemptRecord]]:
+        return self._call_image_extraction_llm(
+            image_data_urls,
+            stage="price_size",
+            system_prompt_key="PRICE_SIZE_SYSTEM_PROMPT",
+            user_prompt_key="PRICE_SIZE_USER_PROMPT",
+            image_hint=(
+                "clearly visible actual product price, clearly visible product "
+                "size text (tags, labels, packaging, size charts, printed "
+                "measurements) and product evidence for a realistic AI "
+                "reference price range."
+            ),
+            # Same model as the price link: the range estimate is the harder half.
+            primary_model=(
+                model_override
+                or getattr(self.settings, "price_model", "")
+                or self.settings.vision_model
+            ),
+            max_tokens=400,
+            cancel_token=cancel_token,
+        )
+
+    def _call_image_extraction_llm(
+        self,
+        image_data_urls: List[str],
+        *,
+        stage: str,
+        system_prompt_key: str,
+        user_prompt_key: str,
+        image_hint: str,
+        primary_model: str,
+        max_tokens: int,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Tuple[Dict[str, Any], List[AttemptRecord]]:
+        """One vision call over every image with a fixed prompt pair (price / size links)."""
         if not image_data_urls:
             raise BadRequestError("Image list is empty.")
         image_payloads: List[Dict[str, Any]] = []
@@ -1324,42 +1831,37 @@ class MercariAnalyzer:
             image_payloads.append(
                 {
                     "type": "text",
-                    "text": (
-                        f"Image {index} of {image_count}: inspect this image for any "
-                        "clearly visible product size text (tags, labels, packaging, "
-                        "size charts, printed measurements)."
-                    ),
+                    "text": f"Image {index} of {image_count}: inspect this image for any {image_hint}",
                 }
             )
             image_payloads.append({"type": "image_url", "image_url": {"url": url}})
         messages = [
-            {"role": "system", "content": prompt_store.render_system("SIZE_ONLY_SYSTEM_PROMPT")},
+            {"role": "system", "content": prompt_store.render_system(system_prompt_key)},
             {
                 "role": "user",
-                "content": [{"type": "text", "text": prompt_store.get("SIZE_ONLY_USER_PROMPT")}] + image_payloads,
+                "content": [{"type": "text", "text": prompt_store.get(user_prompt_key)}] + image_payloads,
             },
         ]
-        primary = model_override or self.settings.vision_model
-        fallbacks = self.settings.vision_fallback_models
 
         try:
             parsed, raw_response, attempts = self.vision_caller.call_and_parse(
-                stage="size_only",
-                primary_model=primary,
-                fallback_models=fallbacks,
+                stage=stage,
+                primary_model=primary_model,
+                fallback_models=self.settings.vision_fallback_models,
                 messages=messages,
                 temperature=0.1,
-                max_tokens=200,
+                max_tokens=max_tokens,
+                cancel_token=cancel_token,
             )
         except LLMAllAttemptsFailedError as exc:
             self._record_stage(
-                stage="size_only",
+                stage=stage,
                 attempts=[a.__dict__ for a in exc.attempts],
                 messages=messages,
             )
             raise
         self._record_stage(
-            stage="size_only",
+            stage=stage,
             attempts=[a.__dict__ for a in attempts],
             messages=messages,
             raw_response=raw_response,
@@ -1373,6 +1875,7 @@ class MercariAnalyzer:
         language: str,
         model_override: Optional[str] = None,
         use_fallback_prompt: bool = False,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> Tuple[Dict[str, Any], Dict[str, Any], List[AttemptRecord]]:
         if not image_data_urls:
             raise BadRequestError("Image list is empty.")
@@ -1427,6 +1930,7 @@ class MercariAnalyzer:
                 messages=messages,
                 temperature=0.2,
                 max_tokens=12000,
+                cancel_token=cancel_token,
             )
         except LLMAllAttemptsFailedError as exc:
             self._record_stage(
@@ -1580,19 +2084,37 @@ class MercariAnalyzer:
         brand_for_prompt: str,
         group_name: str,
         model_override: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        path_matches: Optional[List[Dict[str, Any]]] = None,
     ) -> Tuple[List[Dict[str, str]], Optional[Dict[str, Any]], List[AttemptRecord]]:
         candidates = self.category_store.get_categories_by_group(group_name)
         if not candidates:
             return [], None, []
 
-        candidate_paths = [item["name"] for item in candidates]
-        candidate_block = "\n".join(candidate_paths)
-        user_prompt = prompt_store.get("CATEGORY_USER_PROMPT_TEMPLATE").format(
+        candidate_block = self.category_store.candidate_block(group_name)
+        # The full group list reuses the store's rendered prefix; a narrowed
+        # list is specific to this title and is rendered uncached.
+        prefix_store: Optional[CategoryStore] = self.category_store
+        node_attempts: List[AttemptRecord] = []
+        threshold = self.settings.category_hierarchical_threshold
+        if threshold and len(candidates) > threshold:
+            narrowed, node_attempts = self._narrow_candidates(
+                title, description, brand_for_prompt, group_name, threshold, model_override, cancel_token
+            )
+            if narrowed:
+                candidate_block = "\n".join(item["name"] for item in narrowed)
+                prefix_store = None
+
+        user_prompt = _cacheable_user_content(
+            prompt_store.get("CATEGORY_USER_PROMPT_TEMPLATE"),
+            "candidate_paths",
+            candidate_block,
+            self.settings.prompt_cache_control,
+            prefix_store=prefix_store,
             title=title,
             description=description,
             brand=brand_for_prompt,
             group_name=group_name,
-            candidate_paths=candidate_block,
         )
         messages = [
             {"role": "system", "content": prompt_store.render_system("CATEGORY_SYSTEM_PROMPT")},
@@ -1611,6 +2133,7 @@ class MercariAnalyzer:
                 temperature=0.1,
                 max_tokens=16000,
                 reasoning=self._classification_reasoning(),
+                cancel_token=cancel_token,
             )
         except LLMAllAttemptsFailedError as exc:
             self._record_stage(
@@ -1627,6 +2150,96 @@ class MercariAnalyzer:
             parsed=parsed,
         )
 
+        categories = self._categories_from_answer(parsed, group_name, path_matches)
+        return categories, parsed, node_attempts + attempts
+
+    def _narrow_candidates(
+        self,
+        title: str,
+        description: str,
+        brand_for_prompt: str,
+        group_name: str,
+        threshold: int,
+        model_override: Optional[str],
+        cancel_token: Optional[CancellationToken],
+    ) -> Tuple[List[Dict[str, str]], List[AttemptRecord]]:
+        """The categories under the second-level nodes the model picks for a large group.
+
+        Nodes hold at most ``threshold / CATEGORY_NODE_PICKS`` categories each, so
+        the picked nodes together stay around the threshold. An empty list
+        (failed call, no valid pick) means the caller keeps the full list.
+        """
+        nodes = self.category_store.category_nodes(group_name, max(1, threshold // CATEGORY_NODE_PICKS))
+        if len(nodes) < 2:
+            return [], []
+        user_prompt = _cacheable_user_content(
+            prompt_store.get("CATEGORY_NODE_USER_PROMPT_TEMPLATE"),
+            "candidate_nodes",
+            "\n".join(node.path for node in nodes),
+            self.settings.prompt_cache_control,
+            title=title,
+            description=description,
+            brand=brand_for_prompt,
+            group_name=group_name,
+        )
+        messages = [
+            {"role": "system", "content": prompt_store.render_system("CATEGORY_NODE_SYSTEM_PROMPT")},
+            {"role": "user", "content": user_prompt},
+        ]
+        try:
+            parsed, raw_response, attempts = self.category_caller.call_and_parse(
+                stage="category_node",
+                primary_model=model_override or self.settings.category_model,
+                fallback_models=self.settings.category_fallback_models,
+                messages=messages,
+                temperature=0.1,
+                max_tokens=16000,
+                reasoning=self._classification_reasoning(),
+                cancel_token=cancel_token,
+            )
+        except LLMAllAttemptsFailedError as exc:
+            self._record_stage(
+                stage="category_node",
+                attempts=[a.__dict__ for a in exc.attempts],
+                messages=messages,
+            )
+            if cancel_token is not None and cancel_token.cancelled:
+                raise
+            _logger.warning("Category node pick failed for %s; sending every path", group_name)
+            CATEGORY_NARROWING.inc(outcome="fallback")
+            return [], list(exc.attempts)
+        self._record_stage(
+            stage="category_node",
+            attempts=[a.__dict__ for a in attempts],
+            messages=messages,
+            raw_response=raw_response,
+            parsed=parsed,
+        )
+
+        by_label = {normalize_category_label(node.path): node for node in nodes}
+        picked = parsed.get("nodes") if isinstance(parsed, dict) else None
+        chosen: List[Dict[str, str]] = []
+        seen = set()
+        for label in (picked if isinstance(picked, list) else [])[:CATEGORY_NODE_PICKS]:
+            node = by_label.get(normalize_category_label(label)) if isinstance(label, str) else None
+            if node is None or node.path in seen:
+                continue
+            seen.add(node.path)
+            chosen.extend(node.entries)
+        CATEGORY_NARROWING.inc(outcome="narrowed" if chosen else "fallback")
+        return chosen, attempts
+
+    def _categories_from_answer(
+        self,
+        parsed: Dict[str, Any],
+        group_name: str,
+        path_matches: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, str]]:
+        """Up to 3 candidate categories named by one category-selection answer.
+
+        Paths that are not an exact candidate are reconciled to the closest one
+        in the group; how each path was matched is appended to ``path_matches``.
+        """
         ordered_paths: List[Tuple[str, float]] = []
         best = parsed.get("best_target_path")
         if isinstance(best, str) and best.strip():
@@ -1645,6 +2258,7 @@ class MercariAnalyzer:
         # case the model returns more (e.g. duplicates after candidate matching).
         max_results = 3
         seen = set()
+        matched_ids = set()
         results: List[Dict[str, str]] = []
         for path, confidence in ordered_paths:
             path_clean = compress_whitespace(path)
@@ -1653,7 +2267,23 @@ class MercariAnalyzer:
                 continue
             seen.add(key)
             match = self.category_store.find_category(group_name, path_clean)
-            if match:
+            outcome, similarity = "exact", 1.0
+            if match is None:
+                min_similarity = self.settings.category_match_min_similarity
+                closest = self.category_store.closest_category(group_name, path_clean, min_similarity)
+                match, similarity = closest if closest else (None, 0.0)
+                outcome = "fuzzy" if match else "unmatched"
+            CATEGORY_PATH_MATCHES.inc(outcome=outcome)
+            if path_matches is not None:
+                path_matches.append({
+                    "path": path_clean,
+                    "outcome": outcome,
+                    "matched_path": match["name"] if match else "",
+                    "similarity": similarity,
+                })
+            # A reconciled path can land on a category already in the list.
+            if match and match["id"] not in matched_ids:
+                matched_ids.add(match["id"])
                 results.append(
                     {
                         "id": match["id"],
@@ -1671,7 +2301,7 @@ class MercariAnalyzer:
             if len(results) >= max_results:
                 break
 
-        return results, parsed, attempts
+        return results
 
     def _classify_title_fallback_image_to_paths(
         self,
@@ -0,0 +1,117 @@
+"""Title categorization for many titles at once, through batched prompts.
+
+``TitleBatchCategorizer.categorize`` gives the same answer as
+``MercariAnalyzer.analyze_title`` for one title, but the two title-only model
+calls are micro-batched across concurrent callers: titles are first packed into
+one top-level-group prompt, then every title of the same group is packed into
+one category-selection prompt that carries that group's candidate paths once.
+
+Titles the near-duplicate title cache already knows skip both calls. Any
+title the batched answer does not cover -- the call failed, the JSON did
+not parse, the title's entry is missing or names a path outside the
+candidates -- is retried with the single-title call, and titles the model
+cannot place go to the image fallback exactly as in ``analyze_title``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .batching import MicroBatcher
+from .errors import BadRequestError, LLMAllAttemptsFailedError
+from .pipeline import StageRunner
+
+
+# Titles a caller should keep in flight, in batches: enough to keep the
+# batchers full without starting one task per item of a 10k-item request.
+WINDOW_BATCHES = 4
+
+
+async def _to_thread(_name: str, fn: Callable[..., Any], /, *args: Any) -> Any:
+    return await asyncio.to_thread(fn, *args)
+
+
+class TitleBatchCategorizer:
+    def __init__(
+        self,
+        analyzer: Any,
+        *,
+        language: str,
+        batch_size: int,
+        max_wait_s: float,
+        runner: StageRunner = _to_thread,
+    ) -> None:
+        self.analyzer = analyzer
+        self.language = language
+        self.window = max(1, batch_size) * WINDOW_BATCHES
+        self._runner = runner
+        self._groups = MicroBatcher(self._flush_groups, batch_size=batch_size, max_wait_s=max_wait_s)
+        self._paths = MicroBatcher(self._flush_paths, batch_size=batch_size, max_wait_s=max_wait_s)
+        # Model calls made so far: batched prompts and single-title retries.
+        self.batched_calls = 0
+        self.single_calls = 0
+        # Titles answered by the near-duplicate title cache, without a model call.
+        self.cache_hits = 0
+
+    async def categorize(self, title: str, image_url: Optional[str] = None) -> Dict[str, Any]:
+        title = " ".join(str(title or "").split())
+        if not title:
+            raise BadRequestError("Title is required.")
+
+        cached = await self._runner("title_cache", self.analyzer.cached_title_result, title)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        paths: Optional[Dict[str, Any]] = None
+        title_error: Optional[Exception] = None
+        try:
+            group_name = await self._groups.submit(None, title)
+            if group_name is None:
+                self.single_calls += 1
+                group_name = await self._runner(
+                    "title_category", self.analyzer.classify_title_group, title, self.language
+                )
+            if group_name:
+                paths = await self._paths.submit(group_name, title)
+                if paths is None:
+                    self.single_calls += 1
+                    paths = await self._runner(
+                        "category", self.analyzer.title_category_paths, title, group_name
+                    )
+        except (BadRequestError, LLMAllAttemptsFailedError) as exc:
+            title_error = exc
+
+        if paths:
+            return paths
+        return await self._runner(
+            "title_image_fallback", self.analyzer.title_image_fallback, image_url, self.language, title_error
+        )
+
+    async def _flush_groups(self, _key: Hashable, titles: List[str]) -> List[Optional[str]]:
+        if len(titles) == 1:
+            # A batch of one is the single-title call; leave it to the retry path.
+            return [None]
+        return await self._batched(
+            "title_category_batch", self.analyzer.classify_title_groups, titles, self.language
+        )
+
+    async def _flush_paths(self, group_name: Hashable, titles: List[str]) -> List[Optional[Dict[str, Any]]]:
+        if len(titles) == 1:
+            return [None]
+        return await self._batched(
+            "category_batch", self.analyzer.choose_title_categories_batch, titles, group_name
+        )
+
+    async def _batched(self, name: str, fn: Callable[..., List[Any]], titles: List[str], arg: Any) -> List[Any]:
+        self.batched_calls += 1
+        try:
+            return await self._runner(name, fn, titles, arg)
+        except (BadRequestError, LLMAllAttemptsFailedError):
+            # Every title of a failed batch is retried on its own.
+            return [None] * len(titles)
+
+    def close(self) -> None:
+        self._groups.close()
+        self._paths.close()
@@ -0,0 +1,290 @@
+"""Near-duplicate title -> category answer cache.
+
+Past successful answers (``/title/analyze`` results and the generated title of
+``/image/analyze`` classifications, read back from the observability store)
+are indexed by their normalised title in a SQLite file. A lookup shingles the
+title into character 3-grams, takes a 64-permutation MinHash signature and
+uses LSH (16 bands of 4 rows) to find candidates sharing a band; the best
+candidate whose exact shingle Jaccard similarity reaches ``min_similarity`` is
+returned, so the title needs no LLM call at all.
+
+The index is built offline with ``scripts/title_cache.py rebuild`` and kept
+current with ``scripts/title_cache.py update``; the service only reads it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .observability.paths import artifact_dir
+from .utils import normalize_text
+
+
+_logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Changing any MinHash parameter invalidates stored band keys; rebuild on mismatch.
+INDEX_FORMAT = f"minhash-v1-{SHINGLE_SIZE}-{NUM_PERM}-{BANDS}"
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20260519)
+_PERMUTATIONS: List[Tuple[int, int]] = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)
+]
+
+# Path fields of an analyze_title answer (see service._paths_from_categories).
+PATH_FIELDS = (
+    "best_target_path", "best_category_id", "rakuten_id", "meru_id", "rakuma_id",
+    "zenplus_id", "meru_path", "rakuma_path", "zenplus_path",
+)
+
+TITLE_ENDPOINT = "/api/v1/mercari/title/analyze"
+IMAGE_ENDPOINT = "/api/v1/mercari/image/analyze"
+
+
+class TitleRecord(NamedTuple):
+    title: str
+    result: Dict[str, Any]
+    source: str
+    request_id: str = ""
+    recorded_at: str = ""
+
+
+def normalize_title(title: str) -> str:
+    return normalize_text(title or "")
+
+
+def shingles(normalized: str) -> FrozenSet[str]:
+    compact = "".join(normalized.split())
+    if len(compact) <= SHINGLE_SIZE:
+        return frozenset([compact]) if compact else frozenset()
+    return frozenset(compact[i:i + SHINGLE_SIZE] for i in range(len(compact) - SHINGLE_SIZE + 1))
+
+
+def minhash(grams: FrozenSet[str]) -> List[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big") for g in grams]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_keys(signature: List[int]) -> List[str]:
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode("ascii"), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class TitleAnswerCache:
+    """MinHash/LSH index of past title answers in a SQLite file."""
+
+    def __init__(self, path: Union[str, Path], min_similarity: float = 0.9) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.min_similarity = float(min_similarity)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS title_cache_entries ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, normalized TEXT NOT NULL UNIQUE,"
+                " title TEXT NOT NULL, result TEXT NOT NULL, source TEXT NOT NULL,"
+                " request_id TEXT, recorded_at TEXT)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS title_cache_bands (key TEXT NOT NULL, entry_id INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_title_cache_bands ON title_cache_bands(key)")
+            conn.execute("CREATE TABLE IF NOT EXISTS title_cache_meta (name TEXT PRIMARY KEY, value TEXT)")
+            stored = conn.execute("SELECT value FROM title_cache_meta WHERE name = 'format'").fetchone()
+            if stored is None:
+                conn.execute("INSERT INTO title_cache_meta (name, value) VALUES ('format', ?)", (INDEX_FORMAT,))
+            elif stored[0] != INDEX_FORMAT:
+                raise ValueError(f"Title cache {self.path} uses {stored[0]}; rebuild it for {INDEX_FORMAT}.")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, title: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """The answer of the most similar indexed title and its similarity, if close enough."""
+        normalized = normalize_title(title)
+        grams = shingles(normalized)
+        if not grams:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM title_cache_entries WHERE normalized = ?", (normalized,)
+            ).fetchone()
+            if row is not None:
+                return json.loads(row[0]), 1.0
+            keys = band_keys(minhash(grams))
+            candidates = conn.execute(
+                "SELECT DISTINCT e.normalized, e.result FROM title_cache_bands b"
+                " JOIN title_cache_entries e ON e.id = b.entry_id"
+                f" WHERE b.key IN ({','.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+        best: Optional[Tuple[Dict[str, Any], float]] = None
+        for candidate, result in candidates:
+            similarity = jaccard(grams, shingles(candidate))
+            if similarity >= self.min_similarity and (best is None or similarity > best[1]):
+                best = (result, similarity)
+        if best is None:
+            return None
+        return json.loads(best[0]), best[1]
+
+    def add_many(self, records: Iterable[TitleRecord], replace: bool = False) -> int:
+        """Index ``records`` in one transaction; a later answer for the same title wins.
+
+        With ``replace`` the existing entries are dropped in the same
+        transaction, so a running service never sees a half-built index.
+        """
+        added = 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if replace:
+                    self._clear(conn)
+                for record in records:
+                    added += self._add(conn, record)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def _add(self, conn: sqlite3.Connection, record: TitleRecord) -> int:
+        normalized = normalize_title(record.title)
+        grams = shingles(normalized)
+        if not grams or not record.result.get("best_target_path"):
+            return 0
+        existing = conn.execute(
+            "SELECT id FROM title_cache_entries WHERE normalized = ?", (normalized,)
+        ).fetchone()
+        payload = json.dumps(record.result, ensure_ascii=False)
+        if existing is not None:
+            conn.execute(
+                "UPDATE title_cache_entries SET title = ?, result = ?, source = ?, request_id = ?, recorded_at = ?"
+                " WHERE id = ?",
+                (record.title, payload, record.source, record.request_id, record.recorded_at, existing[0]),
+            )
+            return 1
+        cur = conn.execute(
+            "INSERT INTO title_cache_entries (normalized, title, result, source, request_id, recorded_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (normalized, record.title, payload, record.source, record.request_id, record.recorded_at),
+        )
+        conn.executemany(
+            "INSERT INTO title_cache_bands (key, entry_id) VALUES (?, ?)",
+            [(key, cur.lastrowid) for key in band_keys(minhash(grams))],
+        )
+        return 1
+
+    @staticmethod
+    def _clear(conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM title_cache_bands")
+        conn.execute("DELETE FROM title_cache_entries")
+        conn.execute("DELETE FROM title_cache_meta WHERE name = 'indexed_until'")
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM title_cache_entries").fetchone()[0]
+
+    @property
+    def indexed_until(self) -> str:
+        """Timestamp of the newest observability request already indexed ('' for none)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM title_cache_meta WHERE name = 'indexed_until'").fetchone()
+        return row[0] if row else ""
+
+    @indexed_until.setter
+    def indexed_until(self, value: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO title_cache_meta (name, value) VALUES ('indexed_until', ?)", (value,)
+            )
+
+
+def load_title_cache(path: str, min_similarity: float) -> Optional[TitleAnswerCache]:
+    """The index at ``path``, or None when it has not been built (or is unusable)."""
+    if not path or not Path(path).is_file():
+        return None
+    try:
+        return TitleAnswerCache(path, min_similarity=min_similarity)
+    except (sqlite3.Error, ValueError) as exc:
+        _logger.warning("Ignoring title cache %s: %s", path, exc)
+        return None
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _answer_from_response(body: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(body, dict) or not body.get("best_target_path"):
+        return None
+    answer = {field: body.get(field) or "" for field in PATH_FIELDS}
+    answer["alternatives"] = body.get("alternatives") if isinstance(body.get("alternatives"), list) else []
+    return answer
+
+
+def records_from_observability(db_path: str, store_root: str, since: str = "") -> List[TitleRecord]:
+    """Successful title and image classification answers recorded after ``since``, oldest first.
+
+    Title requests contribute the submitted title; image requests the title
+    the fast classification stage generated for the image.
+    """
+    if not Path(db_path).is_file():
+        return []
+    root = Path(store_root)
+    with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+        rows = conn.execute(
+            "SELECT r.request_id, r.timestamp_utc, r.endpoint,"
+            " (SELECT parsed_file FROM llm_calls c WHERE c.request_id = r.request_id"
+            "  AND c.stage = 'fast_classification' AND c.status = 'ok' AND c.parsed_file IS NOT NULL"
+            "  ORDER BY c.id DESC LIMIT 1)"
+            " FROM requests r WHERE r.endpoint IN (?, ?) AND r.status_code = 200 AND r.timestamp_utc > ?"
+            " ORDER BY r.timestamp_utc",
+            (TITLE_ENDPOINT, IMAGE_ENDPOINT, since or ""),
+        ).fetchall()
+    records: List[TitleRecord] = []
+    for request_id, recorded_at, endpoint, fast_parsed_file in rows:
+        folder = artifact_dir(root, recorded_at[:10], request_id)
+        response = _read_json(folder / "response.json") or {}
+        answer = _answer_from_response((response.get("body") or {}).get("json"))
+        if answer is None:
+            continue
+        if endpoint == TITLE_ENDPOINT:
+            request = _read_json(folder / "request.json") or {}
+            body = (request.get("body") or {}).get("json")
+            title = body.get("title") if isinstance(body, dict) else None
+            source = "title"
+        else:
+            parsed = _read_json(root / fast_parsed_file) if fast_parsed_file else None
+            title = parsed.get("title") if isinstance(parsed, dict) else None
+            source = "image"
+        if isinstance(title, str) and title.strip():
+            records.append(TitleRecord(title.strip(), answer, source, request_id, recorded_at))
+    return records
@@ -0,0 +1,276 @@
+"""Local title -> top-level category classifier.
+
+The first model call of /title/analyze only picks one of
+``TOP_LEVEL_CATEGORIES``. ``TitleGroupClassifier`` answers that question
+locally: multinomial naive Bayes over L2-normalised TF-IDF weights of
+character 1-3 grams, a linear model small enough to score a title in well
+under a millisecond in plain Python. It is trained offline by
+``scripts/train_title_classifier.py`` from the category CSV paths and the
+title -> group decisions the LLM made earlier (recorded by the observability
+store), and saved as JSON. ``MercariAnalyzer`` uses it only when the top
+class' posterior clears ``TITLE_CLASSIFIER_MIN_CONFIDENCE``; everything else
+still goes to the LLM.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import math
+import re
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .constants import TOP_LEVEL_CATEGORIES
+from .utils import normalize_category_label, normalize_text
+
+
+_logger = logging.getLogger(__name__)
+
+MODEL_VERSION = 1
+NGRAM_RANGE = (1, 3)
+
+Example = Tuple[str, str]  # (text, top-level category)
+
+_TOP_LEVEL_BY_LABEL = {normalize_category_label(name): name for name in TOP_LEVEL_CATEGORIES}
+_PROMPT_TITLE_RE = re.compile(r"^Product title:\s*(.+)$", re.MULTILINE)
+
+
+def title_features(text: str) -> Counter:
+    """Character n-gram counts of the normalised text (word edges padded)."""
+    normalized = normalize_text(text or "")
+    counts: Counter = Counter()
+    if not normalized:
+        return counts
+    padded = f" {normalized} "
+    low, high = NGRAM_RANGE
+    for n in range(low, high + 1):
+        for start in range(len(padded) - n + 1):
+            gram = padded[start:start + n]
+            if gram.strip():
+                counts[gram] += 1
+    return counts
+
+
+def _tfidf(counts: Counter, idf: Dict[str, float]) -> Dict[str, float]:
+    weights = {gram: (1.0 + math.log(count)) * idf[gram] for gram, count in counts.items() if gram in idf}
+    norm = math.sqrt(sum(value * value for value in weights.values()))
+    if norm <= 0:
+        return {}
+    return {gram: value / norm for gram, value in weights.items()}
+
+
+class TitleGroupClassifier:
+    def __init__(
+        self,
+        labels: Sequence[str],
+        log_priors: Sequence[float],
+        defaults: Sequence[float],
+        idf: Dict[str, float],
+        deltas: Dict[str, Dict[int, float]],
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.labels = list(labels)
+        self.log_priors = list(log_priors)
+        # log P(gram | class) is ``defaults[c] + deltas[gram].get(c, 0.0)``:
+        # the smoothed value for a gram never seen with the class, plus a
+        # sparse correction for the classes it was seen with.
+        self.defaults = list(defaults)
+        self.idf = idf
+        self.deltas = deltas
+        self.meta = dict(meta or {})
+
+    @classmethod
+    def train(cls, examples: Iterable[Example], alpha: float = 0.1) -> "TitleGroupClassifier":
+        docs: List[Tuple[Counter, str]] = [(title_features(text), label) for text, label in examples]
+        docs = [(counts, label) for counts, label in docs if counts and label]
+        if not docs:
+            raise ValueError("No training examples.")
+        labels = sorted({label for _counts, label in docs})
+        index = {label: i for i, label in enumerate(labels)}
+
+        df: Counter = Counter()
+        for counts, _label in docs:
+            df.update(counts.keys())
+        total = len(docs)
+        idf = {gram: math.log((1.0 + total) / (1.0 + count)) + 1.0 for gram, count in df.items()}
+
+        class_docs = [0] * len(labels)
+        class_mass = [0.0] * len(labels)
+        gram_mass: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for counts, label in docs:
+            c = index[label]
+            class_docs[c] += 1
+            for gram, weight in _tfidf(counts, idf).items():
+                gram_mass[gram][c] = gram_mass[gram].get(c, 0.0) + weight
+                class_mass[c] += weight
+
+        vocab = len(idf)
+        denominators = [mass + alpha * vocab for mass in class_mass]
+        defaults = [math.log(alpha / denominator) for denominator in denominators]
+        deltas = {
+            gram: {c: math.log((mass + alpha) / alpha) for c, mass in per_class.items()}
+            for gram, per_class in gram_mass.items()
+        }
+        log_priors = [math.log(count / total) for count in class_docs]
+        meta = {"examples": total, "alpha": alpha, "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        return cls(labels, log_priors, defaults, idf, deltas, meta)
+
+    def predict(self, title: str) -> Tuple[Optional[str], float]:
+        """Best label and its posterior probability; ``(None, 0.0)`` for unseen text."""
+        weights = _tfidf(title_features(title), self.idf)
+        if not weights:
+            return None, 0.0
+        mass = sum(weights.values())
+        scores = [prior + default * mass for prior, default in zip(self.log_priors, self.defaults)]
+        for gram, weight in weights.items():
+            for c, delta in self.deltas.get(gram, {}).items():
+                scores[c] += weight * delta
+        top = max(range(len(scores)), key=scores.__getitem__)
+        best = scores[top]
+        normalizer = sum(math.exp(score - best) for score in scores)
+        return self.labels[top], 1.0 / normalizer
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": MODEL_VERSION,
+            "ngram_range": list(NGRAM_RANGE),
+            "labels": self.labels,
+            "log_priors": self.log_priors,
+            "defaults": self.defaults,
+            "idf": self.idf,
+            "deltas": {gram: [[c, delta] for c, delta in per_class.items()] for gram, per_class in self.deltas.items()},
+            "meta": self.meta,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "TitleGroupClassifier":
+        if payload.get("version") != MODEL_VERSION or list(payload.get("ngram_range") or []) != list(NGRAM_RANGE):
+            raise ValueError("Unsupported title classifier model version.")
+        deltas = {gram: {int(c): float(delta) for c, delta in pairs} for gram, pairs in payload["deltas"].items()}
+        return cls(
+            payload["labels"],
+            payload["log_priors"],
+            payload["defaults"],
+            {gram: float(value) for gram, value in payload["idf"].items()},
+            deltas,
+            payload.get("meta"),
+        )
+
+    def save(self, path: str) -> None:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+        tmp.replace(target)
+
+    @classmethod
+    def load(cls, path: str) -> "TitleGroupClassifier":
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def load_title_classifier(path: str) -> Optional[TitleGroupClassifier]:
+    """The trained model at ``path``, or None when it is not configured or unreadable."""
+    if not path or not Path(path).is_file():
+        return None
+    try:
+        return TitleGroupClassifier.load(path)
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        _logger.warning("Ignoring title classifier model %s: %s", path, exc)
+        return None
+
+
+def top_level_label(value: str) -> Optional[str]:
+    """The ``TOP_LEVEL_CATEGORIES`` entry ``value`` names exactly, if any."""
+    return _TOP_LEVEL_BY_LABEL.get(normalize_category_label(value or ""))
+
+
+def examples_from_category_csv(path: str) -> List[Example]:
+    """One example per category path: the segments below the top level, labelled with it.
+
+    Rows whose group is not one of ``TOP_LEVEL_CATEGORIES`` are skipped.
+    """
+    examples: List[Example] = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            segments = [part.strip() for part in re.split(r"\s*>\s*", row.get("path") or "") if part.strip()]
+            label = top_level_label(row.get("group_name") or (segments[0] if segments else ""))
+            if label is None:
+                continue
+            if segments and top_level_label(segments[0]) == label:
+                segments = segments[1:]
+            if segments:
+                examples.append((" ".join(segments), label))
+    return examples
+
+
+def examples_from_observability(db_path: str, store_root: str) -> List[Example]:
+    """Title -> group decisions from successful ``title_category`` LLM calls.
+
+    The title is read back from the recorded prompt and the label from the
+    parsed answer; the latest answer wins for a repeated title.
+    """
+    if not Path(db_path).is_file():
+        return []
+    root = Path(store_root)
+    with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+        rows = conn.execute(
+            "SELECT prompt_file, parsed_file FROM llm_calls"
+            " WHERE stage = 'title_category' AND status = 'ok'"
+            " AND prompt_file IS NOT NULL AND parsed_file IS NOT NULL"
+            " ORDER BY timestamp_utc"
+        ).fetchall()
+    by_title: Dict[str, str] = {}
+    for prompt_file, parsed_file in rows:
+        try:
+            messages = json.loads((root / prompt_file).read_text(encoding="utf-8")).get("messages") or []
+            parsed = json.loads((root / parsed_file).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        user = next((m.get("content") for m in messages if m.get("role") == "user"), None)
+        match = _PROMPT_TITLE_RE.search(user) if isinstance(user, str) else None
+        label = top_level_label(str(parsed.get("top_level_category") or "")) if isinstance(parsed, dict) else None
+        if match and label:
+            by_title[match.group(1).strip()] = label
+    return list(by_title.items())
+
+
+def evaluate(
+    classifier: TitleGroupClassifier,
+    examples: Sequence[Example],
+    thresholds: Sequence[float] = (0.5, 0.7, 0.8, 0.9, 0.95),
+) -> Dict[str, Any]:
+    """Accuracy, per-threshold coverage/accuracy and predict latency on ``examples``."""
+    predictions: List[Tuple[bool, float]] = []
+    latencies: List[float] = []
+    for text, label in examples:
+        started = time.perf_counter()
+        predicted, confidence = classifier.predict(text)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        predictions.append((predicted == label, confidence))
+
+    def _percentile(q: float) -> Optional[float]:
+        if not latencies:
+            return None
+        ranked = sorted(latencies)
+        return round(ranked[min(len(ranked) - 1, int(math.ceil(q * len(ranked))) - 1)], 4)
+
+    total = len(predictions)
+    by_threshold = []
+    for threshold in thresholds:
+        answered = [correct for correct, confidence in predictions if confidence >= threshold]
+        by_threshold.append({
+            "threshold": threshold,
+            "coverage": round(len(answered) / total, 4) if total else None,
+            "accuracy": round(sum(answered) / len(answered), 4) if answered else None,
+        })
+    return {
+        "examples": total,
+        "accuracy": round(sum(correct for correct, _c in predictions) / total, 4) if total else None,
+        "thresholds": by_threshold,
+        "latency_ms": {"p50": _percentile(0.5), "p95": _percentile(0.95), "p99": _percentile(0.99)},
+    }
@@ -1,21 +1,30 @@
 import asyncio
+import gc
 import hmac
 import ipaddress
 import json
+import logging
 import os
 import socket
 import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 from contextlib import suppress
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
-from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.concurrency import run_in_threadpool
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from starlette.datastructures import UploadFile as _Upload
@@ -27,13 +36,19 @@ from app.constants import DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES
 from app.console_accounts import ALL_MENUS, SUBACCOUNT_ROLE, SUPERADMIN_ROLE, ConsoleAccountStore
 from app.data.brands import BrandStore
 from app.data.categories import CategoryStore
+from app.data.reloader import ReloadableStore
 from app.evaluation.image_model_evaluation import ModelCombination, build_result_row
 from app.evaluation.runs import EvaluationRunConfig, EvaluationRunStore
-from app.errors import BadRequestError, LLMAllAttemptsFailedError
+from app.errors import BadRequestError, ExecutorSaturatedError, LLMAllAttemptsFailedError, StageDeadlineError
+from app.executor import BoundedExecutor
 from app.image_processing import compress_image_if_needed
-from app.jobs import AnalysisJobStore
+from app.jobs import AnalysisJobStore, create_job_backend, primary_started_at, wait_for_job_update
+from app.llm.cancellation import CancellationToken
 from app.llm.client import OpenRouterClient
+from app.llm import scheduler as llm_scheduler
 from app.observability import context as obs_ctx
+from app.observability import metrics as obs_metrics
+from app.observability import tracing
 from app.observability.api import build_router as build_obs_router
 from app.observability.auth import (
     COOKIE_NAME,
@@ -50,6 +65,7 @@ from app.observability.recorder import Recorder
 from app.observability.retention import prune as obs_prune
 from app.observability.store import Store as ObsStore
 from app.llm import prompt_store
+from app.pipeline import COMPLETED as STAGE_COMPLETED, Stage, StagePipeline
 from app.runtime_config import get_public_config, update_runtime_config
 from app import service as _svc_module
 from app.service import MercariAnalyzer
@@ -57,8 +73,12 @@ from app.showcase.archive import ArchiveWriter as ShowcaseArchiveWriter
 from app.showcase.openrouter_image_client import OpenRouterImageClient
 from app.showcase.service import ShowcaseService
 from app.showcase.storage import StorageManager as ShowcaseStorageManager
+from app.title_batch import TitleBatchCategorizer
+from app.title_cache import load_title_cache
+from app.title_classifier import load_title_classifier
 from app.utils import fetch_image_from_url, parse_bool_param
 
+_logger = logging.getLogger(__name__)
 settings = load_settings()
 CONSOLE_USERS_PATH = Path(os.getenv("CONSOLE_USERS_PATH", str(BASE_DIR / "data" / "console_users.json")))
 console_account_store = ConsoleAccountStore(CONSOLE_USERS_PATH, superadmin_username=settings.logs_user)
@@ -116,8 +136,20 @@ _obs_store = ObsStore(BASE_DIR / "logs" / "observability.db")
 _obs_store.init_schema()
 recorder = Recorder(store=_obs_store, store_root=BASE_DIR / "logs" / "store")
 _svc_module.set_recorder(recorder)
-brand_store = BrandStore(settings.brand_csv_path)
-category_store = CategoryStore(settings.category_csv_path)
+span_writer = tracing.SpanWriter(_obs_store.insert_spans)
+tracing.set_sink(span_writer)
+brand_store = ReloadableStore(
+    "brands", settings.brand_csv_path,
+    lambda: BrandStore(settings.brand_csv_path, snapshot_path=settings.brand_snapshot_path),
+)
+category_store = ReloadableStore(
+    "categories", settings.category_csv_path,
+    lambda: CategoryStore(settings.category_csv_path, snapshot_path=settings.category_snapshot_path),
+)
+reference_stores: Dict[str, ReloadableStore] = {"brands": brand_store, "categories": category_store}
+# Keep the collector off everything loaded so far (mostly the reference tables):
+# workers forked from a preloading master then share those pages copy-on-write.
+gc.freeze()
 vision_client = OpenRouterClient(
     api_key=settings.openrouter_api_key,
     base_url=settings.openrouter_base_url,
@@ -141,22 +173,66 @@ analyzer = MercariAnalyzer(
     category_store=category_store,
     vision_client=vision_client,
     category_client=category_client,
+    title_classifier=load_title_classifier(settings.title_classifier_path),
+    title_cache=load_title_cache(settings.title_cache_path, settings.title_cache_min_similarity),
+)
+llm_scheduler.set_scheduler(
+    llm_scheduler.LLMScheduler(
+        settings.llm_max_concurrency,
+        weights={
+            llm_scheduler.INTERACTIVE: settings.llm_interactive_weight,
+            llm_scheduler.BACKGROUND: settings.llm_background_weight,
+            llm_scheduler.BATCH: settings.llm_batch_weight,
+        },
+        caps={
+            llm_scheduler.BACKGROUND: settings.llm_background_max_concurrency,
+            llm_scheduler.BATCH: settings.llm_batch_max_concurrency,
+        },
+        interactive_wait_target_ms=settings.llm_interactive_wait_target_ms,
+    )
+)
+product_data_executor = BoundedExecutor(
+    max_workers=settings.product_data_workers,
+    max_queue=settings.product_data_max_queue,
+    thread_name_prefix="product-data",
 )
-product_data_executor = ThreadPoolExecutor(max_workers=4)
 evaluation_executor = ThreadPoolExecutor(max_workers=1)
 evaluation_store = EvaluationRunStore(BASE_DIR / "logs" / "image_model_tests")
 
 
 def _submit_with_request_id(fn, /, *args, **kwargs):
     rid = obs_ctx.get_request_id()
+    priority = llm_scheduler.current_priority()
+    parent_span = tracing.current_span()
+    submitted_ms = tracing.now_ms()
+    task_name = getattr(fn, "__name__", "task")
     def _runner():
         token = obs_ctx.set_request_id(rid) if rid else None
+        priority_token = llm_scheduler.set_priority(priority)
         try:
-            return fn(*args, **kwargs)
+            queue_ms = tracing.now_ms() - submitted_ms
+            obs_metrics.PRODUCT_DATA_QUEUE_WAIT_SECONDS.observe(queue_ms / 1000.0)
+            with tracing.use_span(parent_span):
+                tracing.record_span("executor.queue_wait", submitted_ms, submitted_ms + queue_ms, task=task_name)
+                with tracing.span(f"executor.{task_name}"):
+                    result = fn(*args, **kwargs)
+            # product_data_ms covers the model call only; report the wait beside it.
+            if isinstance(result, dict) and isinstance(result.get("timings"), dict):
+                result["timings"]["product_data_queue_ms"] = round(queue_ms, 2)
+            return result
         finally:
+            llm_scheduler.reset_priority(priority_token)
             if token is not None:
                 obs_ctx.reset_request_id(token)
-    return product_data_executor.submit(_runner)
+    future = product_data_executor.submit(_runner)
+    cancel_token = kwargs.get("cancel_token")
+    if cancel_token is not None:
+        # Lets _cancel_future reach a task that is already running, and drops
+        # a still-queued one as soon as whoever owns the token gives up on it.
+        future.cancel_token = cancel_token
+        unregister = cancel_token.on_cancel(future.cancel)
+        future.add_done_callback(lambda _f: unregister())
+    return future
 
 
 def _settings_for_evaluation(config: EvaluationRunConfig):
@@ -221,12 +297,20 @@ def _evaluation_analyzer(config: EvaluationRunConfig) -> MercariAnalyzer:
         config.productDataModel,
         config.reasoningEffort,
     )
-    if key not in _evaluation_analyzer_cache:
+    hit = key in _evaluation_analyzer_cache
+    obs_metrics.record_cache("evaluation_analyzer", hit)
+    if not hit:
         _evaluation_analyzer_cache[key] = _build_evaluation_analyzer(config)
     return _evaluation_analyzer_cache[key]
 
 
 def _evaluation_case_runner(case: Dict[str, str], config: EvaluationRunConfig) -> Dict[str, str]:
+    # Evaluations share the OpenRouter quota with live traffic; keep them behind it.
+    with llm_scheduler.llm_priority(llm_scheduler.BACKGROUND):
+        return _run_evaluation_case(case, config)
+
+
+def _run_evaluation_case(case: Dict[str, str], config: EvaluationRunConfig) -> Dict[str, str]:
     combo = ModelCombination(
         vision_model=config.visionModel,
         category_model=config.categoryModel,
@@ -276,7 +360,32 @@ def _evaluation_case_runner(case: Dict[str, str], config: EvaluationRunConfig) -
     )
 
 
-analysis_job_store = AnalysisJobStore()
+_job_store_path = Path(settings.job_store_path)
+analysis_job_store = AnalysisJobStore(
+    backend=create_job_backend(
+        settings.job_store_backend,
+        path=_job_store_path if _job_store_path.is_absolute() else BASE_DIR / _job_store_path,
+        url=settings.job_store_url,
+    ),
+    max_bytes=settings.job_store_max_bytes,
+)
+
+obs_metrics.PRODUCT_DATA_QUEUE_DEPTH.set_function(lambda: product_data_executor.queued)
+obs_metrics.PRODUCT_DATA_ACTIVE_WORKERS.set_function(lambda: product_data_executor.active)
+obs_metrics.ANALYSIS_JOBS.set_function(lambda: len(analysis_job_store))
+obs_metrics.LLM_SCHEDULER_CALLS.set_function(lambda: {
+    (cls, state): n
+    for cls, counts in llm_scheduler.get_scheduler().snapshot().items()
+    for state, n in counts.items()
+})
+obs_metrics.LLM_SCHEDULER_THROTTLED.set_function(lambda: int(llm_scheduler.get_scheduler().throttled))
+obs_metrics.ANALYSIS_JOB_BYTES.set_function(lambda: analysis_job_store.resident_bytes)
+obs_metrics.REFERENCE_DATA_ROWS.set_function(
+    lambda: {(name,): len(store.store) for name, store in reference_stores.items()}
+)
+obs_metrics.REFERENCE_DATA_LOAD_SECONDS.set_function(
+    lambda: {(name,): store.status()["load_ms"] / 1000 for name, store in reference_stores.items()}
+)
 PRODUCT_DETAIL_FIELDS = ("brand", "product_name", "model_number", "color")
 
 
@@ -362,26 +471,97 @@ def _format_attempts_error(exc: LLMAllAttemptsFailedError) -> Dict[str, Any]:
 from contextlib import asynccontextmanager
 
 
+async def _prune_in_chunks() -> Dict[str, Any]:
+    """Run one retention pass on worker threads, a bounded chunk at a time.
+
+    Each chunk deletes at most LOG_PRUNE_BATCH_SIZE requests and yields back to
+    the event loop before the next, so a large backlog never blocks API
+    traffic. The totals are logged, kept on ``app.state.last_prune`` and
+    exported on /metrics (``mercari_log_prune_*``).
+    """
+    rows_deleted = 0
+    bytes_freed = 0
+    busy_ms = 0.0
+    chunks = 0
+    started = time.monotonic()
+    while True:
+        stats = await run_in_threadpool(
+            obs_prune,
+            _obs_store,
+            BASE_DIR / "logs" / "store",
+            settings.log_retention_days,
+            settings.log_max_total_bytes,
+            max_rows=settings.log_prune_batch_size,
+        )
+        chunks += 1
+        rows_deleted += stats.rows_deleted
+        bytes_freed += stats.bytes_freed
+        busy_ms += stats.elapsed_ms
+        if not stats.has_more:
+            break
+        await asyncio.sleep(0)
+    summary = {
+        "rows_deleted": rows_deleted,
+        "bytes_freed": bytes_freed,
+        "chunks": chunks,
+        "busy_ms": round(busy_ms, 2),
+        "wall_ms": round((time.monotonic() - started) * 1000, 2),
+    }
+    app.state.last_prune = summary
+    obs_metrics.LOG_PRUNE_ROWS_DELETED.inc(rows_deleted)
+    obs_metrics.LOG_PRUNE_BYTES_FREED.inc(bytes_freed)
+    obs_metrics.LOG_PRUNE_SECONDS.observe(busy_ms / 1000.0)
+    _logger.info(
+        "observability.prune_loop rows_deleted=%d bytes_freed=%d chunks=%d busy_ms=%.2f wall_ms=%.2f",
+        rows_deleted, bytes_freed, chunks, summary["busy_ms"], summary["wall_ms"],
+    )
+    return summary
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async def prune_loop():
         while True:
             try:
-                obs_prune(_obs_store, BASE_DIR / "logs" / "store",
-                          settings.log_retention_days, settings.log_max_total_bytes)
+                await _prune_in_chunks()
             except Exception:
-                pass
+                _logger.exception("observability.prune_loop failed")
             await asyncio.sleep(settings.log_prune_interval_minutes * 60)
 
+    async def metrics_flush_loop(directory: Path):
+        # Publish this worker's counters so a scrape served by any worker sees them.
+        while True:
+            try:
+                await run_in_threadpool(obs_metrics.write_snapshot, obs_metrics.REGISTRY, directory)
+            except Exception:
+                _logger.exception("metrics snapshot flush failed")
+            await asyncio.sleep(settings.metrics_flush_seconds)
+
+    async def reference_data_watch_loop():
+        # Each worker rebuilds its own copy; the old tables serve until the swap.
+        while True:
+            await asyncio.sleep(settings.reference_data_reload_seconds)
+            for store in reference_stores.values():
+                try:
+                    await run_in_threadpool(store.reload)
+                except Exception:
+                    _logger.exception("reference data reload check failed")
+
     task = asyncio.create_task(prune_loop())
     app.state.prune_task = task
+    tasks = [task]
+    if settings.metrics_enabled and settings.metrics_multiproc_dir:
+        tasks.append(asyncio.create_task(metrics_flush_loop(Path(settings.metrics_multiproc_dir))))
+    if settings.reference_data_reload_seconds:
+        tasks.append(asyncio.create_task(reference_data_watch_loop()))
     prompt_store.load_overrides()
     try:
         yield
     finally:
-        task.cancel()
-        with suppress(asyncio.CancelledError):
-            await task
+        for pending in tasks:
+            pending.cancel()
+            with suppress(asyncio.CancelledError):
+                await pending
 
 
 app = FastAPI(lifespan=lifespan, title="Mercari Image Analyzer", version="1.0.0")
@@ -485,22 +665,23 @@ def _safe_product_data_ms(future) -> Optional[float]:
 def _primary_elapsed_seconds(
     primary,
     primary_ok: bool,
-    started_at: Optional[float],
+    picked_up_at: Optional[float],
 ) -> Optional[float]:
     """Compute primary's wall-clock elapsed time (in seconds) for threshold checks.
 
     When primary has completed successfully we trust the product_data_ms it
-    reported (which was measured against the same submit timestamp). Otherwise
-    we fall back to ``now - started_at`` so a still-running primary that has
-    blown past the threshold is treated as exceeded.
+    reported (model time, excluding the executor queue). A still-running
+    primary is measured from ``picked_up_at``, when a worker picked it up (see
+    ``app.jobs.primary_started_at``), so one that has blown past the threshold
+    is treated as exceeded; one still queued (None) is not.
     """
     if primary_ok:
         ms = _safe_product_data_ms(primary)
         if ms is not None:
             return ms / 1000.0
-    if not primary.done() and started_at is not None:
-        return time.monotonic() - float(started_at)
-    return None
+    if primary.done() or picked_up_at is None:
+        return None
+    return time.monotonic() - float(picked_up_at)
 
 
 _FALLBACK_TITLE_FILLER_TERMS = (
@@ -545,6 +726,27 @@ def _fallback_quality_issues(payload: Dict[str, Any]) -> List[str]:
     return issues
 
 
+def _future_error(future) -> Optional[BaseException]:
+    """``future.exception()`` for a done future, treating cancellation as an error."""
+    if future.cancelled():
+        return CancelledError()
+    return future.exception()
+
+
+def _cancel_future(future) -> None:
+    """Stop a product-data call whose result is no longer needed.
+
+    A call still waiting in the executor queue never starts; a running one has
+    its CancellationToken fired, which aborts the in-flight OpenRouter request
+    and records the attempt as ``cancelled``.
+    """
+    if future is None or future.done() or future.cancel():
+        return
+    token = getattr(future, "cancel_token", None)
+    if token is not None:
+        token.cancel()
+
+
 def _resolve_product_source(
     job: Dict[str, Any],
     *,
@@ -560,18 +762,17 @@ def _resolve_product_source(
     """
     primary = job["future"]
     fallback = job.get("fallback_future")
-    started_at = job.get("started_at")
     fallback_timeout = job.get("fallback_timeout")
 
     primary_done = primary.done()
-    primary_error = primary.exception() if primary_done else None
+    primary_error = _future_error(primary) if primary_done else None
     primary_ok = primary_done and primary_error is None
 
     fallback_done = bool(fallback and fallback.done())
-    fallback_error = fallback.exception() if fallback_done else None
+    fallback_error = _future_error(fallback) if fallback_done else None
     fallback_ok = fallback_done and fallback_error is None
 
-    primary_elapsed = _primary_elapsed_seconds(primary, primary_ok, started_at)
+    primary_elapsed = _primary_elapsed_seconds(primary, primary_ok, primary_started_at(job))
     # Use >= so a threshold of 0 still triggers when primary has not yet
     # produced a result, matching the original behaviour and side-stepping
     # the time.monotonic() granularity floor on Windows where two adjacent
@@ -627,11 +828,24 @@ def _job_payload(
     fallback_timeout: Optional[float] = None,
 ) -> Dict[str, Any]:
     job = {
+        "classification": classification,
         "future": future,
         "fallback_future": fallback_future,
         "started_at": started_at,
         "fallback_timeout": fallback_timeout,
     }
+    return _payload_for_job(job_id, job, raise_product_errors=raise_product_errors)
+
+
+def _payload_for_job(
+    job_id: str,
+    job: Dict[str, Any],
+    *,
+    raise_product_errors: bool = True,
+) -> Dict[str, Any]:
+    classification = job["classification"]
+    future = job["future"]
+    fallback_future = job.get("fallback_future")
     source, product_data, error = _resolve_product_source(
         job,
         raise_product_errors=raise_product_errors,
@@ -640,6 +854,8 @@ def _job_payload(
         raise error
     if source is None or product_data is None:
         return _pending_payload(job_id, classification)
+    # The winner's result stays in the job; the other call is now wasted work.
+    _cancel_future(fallback_future if source == "primary" else future)
     payload = _merge_analysis_payload(classification, product_data)
     payload["job_id"] = job_id
     payload["product_data_source"] = source
@@ -657,6 +873,19 @@ def _job_payload(
     return payload
 
 
+async def _run_traced_in_threadpool(name: str, fn, /, *args, **kwargs):
+    """run_in_threadpool under a span, recording the wait for a free thread."""
+    submitted_ms = tracing.now_ms()
+
+    def _runner():
+        # run_in_threadpool copies the context, so the caller's span is current here.
+        tracing.record_span("threadpool.queue_wait", submitted_ms, tracing.now_ms(), task=name)
+        with tracing.span(name):
+            return fn(*args, **kwargs)
+
+    return await run_in_threadpool(_runner)
+
+
 async def _prepare_image_payloads(
     image_list: List[UploadFile],
 ) -> Tuple[List[Tuple[bytes, str]], List[Dict[str, Any]]]:
@@ -693,10 +922,16 @@ async def _prepare_image_payloads(
                 status_code=400, detail=f"Image is too large (index {index})."
             )
 
-        processed = compress_image_if_needed(
-            image_bytes=data,
-            mime_type=image.content_type or "application/octet-stream",
-            threshold_bytes=settings.image_compression_threshold_bytes,
+        preprocess_started = time.monotonic()
+        with tracing.span("image.preprocess", index=index, original_bytes=len(data)):
+            processed = compress_image_if_needed(
+                image_bytes=data,
+                mime_type=image.content_type or "application/octet-stream",
+                threshold_bytes=settings.image_compression_threshold_bytes,
+            )
+        obs_metrics.IMAGE_PREPROCESS_SECONDS.observe(
+            time.monotonic() - preprocess_started,
+            compressed="true" if processed.compressed else "false",
         )
         image_payloads.append((processed.data, processed.mime_type))
         image_processing.append(
@@ -1068,6 +1303,21 @@ def reset_prompts(payload: Dict[str, Any], request: Request) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@app.get("/api/v1/reference-data", dependencies=[Depends(config_auth)])
+def read_reference_data() -> Dict[str, Any]:
+    return {"tables": [store.status() for store in reference_stores.values()]}
+
+
+@app.post("/api/v1/reference-data/reload", dependencies=[Depends(config_auth)])
+def reload_reference_data(payload: Dict[str, Any], request: Request) -> Dict[str, Any]:
+    """Rebuild the named tables (all by default) in this worker, even if their CSV did not change."""
+    _reject_cross_origin(request)
+    names = payload.get("tables") or list(reference_stores)
+    if not isinstance(names, list) or any(name not in reference_stores for name in names):
+        raise HTTPException(status_code=400, detail=f"tables must be a list of {sorted(reference_stores)}")
+    return {"tables": [reference_stores[name].reload(force=True) for name in names]}
+
+
 @app.post("/api/v1/evaluations", dependencies=[Depends(evaluation_auth)])
 async def create_evaluation(
     file: UploadFile = File(...),
@@ -1263,23 +1513,57 @@ def _job_id_from_response(body: bytes) -> str:
     return ""
 
 
+# Streamed bodies are relayed as they are produced instead of being buffered
+# for the request log (see observe_request).
+_STREAMING_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+def _is_streaming_response(response: Response) -> bool:
+    content_type = response.headers.get("content-type", "")
+    return content_type.split(";", 1)[0].strip().lower() in _STREAMING_MEDIA_TYPES
+
+
 @app.middleware("http")
 async def observe_request(request: Request, call_next):
     if (
         not settings.log_requests
         or request.url.path == "/health"
         or request.url.path.startswith("/api/v1/logs/")
-        or request.url.path in {"/logs", "/", "/favicon.ico", "/config"}
+        or request.url.path in {"/logs", "/", "/favicon.ico", "/config", "/metrics"}
     ):
         return await call_next(request)
 
     request_id = uuid.uuid4().hex
     token = obs_ctx.set_request_id(request_id)
+    root, span_token = tracing.open_span(
+        "http.request", trace_id=request_id, method=request.method, endpoint=request.url.path
+    )
     start = time.monotonic()
     body = b""
     status_code = 500
     error_message = ""
     response_body_bytes = b""
+    streaming = False
+
+    def finish(error: str = "") -> None:
+        duration_ms = (time.monotonic() - start) * 1000.0
+        if root is not None:
+            root.attributes["status_code"] = status_code
+            if error or status_code >= 500:
+                root.status = "error"
+        tracing.close_span(root)
+        try:
+            job_id = _job_id_from_path(request.url.path) or _job_id_from_response(response_body_bytes)
+            recorder.finalize_request(
+                request_id=request_id,
+                status_code=status_code,
+                duration_ms=duration_ms,
+                error=error,
+                response_body=response_body_bytes,
+                job_id=job_id,
+            )
+        except Exception:
+            pass
 
     try:
         if request.method in {"POST", "PUT", "PATCH"}:
@@ -1336,6 +1620,27 @@ async def observe_request(request: Request, call_next):
         response = await call_next(request)
         status_code = response.status_code
 
+        if _is_streaming_response(response):
+            # Event and NDJSON streams are relayed chunk by chunk and their body
+            # is not logged; the request is finalized once the stream ends.
+            streaming = True
+            body_iterator = response.body_iterator
+
+            async def relay():
+                stream_error = ""
+                try:
+                    async for chunk in body_iterator:
+                        yield chunk
+                except BaseException as exc:
+                    stream_error = repr(exc)
+                    raise
+                finally:
+                    finish(stream_error)
+
+            response.body_iterator = relay()
+            response.headers["X-Request-Id"] = request_id
+            return response
+
         # buffer full response body for re-emission, keep capped slice for logging
         full_chunks: List[bytes] = []
         async for chunk in response.body_iterator:
@@ -1360,20 +1665,57 @@ async def observe_request(request: Request, call_next):
         error_message = repr(exc)
         raise
     finally:
-        duration_ms = (time.monotonic() - start) * 1000.0
-        try:
-            job_id = _job_id_from_path(request.url.path) or _job_id_from_response(response_body_bytes)
-            recorder.finalize_request(
-                request_id=request_id,
-                status_code=status_code,
-                duration_ms=duration_ms,
-                error=error_message,
-                response_body=response_body_bytes,
-                job_id=job_id,
-            )
-        except Exception:
-            pass
+        tracing.detach_span(span_token)
         obs_ctx.reset_request_id(token)
+        if not streaming:
+            finish(error_message)
+
+
+@app.middleware("http")
+async def observe_metrics(request: Request, call_next):
+    if not settings.metrics_enabled or request.url.path == "/metrics":
+        return await call_next(request)
+    start = time.monotonic()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template so /analyze/{job_id} stays one series.
+        route = request.scope.get("route")
+        obs_metrics.HTTP_REQUEST_SECONDS.observe(
+            time.monotonic() - start,
+            method=request.method,
+            endpoint=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+        )
+
+
+@app.middleware("http")
+async def llm_priority_header(request: Request, call_next):
+    """``X-Priority: background|batch`` lets scripts queue their LLM calls behind live traffic."""
+    header = request.headers.get("x-priority")
+    if not header:
+        return await call_next(request)
+    token = llm_scheduler.set_priority(header)
+    try:
+        return await call_next(request)
+    finally:
+        llm_scheduler.reset_priority(token)
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.metrics_token:
+        supplied = request.headers.get("authorization", "")
+        if not _safe_compare_digest(supplied, f"Bearer {settings.metrics_token}"):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+    multiproc_dir = Path(settings.metrics_multiproc_dir) if settings.metrics_multiproc_dir else None
+    body = await run_in_threadpool(obs_metrics.exposition, obs_metrics.REGISTRY, multiproc_dir)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.post("/api/v1/mercari/image/analyze")
@@ -1395,10 +1737,12 @@ async def analyze_image(
     try:
         job_id = uuid.uuid4().hex
         # Capture the monotonic timestamp the moment we hand off the task to the
-        # executor. We use this as both (a) the timing baseline reported back as
-        # product_data_ms and (b) the threshold baseline for the fallback
-        # decision logic. Aligning both on submit time means the timeout the
-        # user configures actually maps to the elapsed time they observe.
+        # executor. It is the job's start time and the fallback threshold
+        # baseline while the primary is queued; once a worker picks the task up
+        # the threshold is measured from that point instead (see
+        # app.jobs.primary_started_at), so a burst queueing many jobs does not
+        # make all of them look late. Raises ExecutorSaturatedError (503) when
+        # the queue is full.
         primary_submitted_at = time.monotonic()
         product_future = _submit_with_request_id(
             analyzer.generate_product_data,
@@ -1406,23 +1750,27 @@ async def analyze_image(
             language=language,
             debug=debug_enabled,
             use_fallback_prompt=False,
-            started_at=primary_submitted_at,
+            cancel_token=CancellationToken(),
         )
         fallback_model = (settings.product_data_fallback_model or "").strip()
         fallback_future = None
         if fallback_model:
-            fallback_submitted_at = time.monotonic()
-            fallback_future = _submit_with_request_id(
-                analyzer.generate_product_data,
-                images=image_payloads,
-                language=language,
-                debug=debug_enabled,
-                model_override=fallback_model,
-                use_fallback_prompt=True,
-                started_at=fallback_submitted_at,
-            )
+            try:
+                fallback_future = _submit_with_request_id(
+                    analyzer.generate_product_data,
+                    images=image_payloads,
+                    language=language,
+                    debug=debug_enabled,
+                    model_override=fallback_model,
+                    use_fallback_prompt=True,
+                    cancel_token=CancellationToken(),
+                )
+            except ExecutorSaturatedError:
+                # The primary made it in; shed only the extra fallback call.
+                obs_metrics.PRODUCT_DATA_REJECTED.inc(task="fallback")
         fallback_timeout = float(settings.product_data_fallback_timeout_seconds)
-        classification = await run_in_threadpool(
+        classification = await _run_traced_in_threadpool(
+            "classification",
             analyzer.classify_first_image_categories,
             images=image_payloads,
             language=language,
@@ -1438,6 +1786,8 @@ async def analyze_image(
             fallback_future=fallback_future,
             started_at=primary_submitted_at,
             fallback_timeout=fallback_timeout,
+            # Pinned by the queued product-data calls until they finish.
+            payload_bytes=sum(len(data) for data, _mime in image_payloads),
         )
         result = _job_payload(
             job_id,
@@ -1448,6 +1798,13 @@ async def analyze_image(
             started_at=primary_submitted_at,
             fallback_timeout=fallback_timeout,
         )
+    except ExecutorSaturatedError as exc:
+        obs_metrics.PRODUCT_DATA_REJECTED.inc(task="primary")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy; retry later.",
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
     except BadRequestError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except LLMAllAttemptsFailedError as exc:
@@ -1463,19 +1820,26 @@ async def analyze_image_price(
     image_list: List[UploadFile] = File(...),
     debug: str = Form("false"),
     vision_model: str = Form(None),
+    combined: str = Form("false"),
 ):
     """Standalone fast price link: one vision call returning price fields.
 
     Independent of the /analyze flow — the app can call this directly to obtain
     a price quickly. Direct prices are visible-only; prices is an AI reference
-    range.
+    range. With ``combined=true`` the same call also returns ``product_size``
+    (see /size), so a client needing both pays for the images once.
     """
     image_payloads, image_processing = await _prepare_image_payloads(image_list)
     debug_enabled = settings.enable_debug_param and parse_bool_param(debug, False)
+    extract = (
+        analyzer.extract_price_and_size
+        if parse_bool_param(combined, False)
+        else analyzer.extract_prices
+    )
 
     try:
         result = await run_in_threadpool(
-            analyzer.extract_prices,
+            extract,
             images=image_payloads,
             debug=debug_enabled,
             model_override=vision_model,
@@ -1500,6 +1864,7 @@ async def analyze_image_size(
     image_list: List[UploadFile] = File(...),
     debug: str = Form("false"),
     vision_model: str = Form(None),
+    combined: str = Form("false"),
 ):
     """Standalone fast size link: one vision call returning the product size.
 
@@ -1507,14 +1872,17 @@ async def analyze_image_size(
     size on demand without slowing classification. Inspects every uploaded image
     because the size usually appears on a tag, package or size chart rather than
     the first image. The size is visible-only: product_size is null when no
-    explicit size text is found.
+    explicit size text is found. With ``combined=true`` the same call also
+    returns the /price fields.
     """
     image_payloads, image_processing = await _prepare_image_payloads(image_list)
     debug_enabled = settings.enable_debug_param and parse_bool_param(debug, False)
+    combined_enabled = parse_bool_param(combined, False)
+    extract = analyzer.extract_price_and_size if combined_enabled else analyzer.extract_size
 
     try:
         result = await run_in_threadpool(
-            analyzer.extract_size,
+            extract,
             images=image_payloads,
             debug=debug_enabled,
             model_override=vision_model,
@@ -1526,6 +1894,8 @@ async def analyze_image_size(
     except Exception as exc:
         raise HTTPException(status_code=500, detail="Internal server error.") from exc
 
+    if combined_enabled:
+        result = _ensure_price_fields(result)
     if debug_enabled:
         result["image_processing"] = image_processing
     else:
@@ -1533,6 +1903,368 @@ async def analyze_image_size(
     return JSONResponse(result)
 
 
+def _analyze_all_pipeline(
+    image_payloads: List[Tuple[bytes, str]],
+    *,
+    language: str,
+    debug: bool,
+    vision_model: Optional[str],
+    category_model: Optional[str],
+    combined: bool = False,
+) -> StagePipeline:
+    """The /analyze-all stage graph: dependencies and deadlines live here only.
+
+    ``combined`` replaces the price and size stages with one ``price_size``
+    call that sends the images to the model once.
+    """
+    fast_deadline = float(settings.analyze_all_fast_deadline_seconds)
+    deadline = float(settings.analyze_all_deadline_seconds)
+    if combined:
+        price_and_size = [
+            Stage(
+                "price_size",
+                lambda _inputs, token: analyzer.extract_price_and_size(
+                    images=image_payloads, debug=debug, model_override=vision_model, cancel_token=token,
+                ),
+                deadline_seconds=fast_deadline,
+            ),
+        ]
+    else:
+        price_and_size = [
+            Stage(
+                "price",
+                lambda _inputs, token: analyzer.extract_prices(
+                    images=image_payloads, debug=debug, model_override=vision_model, cancel_token=token,
+                ),
+                deadline_seconds=fast_deadline,
+            ),
+            Stage(
+                "size",
+                lambda _inputs, token: analyzer.extract_size(
+                    images=image_payloads, debug=debug, model_override=vision_model, cancel_token=token,
+                ),
+                deadline_seconds=fast_deadline,
+            ),
+        ]
+
+    # Runs on product_data_executor (see analyze_image_all); named so its span
+    # reads executor.generate_product_data, as it does for /analyze.
+    def generate_product_data(_inputs, cancel_token):
+        return analyzer.generate_product_data(
+            images=image_payloads, language=language, debug=debug, cancel_token=cancel_token,
+        )
+
+    return StagePipeline([
+        Stage(
+            "fast_classification",
+            lambda _inputs, token: analyzer.fast_classify(
+                image_payloads, language, debug=debug,
+                model_override=vision_model, cancel_token=token,
+            ),
+            deadline_seconds=fast_deadline,
+        ),
+        Stage(
+            "categories",
+            lambda inputs, token: analyzer.select_categories(
+                inputs["fast_classification"], debug=debug,
+                model_override=category_model, cancel_token=token,
+            ),
+            depends_on=("fast_classification",),
+            deadline_seconds=deadline,
+        ),
+        Stage("product_data", generate_product_data, deadline_seconds=deadline),
+        *price_and_size,
+    ])
+
+
+def _merge_analyze_all_results(
+    results: Dict[str, Dict[str, Any]],
+    image_processing: List[Dict[str, Any]],
+    total_ms: float,
+) -> Dict[str, Any]:
+    """Fold the completed stages into one /analyze-shaped payload plus price and size."""
+    payload: Dict[str, Any] = {}
+    timings: Dict[str, Any] = {}
+    debug_payload: Dict[str, Any] = {}
+    attempts: Dict[str, Any] = {}
+    for name in ("fast_classification", "categories", "product_data", "price", "size", "price_size"):
+        result = results.get(name)
+        if not isinstance(result, dict):
+            continue
+        result = dict(result)
+        timings.update(result.pop("timings", None) or {})
+        stage_debug = result.pop("_debug", None)
+        if isinstance(stage_debug, dict):
+            attempts.update(stage_debug.pop("attempts", None) or {})
+            debug_payload.update(stage_debug)
+        if name == "fast_classification":
+            # Only feeds category selection; /analyze does not expose it either.
+            continue
+        if name == "product_data":
+            # Price fields come from the price stage; drop the null placeholders.
+            for key in ("tax_excluded", "tax_included", "prices"):
+                result.pop(key, None)
+        payload.update(result)
+    payload["image_processing"] = image_processing
+    timings["total_ms"] = total_ms
+    payload["timings"] = timings
+    if debug_payload or attempts:
+        debug_payload["attempts"] = attempts
+        payload["_debug"] = debug_payload
+    payload = _sanitize_product_details(payload)
+    return _ensure_price_fields(payload)
+
+
+@app.post("/api/v1/mercari/image/analyze-all")
+async def analyze_image_all(
+    request: Request,
+    image_list: List[UploadFile] = File(...),
+    language: str = Form(DEFAULT_LANGUAGE),
+    debug: str = Form("false"),
+    vision_model: str = Form(None),
+    category_model: str = Form(None),
+    stream: str = Form(None),
+    combined: str = Form("false"),
+):
+    """Classification, categories, product data, price and size in one request.
+
+    The images are validated and compressed once, then every stage of
+    ``_analyze_all_pipeline`` starts as soon as its inputs are ready. One
+    message is streamed per stage as it settles (``completed``, ``failed`` with
+    the status/detail the standalone endpoint would have returned, or
+    ``skipped`` when a stage it needs failed), followed by a final
+    ``analysis`` message carrying the merged result. The stream is NDJSON by
+    default; ``stream=sse`` (or ``Accept: text/event-stream``) switches to
+    server-sent events named after the stage. ``combined=true`` reads price
+    and size in one ``price_size`` stage.
+    """
+    stream_format = (stream or "").strip().lower()
+    if not stream_format:
+        accept = request.headers.get("accept", "")
+        stream_format = "sse" if "text/event-stream" in accept else "ndjson"
+    if stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="stream must be ndjson or sse.")
+
+    image_payloads, image_processing = await _prepare_image_payloads(image_list)
+
+    language = language or DEFAULT_LANGUAGE
+    if language not in SUPPORTED_LANGUAGES:
+        raise HTTPException(status_code=400, detail="Invalid language.")
+
+    debug_enabled = settings.enable_debug_param and parse_bool_param(debug, False)
+    pipeline = _analyze_all_pipeline(
+        image_payloads,
+        language=language,
+        debug=debug_enabled,
+        vision_model=vision_model,
+        category_model=category_model,
+        combined=parse_bool_param(combined, False),
+    )
+
+    def _encode(message: Dict[str, Any]) -> str:
+        if stream_format == "sse":
+            return _sse_message(message["stage"], message)
+        return json.dumps(message, ensure_ascii=False) + "\n"
+
+    async def _runner(name, fn, /, inputs, token):
+        if name == "product_data":
+            # Same admission control as /analyze: ExecutorSaturatedError fails
+            # the stage with 503 instead of queueing past the limit. The token
+            # goes by keyword so a missed deadline also drops the queued task.
+            return await asyncio.wrap_future(_submit_with_request_id(fn, inputs, cancel_token=token))
+        return await _run_traced_in_threadpool(f"analyze_all.{name}", fn, inputs, token)
+
+    async def _messages():
+        started = time.monotonic()
+        results: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, Any] = {}
+        async for event in pipeline.run(_runner):
+            obs_metrics.ANALYZE_ALL_STAGE_SECONDS.observe(
+                event.elapsed_ms / 1000.0, stage=event.stage, status=event.status,
+            )
+            message: Dict[str, Any] = {
+                "stage": event.stage,
+                "status": event.status,
+                "elapsed_ms": event.elapsed_ms,
+            }
+            if event.status == STAGE_COMPLETED:
+                results[event.stage] = event.result
+                message["result"] = event.result
+            elif event.error is not None:
+                error = _job_http_error(event.error)
+                message["error"] = errors[event.stage] = {
+                    "status_code": error.status_code,
+                    "detail": error.detail,
+                }
+            else:
+                message["blocked_by"] = event.blocked_by
+                errors[event.stage] = {"blocked_by": event.blocked_by}
+            yield _encode(message)
+        total_ms = round((time.monotonic() - started) * 1000, 2)
+        final: Dict[str, Any] = {
+            "stage": "analysis",
+            "status": "completed" if not errors else "partial",
+            "elapsed_ms": total_ms,
+            "result": _merge_analyze_all_results(results, image_processing, total_ms),
+        }
+        if errors:
+            final["errors"] = errors
+        yield _encode(final)
+
+    if stream_format == "sse":
+        return StreamingResponse(
+            _messages(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return StreamingResponse(
+        _messages(),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
+def _group_batch_items(form) -> List[Tuple[str, List[UploadFile]]]:
+    """Group uploaded files by form field name: one field per item, in upload order."""
+    items: Dict[str, List[UploadFile]] = {}
+    for key, value in form.multi_items():
+        if isinstance(value, _Upload):
+            items.setdefault(key, []).append(value)
+    return list(items.items())
+
+
+async def _analyze_batch_item(
+    image_list: List[UploadFile],
+    *,
+    language: str,
+    debug: bool,
+    cancel_token: CancellationToken,
+) -> Dict[str, Any]:
+    """One /analyze run without the job: classification and product data, merged."""
+    image_payloads, image_processing = await _prepare_image_payloads(image_list)
+    # Shares /analyze's bounded executor; a full queue fails the item with 503.
+    product_future = _submit_with_request_id(
+        analyzer.generate_product_data,
+        images=image_payloads,
+        language=language,
+        debug=debug,
+        cancel_token=cancel_token,
+    )
+    try:
+        classification = await _run_traced_in_threadpool(
+            "classification",
+            analyzer.classify_first_image_categories,
+            images=image_payloads,
+            language=language,
+            debug=debug,
+            image_processing=image_processing,
+        )
+        product_data = await asyncio.wrap_future(product_future)
+    except BaseException:
+        _cancel_future(product_future)
+        raise
+    return _merge_analysis_payload(classification, product_data)
+
+
+@app.post("/api/v1/mercari/image/analyze/batch")
+async def analyze_image_batch(request: Request):
+    """Analyze many items in one request, streaming one NDJSON line per item.
+
+    Multipart body: every file field is one item, named by its item id and
+    repeated for each of the item's images (``-F item-1=@a.jpg -F item-1=@b.jpg
+    -F item-2=@c.jpg``). ``language`` and ``debug`` apply to every item and
+    ``concurrency`` may lower ANALYZE_BATCH_CONCURRENCY. Items run through the
+    same path as /analyze (without the fallback race or a job) and their LLM
+    calls go through the shared scheduler as ``batch`` unless X-Priority says
+    otherwise. Lines arrive as items finish: ``{"type": "item", "item", "index",
+    "status": "completed"|"failed", "result"|"error", "elapsed_ms"}``, then a
+    ``{"type": "summary", ...}`` line with counts and throughput. Items still
+    queued or running are cancelled when the client disconnects.
+    """
+    max_items = int(settings.analyze_batch_max_items)
+    form = await request.form(max_files=max_items * 20, max_fields=1000)
+    items = _group_batch_items(form)
+    if not items:
+        raise HTTPException(status_code=400, detail="At least one item with images is required.")
+    if len(items) > max_items:
+        raise HTTPException(status_code=400, detail=f"At most {max_items} items per batch.")
+
+    language = str(form.get("language") or DEFAULT_LANGUAGE)
+    if language not in SUPPORTED_LANGUAGES:
+        raise HTTPException(status_code=400, detail="Invalid language.")
+    debug_enabled = settings.enable_debug_param and parse_bool_param(str(form.get("debug") or "false"), False)
+    concurrency = int(settings.analyze_batch_concurrency)
+    raw_concurrency = form.get("concurrency")
+    if raw_concurrency:
+        try:
+            concurrency = max(1, min(concurrency, int(str(raw_concurrency))))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="concurrency must be an integer.")
+    priority = (
+        llm_scheduler.current_priority()
+        if request.headers.get("x-priority")
+        else llm_scheduler.BATCH
+    )
+
+    async def _lines():
+        started = time.monotonic()
+        slots = asyncio.Semaphore(concurrency)
+        tokens = [CancellationToken() for _ in items]
+
+        async def _run(index: int) -> Dict[str, Any]:
+            item_id, image_list = items[index]
+            async with slots:
+                item_started = time.monotonic()
+                line: Dict[str, Any] = {"type": "item", "item": item_id, "index": index}
+                try:
+                    result = await _analyze_batch_item(
+                        image_list, language=language, debug=debug_enabled, cancel_token=tokens[index],
+                    )
+                except Exception as exc:
+                    error = exc if isinstance(exc, HTTPException) else _job_http_error(exc)
+                    line.update(status="failed", error={"status_code": error.status_code, "detail": error.detail})
+                else:
+                    line.update(status="completed", result=result)
+                line["elapsed_ms"] = round((time.monotonic() - item_started) * 1000, 2)
+                return line
+
+        with llm_scheduler.llm_priority(priority):
+            tasks = [asyncio.ensure_future(_run(index)) for index in range(len(items))]
+        counts = {"completed": 0, "failed": 0}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                counts[line["status"]] += 1
+                obs_metrics.ANALYZE_BATCH_ITEMS.inc(status=line["status"])
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+                if await request.is_disconnected():
+                    return
+        finally:
+            unfinished = [task for task in tasks if not task.done()]
+            if unfinished:
+                for token in tokens:
+                    token.cancel()
+                for task in unfinished:
+                    task.cancel()
+                obs_metrics.ANALYZE_BATCH_ITEMS.inc(len(unfinished), status="cancelled")
+        elapsed = time.monotonic() - started
+        summary = {
+            "type": "summary",
+            "items": len(items),
+            **counts,
+            "concurrency": concurrency,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "items_per_minute": round(len(items) / elapsed * 60, 2) if elapsed > 0 else None,
+        }
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        _lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/v1/mercari/product-data/regenerate")
 async def regenerate_product_data(
     image_list: List[UploadFile] = File(...),
@@ -1570,28 +2302,113 @@ async def regenerate_product_data(
     return JSONResponse(result)
 
 
+def _stored_job_payload(job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    return _payload_for_job(job_id, job)
+
+
+def _job_http_error(exc: Exception) -> HTTPException:
+    if isinstance(exc, BadRequestError):
+        return HTTPException(status_code=400, detail=str(exc))
+    if isinstance(exc, LLMAllAttemptsFailedError):
+        return HTTPException(status_code=502, detail=_format_attempts_error(exc))
+    if isinstance(exc, StageDeadlineError):
+        return HTTPException(status_code=504, detail=str(exc))
+    if isinstance(exc, ExecutorSaturatedError):
+        return HTTPException(status_code=503, detail="Server is busy; retry later.")
+    return HTTPException(status_code=500, detail="Internal server error.")
+
+
+async def _load_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Look a job up, off the event loop when it may come from a shared backend."""
+    if analysis_job_store.backend is None:
+        return analysis_job_store.get(job_id)
+    return await run_in_threadpool(analysis_job_store.get, job_id)
+
+
+async def _refresh_job(job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Re-read a job owned by another worker; local jobs update in place."""
+    if not job.get("remote"):
+        return job
+    return await _load_job(job_id) or job
+
+
 @app.get("/api/v1/mercari/image/analyze/{job_id}")
-async def poll_image_analysis(job_id: str):
-    job = analysis_job_store.get(job_id)
+async def poll_image_analysis(job_id: str, wait: float = Query(0.0, ge=0)):
+    """Return the job state; with ``wait`` > 0, long-poll for completion.
+
+    A long poll is held on the event loop until the product-data source can be
+    decided or ``wait`` seconds (capped by JOB_POLL_MAX_WAIT_SECONDS) pass,
+    waking on future completion rather than re-checking on a timer.
+    """
+    job = await _load_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Analysis job not found.")
-    try:
-        result = await run_in_threadpool(
-            _job_payload,
-            job_id,
-            job["classification"],
-            job["future"],
-            fallback_future=job.get("fallback_future"),
-            started_at=job.get("started_at"),
-            fallback_timeout=job.get("fallback_timeout"),
-        )
-    except BadRequestError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-    except LLMAllAttemptsFailedError as exc:
-        raise HTTPException(status_code=502, detail=_format_attempts_error(exc)) from exc
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail="Internal server error.") from exc
-    return JSONResponse(result)
+    deadline = time.monotonic() + min(wait, float(settings.job_poll_max_wait_seconds))
+    while True:
+        try:
+            # Deciding the source only reads finished futures, so it never blocks.
+            result = _stored_job_payload(job_id, job)
+        except Exception as exc:
+            raise _job_http_error(exc) from exc
+        remaining = deadline - time.monotonic()
+        if result["status"] != "product_pending" or remaining <= 0:
+            return JSONResponse(result)
+        await wait_for_job_update(job, remaining)
+        job = await _refresh_job(job_id, job)
+
+
+_JOB_EVENTS_KEEPALIVE_SECONDS = 15.0
+
+
+def _sse_message(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/api/v1/mercari/image/analyze/{job_id}/events")
+async def stream_image_analysis(job_id: str, request: Request):
+    """Server-sent events for one analysis job.
+
+    Emits the current state immediately (``product_pending`` or ``completed``),
+    then ``completed`` -- or ``error`` with the status/detail a poll would have
+    returned -- as soon as a product-data future settles the job, and closes.
+    Waiting hangs off future done-callbacks, so an idle stream holds no thread.
+    """
+    job = await _load_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Analysis job not found.")
+
+    async def _events():
+        nonlocal job
+        last_status = None
+        last_sent = time.monotonic()
+        while True:
+            try:
+                # Deciding the source only reads finished futures, so it never blocks.
+                payload = _stored_job_payload(job_id, job)
+            except Exception as exc:
+                error = _job_http_error(exc)
+                yield _sse_message("error", {"status_code": error.status_code, "detail": error.detail})
+                return
+            if payload["status"] != last_status:
+                last_status = payload["status"]
+                yield _sse_message(last_status, payload)
+                last_sent = time.monotonic()
+            if last_status != "product_pending":
+                return
+            idle = time.monotonic() - last_sent
+            await wait_for_job_update(job, max(0.0, _JOB_EVENTS_KEEPALIVE_SECONDS - idle))
+            if await request.is_disconnected():
+                return
+            if time.monotonic() - last_sent >= _JOB_EVENTS_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+            job = await _refresh_job(job_id, job)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 class TitleCategoryRequest(BaseModel):
@@ -1623,6 +2440,122 @@ async def analyze_title(request: TitleCategoryRequest):
     return JSONResponse(result)
 
 
+class TitleBatchItem(BaseModel):
+    id: Optional[str] = None
+    title: str
+    image_url: Optional[str] = None
+
+
+class TitleBatchRequest(BaseModel):
+    items: List[TitleBatchItem]
+    language: Optional[str] = DEFAULT_LANGUAGE
+    # May only lower TITLE_BATCH_SIZE / TITLE_BATCH_MAX_WAIT_MS.
+    batch_size: Optional[int] = None
+    max_wait_ms: Optional[int] = None
+
+
+@app.post("/api/v1/mercari/title/analyze/batch")
+async def analyze_title_batch(payload: TitleBatchRequest, request: Request):
+    """Categorize many titles in one request, streaming one NDJSON line per item.
+
+    Titles are packed into batched prompts (top-level group first, then one
+    category prompt per group) of up to ``batch_size`` titles, a partial batch
+    waiting at most ``max_wait_ms`` for more; only a few batches of titles are
+    in flight at once. Items the batched answer does not
+    cover are retried one by one, then through the image fallback, so each
+    result matches /title/analyze. Item lines are ``{"type": "item", "item",
+    "index", "status", "result"|"error", "elapsed_ms"}``; the closing
+    ``{"type": "summary", ...}`` line adds the batched and single-title model
+    call counts and the title cache hits.
+    """
+    items = payload.items
+    max_items = int(settings.title_batch_max_items)
+    if not items:
+        raise HTTPException(status_code=400, detail="At least one item is required.")
+    if len(items) > max_items:
+        raise HTTPException(status_code=400, detail=f"At most {max_items} items per batch.")
+    language = payload.language or DEFAULT_LANGUAGE
+    if language not in SUPPORTED_LANGUAGES:
+        raise HTTPException(status_code=400, detail="Invalid language.")
+    batch_size = int(settings.title_batch_size)
+    if payload.batch_size is not None:
+        batch_size = max(1, min(batch_size, payload.batch_size))
+    max_wait_ms = int(settings.title_batch_max_wait_ms)
+    if payload.max_wait_ms is not None:
+        max_wait_ms = max(0, min(max_wait_ms, payload.max_wait_ms))
+    priority = (
+        llm_scheduler.current_priority()
+        if request.headers.get("x-priority")
+        else llm_scheduler.BATCH
+    )
+
+    async def _lines():
+        started = time.monotonic()
+        categorizer = TitleBatchCategorizer(
+            analyzer,
+            language=language,
+            batch_size=batch_size,
+            max_wait_s=max_wait_ms / 1000.0,
+            runner=_run_traced_in_threadpool,
+        )
+
+        async def _run(index: int) -> Dict[str, Any]:
+            item = items[index]
+            item_started = time.monotonic()
+            line: Dict[str, Any] = {"type": "item", "item": item.id, "index": index}
+            try:
+                result = await categorizer.categorize(item.title, item.image_url)
+            except Exception as exc:
+                error = _job_http_error(exc)
+                line.update(status="failed", error={"status_code": error.status_code, "detail": error.detail})
+            else:
+                line.update(status="completed", result=result)
+            line["elapsed_ms"] = round((time.monotonic() - item_started) * 1000, 2)
+            return line
+
+        # Items are started through a window of a few batches rather than all
+        # at once, so tasks and pending prompts do not scale with the request.
+        next_index = 0
+        pending: Set["asyncio.Future[Dict[str, Any]]"] = set()
+        counts = {"completed": 0, "failed": 0}
+        try:
+            while next_index < len(items) or pending:
+                with llm_scheduler.llm_priority(priority):
+                    while next_index < len(items) and len(pending) < categorizer.window:
+                        pending.add(asyncio.ensure_future(_run(next_index)))
+                        next_index += 1
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    line = task.result()
+                    counts[line["status"]] += 1
+                    yield json.dumps(line, ensure_ascii=False) + "\n"
+                if await request.is_disconnected():
+                    return
+        finally:
+            categorizer.close()
+            for task in pending:
+                task.cancel()
+        elapsed = time.monotonic() - started
+        summary = {
+            "type": "summary",
+            "items": len(items),
+            **counts,
+            "batch_size": batch_size,
+            "batched_calls": categorizer.batched_calls,
+            "single_calls": categorizer.single_calls,
+            "cache_hits": categorizer.cache_hits,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "items_per_minute": round(len(items) / elapsed * 60, 2) if elapsed > 0 else None,
+        }
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        _lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/v1/showcase/generate")
 async def generate_showcase(
     file: UploadFile = File(...),
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Compare the flat and the two-step (hierarchical) category selection prompts.
+
+Each testset row is categorized twice from its title and brand, inside the
+top-level group of its expected category (so both modes get the same group
+and only the category step differs): once with every path of the group in one
+prompt, once picking second-level nodes first. The report gives prompt tokens
+(from the provider's usage), latency and top-1 / top-3 accuracy per mode.
+
+By default only rows whose group has more paths than the threshold are run;
+the two modes are identical for the rest.
+
+Usage:
+  python scripts/benchmark_category_narrowing.py \
+    --testset data/test/image_recognition_testset_2026-05-30.csv \
+    --report logs/category_narrowing_report.json
+
+  # No model calls: prompt sizes only, assuming the right node is picked.
+  python scripts/benchmark_category_narrowing.py --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import dataclasses
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.config import Settings, load_settings
+from app.data.categories import CategoryStore
+from app.errors import LLMAllAttemptsFailedError
+from app.llm import prompt_store
+from app.llm.client import OpenRouterClient
+from app.observability.recorder import cached_prompt_tokens
+from app.service import CATEGORY_NODE_PICKS, MercariAnalyzer
+
+
+def load_cases(testset: str, rdx_csv: str, store: CategoryStore) -> List[Dict[str, Any]]:
+    """Testset rows with their expected category; ``genreId`` is mapped through rdx_category.csv."""
+    with open(rdx_csv, newline="", encoding="utf-8-sig") as f:
+        meru_ids = {row["id"]: row.get("meru_id", "") for row in csv.DictReader(f)}
+    by_id = {entry["id"]: entry for entries in store.by_group.values() for entry in entries}
+    cases = []
+    with open(testset, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            expected = by_id.get(meru_ids.get((row.get("genreId") or "").strip(), ""))
+            title = (row.get("itemName") or "").strip()
+            if expected is None or not title:
+                continue
+            cases.append({
+                "title": title,
+                "brand": (row.get("brand") or "").strip(),
+                "expected_id": expected["id"],
+                "expected_path": expected["name"],
+                "group_name": expected["group_name"],
+            })
+    return cases
+
+
+class UsageClient:
+    """OpenRouterClient wrapper that adds up the prompt tokens providers report."""
+
+    def __init__(self, client: OpenRouterClient) -> None:
+        self.client = client
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+
+    def chat(self, **kwargs: Any):
+        content, raw = self.client.chat(**kwargs)
+        usage = (raw or {}).get("usage") or {}
+        self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+        self.cached_prompt_tokens += cached_prompt_tokens(usage) or 0
+        return content, raw
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+def run_mode(settings: Settings, store: CategoryStore, cases: List[Dict[str, Any]], threshold: int) -> Dict[str, Any]:
+    client = UsageClient(OpenRouterClient(
+        api_key=settings.openrouter_api_key,
+        base_url=settings.openrouter_base_url,
+        timeout=settings.request_timeout,
+        referer=settings.openrouter_referer,
+        app_name=settings.openrouter_app_name,
+        reasoning=settings.reasoning,
+    ))
+    analyzer = MercariAnalyzer(
+        settings=dataclasses.replace(settings, category_hierarchical_threshold=threshold),
+        brand_store=None,
+        category_store=store,
+        vision_client=client,
+        category_client=client,
+    )
+    latencies: List[float] = []
+    tokens: List[int] = []
+    top1 = top3 = failed = 0
+    for case in cases:
+        before = client.prompt_tokens
+        started = time.monotonic()
+        try:
+            categories, _, _ = analyzer._choose_categories(
+                title=case["title"],
+                description="",
+                brand_for_prompt=case["brand"],
+                group_name=case["group_name"],
+            )
+        except LLMAllAttemptsFailedError:
+            failed += 1
+            continue
+        latencies.append((time.monotonic() - started) * 1000)
+        tokens.append(client.prompt_tokens - before)
+        ids = [category["id"] for category in categories]
+        top1 += bool(ids) and ids[0] == case["expected_id"]
+        top3 += case["expected_id"] in ids
+    answered = len(latencies)
+    return {
+        "items": len(cases),
+        "failed": failed,
+        "top1_accuracy": round(top1 / answered, 4) if answered else None,
+        "top3_accuracy": round(top3 / answered, 4) if answered else None,
+        "prompt_tokens_mean": round(sum(tokens) / answered, 1) if answered else None,
+        "cached_prompt_tokens": client.cached_prompt_tokens,
+        "latency_ms": {"p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95)},
+    }
+
+
+def prompt_sizes(store: CategoryStore, cases: List[Dict[str, Any]], threshold: int) -> Dict[str, Any]:
+    """Prompt characters per item without calling a model; step 2 assumes the expected node is picked."""
+    flat: List[int] = []
+    hierarchical: List[int] = []
+    system = {
+        key: len(prompt_store.render_system(key))
+        for key in ("CATEGORY_SYSTEM_PROMPT", "CATEGORY_NODE_SYSTEM_PROMPT")
+    }
+    for case in cases:
+        group = case["group_name"]
+        paths = [entry["name"] for entry in store.get_categories_by_group(group)]
+        flat_chars = system["CATEGORY_SYSTEM_PROMPT"] + len("\n".join(paths))
+        flat.append(flat_chars)
+        nodes = store.category_nodes(group, max(1, threshold // CATEGORY_NODE_PICKS))
+        node = next((n for n in nodes if any(e["id"] == case["expected_id"] for e in n.entries)), None)
+        if len(paths) <= threshold or len(nodes) < 2 or node is None:
+            hierarchical.append(flat_chars)
+            continue
+        hierarchical.append(
+            system["CATEGORY_NODE_SYSTEM_PROMPT"] + len("\n".join(n.path for n in nodes))
+            + system["CATEGORY_SYSTEM_PROMPT"] + len("\n".join(e["name"] for e in node.entries))
+        )
+    return {
+        "items": len(cases),
+        "flat_chars_mean": round(sum(flat) / len(flat), 1),
+        "hierarchical_chars_mean": round(sum(hierarchical) / len(hierarchical), 1),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--testset", default=str(ROOT_DIR / "data" / "test" / "image_recognition_testset_2026-05-30.csv"))
+    parser.add_argument("--rdx-categories", default=str(ROOT_DIR / "data" / "others" / "rdx_category.csv"))
+    parser.add_argument("--categories", default=settings.category_csv_path)
+    parser.add_argument("--threshold", type=int, default=settings.category_hierarchical_threshold or 600)
+    parser.add_argument("--all", action="store_true", help="Also run rows whose group is within the threshold.")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--dry-run", action="store_true", help="Only compare prompt sizes; no model calls.")
+    parser.add_argument("--report", help="Also write the report as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    store = CategoryStore(args.categories)
+    cases = load_cases(args.testset, args.rdx_categories, store)
+    if not args.all:
+        cases = [c for c in cases if len(store.get_categories_by_group(c["group_name"])) > args.threshold]
+    if args.limit:
+        cases = cases[:args.limit]
+    print(f"{len(cases)} testset rows, threshold {args.threshold}")
+    if not cases:
+        return 1
+
+    if args.dry_run:
+        report: Dict[str, Any] = {"threshold": args.threshold, "prompt_sizes": prompt_sizes(store, cases, args.threshold)}
+    else:
+        report = {
+            "threshold": args.threshold,
+            "flat": run_mode(settings, store, cases, 0),
+            "hierarchical": run_mode(settings, store, cases, args.threshold),
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
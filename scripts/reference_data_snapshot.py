@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Write and measure binary snapshots of the brand and category tables.
+
+Commands:
+  build    Load BRAND_CSV_PATH / CATEGORY_CSV_PATH and write their snapshots
+           to BRAND_SNAPSHOT_PATH / CATEGORY_SNAPSHOT_PATH.
+  check    Report whether each snapshot is usable and matches its CSV.
+  measure  Load each store in a fresh process, from the CSV and from the
+           snapshot, and print the load time and the RSS it adds.
+
+Usage:
+  python scripts/build_mercari_brand_csv.py && python scripts/reference_data_snapshot.py build
+  python scripts/reference_data_snapshot.py measure --runs 3
+
+The service rebuilds a missing or stale snapshot itself on startup, so
+``build`` only saves the first worker that work (e.g. in a deploy step).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.config import load_settings
+from app.data.brands import BrandStore
+from app.data.categories import CategoryStore
+from app.data.snapshot import SNAPSHOT_VERSION, read_current_snapshot
+
+STORES = {"brands": BrandStore, "categories": CategoryStore}
+
+
+def _rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _load_once(kind: str, csv_path: str, snapshot_path: str) -> Dict[str, float]:
+    """Runs in a child process so every sample starts from a clean heap."""
+    before = _rss_mib()
+    started = time.perf_counter()
+    store = STORES[kind](csv_path, snapshot_path=snapshot_path)
+    load_ms = (time.perf_counter() - started) * 1000
+    after = _rss_mib()
+    del store
+    return {"load_ms": round(load_ms, 1), "rss_mib": round(after - before, 1), "process_rss_mib": round(after, 1)}
+
+
+def _measure(kind: str, csv_path: str, snapshot_path: str, runs: int) -> Dict[str, float]:
+    samples: List[Dict[str, float]] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, __file__, "_load", kind, csv_path, snapshot_path],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        samples.append(json.loads(output.splitlines()[-1]))
+    return {key: min(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main(argv: List[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["_load"]:
+        print(json.dumps(_load_once(*argv[1:4])))
+        return 0
+
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("build", "check", "measure"))
+    parser.add_argument("--brand-csv", default=settings.brand_csv_path)
+    parser.add_argument("--category-csv", default=settings.category_csv_path)
+    parser.add_argument("--brand-snapshot", default=settings.brand_snapshot_path or "data/mercari_brand.snapshot")
+    parser.add_argument("--category-snapshot",
+                        default=settings.category_snapshot_path or "data/category_rakuten.snapshot")
+    parser.add_argument("--runs", type=int, default=3, help="Samples per measurement; the minimum is reported.")
+    args = parser.parse_args(argv)
+
+    sources = {
+        "brands": (args.brand_csv, args.brand_snapshot),
+        "categories": (args.category_csv, args.category_snapshot),
+    }
+    if args.command == "build":
+        for kind, (csv_path, snapshot_path) in sources.items():
+            STORES[kind](csv_path).write_snapshot(snapshot_path)
+            size = os.path.getsize(snapshot_path) / 2**20
+            print(f"{kind}: {csv_path} -> {snapshot_path} (format v{SNAPSHOT_VERSION}, {size:.1f} MiB)")
+        return 0
+    if args.command == "check":
+        stale = 0
+        for kind, (csv_path, snapshot_path) in sources.items():
+            current = read_current_snapshot(snapshot_path, kind, csv_path) is not None
+            stale += not current
+            print(f"{kind}: {snapshot_path} {'is current' if current else 'is missing, unusable or stale'}")
+        return 1 if stale else 0
+
+    report = {}
+    for kind, (csv_path, snapshot_path) in sources.items():
+        report[kind] = {"csv": _measure(kind, csv_path, "", args.runs)}
+        if os.path.exists(snapshot_path):
+            report[kind]["snapshot"] = _measure(kind, csv_path, snapshot_path, args.runs)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -152,6 +152,8 @@ def main(argv: Optional[List[str]] = None) -> int:
         cases = cases[: args.limit]
 
     session = requests.Session()
+    # Queue this run's LLM calls behind live traffic on the server.
+    session.headers["X-Priority"] = "batch"
     results: List[Dict[str, Any]] = []
     ok = 0
     failed = 0
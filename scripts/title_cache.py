@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Build and maintain the near-duplicate title answer cache (TITLE_CACHE_PATH).
+
+Commands:
+  rebuild  Re-index every successful /title/analyze and /image/analyze answer
+           in the observability store, replacing the current index atomically.
+  update   Index only the requests recorded since the last rebuild/update.
+  stats    Print the number of entries and the last indexed timestamp.
+  lookup   Show what the cache would answer for a title.
+
+Usage:
+  python scripts/title_cache.py rebuild
+  python scripts/title_cache.py update            # e.g. from cron every few minutes
+  python scripts/title_cache.py lookup "Nintendo Switch 有機EL ホワイト"
+
+The running service reads the same SQLite file, so neither command needs a
+restart; the index only has to exist when the service starts.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.config import load_settings
+from app.title_cache import TitleAnswerCache, records_from_observability
+
+
+# Requests are stamped when they start, so one still running at the previous
+# update can finish with an earlier timestamp; re-read a margin (indexing is
+# idempotent) instead of missing it.
+UPDATE_OVERLAP = timedelta(minutes=10)
+
+
+def _rewind(timestamp: str) -> str:
+    if not timestamp:
+        return ""
+    started = datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ") - UPDATE_OVERLAP
+    return started.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def main(argv: List[str] | None = None) -> int:
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("rebuild", "update", "stats", "lookup"))
+    parser.add_argument("title", nargs="?", help="Title for the lookup command.")
+    parser.add_argument("--cache", default=settings.title_cache_path)
+    parser.add_argument("--min-similarity", type=float, default=settings.title_cache_min_similarity)
+    parser.add_argument("--observability-db", default=str(ROOT_DIR / "logs" / "observability.db"))
+    parser.add_argument("--store-root", default=str(ROOT_DIR / "logs" / "store"))
+    args = parser.parse_args(argv)
+
+    cache = TitleAnswerCache(args.cache, min_similarity=args.min_similarity)
+    if args.command == "stats":
+        print(f"{len(cache)} titles indexed, up to {cache.indexed_until or '(never)'}")
+        return 0
+    if args.command == "lookup":
+        if not args.title:
+            parser.error("lookup needs a title")
+        hit = cache.lookup(args.title)
+        if hit is None:
+            print("miss")
+            return 1
+        result, similarity = hit
+        print(f"hit (similarity {similarity:.3f})")
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+    since = "" if args.command == "rebuild" else _rewind(cache.indexed_until)
+    records = records_from_observability(args.observability_db, args.store_root, since=since)
+    added = cache.add_many(records, replace=args.command == "rebuild")
+    if records:
+        cache.indexed_until = max(cache.indexed_until, records[-1].recorded_at)
+    print(f"{args.command}: indexed {added} of {len(records)} answers; {len(cache)} titles in {args.cache}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
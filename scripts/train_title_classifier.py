@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Train the local title -> top-level category classifier and report how it does.
+
+Training data: every path of the category CSV(s), labelled with its top-level
+category, plus the title -> group answers of past ``title_category`` LLM calls
+read from the observability store. A deterministic share of each source is
+held out for the report; the saved model is then retrained on everything.
+
+Usage:
+  python scripts/train_title_classifier.py \
+    --categories data/category_rakuten.csv \
+    --output data/title_classifier.json \
+    --report logs/title_classifier_report.json
+
+Category paths alone are a weak proxy for real titles (brand and model names
+never appear in them); check the ``history`` section of the report before
+lowering TITLE_CLASSIFIER_MIN_CONFIDENCE.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.config import load_settings
+from app.title_classifier import (
+    Example,
+    TitleGroupClassifier,
+    evaluate,
+    examples_from_category_csv,
+    examples_from_observability,
+)
+
+
+def split(examples: Sequence[Example], holdout: float) -> Tuple[List[Example], List[Example]]:
+    """Stable train/holdout split keyed on the text, so reruns compare like for like."""
+    train: List[Example] = []
+    held: List[Example] = []
+    for example in examples:
+        bucket = zlib.crc32(example[0].encode("utf-8")) % 1000
+        (held if bucket < holdout * 1000 else train).append(example)
+    return train, held
+
+
+def main(argv: List[str] | None = None) -> int:
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categories", action="append", help="Category CSV (repeatable); default CATEGORY_CSV_PATH.")
+    parser.add_argument("--observability-db", default=str(ROOT_DIR / "logs" / "observability.db"))
+    parser.add_argument("--store-root", default=str(ROOT_DIR / "logs" / "store"))
+    parser.add_argument("--output", default=settings.title_classifier_path)
+    parser.add_argument("--report", help="Also write the report as JSON to this path.")
+    parser.add_argument("--holdout", type=float, default=0.1)
+    parser.add_argument("--alpha", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    paths: List[Example] = []
+    for csv_path in args.categories or [settings.category_csv_path]:
+        paths.extend(examples_from_category_csv(csv_path))
+    history = examples_from_observability(args.observability_db, args.store_root)
+    print(f"examples: {len(paths)} category paths, {len(history)} historical titles")
+    if len({label for _text, label in paths + history}) < 2:
+        print("Not enough training data: fewer than two top-level categories in the category CSV and history.")
+        return 1
+
+    paths_train, paths_held = split(paths, args.holdout)
+    history_train, history_held = split(history, args.holdout)
+    classifier = TitleGroupClassifier.train(paths_train + history_train, alpha=args.alpha)
+    report: Dict[str, Any] = {
+        "train_examples": len(paths_train) + len(history_train),
+        "paths": evaluate(classifier, paths_held),
+        "history": evaluate(classifier, history_held),
+    }
+    for name in ("paths", "history"):
+        section = report[name]
+        print(f"\n[{name}] held out {section['examples']}, accuracy {section['accuracy']}, "
+              f"latency ms {section['latency_ms']}")
+        for row in section["thresholds"]:
+            print(f"  confidence >= {row['threshold']:.2f}: coverage {row['coverage']}, accuracy {row['accuracy']}")
+    if not history_held:
+        print("\nNo historical titles held out: accuracy on real titles is unknown.")
+
+    final = TitleGroupClassifier.train(paths + history, alpha=args.alpha)
+    final.meta.update({"paths": len(paths), "history": len(history)})
+    final.save(args.output)
+    print(f"\nSaved {len(final.idf)} n-grams / {len(final.labels)} classes to {args.output}")
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from console_auth_helpers import auth_headers
+from app.errors import BadRequestError, ExecutorSaturatedError, StageDeadlineError
+from app.executor import BoundedExecutor
+from app.pipeline import COMPLETED, FAILED, SKIPPED, Stage, StagePipeline
+import main
+
+
+def _collect(pipeline):
+    async def _run():
+        return [event async for event in pipeline.run()]
+
+    return asyncio.run(_run())
+
+
+def test_stages_stream_in_completion_order_with_dependency_inputs():
+    release_slow = threading.Event()
+
+    def slow(_inputs, _token):
+        release_slow.wait(2)
+        return "slow"
+
+    pipeline = StagePipeline([
+        Stage("slow", slow),
+        Stage("child", lambda inputs, _token: inputs["fast"] + "+child", depends_on=("fast",)),
+        Stage("fast", lambda _inputs, _token: "fast"),
+    ])
+
+    async def _run():
+        events = []
+        async for event in pipeline.run():
+            events.append(event)
+            if event.stage == "child":
+                release_slow.set()
+        return events
+
+    events = asyncio.run(_run())
+
+    assert [(e.stage, e.status) for e in events] == [
+        ("fast", COMPLETED), ("child", COMPLETED), ("slow", COMPLETED),
+    ]
+    assert events[1].result == "fast+child"
+
+
+def test_failed_stage_skips_its_dependents_only():
+    def broken(_inputs, _token):
+        raise BadRequestError("bad image")
+
+    events = {e.stage: e for e in _collect(StagePipeline([
+        Stage("root", broken),
+        Stage("child", lambda inputs, _t: pytest.fail("must not run"), depends_on=("root",)),
+        Stage("grandchild", lambda inputs, _t: pytest.fail("must not run"), depends_on=("child",)),
+        Stage("other", lambda _inputs, _t: 1),
+    ]))}
+
+    assert events["root"].status == FAILED
+    assert isinstance(events["root"].error, BadRequestError)
+    assert events["child"].status == SKIPPED and events["child"].blocked_by == "root"
+    assert events["grandchild"].status == SKIPPED
+    assert events["other"].status == COMPLETED
+
+
+def test_deadline_fails_the_stage_and_cancels_its_call():
+    tokens = []
+
+    def hangs(_inputs, token):
+        tokens.append(token)
+        token.wait(2)
+        return "late"
+
+    started = time.monotonic()
+    events = _collect(StagePipeline([Stage("hangs", hangs, deadline_seconds=0.1)]))
+
+    assert time.monotonic() - started < 1.5
+    assert events[0].status == FAILED
+    assert isinstance(events[0].error, StageDeadlineError)
+    assert tokens[0].cancelled
+
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    noop = lambda _inputs, _token: None  # noqa: E731
+    with pytest.raises(ValueError):
+        StagePipeline([Stage("a", noop, depends_on=("b",)), Stage("b", noop, depends_on=("a",))])
+    with pytest.raises(ValueError):
+        StagePipeline([Stage("a", noop, depends_on=("missing",))])
+
+
+_FAST = {"title": "Nike シャツ", "simple_description": "", "top_level_category": "メンズファッション",
+         "group_name": "メンズファッション", "timings": {"fast_classification_ms": 5.0}}
+
+
+def _post(client, **data):
+    return client.post(
+        "/api/v1/mercari/image/analyze-all",
+        headers=auth_headers(),
+        files=[("image_list", ("a.png", b"\x89PNG\r\n\x1a\n", "image/png"))],
+        data={"language": "ja", **data},
+    )
+
+
+@patch.object(main, "analyzer")
+def test_endpoint_streams_each_stage_then_the_merged_result(analyzer):
+    analyzer.fast_classify.return_value = _FAST
+    analyzer.select_categories.return_value = {
+        "categories": [{"id": "1", "name": "メンズファッション/トップス"}],
+        "best_target_path": "メンズファッション/トップス",
+        "timings": {"category_ms": 3.0},
+    }
+    analyzer.generate_product_data.return_value = {
+        "title": "Nike シャツ メンズ", "brand_name": "Nike", "tax_excluded": None,
+        "tax_included": None, "prices": [], "timings": {"product_data_ms": 9.0},
+    }
+    analyzer.extract_prices.return_value = {"tax_excluded": None, "tax_included": 1078,
+                                            "prices": [900, 1200], "timings": {"price_ms": 4.0}}
+    analyzer.extract_size.side_effect = BadRequestError("no size")
+
+    response = _post(TestClient(main.app))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    messages = [json.loads(line) for line in response.text.splitlines()]
+    by_stage = {m["stage"]: m for m in messages}
+    assert set(by_stage) == {"fast_classification", "categories", "product_data", "price", "size", "analysis"}
+    assert messages[-1]["stage"] == "analysis"
+    assert by_stage["size"]["status"] == "failed"
+    assert by_stage["size"]["error"] == {"status_code": 400, "detail": "no size"}
+
+    final = by_stage["analysis"]
+    assert final["status"] == "partial"
+    assert final["result"]["brand_name"] == "Nike"
+    assert final["result"]["tax_included"] == 1078
+    assert final["result"]["prices"] == [900, 1200]
+    assert final["result"]["best_target_path"] == "メンズファッション/トップス"
+    assert analyzer.select_categories.call_args.args[0] == _FAST
+    # The images were read and compressed once and shared by every stage.
+    images = analyzer.extract_prices.call_args.kwargs["images"]
+    assert analyzer.generate_product_data.call_args.kwargs["images"] is images
+
+
+@patch.object(main, "analyzer")
+def test_endpoint_speaks_sse_on_request(analyzer):
+    analyzer.fast_classify.side_effect = BadRequestError("bad image")
+    analyzer.generate_product_data.return_value = {"timings": {}}
+    analyzer.extract_prices.return_value = {"timings": {}}
+    analyzer.extract_size.return_value = {"product_size": None, "timings": {}}
+
+    response = _post(TestClient(main.app), stream="sse")
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "event: categories\n" in response.text
+    assert '"blocked_by": "fast_classification"' in response.text
+    assert response.text.rstrip().split("\n\n")[-1].startswith("event: analysis\n")
+    analyzer.select_categories.assert_not_called()
+
+
+
+@patch.object(main, "analyzer")
+def test_combined_mode_reads_price_and_size_in_one_stage(analyzer):
+    analyzer.fast_classify.return_value = {**_FAST, "group_name": None}
+    analyzer.select_categories.return_value = {"categories": [], "timings": {}}
+    analyzer.generate_product_data.return_value = {"timings": {}}
+    analyzer.extract_price_and_size.return_value = {
+        "tax_excluded": None, "tax_included": 500, "prices": [400, 600],
+        "product_size": "M", "timings": {"price_size_ms": 4.0},
+    }
+
+    messages = [json.loads(line) for line in _post(TestClient(main.app), combined="true").text.splitlines()]
+
+    assert {m["stage"] for m in messages} == {
+        "fast_classification", "categories", "product_data", "price_size", "analysis",
+    }
+    final = messages[-1]
+    assert final["status"] == "completed"
+    assert final["result"]["product_size"] == "M"
+    assert final["result"]["tax_included"] == 500
+    analyzer.extract_prices.assert_not_called()
+    analyzer.extract_size.assert_not_called()
+
+
+@patch.object(main, "analyzer")
+def test_product_data_stage_goes_through_the_bounded_executor(analyzer):
+    analyzer.fast_classify.return_value = _FAST
+    analyzer.select_categories.return_value = {"categories": [], "timings": {}}
+    analyzer.extract_prices.return_value = {"timings": {}}
+    analyzer.extract_size.return_value = {"product_size": None, "timings": {}}
+
+    with patch.object(main.product_data_executor, "submit", side_effect=ExecutorSaturatedError(7)):
+        messages = [json.loads(line) for line in _post(TestClient(main.app)).text.splitlines()]
+
+    by_stage = {m["stage"]: m for m in messages}
+    assert by_stage["product_data"]["status"] == "failed"
+    assert by_stage["product_data"]["error"]["status_code"] == 503
+    assert by_stage["categories"]["status"] == "completed"
+    assert by_stage["analysis"]["status"] == "partial"
+    analyzer.generate_product_data.assert_not_called()
+
+
+@patch.object(main, "analyzer")
+def test_queued_product_data_is_dropped_when_its_deadline_passes(analyzer, monkeypatch):
+    analyzer.fast_classify.return_value = _FAST
+    analyzer.select_categories.return_value = {"categories": [], "timings": {}}
+    analyzer.extract_prices.return_value = {"timings": {}}
+    analyzer.extract_size.return_value = {"product_size": None, "timings": {}}
+    executor = BoundedExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(release.wait)  # the only worker is busy for the whole request
+    submitted = []
+    submit = executor.submit
+
+    def recording_submit(fn, /, *args, **kwargs):
+        submitted.append(submit(fn, *args, **kwargs))
+        return submitted[-1]
+
+    monkeypatch.setattr(executor, "submit", recording_submit)
+    monkeypatch.setattr(main, "product_data_executor", executor)
+    monkeypatch.setattr(main.settings, "analyze_all_deadline_seconds", 0.2)
+    try:
+        messages = [json.loads(line) for line in _post(TestClient(main.app)).text.splitlines()]
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+
+    by_stage = {m["stage"]: m for m in messages}
+    assert by_stage["product_data"]["status"] == "failed"
+    assert by_stage["product_data"]["error"]["status_code"] == 504
+    assert len(submitted) == 1 and submitted[0].cancelled()
+    analyzer.generate_product_data.assert_not_called()
+
+
+def test_endpoint_rejects_unknown_stream_format():
+    assert _post(TestClient(main.app), stream="xml").status_code == 400
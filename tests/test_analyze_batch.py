@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from console_auth_helpers import auth_headers
+from app.errors import BadRequestError, ExecutorSaturatedError
+from app.llm import scheduler as llm_scheduler
+import main
+
+
+PNG = b"\x89PNG\r\n\x1a\n"
+CLASSIFICATION = {"status": "product_pending", "categories": [], "tax_excluded": None,
+                  "tax_included": None, "prices": [], "timings": {"classification_ms": 5.0}}
+
+
+def _post(files, headers=None, **data):
+    return TestClient(main.app).post(
+        "/api/v1/mercari/image/analyze/batch",
+        headers={**auth_headers(), **(headers or {})},
+        files=files,
+        data=data,
+    )
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@patch.object(main, "analyzer")
+def test_streams_one_line_per_item_and_a_summary(analyzer):
+    priorities = []
+
+    def classify(images, **_kwargs):
+        if len(images) == 1:
+            raise BadRequestError("unreadable image")
+        return CLASSIFICATION
+
+    def generate(images, **_kwargs):
+        priorities.append(llm_scheduler.current_priority())
+        return {"title": f"{len(images)} images", "timings": {"product_data_ms": 7.0}}
+
+    analyzer.classify_first_image_categories.side_effect = classify
+    analyzer.generate_product_data.side_effect = generate
+
+    response = _post([
+        ("item-a", ("a1.png", PNG, "image/png")),
+        ("item-b", ("b1.png", PNG, "image/png")),
+        ("item-a", ("a2.png", PNG, "image/png")),
+    ])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = _lines(response)
+    items = {line["item"]: line for line in lines if line["type"] == "item"}
+    assert items["item-a"]["status"] == "completed"
+    assert items["item-a"]["result"]["title"] == "2 images"
+    assert items["item-a"]["result"]["status"] == "completed"
+    assert items["item-b"]["status"] == "failed"
+    assert items["item-b"]["error"] == {"status_code": 400, "detail": "unreadable image"}
+
+    summary = lines[-1]
+    assert summary["type"] == "summary"
+    assert (summary["items"], summary["completed"], summary["failed"]) == (2, 1, 1)
+    assert summary["items_per_minute"] > 0
+    # Batch traffic queues behind interactive calls in the LLM scheduler.
+    assert set(priorities) == {llm_scheduler.BATCH}
+
+
+@patch.object(main, "analyzer")
+def test_items_run_with_bounded_concurrency(analyzer):
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def classify(**_kwargs):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+        return CLASSIFICATION
+
+    analyzer.classify_first_image_categories.side_effect = classify
+    analyzer.generate_product_data.return_value = {"timings": {}}
+
+    files = [(f"item-{i}", (f"{i}.png", PNG, "image/png")) for i in range(6)]
+    lines = _lines(_post(files, concurrency="2"))
+
+    assert lines[-1]["completed"] == 6
+    assert lines[-1]["concurrency"] == 2
+    assert running["max"] <= 2
+
+
+@patch.object(main, "analyzer")
+def test_explicit_priority_header_wins(analyzer):
+    seen = []
+    analyzer.classify_first_image_categories.return_value = CLASSIFICATION
+    analyzer.generate_product_data.side_effect = lambda **_kwargs: seen.append(
+        llm_scheduler.current_priority()) or {"timings": {}}
+
+    _post([("item", ("a.png", PNG, "image/png"))], headers={"X-Priority": "background"})
+
+    assert seen == [llm_scheduler.BACKGROUND]
+
+
+@patch.object(main, "analyzer")
+def test_saturated_product_data_executor_fails_the_item_with_503(analyzer):
+    analyzer.classify_first_image_categories.return_value = CLASSIFICATION
+
+    with patch.object(main.product_data_executor, "submit", side_effect=ExecutorSaturatedError(7)):
+        lines = _lines(_post([("item", ("a.png", PNG, "image/png"))]))
+
+    assert lines[0]["status"] == "failed"
+    assert lines[0]["error"]["status_code"] == 503
+    analyzer.generate_product_data.assert_not_called()
+
+
+def test_batch_endpoints_are_recorded_in_the_request_log(monkeypatch):
+    started = []
+    monkeypatch.setattr(main.recorder, "start_request", lambda **kwargs: started.append(kwargs["endpoint"]))
+    with patch.object(main, "analyzer") as analyzer:
+        analyzer.classify_first_image_categories.return_value = CLASSIFICATION
+        analyzer.generate_product_data.return_value = {"timings": {}}
+        _post([("item", ("a.png", PNG, "image/png"))])
+    TestClient(main.app).post("/api/v1/mercari/title/analyze/batch", headers=auth_headers(), json={"items": []})
+
+    assert started == ["/api/v1/mercari/image/analyze/batch", "/api/v1/mercari/title/analyze/batch"]
+
+
+def test_rejects_empty_and_oversized_batches():
+    assert _post([], language="ja").status_code == 400
+    with patch.object(main.settings, "analyze_batch_max_items", 1):
+        response = _post([
+            ("a", ("a.png", PNG, "image/png")),
+            ("b", ("b.png", PNG, "image/png")),
+        ])
+    assert response.status_code == 400
@@ -4,6 +4,7 @@ import unittest
 from pathlib import Path
 
 from app.data.brands import BrandStore, empty_brand_id_obj
+from app.data.categories import CategoryStore
 from app.service import _resolve_brand
 
 
@@ -15,6 +16,8 @@ BRAND_ROWS = [
 
 FIELDNAMES = ["id", "name", "name_jp", "name_en", "name_cn", "meru_id"]
 
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
 
 def _build_store(tmpdir: str) -> BrandStore:
     csv_path = Path(tmpdir) / "mercari_brand.csv"
@@ -109,6 +112,24 @@ class ResolveBrandTest(unittest.TestCase):
         self.assertEqual(id_obj, empty_brand_id_obj())
         self.assertEqual(raw, "Tapo")
 
+    def test_falls_back_to_brand_named_mid_title(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = _build_store(tmpdir)
+            ai_raw = {"brand_name": "", "title": "【新品】ワイヤレスイヤホン ソニー WF-1000XM4"}
+            name, id_obj, raw = _resolve_brand(store, ai_raw, _description())
+        self.assertEqual(name, "Sony")
+        self.assertEqual(id_obj["meru_brand_id"], "sony-1")
+        self.assertEqual(raw, "")
+
+    def test_brand_only_in_description_text_is_not_used(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = _build_store(tmpdir)
+            description = {**_description(), "product_intro": "Acme製の充電器と同じ規格です。"}
+            ai_raw = {"brand_name": "", "title": "USB充電器 急速"}
+            self.assertEqual(_resolve_brand(store, ai_raw, description)[0], "")
+            description["search_keywords"] = ["充電器", "acme"]
+            self.assertEqual(_resolve_brand(store, ai_raw, description)[0], "Acme")
+
     def test_missing_brand_candidates_degrades_gracefully(self):
         # Old / fallback models may not return brand_candidates at all.
         with tempfile.TemporaryDirectory() as tmpdir:
@@ -137,5 +158,44 @@ class ResolveBrandTest(unittest.TestCase):
         self.assertEqual(store.match_calls, ["Tapo"])
 
 
+class ShippedBrandTableTest(unittest.TestCase):
+    """Titles built from everyday words must not be read as brands."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.store = BrandStore(str(DATA_DIR / "mercari_brand.csv"))
+        cls.generic_words = CategoryStore(str(DATA_DIR / "category_rakuten.csv")).path_words()
+
+    def _brand(self, title: str) -> str:
+        ai_raw = {"brand_name": "", "title": title}
+        return _resolve_brand(self.store, ai_raw, _description(), self.generic_words)[0]
+
+    def test_generic_titles_resolve_to_no_brand(self):
+        for title in (
+            "Tシャツ メンズ 半袖 綿 ホワイト",
+            "レディース ワンピース 花柄 ロング",
+            "ベビー服 ロンパース 70cm 女の子",
+            "イヤリング ピアス パール",
+            "キッチン 収納 ラック 3段",
+            "木製 スツール 北欧 インテリア",
+        ):
+            with self.subTest(title=title):
+                self.assertEqual(self._brand(title), "")
+
+    def test_named_brands_still_resolve(self):
+        self.assertEqual(self._brand("【新品】ワイヤレスイヤホン ソニー WF-1000XM4"), "SONY")
+        self.assertEqual(self._brand("NIKE エアマックス 27cm"), "NIKE")
+        self.assertEqual(self._brand("ノースリーブ ワンピース シャネル"), "CHANEL")
+
+    def test_title_first_token_is_still_matched_as_is(self):
+        # Only scanner hits are gated; the first-token candidate is unchanged.
+        self.assertEqual(self._brand("ホワイト Tシャツ メンズ"), "WHITE")
+
+    def test_description_text_is_not_scanned(self):
+        description = {**_description(), "product_intro": "ソニー製の充電器と同じ規格です。"}
+        ai_raw = {"brand_name": "", "title": "USB充電器 急速"}
+        self.assertEqual(_resolve_brand(self.store, ai_raw, description, self.generic_words)[0], "")
+
+
 if __name__ == "__main__":
     unittest.main()
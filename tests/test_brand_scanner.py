@@ -0,0 +1,65 @@
+import random
+
+from app.data.brand_scanner import BrandScanner, indexable
+from app.utils import normalize_text
+
+NAMES = ["nike", "ナイキ", "air", "air max", "max", "ロエベ", "ママ", "2020", "ami", "miami", "ami paris"]
+
+
+def _scanner(names=NAMES) -> BrandScanner:
+    keys = [normalize_text(name) for name in names]
+    return BrandScanner(keys, [{"brand_name": name} for name in names])
+
+
+def test_finds_names_mid_title_with_positions():
+    (hit,) = _scanner().scan({"title": "【美品】ロエベ パズルバッグ"})
+
+    assert hit.record["brand_name"] == "ロエベ"
+    mention = hit.mentions[0]
+    text = normalize_text("【美品】ロエベ パズルバッグ")
+    assert text[mention.start:mention.end] == "ロエベ" and mention.field == "title"
+
+
+def test_names_inside_a_longer_word_or_number_are_not_mentions():
+    scanner = _scanner()
+    assert scanner.scan({"title": "miamix 2020年モデル ママバッグ", "description": "hairband ナイキスト"}) == []
+    assert not indexable("ママ") and not indexable("2020") and indexable("ami")
+
+
+def test_overlaps_keep_the_longest_name_and_fields_are_weighted():
+    hits = _scanner().scan({"title": "Air Max 90 ami paris", "description": "NIKE ナイキ nike"})
+
+    assert [hit.record["brand_name"] for hit in hits] == ["ami paris", "air max", "nike", "ナイキ"]
+    assert hits[0].score == 3.0 * len("ami paris")
+    assert [m.name for m in hits[2].mentions] == ["nike", "nike"]
+
+
+def test_automaton_finds_what_a_naive_search_finds():
+    rng = random.Random(7)
+    names = sorted({"".join(rng.choice("abc") for _ in range(rng.randint(3, 6))) for _ in range(60)})
+    scanner = _scanner(names)
+    for _ in range(200):
+        text = "".join(rng.choice("abc ") for _ in range(40))
+        expected = set()
+        for word_start, word in _words(text):
+            if word in names:
+                expected.add((word_start, word_start + len(word), word))
+        found = {(start, end, scanner.names[p]) for start, end, p in scanner.find(text)}
+        # Inside a run of letters only whole words are mentions.
+        assert found == expected
+
+
+def test_state_round_trip_keeps_the_automaton():
+    scanner = _scanner()
+    restored = BrandScanner.from_state(scanner.names, scanner.records, scanner.state())
+
+    text = normalize_text("ナイキ Air Max ami paris")
+    assert restored.find(text) == scanner.find(text)
+
+
+def _words(text):
+    start = 0
+    for word in text.split(" "):
+        if word:
+            yield start, word
+        start += len(word) + 1
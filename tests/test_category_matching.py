@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+
+from app.data.categories import CategoryStore
+from app.service import MercariAnalyzer
+
+
+ROWS = [
+    ("1", "ファッション > メンズ > トップス > Tシャツ"),
+    ("2", "ファッション > メンズ > アクセサリー > ネックレス"),
+    ("3", "ファッション > メンズ > その他"),
+    ("4", "ファッション > キッズ > その他"),
+    ("5", "ファッション > レディース > バッグ > ショルダーバッグ"),
+]
+
+
+def _store(tmp_path) -> CategoryStore:
+    path = tmp_path / "categories.csv"
+    lines = ["category_id,path,group_name"] + [f"{cid},{name},ファッション" for cid, name in ROWS]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return CategoryStore(str(path))
+
+
+def _closest(store, path, min_similarity=0.8):
+    hit = store.closest_category("ファッション", path, min_similarity)
+    return (hit[0]["id"], hit[1]) if hit else None
+
+
+def test_near_miss_paths_resolve_to_the_closest_real_path(tmp_path):
+    store = _store(tmp_path)
+
+    # Other separators, full width and a missing group prefix are not misses at all.
+    assert _closest(store, "ファッション＞メンズ＞トップス＞Ｔシャツ") == ("1", 1.0)
+    assert _closest(store, "メンズ › トップス > Tシャツ") == ("1", 1.0)
+    # A dropped segment or a small typo still finds the path.
+    assert _closest(store, "ファッション > メンズ > ネックレス")[0] == "2"
+    assert _closest(store, "ファッション > レディース > バッグ > ショルダーバック")[0] == "5"
+
+
+def test_unrelated_or_ambiguous_paths_stay_unmatched(tmp_path):
+    store = _store(tmp_path)
+
+    assert _closest(store, "ファッション > 家電 > 冷蔵庫") is None
+    # Either "その他" would fit once the middle segment is gone.
+    assert _closest(store, "ファッション > その他", min_similarity=0.0) is None
+    assert store.closest_category("なし", "ファッション > メンズ > その他", 0.8) is None
+
+
+class _ChatClient:
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+
+    def chat(self, **_kwargs):
+        return json.dumps(self.payloads.pop(0)), {"choices": []}
+
+
+def test_reconciled_paths_are_kept_and_reported_in_debug(tmp_path):
+    client = _ChatClient([{
+        "best_target_path": "ファッション > メンズ > トップス > Ｔシャツ",
+        "confidence": 0.9,
+        "alternatives": [
+            {"target_path": "ファッション > メンズ > ネックレス", "confidence": 0.5},
+            {"target_path": "ファッション > 家電", "confidence": 0.1},
+        ],
+    }])
+    analyzer = MercariAnalyzer(
+        settings=SimpleNamespace(
+            category_model="category-test", category_fallback_models=[], request_timeout=60,
+            model_call_max_retries=0, model_call_total_budget_seconds=10,
+            category_hierarchical_threshold=0, category_match_min_similarity=0.8,
+            prompt_cache_control=True,
+        ),
+        brand_store=None, category_store=_store(tmp_path), vision_client=client, category_client=client,
+    )
+
+    result = analyzer.select_categories({"group_name": "ファッション", "title": "Tシャツ"}, debug=True)
+
+    assert [c["id"] for c in result["categories"]] == ["1", "2"]
+    summary = result["_debug"]["category_path_matches"]
+    assert (summary["exact"], summary["fuzzy"], summary["unmatched"]) == (1, 1, 1)
+    assert summary["paths"][1]["matched_path"] == "ファッション > メンズ > アクセサリー > ネックレス"
@@ -0,0 +1,108 @@
+import json
+from types import SimpleNamespace
+
+from app.data.categories import CategoryStore
+from app import service
+from app.service import MercariAnalyzer
+
+
+ROWS = [
+    ("1", "ファッション > メンズ > トップス > Tシャツ"),
+    ("2", "ファッション > メンズ > トップス > シャツ"),
+    ("3", "ファッション > メンズ > パンツ"),
+    ("4", "ファッション > レディース"),
+    ("5", "ファッション > レディース > ワンピース"),
+    ("6", "ファッション > 小物 > 財布"),
+]
+
+
+def _store(tmp_path) -> CategoryStore:
+    path = tmp_path / "categories.csv"
+    lines = ["category_id,path,group_name"] + [f"{cid},{name},ファッション" for cid, name in ROWS]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return CategoryStore(str(path))
+
+
+def test_nodes_split_until_small_enough_and_cover_every_category(tmp_path):
+    nodes = _store(tmp_path).category_nodes("ファッション", max_leaves=2)
+
+    assert [(node.path, [e["id"] for e in node.entries]) for node in nodes] == [
+        ("ファッション > メンズ > トップス", ["1", "2"]),
+        ("ファッション > メンズ > パンツ", ["3"]),
+        ("ファッション > レディース", ["4", "5"]),
+        ("ファッション > 小物", ["6"]),
+    ]
+    # The node itself stays pickable when its own path is a category.
+    assert [n.path for n in _store(tmp_path).category_nodes("ファッション", max_leaves=1)][3:5] == [
+        "ファッション > レディース",
+        "ファッション > レディース > ワンピース",
+    ]
+    assert _store(tmp_path).category_nodes("なし", max_leaves=2) == []
+
+
+def _user_text(call):
+    return "".join(part["text"] for part in call["messages"][1]["content"])
+
+
+class _ChatClient:
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+        self.calls = []
+
+    def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        return json.dumps(self.payloads.pop(0)), {"choices": []}
+
+
+def _analyzer(tmp_path, threshold, payloads):
+    settings = SimpleNamespace(
+        category_model="category-test", category_fallback_models=[], request_timeout=60,
+        model_call_max_retries=0, model_call_total_budget_seconds=10,
+        category_hierarchical_threshold=threshold, prompt_cache_control=True,
+    )
+    client = _ChatClient(payloads)
+    analyzer = MercariAnalyzer(
+        settings=settings, brand_store=None, category_store=_store(tmp_path),
+        vision_client=client, category_client=client,
+    )
+    return analyzer, client
+
+
+def test_large_groups_pick_nodes_first_and_only_list_paths_under_them(tmp_path, monkeypatch):
+    # One pick per prompt, so nodes may hold up to threshold (3) categories.
+    monkeypatch.setattr(service, "CATEGORY_NODE_PICKS", 1)
+    analyzer, client = _analyzer(tmp_path, 3, [
+        {"nodes": ["ファッション > メンズ", "ファッション > 存在しない"]},
+        {"best_target_path": "ファッション > メンズ > パンツ", "confidence": 0.9, "alternatives": []},
+    ])
+
+    paths = analyzer.title_category_paths("チノパン", "ファッション")
+
+    assert paths["best_category_id"] == "3"
+    node_prompt, path_prompt = (_user_text(call) for call in client.calls)
+    assert "ファッション > メンズ\nファッション > レディース\nファッション > 小物" in node_prompt
+    assert "ファッション > メンズ > パンツ" in path_prompt
+    assert "レディース" not in path_prompt and "財布" not in path_prompt
+    # The narrowed list is one-off: it must not displace the group prefixes.
+    assert analyzer.category_store._candidate_prefixes == {}
+
+
+def test_unusable_node_answers_fall_back_to_the_full_list(tmp_path):
+    analyzer, client = _analyzer(tmp_path, 3, [
+        {"nodes": ["どれでもない"]},
+        {"best_target_path": "ファッション > 小物 > 財布", "confidence": 0.9, "alternatives": []},
+    ])
+
+    assert analyzer.title_category_paths("長財布", "ファッション")["best_category_id"] == "6"
+    assert "ファッション > 小物 > 財布" in _user_text(client.calls[1])
+    assert "ファッション > メンズ > パンツ" in _user_text(client.calls[1])
+
+
+def test_groups_within_the_threshold_use_one_call(tmp_path):
+    analyzer, client = _analyzer(tmp_path, 600, [
+        {"best_target_path": "ファッション > 小物 > 財布", "confidence": 0.9, "alternatives": []},
+    ])
+
+    analyzer.title_category_paths("長財布", "ファッション")
+
+    assert len(client.calls) == 1
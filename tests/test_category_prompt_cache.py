@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.data.categories import CategoryStore
+from app.llm import prompt_store
+from app.service import MercariAnalyzer
+
+
+@pytest.fixture(autouse=True)
+def _no_prompt_overrides(monkeypatch):
+    monkeypatch.setattr(prompt_store, "_overrides", {})
+
+
+class _ChatClient:
+    def __init__(self):
+        self.calls = []
+
+    def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        return json.dumps({"best_target_path": "", "alternatives": []}), {"choices": []}
+
+
+def _analyzer(tmp_path, prompt_cache_control=True):
+    path = tmp_path / "categories.csv"
+    path.write_text(
+        "category_id,path,group_name\n"
+        "1,靴 > スニーカー,靴\n"
+        "2,靴 > ブーツ,靴\n",
+        encoding="utf-8",
+    )
+    client = _ChatClient()
+    analyzer = MercariAnalyzer(
+        settings=SimpleNamespace(
+            category_model="category-test", category_fallback_models=[], request_timeout=60,
+            model_call_max_retries=0, model_call_total_budget_seconds=10,
+            category_hierarchical_threshold=0, prompt_cache_control=prompt_cache_control,
+        ),
+        brand_store=None, category_store=CategoryStore(str(path)), vision_client=client, category_client=client,
+    )
+    return analyzer, client
+
+
+def test_candidate_list_is_a_shared_cacheable_prefix(tmp_path):
+    analyzer, client = _analyzer(tmp_path)
+
+    analyzer.title_category_paths("ナイキ エアマックス", "靴")
+    analyzer.title_category_paths("レインブーツ", "靴")
+
+    first, second = (call["messages"][1]["content"] for call in client.calls)
+    assert first[0] == second[0]
+    assert first[0]["cache_control"] == {"type": "ephemeral"}
+    assert first[0]["text"].endswith("靴 > スニーカー\n靴 > ブーツ")
+    assert "ナイキ" in first[1]["text"] and "ナイキ" not in first[0]["text"]
+    # Rendered once per (template head, group) and reused by later calls.
+    assert first[0]["text"] is second[0]["text"]
+    assert len(analyzer.category_store._candidate_prefixes) == 1
+
+
+def test_cache_control_can_be_turned_off(tmp_path):
+    analyzer, client = _analyzer(tmp_path, prompt_cache_control=False)
+
+    analyzer.title_category_paths("ナイキ エアマックス", "靴")
+
+    assert "cache_control" not in client.calls[0]["messages"][1]["content"][0]
+
+
+def test_templates_with_product_fields_first_stay_one_string(tmp_path, monkeypatch):
+    monkeypatch.setitem(
+        prompt_store._overrides,
+        "CATEGORY_USER_PROMPT_TEMPLATE",
+        "Title: {title}\n{description}{brand}\nGroup: {group_name}\n{candidate_paths}",
+    )
+    analyzer, client = _analyzer(tmp_path)
+
+    analyzer.title_category_paths("ナイキ エアマックス", "靴")
+
+    assert client.calls[0]["messages"][1]["content"] == (
+        "Title: ナイキ エアマックス\n\nGroup: 靴\n靴 > スニーカー\n靴 > ブーツ"
+    )
@@ -53,6 +53,12 @@ class _FakeCategoryStore:
     def find_category(self, group_name, category_name):  # noqa: D401 - test stub
         return None
 
+    def closest_category(self, group_name, category_name, min_similarity):
+        return None
+
+    def path_words(self):
+        return frozenset()
+
 
 def _build_analyzer(
     *,
@@ -0,0 +1,143 @@
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from app.errors import LLMAllAttemptsFailedError
+from app.jobs import wait_for_job_update
+
+
+def _resolve_later(future, *, result=None, exc=None, delay=0.2):
+    def _run():
+        time.sleep(delay)
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+    threading.Thread(target=_run, daemon=True).start()
+
+
+def _events(client, job_id):
+    events = []
+    with client.stream("GET", f"/api/v1/mercari/image/analyze/{job_id}/events") as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        event = None
+        for line in r.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+
+def test_wait_wakes_on_future_completion():
+    future = concurrent.futures.Future()
+    _resolve_later(future, result={}, delay=0.1)
+    started = time.monotonic()
+    woke = asyncio.run(wait_for_job_update({"future": future}, 5.0))
+    assert woke
+    assert time.monotonic() - started < 2.0
+
+
+def test_wait_wakes_when_primary_crosses_fallback_threshold():
+    job = {
+        "future": concurrent.futures.Future(),
+        "started_at": time.monotonic(),
+        "fallback_timeout": 0.1,
+    }
+    started = time.monotonic()
+    assert asyncio.run(wait_for_job_update(job, 5.0))
+    assert time.monotonic() - started < 2.0
+
+
+def test_wait_times_out_without_progress():
+    job = {"future": concurrent.futures.Future()}
+    assert asyncio.run(wait_for_job_update(job, 0.05)) is False
+
+
+def test_events_stream_pushes_completion():
+    future = concurrent.futures.Future()
+    main.analysis_job_store.put("sse-ok", classification={"title": "t"}, future=future)
+    _resolve_later(future, result={"description": "d", "timings": {"product_data_ms": 5.0}})
+
+    with TestClient(main.app) as client:
+        events = _events(client, "sse-ok")
+
+    assert [name for name, _ in events] == ["product_pending", "completed"]
+    assert events[1][1]["product_data_source"] == "primary"
+    assert events[1][1]["description"] == "d"
+
+
+def test_events_stream_reports_product_failure():
+    future = concurrent.futures.Future()
+    main.analysis_job_store.put("sse-fail", classification={"title": "t"}, future=future)
+    _resolve_later(future, exc=LLMAllAttemptsFailedError(stage="product_data", attempts=[]))
+
+    with TestClient(main.app) as client:
+        events = _events(client, "sse-fail")
+
+    assert events[-1][0] == "error"
+    assert events[-1][1]["status_code"] == 502
+
+
+def test_events_stream_unknown_job_is_404():
+    with TestClient(main.app) as client:
+        r = client.get("/api/v1/mercari/image/analyze/missing/events")
+    assert r.status_code == 404
+
+
+def test_long_poll_returns_on_completion():
+    future = concurrent.futures.Future()
+    main.analysis_job_store.put("lp-ok", classification={"title": "t"}, future=future)
+    _resolve_later(future, result={"description": "d"}, delay=0.2)
+
+    with TestClient(main.app) as client:
+        started = time.monotonic()
+        r = client.get("/api/v1/mercari/image/analyze/lp-ok?wait=10")
+    assert r.status_code == 200
+    assert r.json()["status"] == "completed"
+    assert time.monotonic() - started < 5
+
+
+def test_long_poll_expires_with_pending_and_respects_cap(monkeypatch):
+    main.analysis_job_store.put("lp-slow", classification={"title": "t"}, future=concurrent.futures.Future())
+    with TestClient(main.app) as client:
+        started = time.monotonic()
+        r = client.get("/api/v1/mercari/image/analyze/lp-slow?wait=0.3")
+        assert r.json()["status"] == "product_pending"
+        assert time.monotonic() - started >= 0.3
+
+        monkeypatch.setattr(main.settings, "job_poll_max_wait_seconds", 0)
+        started = time.monotonic()
+        r = client.get("/api/v1/mercari/image/analyze/lp-slow?wait=10")
+        assert r.json()["status"] == "product_pending"
+        assert time.monotonic() - started < 2
+
+        assert client.get("/api/v1/mercari/image/analyze/lp-slow?wait=-1").status_code == 422
+
+
+def test_long_polls_do_not_hold_threadpool_threads():
+    import httpx
+
+    future = concurrent.futures.Future()
+    main.analysis_job_store.put("lp-many", classification={"title": "t"}, future=future)
+
+    async def _run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # More waiters than anyio's default 40 worker threads.
+            polls = [
+                asyncio.create_task(client.get("/api/v1/mercari/image/analyze/lp-many?wait=10"))
+                for _ in range(60)
+            ]
+            await asyncio.sleep(0.3)
+            future.set_result({"description": "d"})
+            return await asyncio.wait_for(asyncio.gather(*polls), 5)
+
+    responses = asyncio.run(_run())
+    assert all(r.json()["status"] == "completed" for r in responses)
@@ -0,0 +1,164 @@
+import concurrent.futures
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.errors import BadRequestError, LLMAllAttemptsFailedError
+from app.jobs import AnalysisJobStore, SQLiteJobBackend, create_job_backend
+from app.llm.resilient import AttemptRecord
+import main
+
+
+CLASSIFICATION = {"status": "product_pending", "categories": [], "timings": {"total_ms": 10.0}}
+
+
+@pytest.fixture
+def shared(tmp_path):
+    backend = SQLiteJobBackend(tmp_path / "jobs.db")
+    return AnalysisJobStore(backend=backend), AnalysisJobStore(backend=backend)
+
+
+def test_sqlite_backend_expires_keys(tmp_path):
+    backend = SQLiteJobBackend(tmp_path / "jobs.db")
+    backend.set("a", "1", ex=60)
+    backend.set("b", "2", ex=1)
+    assert backend.get("a") == "1"
+    with patch("app.jobs.time.time", return_value=time.time() + 5):
+        assert backend.get("b") is None
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+def test_job_is_visible_from_another_worker_and_completes(shared):
+    owner, other = shared
+    future = concurrent.futures.Future()
+    owner.put("job-1", classification=CLASSIFICATION, future=future,
+              started_at=time.monotonic() - 2.0, fallback_timeout=10.0)
+
+    remote = other.get("job-1")
+    assert remote["remote"] is True
+    assert remote["classification"] == CLASSIFICATION
+    assert not remote["future"].done()
+    assert remote["fallback_future"] is None
+    assert time.monotonic() - remote["started_at"] == pytest.approx(2.0, abs=0.5)
+
+    future.set_result({"brand": "Nike"})
+    remote = other.get("job-1")
+    assert remote["future"].result() == {"brand": "Nike"}
+    # The owner still serves its own live futures.
+    assert "remote" not in owner.get("job-1")
+
+
+def test_failures_round_trip_through_the_backend(shared):
+    owner, other = shared
+    primary = concurrent.futures.Future()
+    fallback = concurrent.futures.Future()
+    owner.put("job-2", classification=CLASSIFICATION, future=primary, fallback_future=fallback)
+    attempt = AttemptRecord(model="m", attempt=1, attempt_global=1, error_kind="timeout",
+                            message="slow", latency_ms=12.5, status_code=504)
+    primary.set_exception(LLMAllAttemptsFailedError("product_data", [attempt]))
+    fallback.set_exception(BadRequestError("bad image"))
+
+    remote = other.get("job-2")
+    error = remote["future"].exception()
+    assert isinstance(error, LLMAllAttemptsFailedError)
+    assert error.stage == "product_data"
+    assert error.attempts == [attempt]
+    assert isinstance(remote["fallback_future"].exception(), BadRequestError)
+    assert str(remote["fallback_future"].exception()) == "bad image"
+
+
+def test_unknown_job_is_none_with_backend(shared):
+    assert shared[1].get("missing") is None
+
+
+def test_poll_endpoint_serves_job_created_by_another_worker(shared, monkeypatch):
+    owner, other = shared
+    future = concurrent.futures.Future()
+    owner.put("job-3", classification=CLASSIFICATION, future=future)
+    future.set_result({"brand": "Nike", "prices": []})
+    monkeypatch.setattr(main, "analysis_job_store", other)
+
+    response = TestClient(main.app).get("/api/v1/mercari/image/analyze/job-3")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+
+def test_create_job_backend(tmp_path):
+    assert create_job_backend("memory", path=tmp_path / "jobs.db") is None
+    assert isinstance(create_job_backend("sqlite", path=tmp_path / "jobs.db"), SQLiteJobBackend)
+    with pytest.raises(ValueError):
+        create_job_backend("etcd", path=tmp_path / "jobs.db")
+
+
+def _done(value):
+    future = concurrent.futures.Future()
+    future.set_result(value)
+    return future
+
+
+def test_expired_jobs_are_popped_in_time_order():
+    store = AnalysisJobStore(ttl_seconds=60)
+    now = time.time()
+    with patch("app.jobs.time.time", return_value=now):
+        store.put("old", classification=CLASSIFICATION, future=_done({}))
+    with patch("app.jobs.time.time", return_value=now + 30):
+        store.put("new", classification=CLASSIFICATION, future=_done({}))
+    with patch("app.jobs.time.time", return_value=now + 61):
+        assert store.get("old") is None
+        assert store.get("new") is not None
+        assert len(store) == 1
+        assert len(store._expiry) == 1
+
+
+def test_settled_job_drops_images_and_failure_tracebacks():
+    store = AnalysisJobStore()
+    primary = concurrent.futures.Future()
+    fallback = concurrent.futures.Future()
+    store.put("job", classification=CLASSIFICATION, future=primary,
+              fallback_future=fallback, payload_bytes=5_000_000)
+    assert store.resident_bytes > 5_000_000
+
+    primary.set_result({"brand": "Nike"})
+    assert store.resident_bytes > 5_000_000  # the fallback call still holds the images
+    try:
+        raise BadRequestError("bad image")
+    except BadRequestError as exc:
+        fallback.set_exception(exc)
+
+    job = store.get("job")
+    assert store.resident_bytes < 1_000
+    assert job["future"] is not primary
+    assert job["future"].result() == {"brand": "Nike"}
+    assert job["fallback_future"].exception().__traceback__ is None
+
+
+def test_budget_evicts_least_recently_used_jobs():
+    store = AnalysisJobStore(max_bytes=3_500)
+    for job_id in ("a", "b", "c"):
+        store.put(job_id, classification=CLASSIFICATION, future=_done({"notes": "x" * 1_000}))
+    store.get("a")
+    store.put("d", classification=CLASSIFICATION, future=_done({"notes": "x" * 1_000}))
+
+    assert store.get("b") is None
+    assert all(store.get(job_id) for job_id in ("a", "c", "d"))
+    assert store.resident_bytes <= 3_500
+
+
+def test_pending_job_survives_budget_pressure():
+    store = AnalysisJobStore(max_bytes=3_500)
+    pending = concurrent.futures.Future()
+    store.put("pending", classification=CLASSIFICATION, future=pending, payload_bytes=3_000)
+    for job_id in ("a", "b", "c"):
+        store.put(job_id, classification=CLASSIFICATION, future=_done({"notes": "x" * 1_000}))
+
+    assert store.get("pending") is not None
+    assert store.get("a") is None and store.get("b") is None
+    assert store.resident_bytes > 3_500  # over budget until the pending job settles
+
+    pending.set_result({"brand": "Nike"})
+    assert store.get("pending") is not None
+    assert store.resident_bytes <= 3_500
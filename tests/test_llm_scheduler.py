@@ -0,0 +1,196 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.errors import LLMAllAttemptsFailedError, LLMCancelledError, LLMRequestError
+from app.llm import scheduler as llm_scheduler
+from app.llm.cancellation import CancellationToken
+from app.llm.resilient import ResilientCaller
+from app.llm.scheduler import BACKGROUND, BATCH, INTERACTIVE, LLMScheduler
+import main
+
+
+class _Holder:
+    """Takes a slot on a thread and keeps it until released."""
+
+    def __init__(self, scheduler, priority, log=None, cancel_token=None):
+        self.release = threading.Event()
+        self.error = None
+        self._scheduler = scheduler
+        self._priority = priority
+        self._log = log
+        self._cancel_token = cancel_token
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            with self._scheduler.slot(self._priority, cancel_token=self._cancel_token):
+                if self._log is not None:
+                    self._log.append(self._priority)
+                self.release.wait(5)
+        except Exception as exc:
+            self.error = exc
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def _state(scheduler, cls, state):
+    return scheduler.snapshot()[cls][state]
+
+
+def test_weighted_fair_queue_serves_interactive_first():
+    scheduler = LLMScheduler(1, interactive_wait_target_ms=10_000)
+    blocker = _Holder(scheduler, BATCH)
+    _wait_for(lambda: _state(scheduler, BATCH, "running") == 1)
+
+    log = []
+    holders = []
+    for cls in (BATCH, BATCH, BACKGROUND, BACKGROUND, INTERACTIVE, INTERACTIVE):
+        holders.append(_Holder(scheduler, cls, log))
+        _wait_for(lambda c=cls, n=sum(h._priority == cls for h in holders): _state(scheduler, c, "queued") == n)
+        holders[-1].release.set()  # each one finishes as soon as it is granted
+
+    blocker.release.set()
+    for holder in holders:
+        holder.thread.join(2)
+
+    assert log[:2] == [INTERACTIVE, INTERACTIVE]
+    assert log[2] == BACKGROUND
+    assert sorted(log) == sorted([BATCH, BATCH, BACKGROUND, BACKGROUND, INTERACTIVE, INTERACTIVE])
+
+
+def test_per_class_cap_limits_concurrency():
+    scheduler = LLMScheduler(8, caps={BACKGROUND: 1})
+    first = _Holder(scheduler, BACKGROUND)
+    second = _Holder(scheduler, BACKGROUND)
+    _wait_for(lambda: _state(scheduler, BACKGROUND, "queued") == 1)
+    assert _state(scheduler, BACKGROUND, "running") == 1
+
+    first.release.set()
+    _wait_for(lambda: _state(scheduler, BACKGROUND, "queued") == 0)
+    second.release.set()
+    second.thread.join(2)
+
+
+def test_slow_interactive_queue_throttles_background_work():
+    scheduler = LLMScheduler(4, interactive_wait_target_ms=50)
+    held = [_Holder(scheduler, INTERACTIVE) for _ in range(4)]
+    _wait_for(lambda: _state(scheduler, INTERACTIVE, "running") == 4)
+    late = _Holder(scheduler, INTERACTIVE)
+    _wait_for(lambda: _state(scheduler, INTERACTIVE, "queued") == 1)
+    time.sleep(0.1)
+    assert scheduler.throttled
+
+    held[0].release.set()  # "late" gets its slot after ~100 ms in the queue
+    _wait_for(lambda: _state(scheduler, INTERACTIVE, "queued") == 0)
+    background = [_Holder(scheduler, BACKGROUND) for _ in range(2)]
+    _wait_for(lambda: _state(scheduler, BACKGROUND, "queued") == 2)
+    held[1].release.set()
+    held[2].release.set()
+
+    _wait_for(lambda: _state(scheduler, BACKGROUND, "running") == 1)
+    time.sleep(0.05)
+    assert _state(scheduler, BACKGROUND, "queued") == 1  # only one at a time while throttled
+
+    for holder in [*held, late, *background]:
+        holder.release.set()
+
+
+def test_cancel_while_queued_raises_and_frees_the_place():
+    scheduler = LLMScheduler(1)
+    blocker = _Holder(scheduler, INTERACTIVE)
+    _wait_for(lambda: _state(scheduler, INTERACTIVE, "running") == 1)
+    token = CancellationToken()
+    waiting = _Holder(scheduler, BACKGROUND, cancel_token=token)
+    _wait_for(lambda: _state(scheduler, BACKGROUND, "queued") == 1)
+
+    token.cancel()
+    waiting.thread.join(2)
+
+    assert isinstance(waiting.error, LLMCancelledError)
+    assert _state(scheduler, BACKGROUND, "queued") == 0
+    blocker.release.set()
+
+
+def test_slot_wait_gives_up_at_the_deadline_and_frees_the_place():
+    scheduler = LLMScheduler(1)
+    blocker = _Holder(scheduler, INTERACTIVE)
+    _wait_for(lambda: _state(scheduler, INTERACTIVE, "running") == 1)
+
+    started = time.monotonic()
+    with pytest.raises(LLMRequestError, match="waiting for an LLM slot"):
+        with scheduler.slot(BATCH, deadline=started + 0.2):
+            pass
+
+    assert 0.2 <= time.monotonic() - started < 1.0
+    assert _state(scheduler, BATCH, "queued") == 0
+    blocker.release.set()
+
+
+def _resilient_caller(client, total_budget_s):
+    return ResilientCaller(client=client, max_retries=0, total_budget_s=total_budget_s,
+                           per_attempt_timeout_s=60)
+
+
+def _call(caller):
+    return caller.call_and_parse(stage="vision", primary_model="m1", fallback_models=[],
+                                 messages=[], temperature=0.1, max_tokens=10)
+
+
+def test_queued_call_runs_out_of_budget_instead_of_waiting_forever(monkeypatch):
+    scheduler = LLMScheduler(1)
+    monkeypatch.setattr(llm_scheduler, "_scheduler", scheduler)
+    blocker = _Holder(scheduler, INTERACTIVE)
+    _wait_for(lambda: _state(scheduler, INTERACTIVE, "running") == 1)
+    client = MagicMock()
+
+    started = time.monotonic()
+    with pytest.raises(LLMAllAttemptsFailedError) as exc_info:
+        _call(_resilient_caller(client, total_budget_s=1.3))
+
+    # The slot wait stops with _MIN_USEFUL_BUDGET_S (1 s) of the budget left.
+    assert time.monotonic() - started < 1.0
+    kinds = [a.error_kind for a in exc_info.value.attempts]
+    assert kinds == ["request_failed"]
+    assert "waiting for an LLM slot" in exc_info.value.attempts[0].message
+    client.chat.assert_not_called()
+    blocker.release.set()
+
+
+def test_attempt_timeout_excludes_the_slot_wait(monkeypatch):
+    scheduler = LLMScheduler(1)
+    monkeypatch.setattr(llm_scheduler, "_scheduler", scheduler)
+    blocker = _Holder(scheduler, INTERACTIVE)
+    _wait_for(lambda: _state(scheduler, INTERACTIVE, "running") == 1)
+    threading.Timer(0.5, blocker.release.set).start()
+    client = MagicMock()
+    client.chat.return_value = ('{"ok": true}', {"choices": []})
+
+    assert _call(_resilient_caller(client, total_budget_s=3.0))[0] == {"ok": True}
+
+    assert client.chat.call_args.kwargs["timeout"] <= 2.6
+
+
+def test_priority_header_sets_the_request_class():
+    @main.app.get("/__test_priority__")
+    def _priority():
+        return {"priority": llm_scheduler.current_priority()}
+
+    with TestClient(main.app) as client:
+        assert client.get("/__test_priority__").json() == {"priority": INTERACTIVE}
+        assert client.get("/__test_priority__", headers={"X-Priority": "batch"}).json() == {"priority": BATCH}
+        assert client.get("/__test_priority__", headers={"X-Priority": "urgent"}).json() == {"priority": INTERACTIVE}
+
+
+@pytest.mark.parametrize("value, expected", [("Background", BACKGROUND), ("", INTERACTIVE), (None, INTERACTIVE)])
+def test_normalize_priority(value, expected):
+    assert llm_scheduler.normalize_priority(value) == expected
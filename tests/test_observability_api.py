@@ -132,3 +132,11 @@ def test_clear_endpoint_wipes_rows(set_password):
         after = client.get("/api/v1/logs/requests", headers=_auth()).json()
         # Note: middleware skips /api/v1/logs/* paths, so the clear call itself is not logged
         assert after["items"] == []
+
+
+def test_latency_endpoint(set_password):
+    with TestClient(set_password.app) as client:
+        r = client.get("/api/v1/logs/latency?bucket=day", headers=_auth())
+        assert r.status_code == 200
+        assert r.json()["bucket"] == "day"
+        assert client.get("/api/v1/logs/latency?bucket=week", headers=_auth()).status_code == 400
@@ -0,0 +1,75 @@
+import json
+import threading
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.observability import metrics
+
+
+def test_counter_shards_merge_across_threads():
+    registry = metrics.Registry()
+    counter = registry.counter("c_total", "test", ("kind",))
+
+    def _work():
+        for _ in range(1000):
+            counter.inc(kind="a")
+
+    threads = [threading.Thread(target=_work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counter.inc(5, kind="b")
+    assert counter.collect() == {("a",): 8000.0, ("b",): 5.0}
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    hist = registry.histogram("h_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        hist.observe(value, stage='a"b')
+    text = metrics.render(registry.snapshot())
+    assert '# TYPE h_seconds histogram' in text
+    assert 'h_seconds_bucket{stage="a\\"b",le="0.1"} 1' in text
+    assert 'h_seconds_bucket{stage="a\\"b",le="1"} 3' in text
+    assert 'h_seconds_bucket{stage="a\\"b",le="+Inf"} 4' in text
+    assert 'h_seconds_count{stage="a\\"b"} 4' in text
+
+
+def test_multiprocess_merge_keeps_dead_counters_and_drops_dead_gauges(tmp_path: Path):
+    registry = metrics.Registry()
+    registry.counter("jobs_total", "test").inc(3)
+    registry.gauge("depth", "test").set_function(lambda: 2)
+    metrics.write_snapshot(registry, tmp_path)
+    # A worker that has exited: pid far beyond pid_max.
+    dead = {
+        "jobs_total": {"kind": "counter", "help": "test", "labelnames": [], "buckets": [], "values": [[[], 4.0]]},
+        "depth": {"kind": "gauge", "help": "test", "labelnames": [], "buckets": [], "values": [[[], 7.0]]},
+    }
+    (tmp_path / "999999999.json").write_text(json.dumps(dead))
+
+    text = metrics.exposition(registry, tmp_path)
+    assert "jobs_total 7" in text
+    assert "depth 2" in text
+
+
+def test_metrics_endpoint_exposes_route_templates(monkeypatch):
+    import importlib, app.config, main
+    monkeypatch.setenv("METRICS_TOKEN", "s3cret")
+    importlib.reload(app.config)
+    main = importlib.reload(main)
+    metrics.REGISTRY.reset()
+    with TestClient(main.app) as client:
+        client.get("/api/v1/mercari/image/analyze/missing-job")
+        assert client.get("/metrics").status_code == 401
+        r = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert (
+        'mercari_http_request_duration_seconds_count{method="GET",'
+        'endpoint="/api/v1/mercari/image/analyze/{job_id}",status="404"} 1'
+    ) in r.text
+    assert "mercari_product_data_queue_depth 0" in r.text
+    assert "mercari_analysis_jobs 0" in r.text
+    assert "mercari_analysis_job_resident_bytes 0" in r.text
@@ -38,11 +38,44 @@ def test_large_response_body_passes_through_uncorrupted(monkeypatch):
     assert len(body["data"]) == 3 * 1024 * 1024
 
 
+def test_streamed_response_is_recorded_without_buffering_its_body(monkeypatch):
+    """NDJSON/SSE responses keep request, span and LLM recording; only the body is not logged."""
+    from fastapi.responses import StreamingResponse
+    from app.observability import context as ctx
+    from app.observability import tracing
+
+    seen = []
+    finalized = []
+    monkeypatch.setattr(main.recorder, "finalize_request", lambda **kwargs: finalized.append(kwargs))
+
+    @main.app.post("/__test_stream__")
+    def _stream():
+        def lines():
+            for i in range(3):
+                seen.append((ctx.get_request_id(), tracing.current_span()))
+                assert not finalized  # the request stays open while the stream runs
+                yield json.dumps({"i": i}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    with TestClient(main.app) as client:
+        r = client.post("/__test_stream__", json={})
+    assert r.status_code == 200
+    assert [json.loads(line)["i"] for line in r.text.splitlines()] == [0, 1, 2]
+    request_id = r.headers["x-request-id"]
+    assert all(rid == request_id for rid, _ in seen)
+    assert all(span is not None and span.trace_id == request_id for _, span in seen)
+    assert len(finalized) == 1
+    assert finalized[0]["request_id"] == request_id
+    assert finalized[0]["status_code"] == 200
+    assert finalized[0]["response_body"] == b""
+
+
 def test_request_id_propagates_into_background_thread(monkeypatch):
     """Submitting work to product_data_executor preserves request_id contextvar."""
     captured = []
 
-    def fake_generate(images, language, debug, use_fallback_prompt, started_at, model_override=None):
+    def fake_generate(images, language, debug, use_fallback_prompt, started_at=None, model_override=None, cancel_token=None):
         from app.observability import context as ctx
         captured.append(ctx.get_request_id())
         return {"ok": True}
@@ -88,3 +121,34 @@ def test_prune_loop_starts_and_shuts_down():
     # after the TestClient context exits, shutdown ran — task should be cancelled
     # (we can't easily assert task.cancelled() here because the task object survives;
     # the key signal is that no exception is raised during shutdown)
+
+
+def test_prune_runs_in_chunks_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+
+    from app.observability.retention import PruneStats
+
+    loop_thread = threading.get_ident()
+    calls = []
+
+    def fake_prune(store, store_root, retention_days, max_total_bytes, *, max_rows):
+        calls.append((threading.get_ident(), max_rows))
+        return PruneStats(rows_deleted=max_rows, bytes_freed=100, elapsed_ms=1.5,
+                          has_more=len(calls) < 3)
+
+    monkeypatch.setattr(main, "obs_prune", fake_prune)
+    monkeypatch.setattr(main.settings, "log_prune_batch_size", 7)
+    main.obs_metrics.REGISTRY.reset()
+    summary = asyncio.run(main._prune_in_chunks())
+
+    assert summary["chunks"] == 3
+    assert summary["rows_deleted"] == 21
+    assert summary["bytes_freed"] == 300
+    assert summary["busy_ms"] == 4.5
+    assert all(tid != loop_thread and rows == 7 for tid, rows in calls)
+    assert main.app.state.last_prune == summary
+    exposition = main.obs_metrics.exposition(main.obs_metrics.REGISTRY)
+    assert "mercari_log_prune_rows_deleted_total 21" in exposition
+    assert "mercari_log_prune_bytes_freed_total 300" in exposition
+    assert "mercari_log_prune_duration_seconds_count 1" in exposition
@@ -265,3 +265,25 @@ def test_record_llm_stage_cost_in_usage_field(recorder: Recorder):
     with recorder.store.connect() as conn:
         row = conn.execute("SELECT cost_usd FROM llm_calls WHERE request_id='rid_cu'").fetchone()
     assert abs(row["cost_usd"] - 0.0099) < 1e-9
+
+
+def test_record_llm_stage_keeps_cached_prompt_tokens(recorder: Recorder):
+    """usage.prompt_tokens_details.cached_tokens is stored next to prompt_tokens."""
+    recorder.start_request(
+        request_id="rid_cache", method="POST", endpoint="/x",
+        client_ip="", user_agent="", language="", headers={},
+        body_bytes=b"", content_type="", uploaded_images=[],
+    )
+    raw = {"usage": {"prompt_tokens": 9000, "prompt_tokens_details": {"cached_tokens": 8192}}}
+    recorder.record_llm_stage(
+        request_id="rid_cache", stage="category",
+        attempts=[{"model": "m", "attempt": 1, "error_kind": "ok",
+                   "message": "", "latency_ms": 10.0, "status_code": 200}],
+        messages=[{"role": "user", "content": "y"}],
+        raw_response=raw, parsed={"k": "v"},
+    )
+    with recorder.store.connect() as conn:
+        row = conn.execute(
+            "SELECT prompt_tokens, cached_prompt_tokens FROM llm_calls WHERE request_id='rid_cache'"
+        ).fetchone()
+    assert (row["prompt_tokens"], row["cached_prompt_tokens"]) == (9000, 8192)
@@ -44,10 +44,66 @@ def test_prune_by_total_bytes(tmp_path: Path):
         # pad disk
         d = next(recorder.store_root.rglob(rid))
         (d / "padding.bin").write_bytes(b"\x00" * (1024 * 1024))  # 1 MB each
+        recorder.store.add_artifact_bytes(rid, 1024 * 1024)
     stats = prune(recorder.store, recorder.store_root, retention_days=999, max_total_bytes=2 * 1024 * 1024)
     assert stats.rows_deleted >= 3  # only ~2 MB fits
 
 
+def test_recorder_tracks_artifact_bytes(tmp_path: Path):
+    recorder = _make_recorder(tmp_path)
+    _seed_request(recorder, "a", days_ago=0)
+    recorder.finalize_request(
+        request_id="a", status_code=200, duration_ms=1.0,
+        error="", response_body=b'{"ok":true}', job_id="",
+    )
+    with recorder.store.connect() as conn:
+        tracked = conn.execute("SELECT artifact_bytes FROM requests WHERE request_id='a'").fetchone()[0]
+    on_disk = sum(p.stat().st_size for p in recorder.store_root.rglob("a/*"))
+    assert tracked == on_disk > 0
+
+
+def test_prune_capacity_uses_tracked_bytes_not_disk(tmp_path: Path):
+    recorder = _make_recorder(tmp_path)
+    for i in range(3):
+        _seed_request(recorder, f"r{i}", days_ago=i)
+    # untracked files on disk must not trigger capacity pruning
+    d = next(recorder.store_root.rglob("r0"))
+    (d / "stray.bin").write_bytes(b"\x00" * (2 * 1024 * 1024))
+    stats = prune(recorder.store, recorder.store_root, retention_days=999, max_total_bytes=1024 * 1024)
+    assert stats.rows_deleted == 0
+
+
+def test_prune_bounded_chunks_report_has_more(tmp_path: Path):
+    recorder = _make_recorder(tmp_path)
+    for i in range(5):
+        _seed_request(recorder, f"old{i}", days_ago=10 + i)
+    first = prune(recorder.store, recorder.store_root, retention_days=7,
+                  max_total_bytes=10**12, max_rows=2)
+    assert first.rows_deleted == 2
+    assert first.has_more is True
+    total = first.rows_deleted
+    while True:
+        stats = prune(recorder.store, recorder.store_root, retention_days=7,
+                      max_total_bytes=10**12, max_rows=2)
+        total += stats.rows_deleted
+        if not stats.has_more:
+            break
+    assert total == 5
+    with recorder.store.connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM requests").fetchone()[0] == 0
+
+
+def test_prune_backfills_legacy_rows(tmp_path: Path):
+    recorder = _make_recorder(tmp_path)
+    _seed_request(recorder, "legacy", days_ago=0)
+    with recorder.store.connect() as conn:
+        conn.execute("UPDATE requests SET artifact_bytes = NULL")
+    prune(recorder.store, recorder.store_root, retention_days=999, max_total_bytes=10**12)
+    with recorder.store.connect() as conn:
+        tracked = conn.execute("SELECT artifact_bytes FROM requests").fetchone()[0]
+    assert tracked == sum(p.stat().st_size for p in recorder.store_root.rglob("legacy/*"))
+
+
 def test_prune_purges_fts_rows(tmp_path: Path):
     recorder = _make_recorder(tmp_path)
     _seed_request(recorder, "old", days_ago=30)
@@ -18,7 +18,9 @@ def test_choose_categories_records_llm_stage(monkeypatch, tmp_path):
 
     analyzer.category_caller = MagicMock()
     analyzer.category_caller.call_and_parse.return_value = (parsed, raw, attempts)
-    analyzer.settings = MagicMock(category_model="m", category_fallback_models=[])
+    analyzer.settings = MagicMock(
+        category_model="m", category_fallback_models=[], category_hierarchical_threshold=0,
+    )
     analyzer.category_store = MagicMock()
     analyzer.category_store.get_categories_by_group.return_value = [{"name": "x"}]
     analyzer._record_stage = svc.MercariAnalyzer._record_stage.__get__(analyzer)
@@ -0,0 +1,176 @@
+import sqlite3
+from pathlib import Path
+
+from app.observability.recorder import Recorder
+from app.observability.stats import plan_range, request_stats
+from app.observability.store import Store
+
+
+def _make_recorder(tmp_path: Path) -> Recorder:
+    store = Store(tmp_path / "obs.db")
+    store.init_schema()
+    return Recorder(store=store, store_root=tmp_path / "store")
+
+
+def _seed(recorder: Recorder, request_id: str, ts: str, *, status: int = 200,
+          duration_ms: float = 120.0, endpoint: str = "/x", llm_ok: bool = True) -> None:
+    recorder.start_request(
+        request_id=request_id, method="POST", endpoint=endpoint,
+        client_ip="", user_agent="", language="", headers={},
+        body_bytes=b"", content_type="", uploaded_images=[],
+    )
+    with recorder.store.connect() as conn:
+        conn.execute("UPDATE requests SET timestamp_utc=? WHERE request_id=?", (ts, request_id))
+    recorder.record_llm_stage(
+        request_id=request_id, stage="category",
+        attempts=[{"model": "m1", "attempt": 1, "error_kind": "ok" if llm_ok else "request_failed",
+                   "message": "", "latency_ms": 800.0, "status_code": 200}],
+        messages=[{"role": "user", "content": "x"}],
+        raw_response={"usage": {"total_tokens": 10}, "cost": 0.5},
+        parsed={},
+    )
+    with recorder.store.connect() as conn:
+        conn.execute("UPDATE llm_calls SET timestamp_utc=? WHERE request_id=?", (ts, request_id))
+    recorder.finalize_request(
+        request_id=request_id, status_code=status, duration_ms=duration_ms,
+        error="", response_body=b"{}", job_id="",
+    )
+
+
+def _brute_force_total(store: Store, from_=None, to=None) -> int:
+    sql = "SELECT COUNT(*) FROM requests WHERE error_kind != 'pending'"
+    params = []
+    if from_:
+        sql += " AND timestamp_utc >= ?"
+        params.append(from_)
+    if to:
+        sql += " AND timestamp_utc <= ?"
+        params.append(to)
+    with store.connect() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def test_plan_range_uses_rollup_for_whole_hours():
+    plan = plan_range("2026-05-26T03:15:00.000Z", "2026-05-26T07:30:00.000Z")
+    assert plan.use_rollup
+    assert (plan.hour_from, plan.hour_to) == ("2026-05-26T04", "2026-05-26T07")
+    assert len(plan.raw_windows) == 2
+
+
+def test_plan_range_same_hour_falls_back_to_raw():
+    plan = plan_range("2026-05-26T03:15:00.000Z", "2026-05-26T03:45:00.000Z")
+    assert not plan.use_rollup
+
+
+def test_stats_match_raw_counts_across_partial_hours(tmp_path: Path):
+    recorder = _make_recorder(tmp_path)
+    stamps = [
+        "2026-05-26T03:05:00.000000Z",
+        "2026-05-26T03:40:00.000000Z",
+        "2026-05-26T04:10:00.000000Z",
+        "2026-05-26T05:59:59.000000Z",
+        "2026-05-26T06:20:00.000000Z",
+        "2026-05-26T06:50:00.000000Z",
+    ]
+    for i, ts in enumerate(stamps):
+        _seed(recorder, f"r{i}", ts, status=200 if i % 2 else 502, duration_ms=100.0 * (i + 1))
+
+    for from_, to in [
+        (None, None),
+        ("2026-05-26T03:30:00.000Z", None),
+        (None, "2026-05-26T06:30:00.000Z"),
+        ("2026-05-26T03:30:00.000Z", "2026-05-26T06:30:00.000Z"),
+        ("2026-05-26T04:00:00.000000Z", "2026-05-26T05:00:00.000000Z"),
+    ]:
+        stats = request_stats(recorder.store, from_, to)
+        assert stats["total"] == _brute_force_total(recorder.store, from_, to), (from_, to)
+        assert sum(stats["latency_histogram"]["counts"]) == stats["total"]
+
+    stats = request_stats(recorder.store, None, None)
+    assert stats["by_status"] == {200: 3, 502: 3}
+    assert stats["by_error_kind"] == {"ok": 3, "http_5xx": 3}
+    assert stats["sum_tokens"] == 60
+    assert stats["by_stage"]["category"]["calls"] == 6
+    assert stats["by_model"]["m1"]["tokens"] == 60
+
+
+def test_rollups_are_seeded_when_upgrading_existing_db(tmp_path: Path):
+    recorder = _make_recorder(tmp_path)
+    _seed(recorder, "a", "2026-05-26T03:05:00.000000Z")
+    _seed(recorder, "b", "2026-05-26T04:05:00.000000Z")
+    with sqlite3.connect(recorder.store.db_path) as conn:
+        conn.execute("DROP TABLE rollup_requests_hourly")
+        conn.execute("DROP TABLE rollup_llm_hourly")
+
+    recorder.store.init_schema()
+
+    stats = request_stats(recorder.store, None, None)
+    assert stats["total"] == 2
+    assert stats["by_stage"]["category"]["calls"] == 2
+
+
+def test_clear_all_wipes_rollups(tmp_path: Path):
+    from app.observability.retention import clear_all
+
+    recorder = _make_recorder(tmp_path)
+    _seed(recorder, "a", "2026-05-26T03:05:00.000000Z")
+    clear_all(recorder.store, recorder.store_root)
+    assert request_stats(recorder.store, None, None)["total"] == 0
+
+
+def _insert_call(store: Store, ts: str, latency_ms: float, *, stage: str = "category",
+                 model: str = "m1", status: str = "ok", completion_tokens: int = 0) -> None:
+    with store.connect() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO requests (request_id, timestamp_utc, method, endpoint) VALUES ('r', ?, 'POST', '/x')",
+            (ts,),
+        )
+    call_id = store.insert_llm_call(
+        request_id="r", timestamp_utc=ts, stage=stage, attempt=1, model=model, status=status,
+        error_kind=None if status == "ok" else "timeout", error_message=None, latency_ms=latency_ms,
+        http_status_code=200, prompt_tokens=0, completion_tokens=completion_tokens,
+        total_tokens=completion_tokens, cost_usd=0.0, prompt_file=None, response_file=None, parsed_file=None,
+    )
+    store.rollup_llm_call(call_id)
+
+
+def test_latency_sketch_quantiles_within_relative_accuracy():
+    from app.observability.sketch import RELATIVE_ACCURACY, LatencySketch
+
+    values = [float(v) for v in range(1, 10001)]
+    sketch = LatencySketch()
+    for v in values:
+        sketch.add(v)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        assert abs(sketch.quantile(q) - exact) / exact <= RELATIVE_ACCURACY + 1e-9
+
+
+def test_latency_stats_merge_rollup_and_raw_edges(tmp_path: Path):
+    from app.observability.stats import latency_stats
+
+    store = Store(tmp_path / "obs.db")
+    store.init_schema()
+    latencies = []
+    for i in range(200):
+        ts = f"2026-05-26T{3 + i % 4:02d}:{i % 60:02d}:00.000000Z"
+        latency = 100.0 + 10 * i
+        _insert_call(store, ts, latency, completion_tokens=50)
+        latencies.append((ts, latency))
+    _insert_call(store, "2026-05-26T04:30:00.000000Z", 5000.0, status="request_failed")
+    _insert_call(store, "2026-05-26T04:30:00.000000Z", 300.0, model="m2")
+
+    from_, to = "2026-05-26T03:30:00.000000Z", "2026-05-26T06:15:00.000000Z"
+    result = latency_stats(store, from_, to, bucket="total", model="m1", status="ok")
+    (item,) = result["items"]
+    expected = sorted(lat for ts, lat in latencies if from_ <= ts <= to)
+    assert item["calls"] == len(expected)
+    p95 = expected[-(-95 * len(expected) // 100) - 1]
+    assert abs(item["p95"] - p95) / p95 <= 0.011
+    assert item["tokens_per_sec"] == round(50 * len(expected) / (sum(expected) / 1000), 2)
+
+    hourly = latency_stats(store, None, None, bucket="hour")
+    m1_04 = next(i for i in hourly["items"] if i["period"] == "2026-05-26T04" and i["model"] == "m1")
+    assert m1_04["errors"] == 1
+    assert m1_04["error_rate"] == round(1 / m1_04["calls"], 4)
+    assert {i["model"] for i in hourly["items"]} == {"m1", "m2"}
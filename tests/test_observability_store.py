@@ -95,3 +95,30 @@ def test_fts_insert_and_match(tmp_path: Path):
     with store.connect() as conn:
         rows = list(conn.execute("SELECT request_id FROM requests_fts WHERE requests_fts MATCH 'nike'"))
     assert rows[0]["request_id"] == "rid3"
+
+
+def test_init_schema_adds_artifact_bytes_to_existing_db(tmp_path: Path):
+    db_path = tmp_path / "obs.db"
+    from app.observability.store import _SCHEMA
+    legacy_schema = _SCHEMA.replace(
+        "has_image         INTEGER DEFAULT 0,\n  artifact_bytes    INTEGER DEFAULT 0",
+        "has_image         INTEGER DEFAULT 0",
+    )
+    assert "artifact_bytes" not in legacy_schema
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(legacy_schema)
+        conn.execute(
+            "INSERT INTO requests (request_id, timestamp_utc, method, endpoint) "
+            "VALUES ('old', '2026-01-01T00:00:00Z', 'GET', '/x')"
+        )
+    store = Store(db_path)
+    store.init_schema()
+    store.init_schema()  # a second start must not reset measured rows
+    with store.connect() as conn:
+        conn.execute(
+            "INSERT INTO requests (request_id, timestamp_utc, method, endpoint) "
+            "VALUES ('new', '2026-01-02T00:00:00Z', 'GET', '/x')"
+        )
+        rows = dict(conn.execute("SELECT request_id, artifact_bytes FROM requests").fetchall())
+    # Only rows from before the migration are left for the prune backfill.
+    assert rows == {"old": None, "new": 0}
@@ -0,0 +1,133 @@
+import base64
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.observability import context as obs_ctx
+from app.observability import tracing
+from app.observability.store import Store
+
+
+@pytest.fixture
+def collected():
+    spans = []
+    previous = tracing._sink
+    tracing.set_sink(spans.append)
+    yield spans
+    tracing.set_sink(previous)
+
+
+def test_spans_nest_and_cross_threads(collected):
+    token = obs_ctx.set_request_id("rid-1")
+    try:
+        with tracing.span("root") as root:
+            with tracing.span("child", stage="category"):
+                pass
+            parent = tracing.current_span()
+            submitted = tracing.now_ms()
+
+            def _worker():
+                with tracing.use_span(parent):
+                    tracing.record_span("queue_wait", submitted, tracing.now_ms())
+                    with tracing.span("task"):
+                        pass
+
+            t = threading.Thread(target=_worker)
+            t.start()
+            t.join()
+    finally:
+        obs_ctx.reset_request_id(token)
+
+    by_name = {s.name: s for s in collected}
+    assert set(by_name) == {"root", "child", "queue_wait", "task"}
+    assert all(s.trace_id == "rid-1" for s in collected)
+    assert by_name["child"].parent_id == root.span_id
+    assert by_name["task"].parent_id == root.span_id
+    assert by_name["queue_wait"].end_ms >= by_name["queue_wait"].start_ms
+    assert by_name["child"].attributes == {"stage": "category"}
+    assert by_name["task"].thread != by_name["root"].thread
+
+
+def test_span_outside_request_records_nothing(collected):
+    with tracing.span("orphan") as s:
+        assert s is None
+    assert collected == []
+
+
+def test_span_marks_errors(collected):
+    token = obs_ctx.set_request_id("rid-2")
+    try:
+        with pytest.raises(ValueError):
+            with tracing.span("boom"):
+                raise ValueError("x")
+    finally:
+        obs_ctx.reset_request_id(token)
+    assert collected[0].status == "error"
+
+
+def test_span_writer_batches_off_thread():
+    batches = []
+    writer = tracing.SpanWriter(batches.append, max_batch=3)
+    for i in range(7):
+        writer(tracing.Span(str(i), "r", None, "n", 0.0, 1.0))
+    assert writer.flush()
+    assert sorted(s.span_id for batch in batches for s in batch) == [str(i) for i in range(7)]
+    assert all(len(batch) <= 3 for batch in batches)
+
+
+def test_spans_persist_and_cascade_with_request(tmp_path: Path):
+    store = Store(tmp_path / "obs.db")
+    store.init_schema()
+    store.insert_request_start(
+        request_id="r", timestamp_utc="2026-05-26T03:05:00.000000Z", method="GET",
+        endpoint="/x", client_ip="", user_agent="", language="", body_summary="", has_image=False,
+    )
+    store.insert_spans([
+        tracing.Span("a", "r", None, "http.request", 1000.0, 1500.0, attributes={"k": 1}),
+        tracing.Span("b", "r", "a", "llm.attempt", 1100.0, 1400.0),
+        tracing.Span("c", "gone", None, "http.request", 0.0, 1.0),
+    ])
+    spans = store.list_spans("r")
+    assert [(s["name"], s["offset_ms"], s["duration_ms"]) for s in spans] == [
+        ("http.request", 0.0, 500.0), ("llm.attempt", 100.0, 300.0),
+    ]
+    assert spans[0]["attributes"] == {"k": 1}
+    assert store.list_spans("gone") == []
+    with store.connect() as conn:
+        conn.execute("DELETE FROM requests WHERE request_id = 'r'")
+    assert store.list_spans("r") == []
+
+
+def test_analyze_request_records_waterfall(monkeypatch):
+    monkeypatch.setenv("LOGS_PASSWORD", "h")
+    import importlib, app.config, main
+    importlib.reload(app.config)
+    main = importlib.reload(main)
+    main.analyzer.classify_first_image_categories = MagicMock(
+        return_value={"title": "x", "categories": [], "category_paths": [], "prices": []}
+    )
+    main.analyzer.generate_product_data = MagicMock(return_value={"product_data": {}})
+    headers = {"Authorization": "Basic " + base64.b64encode(b"a:h").decode()}
+
+    with TestClient(main.app) as client:
+        png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+        r = client.post(
+            "/api/v1/mercari/image/analyze", headers=headers,
+            data={"language": "ja"}, files=[("image_list", ("a.png", png, "image/png"))],
+        )
+        assert r.status_code == 200
+        job = main.analysis_job_store.get(r.json()["job_id"])
+        job["future"].result(timeout=5)
+        assert main.span_writer.flush()
+        detail = client.get(f"/api/v1/logs/requests/{r.headers['x-request-id']}", headers=headers).json()
+
+    names = [s["name"] for s in detail["spans"]]
+    for expected in ("http.request", "image.preprocess", "threadpool.queue_wait",
+                     "classification", "executor.queue_wait"):
+        assert expected in names
+    root = next(s for s in detail["spans"] if s["name"] == "http.request")
+    assert root["parent_id"] is None and root["offset_ms"] == 0.0
+    assert all(s["parent_id"] for s in detail["spans"] if s["name"] != "http.request")
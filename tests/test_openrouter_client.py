@@ -1,9 +1,14 @@
+import http.server
 import json
 import os
+import threading
+import time
 import unittest
 from unittest.mock import patch
 
 from app.config import Settings
+from app.errors import LLMCancelledError
+from app.llm.cancellation import CancellationToken
 from app.llm.client import OpenRouterClient
 
 
@@ -137,6 +142,57 @@ class OpenRouterClientReasoningTest(unittest.TestCase):
 
         self.assertNotIn("reasoning", captured["payload"])
 
+class _SlowHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(float(self.server.delay))
+        try:
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b'{"choices": [{"message": {"content": "ok"}}]}')
+        except OSError:
+            pass
+
+    def log_message(self, *_args):
+        pass
+
+
+class OpenRouterClientCancellationTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = OpenRouterClient(
+            api_key="key",
+            base_url=f"http://127.0.0.1:{self.server.server_port}/",
+            timeout=10,
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_cancel_aborts_in_flight_request(self):
+        # Warm a keep-alive connection so the cancelled call reuses it.
+        content, _ = self.client.chat(model="m", messages=[], cancel_token=CancellationToken())
+        self.assertEqual(content, "ok")
+
+        self.server.delay = 3
+        token = CancellationToken()
+        threading.Timer(0.2, token.cancel).start()
+        started = time.monotonic()
+        with self.assertRaises(LLMCancelledError):
+            self.client.chat(model="m", messages=[], cancel_token=token)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_already_cancelled_token_sends_nothing(self):
+        token = CancellationToken()
+        token.cancel()
+        with patch.object(self.client.session, "post") as post:
+            with self.assertRaises(LLMCancelledError):
+                self.client.chat(model="m", messages=[], cancel_token=token)
+        post.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -32,6 +32,9 @@ class FakeCategoryStore:
     def find_category(self, group_name, category_name):
         return None
 
+    def closest_category(self, group_name, category_name, min_similarity):
+        return None
+
 
 def _settings():
     return SimpleNamespace(
@@ -112,6 +115,39 @@ class ExtractPricesTest(unittest.TestCase):
         self.assertIsNone(result["tax_included"])
 
 
+class ExtractPriceAndSizeTest(unittest.TestCase):
+    def test_one_call_returns_normalized_price_and_size(self):
+        analyzer, vision_client = _analyzer(
+            {"tax_excluded": "¥980", "tax_included": None, "prices": [1500, 800],
+             "product_size": "  27cm "}
+        )
+
+        result = analyzer.extract_price_and_size(
+            images=[(b"front", "image/png"), (b"tag", "image/png")],
+            debug=True,
+        )
+
+        self.assertEqual(len(vision_client.calls), 1)
+        call = vision_client.calls[0]
+        image_parts = [p for p in call["messages"][1]["content"] if p["type"] == "image_url"]
+        self.assertEqual(call["model"], "price-model-test")
+        self.assertEqual(len(image_parts), 2)
+        self.assertIn("product_size", call["messages"][0]["content"])
+        # Same rules as the separate links: a lone price is tax-included,
+        # the range covers it, and the size is copied as shown.
+        self.assertIsNone(result["tax_excluded"])
+        self.assertEqual(result["tax_included"], 980)
+        self.assertEqual(result["prices"], [800, 1500])
+        self.assertEqual(result["product_size"], "27cm")
+        self.assertEqual(set(result["timings"].keys()), {"price_size_ms"})
+        self.assertIn("price_size", result["_debug"]["attempts"])
+
+    def test_missing_size_is_null(self):
+        analyzer, _ = _analyzer({"tax_excluded": None, "tax_included": None, "prices": []})
+        result = analyzer.extract_price_and_size(images=[(b"front", "image/png")])
+        self.assertIsNone(result["product_size"])
+
+
 class PriceEndpointTest(unittest.TestCase):
     def setUp(self):
         self.client = TestClient(main.app)
@@ -174,6 +210,33 @@ class PriceEndpointTest(unittest.TestCase):
         analyzer.extract_prices.assert_called_once()
         self.assertTrue(analyzer.extract_prices.call_args.kwargs["debug"])
 
+    @patch.object(main, "analyzer")
+    def test_combined_mode_uses_the_single_price_size_call(self, analyzer):
+        analyzer.extract_price_and_size.return_value = {
+            "tax_excluded": None,
+            "tax_included": 1078,
+            "prices": [900, 1300],
+            "product_size": "M",
+            "timings": {"price_size_ms": 42.0},
+        }
+
+        for path in ("/api/v1/mercari/image/price", "/api/v1/mercari/image/size"):
+            resp = self.client.post(
+                path,
+                headers=auth_headers(),
+                files=[("image_list", ("a.png", b"\x89PNG\r\n\x1a\n", "image/png"))],
+                data={"combined": "true"},
+            )
+            self.assertEqual(resp.status_code, 200)
+            body = resp.json()
+            self.assertEqual(body["tax_included"], 1078)
+            self.assertEqual(body["product_size"], "M")
+            self.assertNotIn("timings", body)
+
+        self.assertEqual(analyzer.extract_price_and_size.call_count, 2)
+        analyzer.extract_prices.assert_not_called()
+        analyzer.extract_size.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,146 @@
+import concurrent.futures
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from console_auth_helpers import auth_headers
+from app.errors import ExecutorSaturatedError
+from app.executor import BoundedExecutor
+from app.jobs import AnalysisJobStore, SQLiteJobBackend, primary_started_at
+import main
+
+
+@pytest.fixture
+def blocked_executor():
+    release = threading.Event()
+    executor = BoundedExecutor(max_workers=1, max_queue=2)
+    yield executor, release
+    release.set()
+    executor.shutdown(wait=True)
+
+
+def test_rejects_when_queue_is_full(blocked_executor):
+    executor, release = blocked_executor
+    running = executor.submit(release.wait)
+    queued = [executor.submit(release.wait) for _ in range(2)]
+    deadline = time.monotonic() + 2
+    while executor.active != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert executor.queued == 2
+    with pytest.raises(ExecutorSaturatedError) as exc_info:
+        executor.submit(release.wait)
+    assert exc_info.value.retry_after >= 1
+
+    assert queued[1].cancel()
+    assert executor.queued == 1
+    executor.submit(release.wait)  # the cancelled slot is free again
+
+    release.set()
+    running.result(timeout=2)
+    assert running.timing.started_at is not None
+    assert running.timing.queue_wait_seconds >= 0
+
+
+def test_queued_primary_does_not_count_towards_fallback_threshold(blocked_executor):
+    executor, release = blocked_executor
+    executor.submit(release.wait)
+    queued = executor.submit(release.wait)
+    job = {"future": queued, "started_at": time.monotonic() - 60}
+
+    assert primary_started_at(job) is None
+    assert main._primary_elapsed_seconds(queued, False, primary_started_at(job)) is None
+
+    queued.timing.started_at = time.monotonic() - 2
+    elapsed = main._primary_elapsed_seconds(queued, False, primary_started_at(job))
+    assert elapsed == pytest.approx(2, abs=0.5)
+
+
+def test_long_poll_switches_to_fallback_threshold_after_queued_primary_starts(monkeypatch):
+    # One worker, busy for 0.5 s: the primary waits in the queue past the
+    # submit-time threshold, and its own threshold runs from pickup.
+    executor = BoundedExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(time.sleep, 0.5)
+    primary = executor.submit(release.wait)
+    fallback = concurrent.futures.Future()
+    fallback.set_result({"description": "fallback", "timings": {"product_data_ms": 5.0}})
+    main.analysis_job_store.put(
+        "queued-primary", classification={"title": "t"}, future=primary,
+        fallback_future=fallback, started_at=time.monotonic(), fallback_timeout=0.3,
+    )
+    try:
+        with TestClient(main.app) as client:
+            started = time.monotonic()
+            r = client.get("/api/v1/mercari/image/analyze/queued-primary?wait=10")
+            waited = time.monotonic() - started
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+
+    assert r.json()["status"] == "completed"
+    assert r.json()["product_data_source"] == "fallback"
+    # Pickup at ~0.5 s plus the 0.3 s threshold, not the 10 s wait.
+    assert 0.7 <= waited < 3
+
+
+def test_remote_worker_measures_threshold_from_published_pickup(tmp_path):
+    backend = SQLiteJobBackend(tmp_path / "jobs.db")
+    owner, other = AnalysisJobStore(backend=backend), AnalysisJobStore(backend=backend)
+    executor = BoundedExecutor(max_workers=1)
+    hold, release = threading.Event(), threading.Event()
+    executor.submit(hold.wait)
+    primary = executor.submit(release.wait)
+    fallback = concurrent.futures.Future()
+    fallback.set_result({"description": "fallback"})
+    owner.put("remote-queued", classification={"title": "t"}, future=primary,
+              fallback_future=fallback, started_at=time.monotonic() - 60, fallback_timeout=1.0)
+    try:
+        job = other.get("remote-queued")
+        assert primary_started_at(job) is None
+        assert main._stored_job_payload("remote-queued", job)["status"] == "product_pending"
+
+        hold.set()
+        deadline = time.monotonic() + 2
+        while primary.timing.started_at is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        job = other.get("remote-queued")
+        assert primary_started_at(job) == pytest.approx(primary.timing.started_at, abs=0.2)
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+
+
+def test_analyze_returns_503_with_retry_after_when_saturated(monkeypatch):
+    monkeypatch.setattr(
+        main.analyzer, "classify_first_image_categories",
+        lambda **_kwargs: pytest.fail("classification should not run when shedding load"),
+    )
+    with patch.object(main.product_data_executor, "submit", side_effect=ExecutorSaturatedError(7)):
+        response = TestClient(main.app).post(
+            "/api/v1/mercari/image/analyze",
+            headers=auth_headers(),
+            files=[("image_list", ("a.png", b"\x89PNG\r\n\x1a\n", "image/png"))],
+            data={"language": "ja"},
+        )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
+
+
+def test_queue_wait_is_reported_beside_model_time(monkeypatch):
+    def fake_generate(**_kwargs):
+        return {"timings": {"product_data_ms": 12.0}}
+
+    executor = BoundedExecutor(max_workers=1)
+    monkeypatch.setattr(main, "product_data_executor", executor)
+    try:
+        result = main._submit_with_request_id(fake_generate).result(timeout=2)
+    finally:
+        executor.shutdown(wait=True)
+
+    assert result["timings"]["product_data_ms"] == 12.0
+    assert result["timings"]["product_data_queue_ms"] >= 0
@@ -285,6 +285,43 @@ class ProductDataFallbackTest(_BaseFallbackTest):
         poll = self.client.get(f"/api/v1/mercari/image/analyze/{job_id}", headers=self.headers)
         self.assertEqual(poll.status_code, 502)
 
+    @patch.object(main, "product_data_executor")
+    @patch.object(main, "analyzer")
+    def test_losing_call_is_cancelled_once_a_source_is_chosen(self, analyzer, executor):
+        main.settings.product_data_fallback_timeout_seconds = 0.0
+        primary_future = concurrent.futures.Future()
+        fallback_future = concurrent.futures.Future()
+        executor.submit.side_effect = [primary_future, fallback_future]
+        analyzer.classify_first_image_categories.return_value = self._classification_payload()
+
+        body = self._post_analyze().json()
+        # The primary is running on a worker, so only its token can stop it.
+        primary_future.set_running_or_notify_cancel()
+        fallback_future.set_result(self._product_payload(product_data_ms=300.0))
+
+        poll = self.client.get(f"/api/v1/mercari/image/analyze/{body['job_id']}", headers=self.headers)
+
+        self.assertEqual(poll.json()["product_data_source"], "fallback")
+        self.assertTrue(primary_future.cancel_token.cancelled)
+        self.assertFalse(fallback_future.cancel_token.cancelled)
+
+    @patch.object(main, "product_data_executor")
+    @patch.object(main, "analyzer")
+    def test_queued_fallback_is_dropped_when_primary_wins(self, analyzer, executor):
+        primary_future = concurrent.futures.Future()
+        fallback_future = concurrent.futures.Future()
+        executor.submit.side_effect = [primary_future, fallback_future]
+        analyzer.classify_first_image_categories.return_value = self._classification_payload()
+
+        body = self._post_analyze().json()
+        primary_future.set_result(self._product_payload(product_data_ms=200.0))
+        poll = self.client.get(f"/api/v1/mercari/image/analyze/{body['job_id']}", headers=self.headers)
+
+        self.assertEqual(poll.json()["product_data_source"], "primary")
+        self.assertTrue(fallback_future.cancelled())
+        # Later polls still resolve to the cached primary result.
+        again = self.client.get(f"/api/v1/mercari/image/analyze/{body['job_id']}", headers=self.headers)
+        self.assertEqual(again.json()["product_data_source"], "primary")
 
 class ProductDataFallbackDisabledTest(_BaseFallbackTest):
     def setUp(self):
@@ -304,5 +341,6 @@ class ProductDataFallbackDisabledTest(_BaseFallbackTest):
         self.assertEqual(executor.submit.call_count, 1)
 
 
+
 if __name__ == "__main__":
     unittest.main()
@@ -52,10 +52,11 @@ class PromptStoreReadTest(unittest.TestCase):
         ):
             self.assertEqual(prompt_store.render_system(key), GOLDEN[key])
 
-    def test_list_prompts_has_nineteen_entries(self):
+    def test_list_prompts_has_twenty_seven_entries(self):
         prompts = prompt_store.list_prompts()
-        self.assertEqual(len(prompts), 19)
+        self.assertEqual(len(prompts), 27)
         keys = {p["key"] for p in prompts}
+        self.assertIn("PRICE_SIZE_SYSTEM_PROMPT", keys)
         self.assertIn("CATEGORY_USER_PROMPT_TEMPLATE", keys)
         self.assertIn("SHOWCASE_PROMPT", keys)
         self.assertIn("SIZE_ONLY_SYSTEM_PROMPT", keys)
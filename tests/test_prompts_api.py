@@ -40,7 +40,7 @@ class PromptsApiTest(unittest.TestCase):
         resp = client.get("/api/v1/prompts", headers=_auth())
         self.assertEqual(resp.status_code, 200)
         prompts = resp.json()["prompts"]
-        self.assertEqual(len(prompts), 19)
+        self.assertEqual(len(prompts), 27)
         self.assertIn("SHOWCASE_PROMPT", {p["key"] for p in prompts})
 
     def test_put_prompt_updates_and_persists(self):
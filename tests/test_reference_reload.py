@@ -0,0 +1,78 @@
+import base64
+import importlib
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data.categories import CategoryStore
+from app.data.reloader import ReloadableStore
+
+HEADER = "category_id,path,group_name\n"
+
+
+def _write(path: Path, *rows: str) -> None:
+    path.write_text(HEADER + "".join(f"{row},ファッション\n" for row in rows), encoding="utf-8")
+
+
+def _reloadable(tmp_path: Path) -> ReloadableStore:
+    csv_path = tmp_path / "categories.csv"
+    _write(csv_path, "1,ファッション > メンズ")
+    return ReloadableStore("categories", str(csv_path), lambda: CategoryStore(str(csv_path)))
+
+
+def test_changed_csv_is_swapped_in_and_old_store_stays_whole(tmp_path: Path):
+    store = _reloadable(tmp_path)
+    old = store.store
+    assert store.find_category("ファッション", "ファッション > メンズ")["id"] == "1"
+    assert store.reload()["reloaded"] is False
+
+    _write(tmp_path / "categories.csv", "1,ファッション > メンズ", "2,ファッション > レディース")
+    assert store.status()["stale"] is True
+    status = store.reload()
+
+    assert status["reloaded"] is True and status["rows"] == 2 and status["stale"] is False
+    assert status["load_ms"] >= 0 and status["loaded_at"]
+    assert store.find_category("ファッション", "ファッション > レディース")["id"] == "2"
+    # Requests still holding the old table finish against a complete copy.
+    assert len(old) == 1 and old.find_category("ファッション", "ファッション > メンズ")["id"] == "1"
+
+
+def test_failed_rebuild_keeps_serving_the_loaded_data(tmp_path: Path):
+    store = _reloadable(tmp_path)
+
+    def broken():
+        raise ValueError("broken csv")
+
+    store._factory = broken
+
+    status = store.reload(force=True)
+
+    assert status["reloaded"] is False and status["last_error"] == "ValueError: broken csv"
+    assert status["rows"] == 1
+    assert store.find_category("ファッション", "ファッション > メンズ")["id"] == "1"
+
+
+@pytest.fixture
+def main_module(monkeypatch):
+    monkeypatch.setenv("LOGS_PASSWORD", "testpass")
+    import app.config
+    import main
+    importlib.reload(app.config)
+    return importlib.reload(main)
+
+
+def test_console_reload_endpoint_reports_rows_and_load_time(tmp_path: Path, main_module, monkeypatch):
+    store = _reloadable(tmp_path)
+    monkeypatch.setattr(main_module, "reference_stores", {"categories": store})
+    client = TestClient(main_module.app)
+    headers = {"Authorization": "Basic " + base64.b64encode(b"admin:testpass").decode()}
+
+    assert client.get("/api/v1/reference-data", headers=headers).json()["tables"][0]["rows"] == 1
+    _write(tmp_path / "categories.csv", "1,ファッション > メンズ", "2,ファッション > キッズ")
+    resp = client.post("/api/v1/reference-data/reload", headers=headers, json={})
+
+    assert resp.status_code == 200
+    (table,) = resp.json()["tables"]
+    assert (table["name"], table["rows"], table["reloaded"]) == ("categories", 2, True)
+    assert client.post("/api/v1/reference-data/reload", headers=headers, json={"tables": ["x"]}).status_code == 400
@@ -0,0 +1,93 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from app.data.brands import BrandStore
+from app.data.categories import CategoryStore
+from app.data.snapshot import SnapshotError, read_snapshot
+
+
+def _brand_csv(tmp_path: Path) -> str:
+    path = tmp_path / "mercari_brand.csv"
+    path.write_text(
+        "id,name,name_jp,name_en,rakuten_id,meru_id\n"
+        "b1,Acme,アクメ,Acme,rak-1,0\n"
+        "b2,,名無し,Nameless,,\n",
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def _category_csv(tmp_path: Path) -> str:
+    path = tmp_path / "categories.csv"
+    path.write_text(
+        "category_id,path,group_name,meru_id,meru_path\n"
+        "1,ファッション > メンズ > トップス,ファッション,m-1,Mercari > Tops\n"
+        "2,ファッション > 小物 > 財布,ファッション,,\n",
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_brand_snapshot_loads_the_same_records_without_the_csv(tmp_path: Path):
+    from_csv = BrandStore(_brand_csv(tmp_path))
+    from_csv.write_snapshot(str(tmp_path / "brands.snapshot"))
+
+    store = BrandStore(str(tmp_path / "missing.csv"), snapshot_path=str(tmp_path / "brands.snapshot"))
+
+    assert [r.to_dict() for r in store.records] == [r.to_dict() for r in from_csv.records]
+    record = store.match("アクメ")
+    assert record["brand_name"] == "Acme" and record.get("name_cn") == ""
+    assert record["brand_id_obj"]["rakuten_brand_id"] == "rak-1"
+    assert record["brand_id_obj"]["meru_brand_id"] == ""
+    assert store.match("nameless")["brand_name"] == "Nameless"
+    (hit,) = store.scan_mentions(title="未使用 アクメ ポーチ")
+    assert hit.record is store.match("acme")
+
+
+def test_category_snapshot_keeps_lookups_and_blocks(tmp_path: Path):
+    from_csv = CategoryStore(_category_csv(tmp_path))
+    from_csv.write_snapshot(str(tmp_path / "categories.snapshot"))
+
+    store = CategoryStore(str(tmp_path / "missing.csv"), snapshot_path=str(tmp_path / "categories.snapshot"))
+
+    category = store.find_category("ファッション", "ファッション > メンズ > トップス")
+    assert dict(category) == dict(from_csv.find_category("ファッション", "ファッション > メンズ > トップス"))
+    assert category["meru_path"] == "Mercari > Tops"
+    assert store.candidate_block("ファッション") == from_csv.candidate_block("ファッション")
+    assert store.closest_category("ファッション", "ファッション > 財布", 0.8)[0]["id"] == "2"
+
+
+def test_missing_or_unusable_snapshots_are_rebuilt_from_the_csv(tmp_path: Path):
+    snapshot = tmp_path / "brands.snapshot"
+    assert len(BrandStore(_brand_csv(tmp_path), snapshot_path=str(snapshot)).records) == 2
+    assert len(read_snapshot(str(snapshot), "brands")["index_keys"]) == 4
+
+    CategoryStore(_category_csv(tmp_path)).write_snapshot(str(snapshot))
+    assert BrandStore(_brand_csv(tmp_path), snapshot_path=str(snapshot)).match("アクメ")["id"] == "b1"
+    data = snapshot.read_bytes()
+    snapshot.write_bytes(data[:-3] + b"xyz")
+    with pytest.raises(SnapshotError, match="checksum"):
+        read_snapshot(str(snapshot), "brands")
+    assert BrandStore(_brand_csv(tmp_path), snapshot_path=str(snapshot)).match("アクメ")["id"] == "b1"
+    assert read_snapshot(str(snapshot), "brands")
+
+
+def test_snapshot_is_rebuilt_only_when_the_csv_content_changes(tmp_path: Path):
+    csv_path = _category_csv(tmp_path)
+    snapshot = str(tmp_path / "categories.snapshot")
+    CategoryStore(csv_path, snapshot_path=snapshot)
+    built = os.stat(snapshot).st_mtime_ns
+
+    # Same bytes with a new mtime (e.g. a fresh checkout): the snapshot is reused.
+    os.utime(csv_path, ns=(built + 10**9, built + 10**9))
+    CategoryStore(csv_path, snapshot_path=snapshot)
+    assert os.stat(snapshot).st_mtime_ns == built
+
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("3,ファッション > 小物 > ベルト,ファッション,,\n")
+    store = CategoryStore(csv_path, snapshot_path=snapshot)
+    assert store.find_category("ファッション", "ファッション > 小物 > ベルト")["id"] == "3"
+    assert CategoryStore(csv_path, snapshot_path=snapshot).closest_category(
+        "ファッション", "小物 > ベルト", 0.8)[0]["id"] == "3"
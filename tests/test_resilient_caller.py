@@ -1,7 +1,8 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
-from app.errors import LLMAllAttemptsFailedError, LLMRequestError
+from app.errors import LLMAllAttemptsFailedError, LLMCancelledError, LLMRequestError
+from app.llm.cancellation import CancellationToken
 from app.llm.resilient import ResilientCaller, AttemptRecord
 
 
@@ -218,6 +219,41 @@ class ResilientCallerTest(unittest.TestCase):
         # 3 sleeps between primary's 4 attempts; none before the fallback
         self.assertEqual(self._sleep.call_count, 3)
 
+class ResilientCallerCancellationTest(unittest.TestCase):
+    def _call(self, client, token):
+        return _make_caller(client).call_and_parse(
+            stage="product_data",
+            primary_model="m1",
+            fallback_models=["fb1"],
+            messages=[],
+            temperature=0.1,
+            max_tokens=10,
+            cancel_token=token,
+        )
+
+    def test_cancelled_request_is_recorded_and_not_retried(self):
+        client = MagicMock()
+        client.chat.side_effect = LLMCancelledError("OpenRouter request cancelled.")
+        token = CancellationToken()
+
+        with self.assertRaises(LLMAllAttemptsFailedError) as ctx:
+            self._call(client, token)
+
+        client.chat.assert_called_once()
+        self.assertIs(client.chat.call_args.kwargs["cancel_token"], token)
+        self.assertEqual([a.error_kind for a in ctx.exception.attempts], ["cancelled"])
+
+    def test_cancelled_token_skips_the_request(self):
+        client = MagicMock()
+        token = CancellationToken()
+        token.cancel()
+
+        with self.assertRaises(LLMAllAttemptsFailedError) as ctx:
+            self._call(client, token)
+
+        client.chat.assert_not_called()
+        self.assertEqual(ctx.exception.attempts[0].error_kind, "cancelled")
+
 
 if __name__ == "__main__":
     unittest.main()
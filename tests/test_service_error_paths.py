@@ -23,6 +23,8 @@ def _build_analyzer(vision_client, category_client, *, category_candidates=None)
         request_timeout=10,
         max_image_bytes=1024,
         allowed_mime_types={"image/png"},
+        category_hierarchical_threshold=0,
+        prompt_cache_control=True,
     )
     category_store = MagicMock()
     category_store.get_categories_by_group.return_value = category_candidates or []
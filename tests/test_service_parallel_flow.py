@@ -81,9 +81,21 @@ class FakeCategoryStore:
     def get_categories_by_group(self, group_name):
         return list(self.categories.values())
 
+    def candidate_block(self, group_name):
+        return "\n".join(item["name"] for item in self.categories.values())
+
+    def candidate_prefix(self, head, group_name):
+        return head.format(group_name=group_name) + self.candidate_block(group_name)
+
+    def path_words(self):
+        return frozenset()
+
     def find_category(self, group_name, category_name):
         return self.categories.get(category_name)
 
+    def closest_category(self, group_name, category_name, min_similarity):
+        return None
+
 
 def _settings():
     return SimpleNamespace(
@@ -97,6 +109,8 @@ def _settings():
         model_call_max_retries=0,
         model_call_total_budget_seconds=10,
         request_timeout=10,
+        category_hierarchical_threshold=0,
+        prompt_cache_control=True,
     )
 
 
@@ -143,7 +157,7 @@ class ParallelFlowServiceTest(unittest.TestCase):
         image_parts = [part for part in vision_content if part["type"] == "image_url"]
         prompt_text = vision_content[0]["text"]
         system_prompt = vision_client.calls[0]["messages"][0]["content"]
-        category_prompt = category_client.calls[0]["messages"][1]["content"]
+        category_prompt = "".join(part["text"] for part in category_client.calls[0]["messages"][1]["content"])
         # Classification now sends only the first image (price scan moved out).
         self.assertEqual(len(image_parts), 1)
         self.assertNotIn("product_intro", prompt_text)
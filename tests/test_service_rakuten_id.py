@@ -58,9 +58,18 @@ class FakeCategoryStore:
     def get_categories_by_group(self, group_name):
         return list(self.categories.values())
 
+    def candidate_block(self, group_name):
+        return "\n".join(item["name"] for item in self.categories.values())
+
+    def candidate_prefix(self, head, group_name):
+        return head.format(group_name=group_name) + self.candidate_block(group_name)
+
     def find_category(self, group_name, category_name):
         return self.categories.get(category_name)
 
+    def closest_category(self, group_name, category_name, min_similarity):
+        return None
+
 
 class RakutenIdResponseTest(unittest.TestCase):
     def test_old_sync_analyze_method_is_removed(self):
@@ -78,6 +87,8 @@ class RakutenIdResponseTest(unittest.TestCase):
             category_fallback_models=[],
             model_call_max_retries=0,
             model_call_total_budget_seconds=10,
+            category_hierarchical_threshold=0,
+            prompt_cache_control=True,
         )
         vision_client = RecordingChatClient(
             {
@@ -32,6 +32,9 @@ class FakeCategoryStore:
     def find_category(self, group_name, category_name):
         return None
 
+    def closest_category(self, group_name, category_name, min_similarity):
+        return None
+
 
 def _settings():
     return SimpleNamespace(
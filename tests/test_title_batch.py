@@ -0,0 +1,240 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from console_auth_helpers import auth_headers
+from app.batching import MicroBatcher
+from app.errors import BadRequestError, LLMAllAttemptsFailedError
+from app.llm import scheduler as llm_scheduler
+from app.service import MercariAnalyzer
+from app.title_batch import WINDOW_BATCHES, TitleBatchCategorizer
+import main
+
+
+def test_micro_batcher_flushes_full_buckets_and_on_timeout():
+    calls = []
+
+    async def flush(key, items):
+        calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    async def _run():
+        batcher = MicroBatcher(flush, batch_size=2, max_wait_s=0.05)
+        return await asyncio.gather(
+            batcher.submit("a", 1), batcher.submit("a", 2), batcher.submit("a", 3), batcher.submit("b", 4),
+        )
+
+    assert asyncio.run(_run()) == ["a:1", "a:2", "a:3", "b:4"]
+    assert sorted(calls) == [("a", [1, 2]), ("a", [3]), ("b", [4])]
+
+
+def test_micro_batcher_fails_every_item_of_a_failed_flush():
+    async def flush(_key, _items):
+        raise BadRequestError("boom")
+
+    async def _run():
+        batcher = MicroBatcher(flush, batch_size=2, max_wait_s=1)
+        return await asyncio.gather(batcher.submit(None, 1), batcher.submit(None, 2), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(_run())] == [BadRequestError, BadRequestError]
+
+
+class _ChatClient:
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+        self.calls = []
+
+    def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        return json.dumps(self.payloads.pop(0)), {"choices": []}
+
+
+class _CategoryStore:
+    categories = {
+        "メンズファッション/トップス": {"id": "1", "name": "メンズファッション/トップス"},
+        "メンズファッション/パンツ": {"id": "2", "name": "メンズファッション/パンツ"},
+    }
+
+    def get_categories_by_group(self, group_name):
+        return list(self.categories.values())
+
+    def candidate_block(self, group_name):
+        return "\n".join(item["name"] for item in self.categories.values())
+
+    def candidate_prefix(self, head, group_name):
+        return head.format(group_name=group_name) + self.candidate_block(group_name)
+
+    def find_category(self, group_name, category_name):
+        return self.categories.get(category_name)
+
+    def closest_category(self, group_name, category_name, min_similarity):
+        return None
+
+
+def _analyzer(payloads):
+    settings = SimpleNamespace(
+        vision_model="vision-test", category_model="category-test", request_timeout=60,
+        max_image_bytes=1024, allowed_mime_types={"image/png"}, log_requests=False,
+        vision_fallback_models=[], category_fallback_models=[], model_call_max_retries=0,
+        model_call_total_budget_seconds=10, category_match_min_similarity=0.8,
+        prompt_cache_control=True,
+    )
+    client = _ChatClient(payloads)
+    analyzer = MercariAnalyzer(
+        settings=settings, brand_store=None, category_store=_CategoryStore(),
+        vision_client=client, category_client=client,
+    )
+    return analyzer, client
+
+
+def test_batched_category_answers_are_matched_by_id():
+    analyzer, client = _analyzer([{"results": [
+        {"id": "2", "best_target_path": "メンズファッション/パンツ"},
+        {"id": "1", "best_target_path": "メンズファッション/トップス",
+         "alternatives": [{"target_path": "メンズファッション/パンツ"}]},
+        {"id": "3", "best_target_path": "どこにもない/パス"},
+    ]}])
+
+    results = analyzer.choose_title_categories_batch(
+        ["Tシャツ", "ジーンズ", "謎の品", "答えなし"], "メンズファッション",
+    )
+
+    assert results[0]["best_target_path"] == "メンズファッション/トップス"
+    assert results[1]["best_target_path"] == "メンズファッション/パンツ"
+    # A path outside the candidates and a missing answer both need a retry.
+    assert results[2:] == [None, None]
+    prompt = "".join(part["text"] for part in client.calls[0]["messages"][1]["content"])
+    assert prompt.count("メンズファッション/パンツ") == 1
+    assert "4: 答えなし" in prompt
+
+
+def test_batched_group_answers_separate_missing_from_unknown():
+    analyzer, _client = _analyzer([{"results": [
+        {"id": 1, "top_level_category": "メンズファッション"},
+        {"id": 2, "top_level_category": "unknown"},
+    ]}])
+
+    assert analyzer.classify_title_groups(["シャツ", "???", "x"], "ja") == ["メンズファッション", "", None]
+
+
+def _fake_analyzer():
+    analyzer = MagicMock()
+    lock = threading.Lock()
+    analyzer.batches = []
+
+    def groups(titles, _language):
+        with lock:
+            analyzer.batches.append(("groups", list(titles)))
+        if "broken" in titles:
+            raise LLMAllAttemptsFailedError("title_category_batch", [])
+        return ["" if title == "photo only" else "g" for title in titles]
+
+    def paths(titles, group_name):
+        with lock:
+            analyzer.batches.append(("paths", list(titles)))
+        return [None if title == "unparsed" else {"best_target_path": title} for title in titles]
+
+    analyzer.classify_title_groups.side_effect = groups
+    analyzer.choose_title_categories_batch.side_effect = paths
+    analyzer.classify_title_group.return_value = "g"
+    analyzer.title_category_paths.side_effect = lambda title, group: {"best_target_path": f"single:{title}"}
+    analyzer.title_image_fallback.return_value = {"best_target_path": "from image"}
+    analyzer.cached_title_result.side_effect = lambda title: {"best_target_path": "cached"} if title == "known" else None
+    return analyzer
+
+
+def _categorize_all(analyzer, titles, batch_size=10):
+    async def _run():
+        categorizer = TitleBatchCategorizer(analyzer, language="ja", batch_size=batch_size, max_wait_s=0.05)
+        results = await asyncio.gather(*(categorizer.categorize(title) for title in titles))
+        return results, categorizer
+
+    return asyncio.run(_run())
+
+
+def test_categorizer_batches_titles_and_retries_what_the_batch_missed():
+    analyzer = _fake_analyzer()
+    results, categorizer = _categorize_all(analyzer, ["a", "b", "unparsed", "photo only"])
+
+    assert [r["best_target_path"] for r in results] == ["a", "b", "single:unparsed", "from image"]
+    assert analyzer.batches == [("groups", ["a", "b", "unparsed", "photo only"]), ("paths", ["a", "b", "unparsed"])]
+    assert (categorizer.batched_calls, categorizer.single_calls) == (2, 1)
+    analyzer.title_image_fallback.assert_called_once_with(None, "ja", None)
+
+
+def test_categorizer_answers_cached_titles_without_model_calls():
+    analyzer = _fake_analyzer()
+    results, categorizer = _categorize_all(analyzer, ["known", "a", "b"])
+
+    assert [r["best_target_path"] for r in results] == ["cached", "a", "b"]
+    assert analyzer.batches[0] == ("groups", ["a", "b"])
+    assert categorizer.cache_hits == 1
+
+
+def test_categorizer_falls_back_per_item_when_the_batched_call_fails():
+    analyzer = _fake_analyzer()
+    results, categorizer = _categorize_all(analyzer, ["a", "broken"])
+
+    assert [r["best_target_path"] for r in results] == ["a", "broken"]
+    assert analyzer.classify_title_group.call_count == 2
+    assert categorizer.single_calls == 2
+
+
+@patch.object(main, "analyzer")
+def test_endpoint_streams_items_and_a_summary(analyzer):
+    fake = _fake_analyzer()
+    for name in ("classify_title_groups", "choose_title_categories_batch", "title_image_fallback",
+                 "cached_title_result"):
+        setattr(analyzer, name, getattr(fake, name))
+    priorities = []
+    analyzer.classify_title_groups.side_effect = lambda titles, _language: priorities.append(
+        llm_scheduler.current_priority()) or ["g"] * len(titles)
+    analyzer.title_image_fallback.side_effect = BadRequestError("Title classification failed")
+
+    response = TestClient(main.app).post(
+        "/api/v1/mercari/title/analyze/batch",
+        headers=auth_headers(),
+        json={"items": [{"id": "x", "title": "a"}, {"id": "y", "title": "b"}, {"id": "z", "title": " "}]},
+    )
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    items = {line["item"]: line for line in lines if line["type"] == "item"}
+    assert items["x"]["result"] == {"best_target_path": "a"}
+    assert items["z"]["error"] == {"status_code": 400, "detail": "Title is required."}
+    summary = lines[-1]
+    assert (summary["completed"], summary["failed"], summary["batched_calls"]) == (2, 1, 2)
+    assert priorities == [llm_scheduler.BATCH]
+
+
+def test_endpoint_keeps_a_bounded_window_of_items_in_flight():
+    in_flight = {"now": 0, "max": 0}
+
+    async def categorize(self, title, image_url=None):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.001)
+        in_flight["now"] -= 1
+        return {"best_target_path": title}
+
+    with patch.object(TitleBatchCategorizer, "categorize", categorize):
+        response = TestClient(main.app).post(
+            "/api/v1/mercari/title/analyze/batch",
+            headers=auth_headers(),
+            json={"items": [{"title": f"t{i}"} for i in range(50)], "batch_size": 2},
+        )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1]["completed"] == 50
+    assert in_flight["max"] == 2 * WINDOW_BATCHES
+
+
+@pytest.mark.parametrize("body", [{"items": []}, {"items": [{"title": "a"}], "language": "xx"}])
+def test_endpoint_rejects_bad_requests(body):
+    response = TestClient(main.app).post("/api/v1/mercari/title/analyze/batch", headers=auth_headers(), json=body)
+    assert response.status_code == 400
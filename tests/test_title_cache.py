@@ -0,0 +1,150 @@
+import json
+import sqlite3
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.data.categories import CategoryStore
+from app.observability.recorder import Recorder
+from app.observability.store import Store
+from app.service import MercariAnalyzer
+from app.title_cache import TitleAnswerCache, TitleRecord, load_title_cache, records_from_observability
+
+
+SWITCH = {"best_target_path": "テレビゲーム > 本体", "best_category_id": "1", "alternatives": []}
+SNEAKER = {"best_target_path": "靴 > スニーカー", "best_category_id": "2", "alternatives": []}
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> TitleAnswerCache:
+    cache = TitleAnswerCache(tmp_path / "title_cache.db", min_similarity=0.8)
+    cache.add_many([
+        TitleRecord("Nintendo Switch 有機EL ホワイト 本体", SWITCH, "title"),
+        TitleRecord("ナイキ エアマックス90 ホワイト 27cm", SNEAKER, "image"),
+    ])
+    return cache
+
+
+def test_near_duplicate_titles_hit_and_different_ones_miss(cache: TitleAnswerCache):
+    result, similarity = cache.lookup("Nintendo Switch 有機EL ホワイト 本体 美品")
+    assert result == SWITCH and 0.8 <= similarity < 1.0
+    # Case, width and spacing are normalised away before comparing.
+    assert cache.lookup("nintendo switch 有機ＥＬ ホワイト本体") == (SWITCH, 1.0)
+    assert cache.lookup("Nintendo Switch Lite ブルー") is None
+    assert cache.lookup("") is None
+
+
+def test_rebuild_replaces_and_update_overwrites(cache: TitleAnswerCache):
+    cache.add_many([TitleRecord("ナイキ エアマックス90 ホワイト 27cm", SWITCH, "title")])
+    assert len(cache) == 2
+    assert cache.lookup("ナイキ エアマックス90 ホワイト 27cm")[0] == SWITCH
+
+    cache.add_many([TitleRecord("PS5 本体", SWITCH, "title")], replace=True)
+    assert len(cache) == 1
+    assert cache.lookup("Nintendo Switch 有機EL ホワイト 本体") is None
+
+
+def test_index_built_with_other_minhash_parameters_is_ignored(cache: TitleAnswerCache):
+    with sqlite3.connect(cache.path) as conn:
+        conn.execute("UPDATE title_cache_meta SET value = 'minhash-v0' WHERE name = 'format'")
+
+    assert load_title_cache(str(cache.path), 0.9) is None
+    assert load_title_cache(str(cache.path.parent / "missing.db"), 0.9) is None
+
+
+def _record(recorder, request_id, endpoint, body, response, parsed_title=None):
+    recorder.start_request(
+        request_id=request_id, method="POST", endpoint=endpoint, client_ip="", user_agent="",
+        language="ja", headers={}, body_bytes=json.dumps(body).encode(),
+        content_type="application/json", uploaded_images=[],
+    )
+    if parsed_title is not None:
+        recorder.record_llm_stage(
+            request_id=request_id, stage="fast_classification",
+            attempts=[{"attempt": 1, "model": "m", "latency_ms": 1.0}],
+            messages=[], raw_response={}, parsed={"title": parsed_title},
+        )
+    recorder.finalize_request(
+        request_id=request_id, status_code=response.pop("status_code", 200), duration_ms=5.0,
+        error="", response_body=json.dumps(response).encode(), job_id="",
+    )
+
+
+def test_records_are_read_from_title_and_image_requests(tmp_path: Path):
+    store = Store(tmp_path / "obs.db")
+    store.init_schema()
+    recorder = Recorder(store=store, store_root=tmp_path / "store")
+    _record(recorder, "t1", "/api/v1/mercari/title/analyze", {"title": "PS5 本体"}, {**SWITCH, "extra": 1})
+    _record(recorder, "i1", "/api/v1/mercari/image/analyze", {}, {"status": "product_pending", **SNEAKER},
+            parsed_title="ナイキ スニーカー")
+    _record(recorder, "t2", "/api/v1/mercari/title/analyze", {"title": "謎"}, {"status_code": 400, "detail": "x"})
+
+    records = records_from_observability(str(tmp_path / "obs.db"), str(tmp_path / "store"))
+
+    assert [(r.title, r.source, r.result["best_target_path"]) for r in records] == [
+        ("PS5 本体", "title", "テレビゲーム > 本体"),
+        ("ナイキ スニーカー", "image", "靴 > スニーカー"),
+    ]
+    assert "extra" not in records[0].result
+    assert records_from_observability(str(tmp_path / "obs.db"), str(tmp_path / "store"),
+                                      since=records[-1].recorded_at) == []
+
+
+class _NoLLM:
+    def chat(self, **_kwargs):
+        raise AssertionError("cached titles must not call the model")
+
+
+def test_analyze_title_returns_the_cached_answer_without_llm_calls(cache: TitleAnswerCache):
+    analyzer = MercariAnalyzer(
+        settings=SimpleNamespace(request_timeout=60, model_call_max_retries=0, model_call_total_budget_seconds=10),
+        brand_store=None, category_store=None, vision_client=_NoLLM(), category_client=_NoLLM(),
+        title_cache=cache,
+    )
+
+    result = analyzer.analyze_title("Nintendo Switch 有機EL ホワイト 本体 美品", image_url=None, language="ja")
+
+    assert result == SWITCH
+
+
+def _analyzer_with_categories(tmp_path: Path, cache: TitleAnswerCache, rows: str) -> MercariAnalyzer:
+    path = tmp_path / "categories.csv"
+    path.write_text("category_id,path,group_name,meru_id\n" + rows, encoding="utf-8")
+    return MercariAnalyzer(
+        settings=SimpleNamespace(request_timeout=60, model_call_max_retries=0, model_call_total_budget_seconds=10),
+        brand_store=None, category_store=CategoryStore(str(path)), vision_client=_NoLLM(),
+        category_client=_NoLLM(), title_cache=cache,
+    )
+
+
+def test_cached_answers_are_rebuilt_from_the_live_category_table(tmp_path: Path, cache: TitleAnswerCache):
+    analyzer = _analyzer_with_categories(tmp_path, cache, "1,テレビゲーム > 本体,テレビゲーム,m-9\n")
+
+    result = analyzer.cached_title_result("Nintendo Switch 有機EL ホワイト 本体 美品")
+
+    assert result["best_category_id"] == "1"
+    assert result["meru_id"] == "m-9"
+
+
+def test_cached_ids_missing_after_a_reload_are_a_miss(tmp_path: Path, cache: TitleAnswerCache):
+    moved = _analyzer_with_categories(tmp_path, cache, "1,テレビゲーム > 周辺機器,テレビゲーム,\n")
+    assert moved.cached_title_result("Nintendo Switch 有機EL ホワイト 本体 美品") is None
+    gone = _analyzer_with_categories(tmp_path, cache, "7,テレビゲーム > 本体,テレビゲーム,\n")
+    assert gone.cached_title_result("Nintendo Switch 有機EL ホワイト 本体 美品") is None
+
+
+def test_pinned_models_bypass_the_cache(cache: TitleAnswerCache):
+    analyzer = MercariAnalyzer(
+        settings=SimpleNamespace(request_timeout=60, model_call_max_retries=0, model_call_total_budget_seconds=10),
+        brand_store=None, category_store=None, vision_client=_NoLLM(), category_client=_NoLLM(),
+        title_cache=cache,
+    )
+    analyzer.classify_title_group = lambda title, language, model_override=None: None
+    analyzer.title_image_fallback = lambda *args, **kwargs: {"best_target_path": "fresh"}
+
+    for override in ({"category_model_override": "pinned"}, {"vision_model_override": "pinned"}):
+        result = analyzer.analyze_title(
+            "Nintendo Switch 有機EL ホワイト 本体 美品", image_url=None, language="ja", **override
+        )
+        assert result == {"best_target_path": "fresh"}
@@ -0,0 +1,153 @@
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app.service import MercariAnalyzer
+from app.title_classifier import (
+    TitleGroupClassifier,
+    evaluate,
+    examples_from_category_csv,
+    examples_from_observability,
+    load_title_classifier,
+)
+
+
+EXAMPLES = [
+    ("ナイキ スニーカー 27cm", "靴"),
+    ("アディダス スニーカー 白", "靴"),
+    ("ブーツ レザー 26cm", "靴"),
+    ("ゲーム ソフト Switch", "テレビゲーム"),
+    ("PS5 本体 ゲーム", "テレビゲーム"),
+    ("Switch 本体 有機EL", "テレビゲーム"),
+]
+
+
+def test_predicts_the_closest_class_with_a_posterior():
+    classifier = TitleGroupClassifier.train(EXAMPLES)
+
+    label, confidence = classifier.predict("ナイキ スニーカー 28cm")
+    assert label == "靴"
+    assert 0.5 < confidence <= 1.0
+    assert classifier.predict("Switch ゲーム")[0] == "テレビゲーム"
+    assert classifier.predict("") == (None, 0.0)
+
+
+def test_model_round_trips_through_json(tmp_path):
+    classifier = TitleGroupClassifier.train(EXAMPLES)
+    path = tmp_path / "model.json"
+    classifier.save(str(path))
+
+    loaded = load_title_classifier(str(path))
+
+    assert loaded.predict("PS5 ゲーム") == classifier.predict("PS5 ゲーム")
+    assert load_title_classifier(str(tmp_path / "missing.json")) is None
+    path.write_text(json.dumps({"version": 99}), encoding="utf-8")
+    assert load_title_classifier(str(path)) is None
+
+
+def test_category_paths_become_examples_below_the_top_level(tmp_path):
+    csv_path = tmp_path / "categories.csv"
+    csv_path.write_text(
+        "category_id,path,group_name\n"
+        "1,靴 > メンズ > スニーカー,靴\n"
+        "2,ファッション > トップス,ファッション\n"
+        "3,テレビゲーム,テレビゲーム\n",
+        encoding="utf-8",
+    )
+
+    # Groups outside TOP_LEVEL_CATEGORIES and rows with nothing below the top are skipped.
+    assert examples_from_category_csv(str(csv_path)) == [("メンズ スニーカー", "靴")]
+
+
+def test_history_is_read_from_recorded_title_category_calls(tmp_path):
+    store_root = tmp_path / "store"
+    (store_root / "d").mkdir(parents=True)
+    db_path = tmp_path / "obs.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE llm_calls (timestamp_utc TEXT, stage TEXT, status TEXT, prompt_file TEXT, parsed_file TEXT)"
+        )
+        for i, (title, answer, status) in enumerate([
+            ("ナイキ スニーカー", "靴", "ok"),
+            ("謎の品", "どれでもない", "ok"),
+            ("PS5", "テレビゲーム", "failed"),
+        ]):
+            prompt = {"messages": [{"role": "user", "content": f"Product title: {title}\n\nLanguage of the title: Japanese"}]}
+            (store_root / "d" / f"p{i}.json").write_text(json.dumps(prompt), encoding="utf-8")
+            (store_root / "d" / f"r{i}.json").write_text(json.dumps({"top_level_category": answer}), encoding="utf-8")
+            conn.execute(
+                "INSERT INTO llm_calls VALUES (?, 'title_category', ?, ?, ?)",
+                (f"2026-01-0{i + 1}", status, f"d/p{i}.json", f"d/r{i}.json"),
+            )
+
+    assert examples_from_observability(str(db_path), str(store_root)) == [("ナイキ スニーカー", "靴")]
+    assert examples_from_observability(str(tmp_path / "none.db"), str(store_root)) == []
+
+
+def test_evaluate_reports_coverage_accuracy_and_latency():
+    report = evaluate(TitleGroupClassifier.train(EXAMPLES), EXAMPLES, thresholds=(0.0, 1.01))
+
+    assert report["examples"] == len(EXAMPLES)
+    assert report["accuracy"] == 1.0
+    assert report["thresholds"][0]["coverage"] == 1.0
+    assert report["thresholds"][1] == {"threshold": 1.01, "coverage": 0.0, "accuracy": None}
+    assert report["latency_ms"]["p50"] is not None
+
+
+class _Classifier:
+    def __init__(self, answers):
+        self.answers = answers
+
+    def predict(self, title):
+        return self.answers.get(title, (None, 0.0))
+
+
+class _ChatClient:
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+        self.calls = []
+
+    def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        return json.dumps(self.payloads.pop(0)), {"choices": []}
+
+
+def _analyzer(classifier, payloads):
+    settings = SimpleNamespace(
+        category_model="category-test", category_fallback_models=[], request_timeout=60,
+        model_call_max_retries=0, model_call_total_budget_seconds=10, title_classifier_min_confidence=0.9,
+    )
+    client = _ChatClient(payloads)
+    analyzer = MercariAnalyzer(
+        settings=settings, brand_store=None, category_store=None,
+        vision_client=client, category_client=client, title_classifier=classifier,
+    )
+    return analyzer, client
+
+
+@pytest.mark.parametrize("confidence, llm_calls", [(0.95, 0), (0.6, 1)])
+def test_confident_local_answers_skip_the_llm(confidence, llm_calls):
+    analyzer, client = _analyzer(
+        _Classifier({"ナイキ スニーカー": ("靴", confidence)}),
+        [{"top_level_category": "メンズファッション"}],
+    )
+
+    group = analyzer.classify_title_group("ナイキ スニーカー", "ja")
+
+    assert len(client.calls) == llm_calls
+    assert group == ("靴" if llm_calls == 0 else "メンズファッション")
+
+
+def test_batched_groups_only_send_titles_the_classifier_is_unsure_of():
+    analyzer, client = _analyzer(
+        _Classifier({"ナイキ スニーカー": ("靴", 0.99), "PS5": ("テレビゲーム", 0.99)}),
+        [{"results": [{"id": "1", "top_level_category": "メンズファッション"}]}],
+    )
+
+    groups = analyzer.classify_title_groups(["ナイキ スニーカー", "シャツ", "PS5"], "ja")
+
+    assert groups == ["靴", "メンズファッション", "テレビゲーム"]
+    prompt = client.calls[0]["messages"][1]["content"]
+    assert "1: シャツ" in prompt and "PS5" not in prompt